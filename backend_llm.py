@@ -0,0 +1,203 @@
+# --- BACKENDS DE LLM: INTERFACE COMUM E BACKEND FALSO (OFFLINE, DETERMINÍSTICO) ---
+# A extração só depende de um "modelo" com generate_content / generate_content_async (como genai.GenerativeModel) cujas
+# respostas tenham parts, text, prompt_feedback, usage_metadata e candidates[0].finish_reason. O backend Gemini fica em
+# processar (depende da configuração da API Key); o backend falso responde, sem rede, um JSON conforme o schema para os
+# blocos pedidos no prompt, com latência, erros transitórios (503) e respostas 429 configuráveis, para testes de carga
+# do lote, do serviço HTTP e dos benchmarks.
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+from cache_contexto_gemini import CacheContextoLocal, CacheContextoPrompt
+from cliente_gemini_async import estimar_tokens_prompt
+
+BACKEND_LLM_GEMINI = "gemini"
+BACKEND_LLM_FALSO = "falso"
+DISTRIBUICOES_LATENCIA = ("fixa", "uniforme", "lognormal")
+
+
+class BackendLLM:
+    """Interface: provedor de LLM usado na extração."""
+
+    nome = ""
+
+    @property
+    def identificador_modelo(self) -> str:
+        """Identifica o modelo na chave do cache de respostas (respostas de backends diferentes não se misturam)."""
+        return self.nome
+
+    def configurar(self) -> bool:
+        """Prepara o backend (credenciais etc.); False se não puder ser usado."""
+        raise NotImplementedError
+
+    def obter_modelo(self) -> Any:
+        raise NotImplementedError
+
+    def criar_generation_config(self) -> Any:
+        return None
+
+    def criar_cache_contexto(self, ttl_s: float) -> Optional[CacheContextoPrompt]:
+        """Cache de contexto para o prefixo do prompt (None se o backend não oferecer)."""
+        return None
+
+
+class ErroSimuladoLLM(Exception):
+    """Erro transitório simulado pelo backend falso, com 'code' (429/503) e 'retry_delay' como os erros da API."""
+
+    def __init__(self, code: int, mensagem: str, retry_delay: Optional[float] = None):
+        super().__init__(mensagem)
+        self.code = code
+        self.retry_delay = retry_delay
+
+
+def _valor_sintetico(campo: str, indice: int) -> str:
+    nome = campo.lower()
+    if "cpf" in nome or "cnpj" in nome:
+        return "000.000.000-00"
+    if "data" in nome or "venc" in nome or "desde" in nome:
+        return "01/01/2025"
+    if "hora" in nome:
+        return "08:00:00"
+    if any(parte in nome for parte in ("valor", "saldo", "limite", "tx_", "perc", "parc", "cap_", "aplic_", "prazo")):
+        return f"{indice * 1000:,}.00".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"{campo.upper()} {indice}"
+
+
+def gerar_json_sintetico(blocos_config_map: Dict[str, Any], itens_por_lista: int = 2) -> Dict[str, Any]:
+    """JSON conforme o schema: campos diretos, listas ('nome_lista_json') e sub-listas aninhadas de cada bloco."""
+    dados: Dict[str, Any] = {}
+    for config_bloco in blocos_config_map.values():
+        bloco = {campo: _valor_sintetico(campo, i) for i, campo in enumerate(config_bloco.get("campos_esperados") or [], 1)}
+        nome_lista = config_bloco.get("nome_lista_json")
+        if nome_lista:
+            sub_lista = config_bloco.get("sub_lista_aninhada") if isinstance(config_bloco.get("sub_lista_aninhada"), dict) else None
+            itens = []
+            for n in range(1, itens_por_lista + 1):
+                item = {campo: _valor_sintetico(campo, n) for campo in config_bloco.get("sub_campos_lista") or []}
+                if sub_lista and sub_lista.get("nome_json"):
+                    item[sub_lista["nome_json"]] = [{campo: _valor_sintetico(campo, m) for campo in sub_lista.get("campos") or []}
+                                                   for m in range(1, itens_por_lista + 1)]
+                itens.append(item)
+            bloco[nome_lista] = itens
+        dados[config_bloco["json_chave"]] = bloco
+    return dados
+
+
+class ModeloFalso:
+    """Modelo offline: responde o JSON sintético dos blocos cujas 'json_chave' aparecem no fim do prompt.
+
+    A latência de cada resposta segue `distribuicao_latencia` com média `latencia_s` e desvio `desvio_latencia_s`, mais
+    `latencia_por_mil_tokens_saida_s` por mil tokens da resposta. Com probabilidade `taxa_429` a requisição é recusada
+    na hora (code 429, retry_delay `atraso_retry_429_s`); com `taxa_erros`, falha com 503 após a latência.
+    Os sorteios usam `semente`: a mesma sequência de requisições produz as mesmas latências e erros.
+    """
+
+    def __init__(self, blocos_config_map: Dict[str, Any], marcador_fim: Optional[str] = None, latencia_s: float = 0.5,
+                 distribuicao_latencia: str = "fixa", desvio_latencia_s: float = 0.0, latencia_por_mil_tokens_saida_s: float = 0.0,
+                 taxa_erros: float = 0.0, taxa_429: float = 0.0, atraso_retry_429_s: float = 1.0, itens_por_lista: int = 2,
+                 semente: int = 0):
+        if distribuicao_latencia not in DISTRIBUICOES_LATENCIA:
+            raise ValueError(f"distribuicao_latencia deve ser uma de {DISTRIBUICOES_LATENCIA}.")
+        if not 0 <= taxa_erros + taxa_429 <= 1:
+            raise ValueError("taxa_erros + taxa_429 deve estar entre 0 e 1.")
+        self.blocos_config_map = blocos_config_map
+        self.marcador_fim = marcador_fim
+        self.latencia_s = latencia_s
+        self.distribuicao_latencia = distribuicao_latencia
+        self.desvio_latencia_s = desvio_latencia_s
+        self.latencia_por_mil_tokens_saida_s = latencia_por_mil_tokens_saida_s
+        self.taxa_erros = taxa_erros
+        self.taxa_429 = taxa_429
+        self.atraso_retry_429_s = atraso_retry_429_s
+        self.itens_por_lista = itens_por_lista
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._respostas: Dict[Tuple[str, ...], str] = {} # json_chaves pedidas -> texto da resposta
+        self.requisicoes = 0
+        self.erros_simulados = 0
+        self.respostas_429 = 0
+
+    def _sortear_latencia(self) -> float:
+        media, desvio = self.latencia_s, self.desvio_latencia_s
+        if self.distribuicao_latencia == "uniforme":
+            return max(0.0, self._aleatorio.uniform(media - desvio, media + desvio))
+        if self.distribuicao_latencia == "lognormal" and media > 0 and desvio > 0:
+            sigma2 = math.log(1 + (desvio / media) ** 2)
+            return self._aleatorio.lognormvariate(math.log(media) - sigma2 / 2, math.sqrt(sigma2))
+        return media
+
+    def _texto_resposta(self, prompt: Any) -> str:
+        texto_prompt = prompt if isinstance(prompt, str) else "".join(str(parte) for parte in prompt)
+        inicio = texto_prompt.rfind(self.marcador_fim) if self.marcador_fim else -1
+        final_prompt = texto_prompt[max(inicio, 0):]
+        blocos = {nome: config for nome, config in self.blocos_config_map.items() if f'"{config["json_chave"]}"' in final_prompt}
+        blocos = blocos or self.blocos_config_map
+        chave = tuple(config["json_chave"] for config in blocos.values())
+        with self._lock:
+            if chave not in self._respostas:
+                self._respostas[chave] = json.dumps(gerar_json_sintetico(blocos, self.itens_por_lista), ensure_ascii=False)
+            return self._respostas[chave]
+
+    def _planejar(self, prompt: Any) -> Tuple[Optional[str], float, Optional[ErroSimuladoLLM]]:
+        """(texto da resposta, latência a aguardar, erro a levantar depois da espera ou None)."""
+        with self._lock:
+            self.requisicoes += 1
+            sorteio = self._aleatorio.random()
+            latencia = self._sortear_latencia()
+            if sorteio < self.taxa_429:
+                self.respostas_429 += 1
+                return None, 0.0, ErroSimuladoLLM(429, "Resource has been exhausted (simulado).", self.atraso_retry_429_s)
+            if sorteio < self.taxa_429 + self.taxa_erros:
+                self.erros_simulados += 1
+                return None, latencia, ErroSimuladoLLM(503, "The service is currently unavailable (simulado).")
+        texto = self._texto_resposta(prompt)
+        return texto, latencia + self.latencia_por_mil_tokens_saida_s * estimar_tokens_prompt(texto) / 1000, None
+
+    @staticmethod
+    def _resposta(prompt: Any, texto: str) -> Any:
+        tokens_entrada, tokens_saida = estimar_tokens_prompt(prompt), estimar_tokens_prompt(texto)
+        uso = SimpleNamespace(prompt_token_count=tokens_entrada, candidates_token_count=tokens_saida,
+                              total_token_count=tokens_entrada + tokens_saida, cached_content_token_count=None)
+        return SimpleNamespace(parts=[texto], text=texto, prompt_feedback=None, usage_metadata=uso,
+                               candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"))])
+
+    def generate_content(self, prompt: Any, generation_config: Any = None, request_options: Any = None) -> Any:
+        texto, latencia, erro = self._planejar(prompt)
+        time.sleep(latencia)
+        if erro is not None:
+            raise erro
+        return self._resposta(prompt, texto)
+
+    async def generate_content_async(self, prompt: Any, generation_config: Any = None) -> Any:
+        texto, latencia, erro = self._planejar(prompt)
+        await asyncio.sleep(latencia)
+        if erro is not None:
+            raise erro
+        return self._resposta(prompt, texto)
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"requisicoes": self.requisicoes, "erros_simulados": self.erros_simulados, "respostas_429": self.respostas_429}
+
+
+class BackendFalso(BackendLLM):
+    """Backend offline com ModeloFalso (os parâmetros nomeados vão para o modelo); cache de contexto local."""
+
+    nome = BACKEND_LLM_FALSO
+
+    def __init__(self, blocos_config_map: Dict[str, Any], **config_modelo: Any):
+        self.modelo = ModeloFalso(blocos_config_map, **config_modelo)
+
+    def configurar(self) -> bool:
+        return True
+
+    def obter_modelo(self) -> Any:
+        return self.modelo
+
+    def criar_cache_contexto(self, ttl_s: float) -> Optional[CacheContextoPrompt]:
+        return CacheContextoLocal(self.modelo, ttl_s)
+
@@ -0,0 +1,84 @@
+# --- BENCHMARK: ACHATAMENTO DA RESPOSTA DA IA, RECURSIVO (CÓPIA POR NÍVEL) vs. PILHA EXPLÍCITA ---
+# Monta uma resposta no formato do schema com uma lista 'operacoes_coop' de N itens, cada um com garantias
+# aninhadas (sub_lista_aninhada) e listas simples, e compara o achatar_json atual com a versão recursiva anterior.
+# Uso: python benchmarks/bench_achatar_json.py [--itens 5000] [--repeticoes 7]
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from processar import achatar_json # noqa: E402
+
+
+def _achatar_json_recursivo(objeto_json: Union[Dict[str, Any], List[Any]], prefixo_pai: str = '', separador: str = '_') -> Dict[str, Any]:
+    """Implementação anterior: um dicionário novo por nível, copiado no pai com update()."""
+    items_achatados: Dict[str, Any] = {}
+    if isinstance(objeto_json, dict):
+        for chave, valor in objeto_json.items():
+            chave_str = str(chave)
+            nova_chave_prefixada = f"{prefixo_pai}{separador}{chave_str}" if prefixo_pai else chave_str
+            items_achatados.update(_achatar_json_recursivo(valor, nova_chave_prefixada, separador=separador))
+    elif isinstance(objeto_json, list):
+        if not objeto_json:
+            pass
+        elif not any(isinstance(item, (dict, list)) for item in objeto_json):
+            try:
+                items_achatados[prefixo_pai if prefixo_pai else "lista_simples_na_raiz"] = ', '.join(map(str, objeto_json))
+            except TypeError:
+                items_achatados[prefixo_pai if prefixo_pai else "erro_lista_simples_na_raiz"] = str(objeto_json)
+        else:
+            for i, item_lista in enumerate(objeto_json):
+                items_achatados.update(_achatar_json_recursivo(item_lista, f"{prefixo_pai}{separador}{i+1}", separador=separador))
+    else:
+        if prefixo_pai:
+            items_achatados[prefixo_pai] = objeto_json
+    return items_achatados
+
+
+def _gerar_resposta(num_itens: int) -> Dict[str, Any]:
+    gerador = random.Random(42)
+    operacoes = [{
+        "numero_operacao": f"{gerador.randint(100000, 999999)}-{i}",
+        "modalidade": gerador.choice(["CAPITAL DE GIRO", "CHEQUE ESPECIAL", "FINANCIAMENTO RURAL"]),
+        "valor_contratado": round(gerador.uniform(1_000, 500_000), 2),
+        "situacao": {"atraso_dias": gerador.randint(0, 90), "classificacao_risco": gerador.choice("AABCD")},
+        "garantias": [{"tipo": "AVAL", "nome": f"AVALISTA {i}-{j}", "cpf": f"{gerador.randint(0, 99999999999):011d}"} for j in range(2)],
+        "parcelas_em_aberto": [gerador.randint(1, 60) for _ in range(3)],
+        "observacoes": [],
+    } for i in range(num_itens)]
+    return {"dados_associado": {"nome": "FULANO DE TAL", "cpf": "000.000.000-00"}, "operacoes_coop": operacoes}
+
+
+def _mediana_ms(funcao: Any, resposta: Dict[str, Any], repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao(resposta)
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="achatar_json: recursivo vs. pilha explícita.")
+    parser.add_argument("--itens", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=7)
+    args = parser.parse_args()
+
+    resposta = _gerar_resposta(args.itens)
+    achatado = achatar_json(resposta)
+    assert json.dumps(achatado, ensure_ascii=False) == json.dumps(_achatar_json_recursivo(resposta), ensure_ascii=False), "Saídas divergentes"
+
+    ms_recursivo = _mediana_ms(_achatar_json_recursivo, resposta, args.repeticoes)
+    ms_pilha = _mediana_ms(achatar_json, resposta, args.repeticoes)
+    print(f"Resposta: {args.itens} itens em 'operacoes_coop' -> {len(achatado)} chaves achatadas")
+    print(f"Recursivo (anterior): {ms_recursivo:8.2f} ms")
+    print(f"Pilha explícita:      {ms_pilha:8.2f} ms | aceleração: {ms_recursivo / ms_pilha:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
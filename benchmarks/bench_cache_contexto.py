@@ -0,0 +1,116 @@
+# --- BENCHMARK: LOTE COM E SEM O CACHE DE CONTEXTO DO PREFIXO DO PROMPT ---
+# Envia os documentos de um lote (cache de respostas desligado) com o prefixo de instruções no próprio prompt e com o
+# prefixo registrado no cache de contexto, e compara latência do lote, tokens de entrada enviados por requisição e tokens
+# faturáveis (tokens do cache cobrados com --fator-preco-cache). Sem --api-real, o servidor é simulado com o substituto
+# local (CacheContextoLocal): latência = ida e volta fixa + processamento da entrada por token fora do cache.
+# Com --api-real, usa CacheContextoGemini (requer GOOGLE_API_KEY e um modelo com versão fixa em --modelo); se o prefixo
+# ficar abaixo do mínimo de tokens do modelo, a API recusa o registro e o lote roda sem cache (falhas > 0 no resumo).
+# Uso: python benchmarks/bench_cache_contexto.py [--documentos 20] [--sem-particoes] [--api-real --modelo models/gemini-1.5-flash-002]
+import argparse
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from benchmarks.pdf_sintetico import BLOCOS_SUMULA_SCHEMA, gerar_pdf_sumula # noqa: E402
+from cache_contexto_gemini import CacheContextoLocal # noqa: E402
+from cache_disco import CacheDisco # noqa: E402
+from cliente_gemini_async import estimar_tokens_prompt # noqa: E402
+from contabilidade_tokens import somar_resumos_tokens # noqa: E402
+
+LATENCIA_IDA_VOLTA_S = 0.05
+LATENCIA_POR_MIL_TOKENS_ENTRADA_S = 0.02 # Processamento da entrada fora do cache
+
+
+class ServidorSimulado:
+    """Responde um JSON vazio por bloco; o prefixo registrado no substituto local não conta no tempo de processamento."""
+
+    def __init__(self) -> None:
+        self.cache_contexto: Any = None
+
+    def generate_content(self, conteudo: List[str], generation_config: Any = None, request_options: Any = None) -> Any:
+        prefixos_em_cache = set(self.cache_contexto.prefixos.values()) if self.cache_contexto is not None else set()
+        tokens_fora_cache = estimar_tokens_prompt([parte for parte in conteudo if parte not in prefixos_em_cache])
+        time.sleep(LATENCIA_IDA_VOLTA_S + LATENCIA_POR_MIL_TOKENS_ENTRADA_S * tokens_fora_cache / 1000)
+        chaves = [chave for chave in processar.BLOCO_CONFIG.values() if f'"{chave["json_chave"]}"' in conteudo[-1]]
+        texto = json.dumps({chave["json_chave"]: {} for chave in chaves})
+        uso = SimpleNamespace(prompt_token_count=estimar_tokens_prompt(conteudo), candidates_token_count=estimar_tokens_prompt(texto))
+        return SimpleNamespace(parts=[texto], text=texto, prompt_feedback=None, usage_metadata=uso,
+                               candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"))])
+
+
+def _executar_lote(textos: List[str], caminho_pdf: Path) -> Dict[str, Any]:
+    resumos: List[Dict[str, Any]] = []
+    latencias: List[float] = []
+    t_inicio = time.perf_counter()
+    for texto in textos:
+        metricas: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        if processar.enviar_texto_completo_para_gemini_todos_blocos(texto, processar.BLOCO_CONFIG, caminho_pdf, metricas) is None:
+            sys.exit("Falha na chamada à API.")
+        latencias.append(time.perf_counter() - t0)
+        resumos.append(metricas["contabilidade"].resumo())
+    total = somar_resumos_tokens(resumos)
+    total["duracao_s"] = time.perf_counter() - t_inicio
+    total["latencia_p50_s"] = statistics.median(latencias)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lote com o prefixo do prompt inline vs. no cache de contexto.")
+    parser.add_argument("--documentos", type=int, default=20)
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--sem-particoes", action="store_true", help="Mede no modo de chamada única.")
+    parser.add_argument("--fator-preco-cache", type=float, default=0.25, help="Preço do token em cache relativo ao token normal.")
+    parser.add_argument("--api-real", action="store_true", help="Usa a API Gemini real (requer GOOGLE_API_KEY).")
+    parser.add_argument("--modelo", default=None, help="--api-real: modelo com versão fixa para o cache de contexto.")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    processar.ENVIAR_PARTICOES_EM_PARALELO = not args.sem_particoes
+    servidor = ServidorSimulado()
+    if args.api_real:
+        processar.GEMINI_MODELO_CACHE_CONTEXTO = args.modelo
+    else:
+        processar.configurar_api_gemini = lambda: True
+        processar._criar_generation_config_gemini = lambda: None
+        processar.obter_modelo_gemini = lambda: servidor
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_pdf = gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas, blocos=BLOCOS_SUMULA_SCHEMA)
+        texto = processar.extrair_texto_do_pdf(caminho_pdf)
+        textos = [f"{texto}\nDocumento {i}" for i in range(args.documentos)]
+        processar.CACHE_RESPOSTAS_GEMINI = CacheDisco(Path(dir_tmp) / "cache", 0, habilitado=False)
+
+        totais = {}
+        for rotulo, usar_cache_contexto in (("prefixo inline", False), ("cache de contexto", True)):
+            processar.USAR_CACHE_CONTEXTO_GEMINI = usar_cache_contexto
+            if usar_cache_contexto and not args.api_real:
+                servidor.cache_contexto = processar._cache_contexto_prompt = CacheContextoLocal(servidor)
+            total = totais[rotulo] = _executar_lote(textos, caminho_pdf)
+            enviados = total["tokens_entrada"] - total["tokens_cache"]
+            faturaveis = enviados + args.fator_preco_cache * total["tokens_cache"]
+            print(f"{rotulo:18s}: lote {total['duracao_s']:6.2f} s | p50 por documento {total['latencia_p50_s'] * 1000:7.1f} ms | "
+                  f"{total['chamadas']} requisições | enviados ~{enviados // max(1, total['chamadas']):5d} tokens/requisição | "
+                  f"faturáveis ~{faturaveis:9.0f} tokens")
+        cache_contexto = processar.obter_cache_contexto_prompt()
+        if cache_contexto is not None:
+            print(f"Cache de contexto: {cache_contexto.estatisticas()}")
+            cache_contexto.limpar()
+
+    antes, depois = totais["prefixo inline"], totais["cache de contexto"]
+    print(f"API {'real' if args.api_real else 'simulada'} | tokens enviados: -{100 * depois['tokens_cache'] / max(1, antes['tokens_entrada']):.0f}% | "
+          f"duração do lote: {antes['duracao_s'] / depois['duracao_s']:.2f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# --- BENCHMARK: EXTRAÇÃO DE TEXTO DO PDF, CACHE FRIO vs. QUENTE ---
+# Uso: python benchmarks/bench_cache_texto_pdf.py [--paginas 20] [--repeticoes 5]
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from cache_disco import CacheDisco # noqa: E402
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extração de texto do PDF: cache frio vs. quente.")
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_pdf = gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas)
+        tempos_frio, tempos_quente = [], []
+        for i in range(args.repeticoes):
+            processar.CACHE_TEXTO_PDF = CacheDisco(Path(dir_tmp) / f"cache_{i}", 10 * 1024 * 1024)
+            t0 = time.perf_counter(); texto_frio = processar.extrair_texto_do_pdf(caminho_pdf); tempos_frio.append(time.perf_counter() - t0)
+            t0 = time.perf_counter(); texto_quente = processar.extrair_texto_do_pdf(caminho_pdf); tempos_quente.append(time.perf_counter() - t0)
+            assert texto_frio == texto_quente, "Texto do cache difere do texto extraído"
+
+    mediana_frio, mediana_quente = statistics.median(tempos_frio), statistics.median(tempos_quente)
+    print(f"PDF sintético: {args.paginas} páginas, {len(texto_frio)} caracteres, {args.repeticoes} repetições")
+    print(f"Frio (pdfplumber + limpeza + gravação): mediana {mediana_frio * 1000:.1f} ms")
+    print(f"Quente (leitura do cache):              mediana {mediana_quente * 1000:.2f} ms")
+    print(f"Aceleração: {mediana_frio / mediana_quente:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
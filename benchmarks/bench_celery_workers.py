@@ -0,0 +1,71 @@
+# --- BENCHMARK: VAZÃO DO LOTE CELERY COM DIFERENTES NÚMEROS DE PROCESSOS WORKER ---
+# Requer um redis local (ou PROCESSAR_CELERY_BROKER / PROCESSAR_CELERY_RESULTADOS apontando para outro).
+# Para cada valor de --workers, sobe um worker Celery com o backend de LLM falso (latência fixa por requisição),
+# enfileira o lote de PDFs sintéticos como chord e mede a vazão até o resumo ficar pronto.
+# Uso: python benchmarks/bench_celery_workers.py [--workers 1 2 4 8] [--documentos 32] [--latencia-api 1.0]
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+import tarefas_celery # noqa: E402
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+
+def _executar_worker(concorrencia: int, latencia_api_s: float) -> None:
+    """Processo filho: worker Celery com o backend de LLM falso, de latência fixa (herdado pelos processos do pool)."""
+    processar.BACKEND_LLM = processar.BACKEND_LLM_FALSO
+    processar.CONFIG_BACKEND_FALSO = {"latencia_s": latencia_api_s}
+    processar.CACHE_RESPOSTAS_GEMINI.habilitado = False
+    processar.CACHE_TEXTO_PDF.habilitado = False
+    tarefas_celery.app.worker_main(["worker", f"--concurrency={concorrencia}", "--pool=prefork", "--loglevel=WARNING",
+                                    f"--hostname=bench{concorrencia}@%h", "--without-gossip", "--without-mingle"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Vazão do lote Celery por número de processos worker.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--documentos", type=int, default=32)
+    parser.add_argument("--paginas", type=int, default=5)
+    parser.add_argument("--latencia-api", type=float, default=1.0, help="Latência simulada por requisição à API (s).")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS) # Uso interno: processo do worker
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        _executar_worker(args.worker, args.latencia_api)
+        return
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        dir_pdfs = Path(dir_tmp) / "pdfs"
+        dir_pdfs.mkdir()
+        for i in range(args.documentos):
+            gerar_pdf_sumula(dir_pdfs / f"sumula_{i:03d}.pdf", num_paginas=args.paginas)
+        caminho_modelo = Path(dir_tmp) / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = "{{DADOS_ASSOCIADO_NOME}}"
+        wb.save(caminho_modelo)
+
+        print(f"Documentos: {args.documentos} x {args.paginas} páginas | latência API simulada: {args.latencia_api:.2f} s")
+        print(f"{'workers':>8}{'duração (s)':>14}{'docs/min':>12}{'falhas':>8}")
+        for num_workers in args.workers:
+            tarefas_celery.app.control.purge()
+            processo_worker = subprocess.Popen([sys.executable, __file__, "--worker", str(num_workers), "--latencia-api", str(args.latencia_api)])
+            try:
+                time.sleep(3) # Tempo para o worker se registrar no broker
+                t_inicio = time.perf_counter()
+                resumo = tarefas_celery.enfileirar_lote(dir_pdfs, caminho_modelo, dir_saida=Path(dir_tmp) / f"saida_{num_workers}").get(timeout=3600)
+                duracao_s = time.perf_counter() - t_inicio
+            finally:
+                processo_worker.terminate()
+                processo_worker.wait(timeout=60)
+            print(f"{num_workers:>8}{duracao_s:>14.2f}{resumo['documentos'] / duracao_s * 60:>12.1f}{resumo['falhas']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# --- BENCHMARK: PLANILHA CONSOLIDADA DO LOTE, MEMÓRIA E TEMPO EM FUNÇÃO DO NÚMERO DE LINHAS ---
+# Compara o exportador consolidado (spool em disco + Workbook(write_only=True)) com a abordagem ingênua de montar
+# a planilha inteira em memória (Workbook normal). Mede o pico de memória Python (tracemalloc) e o tempo total.
+# Uso: python benchmarks/bench_exportacao_consolidada.py [--linhas 1000 10000] [--chaves 120]
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from openpyxl import Workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from exportacao_consolidada import ExportadorConsolidado # noqa: E402
+
+
+def _gerar_linha(i: int, num_chaves: int) -> Dict[str, Any]:
+    # Algumas chaves só aparecem em parte das súmulas (ex.: duplicados), como no lote real
+    linha: Dict[str, Any] = {f"CAMPO_{j}": f"valor {i}-{j}" for j in range(num_chaves)}
+    if i % 7 == 0:
+        linha[f"CAMPO_0_DUPLICADO_{i % 3}"] = "extra"
+    return linha
+
+
+def _exportar_write_only(caminho: Path, linhas: int, num_chaves: int) -> None:
+    exportador = ExportadorConsolidado(caminho)
+    for i in range(linhas):
+        exportador.adicionar(f"sumula_{i}.pdf", _gerar_linha(i, num_chaves))
+    exportador.finalizar()
+
+
+def _exportar_em_memoria(caminho: Path, linhas: int, num_chaves: int) -> None:
+    dados: List[Tuple[str, Dict[str, Any]]] = []
+    colunas: Dict[str, None] = {}
+    for i in range(linhas):
+        linha = _gerar_linha(i, num_chaves)
+        colunas.update(dict.fromkeys(linha))
+        dados.append((f"sumula_{i}.pdf", linha))
+    workbook = Workbook()
+    aba = workbook.active
+    aba.append(["PDF"] + list(colunas))
+    for nome_pdf, linha in dados:
+        aba.append([nome_pdf] + [linha.get(coluna) for coluna in colunas])
+    workbook.save(caminho)
+
+
+def _medir(funcao: Callable[[], None]) -> Tuple[float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    funcao()
+    duracao_s = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao_s, pico / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Planilha consolidada: write-only vs. Workbook em memória.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--chaves", type=int, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        print(f"{'Linhas':>8}{'write-only (s)':>16}{'pico (MB)':>11}{'em memória (s)':>17}{'pico (MB)':>11}")
+        for linhas in args.linhas:
+            s_wo, mb_wo = _medir(lambda: _exportar_write_only(Path(dir_tmp) / "wo.xlsx", linhas, args.chaves))
+            s_mem, mb_mem = _medir(lambda: _exportar_em_memoria(Path(dir_tmp) / "mem.xlsx", linhas, args.chaves))
+            print(f"{linhas:>8}{s_wo:>16.2f}{mb_wo:>11.1f}{s_mem:>17.2f}{mb_mem:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# --- BENCHMARK: EXTRAÇÃO POR PÁGINA, DUAS CHAMADAS A extract_text vs. PASSAGEM ÚNICA ---
+# Páginas esparsas (capas) caem no caminho layout=True, em que a versão anterior agrupava os caracteres
+# duas vezes; páginas densas (tabelas) só usam o texto em fluxo e servem de controle.
+# Uso: python benchmarks/bench_extracao_paginas.py [--paginas 40] [--repeticoes 5]
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+import pdfplumber
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+
+def _extrair_duas_chamadas(pagina: Any) -> Tuple[str, Optional[str]]:
+    """Caminho anterior: extract_text(layout=False) e, se poucas palavras, extract_text(layout=True)."""
+    texto_stream = pagina.extract_text(x_tolerance=processar.PDF_X_TOLERANCE, y_tolerance=processar.PDF_Y_TOLERANCE, layout=False)
+    texto_layout = None
+    if not texto_stream or len(texto_stream.split()) < processar.PDF_MIN_PALAVRAS_STREAM:
+        texto_layout = pagina.extract_text(x_tolerance=processar.PDF_X_TOLERANCE, y_tolerance=processar.PDF_Y_TOLERANCE, layout=True)
+    return texto_stream, texto_layout
+
+
+def _medir(caminho_pdf: Path, extrair: Callable[[Any], Tuple[str, Optional[str]]], repeticoes: int) -> float:
+    """Mediana do tempo (ms por página) de abrir o PDF e extrair todas as páginas."""
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        with pdfplumber.open(caminho_pdf) as pdf:
+            for pagina in pdf.pages:
+                extrair(pagina)
+            num_paginas = len(pdf.pages)
+        tempos.append((time.perf_counter() - t0) * 1000 / num_paginas)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extração por página: duas chamadas a extract_text vs. passagem única.")
+    parser.add_argument("--paginas", type=int, default=40)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        casos = {
+            "capas esparsas": gerar_pdf_sumula(Path(dir_tmp) / "esparso.pdf", num_paginas=args.paginas, paginas_esparsas=args.paginas),
+            "tabelas densas": gerar_pdf_sumula(Path(dir_tmp) / "denso.pdf", num_paginas=args.paginas),
+        }
+        print(f"{'Caso':<18}{'2 chamadas (ms/pág)':>22}{'passagem única (ms/pág)':>26}{'aceleração':>12}")
+        for nome_caso, caminho_pdf in casos.items():
+            with pdfplumber.open(caminho_pdf) as pdf: # Confere a equivalência antes de medir
+                assert all(_extrair_duas_chamadas(p) == processar._extrair_textos_pagina(p) for p in pdf.pages), "Saídas divergentes"
+            ms_antes = _medir(caminho_pdf, _extrair_duas_chamadas, args.repeticoes)
+            ms_depois = _medir(caminho_pdf, processar._extrair_textos_pagina, args.repeticoes)
+            print(f"{nome_caso:<18}{ms_antes:>22.2f}{ms_depois:>26.2f}{ms_antes / ms_depois:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# --- BENCHMARK: O QUE VAI PARA O GEMINI COM E SEM O EXTRATOR LOCAL POR RÓTULOS ---
+# Intercepta as requisições (sem chamar a API) e compara requisições, caracteres/tokens estimados do prompt e campos de
+# saída solicitados, além do tempo gasto no extrator local. Os tokens de saída (campos pedidos) dominam a latência da resposta.
+# Sem --pdf, usa a súmula sintética; os rótulos resolvidos dependem das 'regras_locais' do schema.
+# Uso: python benchmarks/bench_extrator_local.py [--pdf sumula.pdf] [--paginas 20] [--sem-particoes]
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from benchmarks.pdf_sintetico import gerar_pdf_sumula # noqa: E402
+from cache_disco import CacheDisco # noqa: E402
+from cliente_gemini_async import CARACTERES_POR_TOKEN_ESTIMADO # noqa: E402
+
+
+def _medir_requisicoes(texto: str, caminho_pdf: Path) -> List[Dict[str, int]]:
+    requisicoes: List[Dict[str, int]] = []
+
+    def _solicitar_registrando(texto_pdf: str, blocos_config_map: Dict[str, Any], pdf_path: Path, chave_cache: str, contabilidade: Any = None, prazo: Any = None) -> Dict[str, Any]:
+        prompt = processar.construir_prompt_gemini(texto_pdf, blocos_config_map)
+        campos = sum(len(c.get("campos_esperados") or []) + len(c.get("sub_campos_lista") or []) for c in blocos_config_map.values())
+        requisicoes.append({"caracteres": len(prompt), "campos_saida": campos})
+        return {}
+
+    processar._solicitar_blocos_gemini = _solicitar_registrando
+    processar.enviar_texto_completo_para_gemini_todos_blocos(texto, processar.BLOCO_CONFIG, caminho_pdf)
+    return requisicoes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prompt enviado ao Gemini com e sem o extrator local por rótulos.")
+    parser.add_argument("--pdf", type=Path, default=None, help="PDF a usar (padrão: súmula sintética).")
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--sem-particoes", action="store_true", help="Mede no modo de chamada única.")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    processar.configurar_api_gemini = lambda: True
+    processar.ENVIAR_PARTICOES_EM_PARALELO = not args.sem_particoes
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_pdf = args.pdf or gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas)
+        texto = processar.extrair_texto_do_pdf(caminho_pdf)
+        processar.CACHE_RESPOSTAS_GEMINI = CacheDisco(Path(dir_tmp) / "cache", 0, habilitado=False)
+
+        for rotulo, usar_extrator in (("sem extrator local", False), ("com extrator local", True)):
+            processar.USAR_EXTRATOR_LOCAL = usar_extrator
+            requisicoes = _medir_requisicoes(texto, caminho_pdf)
+            caracteres = sum(r["caracteres"] for r in requisicoes)
+            print(f"{rotulo:20s}: {len(requisicoes)} requisição(ões), {caracteres:9d} caracteres de prompt "
+                  f"(~{caracteres // CARACTERES_POR_TOKEN_ESTIMADO} tokens de entrada), "
+                  f"{sum(r['campos_saida'] for r in requisicoes)} campos de saída solicitados")
+
+        tempos = []
+        for _ in range(args.repeticoes):
+            t0 = time.perf_counter()
+            dados_locais, _ = processar.resolver_campos_localmente(texto, processar.BLOCO_CONFIG, caminho_pdf)
+            tempos.append((time.perf_counter() - t0) * 1000)
+        print(f"Extrator local: {sum(len(v) for v in dados_locais.values())} campos resolvidos em {statistics.median(tempos):.2f} ms "
+              f"(texto de {len(texto)} caracteres)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# --- BENCHMARK: LOCALIZAÇÃO DOS PLACEHOLDERS NO MODELO EXCEL, VARREDURA DA ABA vs. ÍNDICE DO MODELO ---
+# Gera um modelo grande (muitas células de texto fixo e poucas com {{CHAVE}}) e mede, sobre a aba já carregada,
+# o passo que o índice elimina: varrer todas as células com a regex vs. visitar só as células listadas no índice.
+# Também mede o preenchimento completo (carga + substituição + gravação) com e sem índice.
+# Uso: python benchmarks/bench_indice_placeholders.py [--linhas 2000] [--colunas 30] [--placeholders 150]
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from indice_placeholders_excel import CacheIndicePlaceholders, caminho_indice_placeholders, localizar_placeholders # noqa: E402
+
+
+def _mediana_ms(funcao: Any, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Placeholders do modelo Excel: varredura da aba vs. índice.")
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--colunas", type=int, default=30)
+    parser.add_argument("--placeholders", type=int, default=150)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    gerador = random.Random(42)
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_modelo = Path(dir_tmp) / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for linha in range(1, args.linhas + 1):
+            for coluna in range(1, args.colunas + 1):
+                ws.cell(row=linha, column=coluna, value=f"Rótulo {linha}-{coluna}")
+        dados = {}
+        for i in range(args.placeholders):
+            ws.cell(row=gerador.randint(1, args.linhas), column=gerador.randint(1, args.colunas), value=f"Campo {i}: {{{{CAMPO_{i}}}}}")
+            dados[f"{{{{CAMPO_{i}}}}}"] = f"valor {i}"
+        wb.save(caminho_modelo)
+        caminho_json = Path(dir_tmp) / "dados.json"
+        caminho_json.write_text(json.dumps(dados), encoding="utf-8")
+
+        aba = openpyxl.load_workbook(caminho_modelo).active
+        processar.CACHE_INDICE_PLACEHOLDERS = CacheIndicePlaceholders()
+        processar._obter_celulas_com_placeholders(aba, caminho_modelo) # Gera o índice
+        com_indice = processar._obter_celulas_com_placeholders(aba, caminho_modelo)
+        assert [c.coordinate for c, _ in com_indice] == [c.coordinate for c, _ in localizar_placeholders(aba)], "Índice diverge da varredura"
+
+        ms_varredura = _mediana_ms(lambda: localizar_placeholders(aba), args.repeticoes)
+        ms_indice = _mediana_ms(lambda: processar._obter_celulas_com_placeholders(aba, caminho_modelo), args.repeticoes)
+
+        def _preencher_sem_indice() -> None:
+            processar.CACHE_INDICE_PLACEHOLDERS = CacheIndicePlaceholders()
+            caminho_indice_placeholders(caminho_modelo).unlink(missing_ok=True)
+            processar.preencher_excel_novo_com_placeholders(caminho_json, caminho_modelo, Path(dir_tmp) / "saida.xlsx")
+        ms_total_sem = _mediana_ms(_preencher_sem_indice, args.repeticoes)
+        ms_total_com = _mediana_ms(lambda: processar.preencher_excel_novo_com_placeholders(caminho_json, caminho_modelo, Path(dir_tmp) / "saida.xlsx"), args.repeticoes)
+
+        print(f"Modelo: {args.linhas} x {args.colunas} células, {len(com_indice)} com placeholders")
+        print(f"Localizar placeholders - varredura: {ms_varredura:8.2f} ms | índice: {ms_indice:8.2f} ms | aceleração: {ms_varredura / ms_indice:.0f}x")
+        print(f"Preenchimento completo - sem índice: {ms_total_sem:8.1f} ms | com índice: {ms_total_com:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
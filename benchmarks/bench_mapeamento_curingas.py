@@ -0,0 +1,90 @@
+# --- BENCHMARK: RESOLUÇÃO DE CHAVES CURINGA ('*'), REGEX POR REGEX vs. ÍNDICE COMPILADO ---
+# Monta uma resposta achatada de ~2.000 chaves a partir do mapeamento_config.json real (instâncias das listas
+# com '*', chaves exatas e chaves desconhecidas) e mede só a etapa de resolução dos curingas do normalizador.
+# Uso: python benchmarks/bench_mapeamento_curingas.py [--chaves 2000] [--repeticoes 5]
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from indice_mapeamento import IndiceCuringasMapeamento # noqa: E402
+
+
+def _resolver_regex_por_regex(mapeamento: Dict[str, Any], chaves_ia: List[str]) -> List[Optional[Tuple[str, str]]]:
+    """Caminho anterior do normalizar_chaves_json: compila uma regex por curinga e testa em sequência."""
+    mapa_regex = {}
+    for chave_padrao in sorted([k for k in mapeamento if '*' in k], key=lambda k: (k.count('_'), len(k)), reverse=True):
+        mapa_regex[chave_padrao] = re.compile('^' + re.escape(chave_padrao).replace(r'\*', r'([0-9]+)') + '$')
+    resolucoes = []
+    for chave_ia in chaves_ia:
+        resolucao = None
+        if chave_ia not in mapeamento:
+            for chave_padrao, regex in mapa_regex.items():
+                match = regex.match(chave_ia)
+                if match:
+                    nome_base = str(mapeamento[chave_padrao])
+                    resolucao = (nome_base.replace("*", match.group(1)) if '*' in nome_base else nome_base, chave_padrao)
+                    break
+        resolucoes.append(resolucao)
+    return resolucoes
+
+
+def _resolver_com_indice(indice: IndiceCuringasMapeamento, mapeamento: Dict[str, Any], chaves_ia: List[str]) -> List[Optional[Tuple[str, str]]]:
+    return [None if chave_ia in mapeamento else indice.resolver(chave_ia) for chave_ia in chaves_ia]
+
+
+def _gerar_chaves(mapeamento: Dict[str, Any], total: int) -> List[str]:
+    gerador = random.Random(42)
+    curingas = [k for k in mapeamento if '*' in k]
+    exatas = [k for k in mapeamento if '*' not in k]
+    chaves = []
+    while len(chaves) < total:
+        sorteio = gerador.random()
+        if sorteio < 0.6: # Itens de listas (ex.: modalidades do SCR, avalistas): o caso caro
+            chaves.append(gerador.choice(curingas).replace('*', str(gerador.randint(0, 40))))
+        elif sorteio < 0.9:
+            chaves.append(gerador.choice(exatas))
+        else: # Chaves novas que a IA inventou: percorrem todos os curingas sem casar
+            chaves.append(f"{gerador.choice(exatas)}_{gerador.randint(0, 9)}_observacao")
+    return chaves
+
+
+def _mediana_ms(funcao: Any, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resolução de chaves curinga: regex por regex vs. índice compilado.")
+    parser.add_argument("--chaves", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(Path(__file__).resolve().parent.parent / "mapeamento_config.json", encoding="utf-8") as f:
+        mapeamento = json.load(f)["mapeamento_para_chaves_padronizadas"]
+    chaves_ia = _gerar_chaves(mapeamento, args.chaves)
+    indice = IndiceCuringasMapeamento(mapeamento)
+    assert _resolver_regex_por_regex(mapeamento, chaves_ia) == _resolver_com_indice(indice, mapeamento, chaves_ia), "Resoluções divergentes"
+
+    ms_regex = _mediana_ms(lambda: _resolver_regex_por_regex(mapeamento, chaves_ia), args.repeticoes)
+    ms_construcao = _mediana_ms(lambda: IndiceCuringasMapeamento(mapeamento), args.repeticoes)
+    ms_indice = _mediana_ms(lambda: _resolver_com_indice(indice, mapeamento, chaves_ia), args.repeticoes)
+    print(f"Mapeamento: {len(mapeamento)} chaves ({len(indice)} com '*') | resposta achatada: {len(chaves_ia)} chaves")
+    print(f"Regex por regex:             {ms_regex:8.2f} ms")
+    print(f"Índice (construção, 1x/ver.): {ms_construcao:8.2f} ms")
+    print(f"Índice (resolução):          {ms_indice:8.2f} ms | aceleração: {ms_regex / ms_indice:.1f}x "
+          f"({ms_regex / (ms_indice + ms_construcao):.1f}x incluindo a construção)")
+
+
+if __name__ == "__main__":
+    main()
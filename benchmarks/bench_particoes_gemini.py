@@ -0,0 +1,70 @@
+# --- BENCHMARK: LATÊNCIA PONTA A PONTA, CHAMADA ÚNICA vs. UMA REQUISIÇÃO POR PARTIÇÃO ---
+# Sem --api-real, a API é simulada: latência = ida e volta fixa + custo por campo de saída solicitado,
+# o que reproduz o fato de a geração da saída (e não o envio do texto) dominar o tempo de resposta.
+# Uso: python benchmarks/bench_particoes_gemini.py [--api-real --pdf sumula.pdf] [--repeticoes 3]
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from cache_disco import CacheDisco # noqa: E402
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+LATENCIA_IDA_VOLTA_S = 0.8
+LATENCIA_POR_CAMPO_S = 0.05
+
+
+def _contar_campos_saida(blocos_config_map: Dict[str, Any]) -> int:
+    total = 0
+    for config_bloco in blocos_config_map.values():
+        total += len(config_bloco.get("campos_esperados") or []) + len(config_bloco.get("sub_campos_lista") or [])
+    return total
+
+
+def _solicitar_blocos_simulado(texto: str, blocos_config_map: Dict[str, Any], pdf_path: Path, chave_cache: str, contabilidade: Any = None, prazo: Any = None) -> Dict[str, Any]:
+    time.sleep(LATENCIA_IDA_VOLTA_S + LATENCIA_POR_CAMPO_S * _contar_campos_saida(blocos_config_map))
+    return {config["json_chave"]: {campo: "X" for campo in config.get("campos_esperados") or []} for config in blocos_config_map.values()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latência da extração: chamada única vs. partições em paralelo.")
+    parser.add_argument("--api-real", action="store_true", help="Usa a API Gemini real (requer GOOGLE_API_KEY).")
+    parser.add_argument("--pdf", type=Path, default=None, help="PDF a usar (padrão: súmula sintética de 20 páginas).")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    if not args.api_real:
+        processar._solicitar_blocos_gemini = _solicitar_blocos_simulado
+        processar.configurar_api_gemini = lambda: True
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_pdf = args.pdf or gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=20)
+        texto = processar.extrair_texto_do_pdf(caminho_pdf)
+        processar.CACHE_RESPOSTAS_GEMINI = CacheDisco(Path(dir_tmp) / "cache", 0, habilitado=False)
+        medianas = {}
+        for modo, em_paralelo in (("chamada única", False), ("por partição (paralelo)", True)):
+            processar.ENVIAR_PARTICOES_EM_PARALELO = em_paralelo
+            tempos = []
+            for _ in range(args.repeticoes):
+                t0 = time.perf_counter()
+                resultado = processar.enviar_texto_completo_para_gemini_todos_blocos(texto, processar.BLOCO_CONFIG, caminho_pdf)
+                tempos.append(time.perf_counter() - t0)
+                assert resultado is not None, "Falha na chamada à API"
+            medianas[modo] = statistics.median(tempos)
+            print(f"{modo:<26} mediana {medianas[modo]:.2f} s | chaves de 1º nível: {json.dumps(sorted(resultado))}")
+
+    num_particoes = len(processar.agrupar_blocos_por_particao(processar.BLOCO_CONFIG))
+    print(f"Partições: {num_particoes} | API {'real' if args.api_real else 'simulada'} | "
+          f"aceleração: {medianas['chamada única'] / medianas['por partição (paralelo)']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# --- BENCHMARK: LOTE SEQUENCIAL POR DOCUMENTO vs. PIPELINE EM ESTÁGIOS (--async) ---
+# A IA é o backend falso (offline) com latência fixa por requisição; prompt, extração, normalização e Excel são reais.
+# Com 1 worker, o lote sequencial soma extração + API + Excel de cada PDF; o pipeline sobrepõe
+# a extração do PDF k+1 e o Excel do PDF k-1 à espera da API do PDF k.
+# Uso: python benchmarks/bench_pipeline_lote.py [--documentos 8] [--paginas 10] [--latencia-api 1.0] [--workers 1]
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lote sequencial por documento vs. pipeline em estágios.")
+    parser.add_argument("--documentos", type=int, default=8)
+    parser.add_argument("--paginas", type=int, default=10)
+    parser.add_argument("--latencia-api", type=float, default=1.0, help="Latência simulada por requisição (s).")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    backend = {"backend_llm": processar.BACKEND_LLM_FALSO, "config_backend_falso": {"latencia_s": args.latencia_api}}
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        dir_pdfs = Path(dir_tmp) / "pdfs"
+        dir_pdfs.mkdir()
+        for i in range(args.documentos):
+            gerar_pdf_sumula(dir_pdfs / f"sumula_{i:03d}.pdf", num_paginas=args.paginas)
+        caminho_modelo = Path(dir_tmp) / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        wb.active["A1"], wb.active["A2"] = "{{NOME_ASSOCIADO}}", "{{CPF_ASSOCIADO}}"
+        wb.save(caminho_modelo)
+
+        t0 = time.perf_counter()
+        resumo_seq = processar.executar_lote(dir_pdfs, caminho_modelo, None, args.workers, Path(dir_tmp) / "saida_seq", usar_cache=False, **backend)
+        duracao_seq = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        resumo_pipe = processar.executar_lote_async(dir_pdfs, caminho_modelo, None, args.workers, Path(dir_tmp) / "saida_pipe", usar_cache=False, **backend)
+        duracao_pipe = time.perf_counter() - t0
+
+    print(processar.formatar_resumo_lote(resumo_pipe))
+    print(f"\nDocumentos: {args.documentos} x {args.paginas} páginas | workers: {args.workers} | latência API simulada: {args.latencia_api:.2f} s")
+    print(f"Sequencial: {duracao_seq:.2f} s ({resumo_seq['documentos_por_minuto']:.1f} docs/min) | "
+          f"Pipeline: {duracao_pipe:.2f} s ({resumo_pipe['documentos_por_minuto']:.1f} docs/min) | "
+          f"aceleração: {duracao_seq / duracao_pipe:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
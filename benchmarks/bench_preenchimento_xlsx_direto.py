@@ -0,0 +1,81 @@
+# --- BENCHMARK: PREENCHIMENTO DO MODELO EXCEL, OPENPYXL (CARREGA E REGRAVA TUDO) vs. EDIÇÃO DIRETA DO XML ---
+# Mede `preencher_excel_com_dados` nos dois caminhos sobre o mesmo modelo e confere que as saídas têm os mesmos valores.
+# Sem --modelo, usa um modelo sintético no formato salvo pelo Excel (sharedStrings.xml, estilos, duas abas).
+# Uso: python benchmarks/bench_preenchimento_xlsx_direto.py [--modelo sumula.xlsx --sheet Sumula] [--linhas 2000] [--colunas 30]
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import openpyxl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from benchmarks.xlsx_sintetico import gerar_modelo_xlsx # noqa: E402
+from indice_placeholders_excel import REGEX_PLACEHOLDER_EXCEL, localizar_placeholders # noqa: E402
+
+
+def _mediana_ms(funcao: Any, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def _valores(caminho: Path) -> Dict[str, Any]:
+    wb = openpyxl.load_workbook(caminho)
+    return {ws.title: [[c.value for c in linha] for linha in ws.iter_rows()] for ws in wb.worksheets}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Preenchimento do modelo Excel: openpyxl vs. edição direta do XML.")
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo real (.xlsx); padrão: modelo sintético.")
+    parser.add_argument("--sheet", default=None)
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--colunas", type=int, default=30)
+    parser.add_argument("--placeholders", type=int, default=150)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_modelo = args.modelo
+        if caminho_modelo is None:
+            caminho_modelo = Path(dir_tmp) / "modelo.xlsx"
+            gerar_modelo_xlsx(caminho_modelo, args.linhas, args.colunas, args.placeholders)
+            args.sheet = "Sumula"
+        workbook = openpyxl.load_workbook(caminho_modelo)
+        aba = workbook[args.sheet] if args.sheet else workbook.active
+        placeholders = {m.group(0) for celula, _ in localizar_placeholders(aba) for m in REGEX_PLACEHOLDER_EXCEL.finditer(celula.value)}
+        dados = {ph: f"VALOR DE {ph[2:-2]}" for ph in sorted(placeholders)}
+
+        caminho_openpyxl = Path(dir_tmp) / "saida_openpyxl.xlsx"
+        caminho_direto = Path(dir_tmp) / "saida_direto.xlsx"
+
+        def _openpyxl() -> None:
+            processar.PREENCHER_XLSX_DIRETO = False
+            processar.preencher_excel_com_dados(dados, caminho_modelo, caminho_openpyxl, args.sheet)
+
+        def _direto() -> None:
+            processar.PREENCHER_XLSX_DIRETO = True
+            processar.preencher_excel_com_dados(dados, caminho_modelo, caminho_direto, args.sheet)
+
+        _openpyxl() # Gera o índice de placeholders: o caminho openpyxl é medido já com o índice
+        ms_openpyxl = _mediana_ms(_openpyxl, args.repeticoes)
+        suportado = processar.preencher_xlsx_direto(caminho_modelo, caminho_direto, dados, args.sheet) is not None
+        ms_direto = _mediana_ms(_direto, args.repeticoes)
+        assert _valores(caminho_direto) == _valores(caminho_openpyxl), "Saídas divergem"
+
+        print(f"Modelo: '{caminho_modelo.name}' ({caminho_modelo.stat().st_size / 1024:.0f} KiB), aba '{aba.title}', {len(dados)} placeholders distintos")
+        print(f"Preenchimento direto suportado: {'sim' if suportado else 'não (caiu no openpyxl)'}")
+        print(f"openpyxl: {ms_openpyxl:8.1f} ms | direto: {ms_direto:8.1f} ms | aceleração: {ms_openpyxl / ms_direto:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
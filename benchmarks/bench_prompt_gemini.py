@@ -0,0 +1,61 @@
+# --- BENCHMARK: TAMANHO E MONTAGEM DO PROMPT GEMINI (PREFIXO COMPILADO + TEXTO EM PARTE SEPARADA) ---
+# Mede os tokens estimados das instruções por requisição (chamada única e por partição), o tempo de montagem com o
+# prefixo já compilado e a memória alocada ao montar a requisição em partes vs. concatenada em uma única string.
+# Uso: python benchmarks/bench_prompt_gemini.py [--pdf sumula.pdf] [--paginas 20] [--repeticoes 2000]
+import argparse
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from benchmarks.pdf_sintetico import gerar_pdf_sumula # noqa: E402
+from cliente_gemini_async import estimar_tokens_prompt # noqa: E402
+
+
+def _pico_alocado_kib(funcao: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    resultado = funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return pico / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tamanho e custo de montagem do prompt Gemini.")
+    parser.add_argument("--pdf", type=Path, default=None, help="PDF a usar (padrão: súmula sintética).")
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        texto = processar.extrair_texto_do_pdf(args.pdf or gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas))
+    blocos = processar.BLOCO_CONFIG
+    particoes = processar.agrupar_blocos_por_particao(blocos)
+
+    prefixo, sufixo = processar.obter_moldura_prompt_gemini(blocos)
+    tokens_particoes = sum(estimar_tokens_prompt(list(processar.obter_moldura_prompt_gemini(sub))) for sub in particoes)
+    print(f"Instruções: ~{estimar_tokens_prompt([prefixo, sufixo])} tokens na chamada única; "
+          f"~{tokens_particoes} tokens somando as {len(particoes)} partições")
+    print(f"Texto do documento: ~{estimar_tokens_prompt(texto)} tokens ({len(texto)} caracteres)")
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeticoes):
+        processar.construir_partes_prompt_gemini(texto, blocos)
+    print(f"Montagem em partes (prefixo em cache): {(time.perf_counter() - t0) * 1e6 / args.repeticoes:.1f} µs por requisição")
+
+    kib_partes = _pico_alocado_kib(lambda: processar.construir_partes_prompt_gemini(texto, blocos))
+    kib_concatenado = _pico_alocado_kib(lambda: processar.construir_prompt_gemini(texto, blocos))
+    print(f"Memória alocada por requisição: partes {kib_partes:.1f} KiB | string concatenada {kib_concatenado:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# --- BENCHMARK: TOKENS DE ENTRADA POR DOCUMENTO, DOCUMENTO INTEIRO vs. SÓ AS SEÇÕES DOS BLOCOS ---
+# Intercepta as requisições (sem chamar a API) e soma os tokens estimados dos prompts de um documento, com e sem
+# ENVIAR_APENAS_SECOES_DOS_BLOCOS, na chamada única e por partição. Sem --pdf, usa uma súmula sintética com um
+# título para cada bloco do schema.
+# Uso: python benchmarks/bench_recorte_secoes.py [--pdf sumula.pdf] [--paginas 20] [--margem 200]
+import argparse
+import logging
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from benchmarks.pdf_sintetico import BLOCOS_SUMULA_SCHEMA, gerar_pdf_sumula # noqa: E402
+from cache_disco import CacheDisco # noqa: E402
+from cliente_gemini_async import estimar_tokens_prompt # noqa: E402
+
+
+def _tokens_por_requisicao(texto: str, caminho_pdf: Path) -> List[int]:
+    tokens: List[int] = []
+
+    def _solicitar_registrando(texto_pdf: str, blocos_config_map: Dict[str, Any], pdf_path: Path, chave_cache: str, contabilidade: Any = None, prazo: Any = None) -> Dict[str, Any]:
+        tokens.append(estimar_tokens_prompt(processar.construir_partes_prompt_gemini(texto_pdf, blocos_config_map)))
+        return {}
+
+    processar._solicitar_blocos_gemini = _solicitar_registrando
+    processar.enviar_texto_completo_para_gemini_todos_blocos(texto, processar.BLOCO_CONFIG, caminho_pdf)
+    return tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tokens de entrada por documento com e sem o recorte por seções.")
+    parser.add_argument("--pdf", type=Path, default=None, help="PDF a usar (padrão: súmula sintética).")
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--margem", type=int, default=processar.MARGEM_SECAO_CARACTERES)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if not processar.carregar_schema_extracao():
+        sys.exit("Schema de extração inválido.")
+    processar.configurar_api_gemini = lambda: True
+    processar.USAR_EXTRATOR_LOCAL = False # Mede só o efeito do recorte
+    processar.MARGEM_SECAO_CARACTERES = args.margem
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        caminho_pdf = args.pdf or gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas, blocos=BLOCOS_SUMULA_SCHEMA)
+        texto = processar.extrair_texto_do_pdf(caminho_pdf)
+        processar.CACHE_RESPOSTAS_GEMINI = CacheDisco(Path(dir_tmp) / "cache", 0, habilitado=False)
+        trechos = processar.localizar_trechos_documento(texto)
+        print(f"Documento: {len(texto)} caracteres; títulos encontrados para {len(trechos)}/{len(processar.BLOCO_CONFIG)} blocos")
+
+        for modo, em_paralelo in (("chamada única", False), ("por partição", True)):
+            processar.ENVIAR_PARTICOES_EM_PARALELO = em_paralelo
+            totais = {}
+            for recortar in (False, True):
+                processar.ENVIAR_APENAS_SECOES_DOS_BLOCOS = recortar
+                totais[recortar] = _tokens_por_requisicao(texto, caminho_pdf)
+            antes, depois = sum(totais[False]), sum(totais[True])
+            print(f"{modo:14s}: {len(totais[True])} requisição(ões) | documento inteiro ~{antes:6d} tokens | "
+                  f"só as seções ~{depois:6d} tokens | redução {100 * (1 - depois / antes):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
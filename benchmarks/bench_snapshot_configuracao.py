@@ -0,0 +1,60 @@
+# --- BENCHMARK: CARGA DA CONFIGURAÇÃO (SCHEMA + PARTIÇÕES + MAPEAMENTO), JSON vs. SNAPSHOT BINÁRIO ---
+# Mede o que cada processo (GUI, worker do lote, worker do serviço) faz ao iniciar: validar o schema, gerar as
+# partições, carregar o mapeamento e compilar o índice dos curingas. O snapshot é gravado em diretório temporário.
+# Uso: python benchmarks/bench_snapshot_configuracao.py [--repeticoes 50]
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+
+
+def _carregar_configuracao(usar_snapshot: bool) -> Any:
+    processar._snapshot_configuracao = None
+    processar._indice_curingas_cache = None
+    assert processar.carregar_schema_extracao(usar_snapshot=usar_snapshot) and processar.gerar_particoes_dinamicamente()
+    assert (processar._snapshot_configuracao is not None) == usar_snapshot, "Snapshot não foi usado/ignorado como esperado"
+    mapa_chaves = processar.carregar_mapeamento_de_arquivo(processar.ARQUIVO_MAPEAMENTO_CONFIG)["mapeamento_para_chaves_padronizadas"]
+    return processar.BLOCO_CONFIG, processar.LISTA_DE_NOMES_BLOCOS_PARTICIONADA, mapa_chaves, processar.obter_indice_curingas(mapa_chaves)
+
+
+def _mediana_ms(usar_snapshot: bool, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        _carregar_configuracao(usar_snapshot)
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga da configuração: JSON validado vs. snapshot binário.")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL) # O custo do log não faz parte da comparação
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        processar.ARQUIVO_SNAPSHOT_CONFIG = Path(dir_tmp) / "snapshot_config.pickle"
+        assert processar.compilar_snapshot_configuracao(), "Falha ao compilar o snapshot"
+        via_json = _carregar_configuracao(False)
+        via_snapshot = _carregar_configuracao(True)
+        assert via_json[:3] == via_snapshot[:3], "Configuração do snapshot difere da carregada dos JSONs"
+        chave_teste = "modalidades_scr_3_prejuizo"
+        assert via_json[3].resolver(chave_teste) == via_snapshot[3].resolver(chave_teste), "Índice do snapshot diverge"
+
+        ms_json = _mediana_ms(False, args.repeticoes)
+        ms_snapshot = _mediana_ms(True, args.repeticoes)
+        print(f"Snapshot: {processar.ARQUIVO_SNAPSHOT_CONFIG.stat().st_size / 1024:.0f} KB | {len(via_json[0])} blocos, "
+              f"{len(via_json[2])} chaves de mapeamento ({len(via_json[3])} com '*')")
+        print(f"JSON (validação + índice): {ms_json:7.2f} ms")
+        print(f"Snapshot:                  {ms_snapshot:7.2f} ms | aceleração: {ms_json / ms_snapshot:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
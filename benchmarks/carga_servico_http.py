@@ -0,0 +1,79 @@
+# --- TESTE DE CARGA LOCAL DO SERVIÇO HTTP (POST /extract): VAZÃO (RPS) E LATÊNCIA p50/p95 ---
+# Sem --url, sobe o servico_http em processo (servidor WSGI com threads) com o backend de LLM falso (offline);
+# com --url, dispara contra um servidor já em execução (ex.: gunicorn -c gunicorn.conf.py servico_http:app).
+# Uso: python benchmarks/carga_servico_http.py [--url http://127.0.0.1:8000] [--requisicoes 200] [--concorrencia 16]
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from pdf_sintetico import gerar_pdf_sumula # noqa: E402
+
+
+
+def _subir_servidor_local(latencia_api_s: float, taxa_429: float, porta: int) -> str:
+    """Sobe o servico_http em uma thread com o backend falso: o prompt, os retries e a decodificação da resposta são reais."""
+    from werkzeug.serving import make_server
+    import processar
+    processar.BACKEND_LLM = processar.BACKEND_LLM_FALSO # Antes de importar o serviço, que carrega o estado na importação
+    processar.CONFIG_BACKEND_FALSO = {"latencia_s": latencia_api_s, "distribuicao_latencia": "lognormal",
+                                      "desvio_latencia_s": latencia_api_s / 4, "taxa_429": taxa_429, "atraso_retry_429_s": 0.5}
+    import servico_http
+    processar.CACHE_RESPOSTAS_GEMINI.habilitado = False # Cada requisição vai ao "modelo"
+    servidor = make_server("127.0.0.1", porta, servico_http.app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{porta}"
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round((len(ordenados) - 1) * percentil / 100.0)))] if ordenados else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga do POST /extract: RPS e latência p50/p95.")
+    parser.add_argument("--url", default=None, help="Servidor já em execução (padrão: sobe um local com API simulada).")
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--paginas", type=int, default=5, help="Páginas do PDF sintético enviado.")
+    parser.add_argument("--latencia-api", type=float, default=0.5, help="Latência média do backend falso (s), sem --url.")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração de respostas 429 do backend falso, sem --url.")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        conteudo_pdf = gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=args.paginas).read_bytes()
+    url_base = args.url or _subir_servidor_local(args.latencia_api, args.taxa_429, args.porta)
+    print(f"Alvo: {url_base} | /healthz: {requests.get(f'{url_base}/healthz', timeout=10).status_code}")
+
+    def _enviar(_: int) -> Tuple[float, int]:
+        t0 = time.perf_counter()
+        try:
+            resposta = requests.post(f"{url_base}/extract", files={"pdf": ("sumula.pdf", conteudo_pdf, "application/pdf")}, timeout=300)
+            status = resposta.status_code
+        except requests.RequestException:
+            status = 0
+        return time.perf_counter() - t0, status
+
+    _enviar(0) # Aquecimento (texto do PDF vai para o cache de extração)
+    t_inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        resultados = list(executor.map(_enviar, range(args.requisicoes)))
+    duracao_s = time.perf_counter() - t_inicio
+
+    latencias = [latencia for latencia, status in resultados if status == 200]
+    falhas = len(resultados) - len(latencias)
+    print(f"Requisições: {len(resultados)} | concorrência: {args.concorrencia} | falhas: {falhas} | duração: {duracao_s:.2f} s")
+    print(f"RPS: {len(resultados) / duracao_s:.1f} | latência p50: {_percentil(latencias, 50) * 1000:.0f} ms | "
+          f"p95: {_percentil(latencias, 95) * 1000:.0f} ms | máx: {max(latencias, default=0) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# --- GERADOR DE PDFs SINTÉTICOS DE SÚMULA (PARA BENCHMARKS) ---
+# Escreve PDFs mínimos (fonte Helvetica padrão, sem dependências extras) com o layout de texto
+# típico de uma súmula: cabeçalho, blocos rotulados "Rótulo: valor", tabelas e rodapé "Página: i / n".
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BLOCOS_SUMULA = [
+    ("Dados do Associado", ["Nome", "CPF/CNPJ", "Renda Bruta Mensal", "Data de Nascimento", "Estado Civil", "Profissão", "Conta Corrente", "Risco", "Limite de Crédito"]),
+    ("Linha de crédito", ["Modalidade", "Finalidade", "Taxa de Juros", "Prazo", "Carência", "Valor Solicitado"]),
+    ("Dados da Proposta", ["Número da Proposta", "Valor da Operação", "Garantias", "Forma de Pagamento", "Vencimento", "IOF", "Tarifa", "CET"]),
+    ("Reciprocidade", ["Saldo Médio", "Aplicações", "Capital Social", "Seguros", "Cartões", "Consórcios"]),
+    ("Parecer do Analista", ["Parecer", "Observações", "Restrições"]),
+]
+# Mesmo layout, com um título para cada bloco do extraction_schema.json (para medir o recorte por seções)
+BLOCOS_SUMULA_SCHEMA = BLOCOS_SUMULA[:3] + [
+    ("Reciprocidade – Portfólio de Negócios (Cooperativa)", ["Saldo Médio", "Aplicações", "Capital Social"]),
+    ("Reciprocidade – Portfólio de Negócios (Bancoob)", ["Seguros", "Cartões", "Consórcios"]),
+    ("Responsabilidade – Conta Corrente", ["Saldo Devedor", "Limite Utilizado"]),
+    ("Responsabilidade Direta - Operações de Crédito do Associado COOPERATIVA", ["Total Contratado", "Saldo Total"]),
+    ("Parecer do Analista", ["Parecer", "Observações", "Restrições"]),
+]
+
+
+def _escapar_texto_pdf(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _linhas_pagina(num_pagina: int, total_paginas: int, linhas_por_pagina: int, blocos: List[Tuple[str, List[str]]]) -> List[str]:
+    linhas = ["SICOOB", "Súmula de Crédito", f"Cooperativa: 3{num_pagina:03d} PA: {num_pagina % 40:02d} Data: 15/03/2024 Hora: 10:{num_pagina % 60:02d}"]
+    i = 0
+    while len(linhas) < linhas_por_pagina - 1:
+        titulo, rotulos = blocos[(num_pagina + i) % len(blocos)]
+        linhas.append(titulo)
+        for rotulo in rotulos:
+            linhas.append(f"{rotulo}: VALOR {num_pagina}-{i} {rotulo.upper()} 1.234,56")
+        linhas.append("Operação Contrato Valor Saldo Vencimento")
+        for j in range(4):
+            linhas.append(f"OP{num_pagina}{i}{j} C-{j:05d} 10.000,00 {j * 1000},00 01/0{1 + j}/2026")
+        i += 1
+    linhas = linhas[:linhas_por_pagina - 1]
+    linhas.append(f"Página: {num_pagina} / {total_paginas}")
+    return linhas
+
+
+def gerar_pdf_sumula(
+    caminho: Path, num_paginas: int = 20, linhas_por_pagina: int = 60, paginas_esparsas: int = 0,
+    blocos: Optional[List[Tuple[str, List[str]]]] = None
+) -> Path:
+    """Gera um PDF sintético de súmula. As primeiras `paginas_esparsas` páginas têm apenas algumas palavras (capa)."""
+    objetos = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None, # /Pages, preenchido após conhecer as páginas
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    ids_paginas = []
+    for n in range(1, num_paginas + 1):
+        linhas = ["SICOOB", "Capa"] if n <= paginas_esparsas else _linhas_pagina(n, num_paginas, linhas_por_pagina, blocos or BLOCOS_SUMULA)
+        conteudo = "BT /F1 9 Tf 11 TL 40 810 Td " + " ".join(f"({_escapar_texto_pdf(l)}) Tj T*" for l in linhas) + " ET"
+        conteudo_bytes = conteudo.encode("cp1252")
+        id_pagina = len(objetos) + 1
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {id_pagina + 1} 0 R >>")
+        objetos.append((conteudo_bytes, len(conteudo_bytes)))
+        ids_paginas.append(id_pagina)
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in ids_paginas)}] /Count {len(ids_paginas)} >>"
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        if isinstance(obj, tuple):
+            saida += f"{num} 0 obj\n<< /Length {obj[1]} >>\nstream\n".encode() + obj[0] + b"\nendstream\nendobj\n"
+        else:
+            saida += f"{num} 0 obj\n{obj}\nendobj\n".encode("cp1252")
+    inicio_xref = len(saida)
+    saida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        saida += f"{offset:010d} 00000 n \n".encode()
+    saida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(bytes(saida))
+    return caminho
@@ -0,0 +1,202 @@
+# --- SUÍTE DE BENCHMARKS DOS CAMINHOS QUENTES, COM RESULTADOS EM JSON E COMPARAÇÃO COM A LINHA DE BASE ---
+# Mede, no estilo do asv (cada caso calibrado para repetições de ~0,2 s, várias repetições, tempo por chamada):
+# extrair_texto_do_pdf em PDFs de vários tamanhos (cache de texto desligado), achatar_json e normalizar_chaves_json
+# sobre respostas do backend falso no formato do extraction_schema.json com o mapeamento_config.json real,
+# preencher_excel_novo_com_placeholders em modelos pequeno e grande, e o pipeline ponta a ponta (processar_pdf_sem_interface)
+# com o backend falso sem latência. Cada execução grava benchmarks/resultados/<data>_<commit>.json (ambiente + casos);
+# com --comparar, confronta a mediana de cada caso com outra execução e termina com código 1 se algum caso regrediu
+# além de --limite-regressao. A linha de base versionada (benchmarks/linha_de_base.json) é regravada com --salvar-linha-de-base.
+# Uso: python benchmarks/suite_benchmarks.py [--filtro pdf] [--repeticoes 5] [--comparar [arquivo.json]] [--salvar-linha-de-base]
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import processar # noqa: E402
+from backend_llm import BACKEND_LLM_FALSO, gerar_json_sintetico # noqa: E402
+from benchmarks.pdf_sintetico import BLOCOS_SUMULA_SCHEMA, gerar_pdf_sumula # noqa: E402
+from benchmarks.xlsx_sintetico import gerar_modelo_xlsx # noqa: E402
+
+DIR_BENCHMARKS = Path(__file__).resolve().parent
+DIR_RESULTADOS = DIR_BENCHMARKS / "resultados"
+ARQUIVO_LINHA_DE_BASE = DIR_BENCHMARKS / "linha_de_base.json"
+VERSAO_FORMATO = 1
+
+PAGINAS_PDF = (5, 20, 80)
+ITENS_POR_LISTA_RESPOSTA = (2, 20) # Resposta típica e resposta com listas longas (SCR, operações, avalistas)
+MODELOS_EXCEL = {"pequeno": (60, 12, 40), "grande": (2000, 30, 150)} # linhas, colunas, placeholders
+
+
+def _executar_git(*argumentos: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *argumentos], cwd=DIR_BENCHMARKS.parent, capture_output=True, text=True,
+                              check=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _ambiente() -> Dict[str, Any]:
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _executar_git("rev-parse", "--short", "HEAD"),
+        "alteracoes_locais": bool(_executar_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _medir(funcao: Callable[[], Any], repeticoes: int) -> Dict[str, Any]:
+    """Tempo por chamada (ms) em `repeticoes` repetições de N chamadas, com N calibrado na primeira execução."""
+    temporizador = timeit.Timer(funcao)
+    chamadas, _ = temporizador.autorange() # 1, 2, 5, 10, 20... até somar 0,2 s (também aquece caches e imports)
+    tempos_ms = sorted(t * 1000 / chamadas for t in temporizador.repeat(repeat=repeticoes, number=chamadas))
+    return {
+        "chamadas_por_repeticao": chamadas,
+        "repeticoes": repeticoes,
+        "min_ms": tempos_ms[0],
+        "mediana_ms": statistics.median(tempos_ms),
+        "p95_ms": processar.calcular_percentil(tempos_ms, 95),
+        "max_ms": tempos_ms[-1],
+        "desvio_ms": statistics.stdev(tempos_ms) if len(tempos_ms) > 1 else 0.0,
+    }
+
+
+def _casos(dir_tmp: Path) -> List[Tuple[str, Callable[[], Callable[[], Any]]]]:
+    """(nome, preparação); a preparação roda fora da medição e devolve a função medida."""
+    casos: List[Tuple[str, Callable[[], Callable[[], Any]]]] = []
+
+    def _caso_extracao(paginas: int) -> Callable[[], Any]:
+        caminho_pdf = gerar_pdf_sumula(dir_tmp / f"sumula_{paginas}p.pdf", num_paginas=paginas, blocos=BLOCOS_SUMULA_SCHEMA)
+        return lambda: processar.extrair_texto_do_pdf(caminho_pdf)
+
+    def _caso_achatamento(itens: int) -> Callable[[], Any]:
+        resposta = gerar_json_sintetico(processar.BLOCO_CONFIG, itens)
+        return lambda: processar.achatar_json(resposta)
+
+    def _caso_normalizacao(itens: int) -> Callable[[], Any]:
+        json_achatado = processar.achatar_json(gerar_json_sintetico(processar.BLOCO_CONFIG, itens))
+        # Como no lote: sem janela, chaves fora do mapeamento mantêm o nome da IA e nada é gravado no mapeamento
+        return lambda: processar.normalizar_chaves_json(json_achatado, processar._mapa_chaves_worker_lote, False)
+
+    def _caso_excel(nome: str) -> Callable[[], Any]:
+        linhas, colunas, placeholders = MODELOS_EXCEL[nome]
+        caminho_modelo = dir_tmp / f"modelo_{nome}.xlsx"
+        usados = gerar_modelo_xlsx(caminho_modelo, linhas, colunas, placeholders)
+        caminho_json = dir_tmp / f"dados_{nome}.json"
+        caminho_json.write_text(json.dumps({ph: f"VALOR DE {ph[2:-2]}" for ph in usados}, ensure_ascii=False), encoding="utf-8")
+        return lambda: processar.preencher_excel_novo_com_placeholders(caminho_json, caminho_modelo, dir_tmp / f"saida_{nome}.xlsx", "Sumula")
+
+    def _caso_pipeline(paginas: int) -> Callable[[], Any]:
+        caminho_pdf = gerar_pdf_sumula(dir_tmp / f"pipeline_{paginas}p.pdf", num_paginas=paginas, blocos=BLOCOS_SUMULA_SCHEMA)
+        linhas, colunas, placeholders = MODELOS_EXCEL["pequeno"]
+        caminho_modelo = dir_tmp / "modelo_pipeline.xlsx"
+        gerar_modelo_xlsx(caminho_modelo, linhas, colunas, placeholders)
+        dir_saida = dir_tmp / "saida_pipeline"
+        dir_saida.mkdir(exist_ok=True)
+
+        def _executar() -> Dict[str, Any]:
+            resultado = processar.processar_pdf_sem_interface(caminho_pdf, caminho_modelo, dir_saida, "Sumula")
+            if not resultado["sucesso"]:
+                raise RuntimeError(f"Pipeline falhou: {resultado['erro']}")
+            return resultado
+        return _executar
+
+    for paginas in PAGINAS_PDF:
+        casos.append((f"extrair_texto_do_pdf[{paginas}_paginas]", lambda p=paginas: _caso_extracao(p)))
+    for itens in ITENS_POR_LISTA_RESPOSTA:
+        casos.append((f"achatar_json[{itens}_itens_por_lista]", lambda i=itens: _caso_achatamento(i)))
+    for itens in ITENS_POR_LISTA_RESPOSTA:
+        casos.append((f"normalizar_chaves_json[{itens}_itens_por_lista]", lambda i=itens: _caso_normalizacao(i)))
+    for nome in MODELOS_EXCEL:
+        casos.append((f"preencher_excel_novo_com_placeholders[modelo_{nome}]", lambda n=nome: _caso_excel(n)))
+    casos.append(("pipeline_ponta_a_ponta[20_paginas_llm_falso]", lambda: _caso_pipeline(20)))
+    return casos
+
+
+def comparar_resultados(atual: Dict[str, Any], referencia: Dict[str, Any], limite_regressao: float) -> List[Dict[str, Any]]:
+    """Razão entre as medianas (atual / referência) dos casos presentes nas duas execuções."""
+    comparacoes = []
+    for nome, medida in atual["casos"].items():
+        medida_ref = referencia.get("casos", {}).get(nome)
+        if not medida_ref or not medida_ref.get("mediana_ms"):
+            continue
+        razao = medida["mediana_ms"] / medida_ref["mediana_ms"]
+        comparacoes.append({"caso": nome, "referencia_ms": medida_ref["mediana_ms"], "atual_ms": medida["mediana_ms"],
+                            "razao": razao, "regressao": razao > limite_regressao})
+    return comparacoes
+
+
+def _preparar_processo() -> None:
+    """Estado de um worker do lote: schema, mapeamento real, backend falso sem latência e caches em disco desligados."""
+    processar.inicializar_worker_lote(usar_cache=False, backend_llm=BACKEND_LLM_FALSO, config_backend_falso={"latencia_s": 0})
+    logging.disable(logging.CRITICAL) # inicializar_worker_lote reconfigura o logging
+    if not processar.BLOCO_CONFIG or not processar._mapa_chaves_worker_lote:
+        sys.exit("Schema de extração ou mapeamento de chaves indisponível.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes (extração, achatamento, normalização, Excel, pipeline).")
+    parser.add_argument("--filtro", default=None, help="Só os casos cujo nome contém este texto.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON do resultado (padrão: benchmarks/resultados/<data>_<commit>.json).")
+    parser.add_argument("--comparar", type=Path, nargs="?", const=ARQUIVO_LINHA_DE_BASE, default=None,
+                        help="Execução de referência (sem valor: a linha de base versionada).")
+    parser.add_argument("--limite-regressao", type=float, default=1.25, help="Razão de medianas acima da qual o caso regrediu.")
+    parser.add_argument("--salvar-linha-de-base", action="store_true", help="Regrava benchmarks/linha_de_base.json com esta execução.")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    _preparar_processo()
+
+    resultado: Dict[str, Any] = {"versao_formato": VERSAO_FORMATO, "ambiente": _ambiente(), "casos": {}}
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        for nome, preparar in _casos(Path(dir_tmp)):
+            if args.filtro and args.filtro not in nome:
+                continue
+            funcao = preparar()
+            t_inicio = time.perf_counter()
+            medida = resultado["casos"][nome] = _medir(funcao, args.repeticoes)
+            print(f"{nome:55s} mediana {medida['mediana_ms']:10.3f} ms | min {medida['min_ms']:10.3f} | p95 {medida['p95_ms']:10.3f} "
+                  f"| {medida['chamadas_por_repeticao']}x{medida['repeticoes']} ({time.perf_counter() - t_inicio:.1f} s)")
+    if not resultado["casos"]:
+        sys.exit(f"Nenhum caso corresponde ao filtro '{args.filtro}'.")
+
+    caminho_saida = args.saida
+    if caminho_saida is None:
+        DIR_RESULTADOS.mkdir(exist_ok=True)
+        caminho_saida = DIR_RESULTADOS / f"{datetime.now():%Y%m%d_%H%M%S}_{resultado['ambiente']['commit'] or 'sem_commit'}.json"
+    caminho_saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Resultado gravado em {caminho_saida}")
+    if args.salvar_linha_de_base:
+        ARQUIVO_LINHA_DE_BASE.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Linha de base atualizada: {ARQUIVO_LINHA_DE_BASE}")
+
+    if args.comparar is not None:
+        if not args.comparar.exists():
+            sys.exit(f"Execução de referência não encontrada: {args.comparar}")
+        referencia = json.loads(args.comparar.read_text(encoding="utf-8"))
+        print(f"Comparação com {args.comparar.name} (commit {referencia.get('ambiente', {}).get('commit')}, "
+              f"{referencia.get('ambiente', {}).get('data')}):")
+        comparacoes = comparar_resultados(resultado, referencia, args.limite_regressao)
+        for comparacao in comparacoes:
+            marca = "REGRESSÃO" if comparacao["regressao"] else ""
+            print(f"  {comparacao['caso']:55s} {comparacao['referencia_ms']:10.3f} -> {comparacao['atual_ms']:10.3f} ms "
+                  f"({comparacao['razao']:5.2f}x) {marca}")
+        if any(comparacao["regressao"] for comparacao in comparacoes):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# --- GERADOR DE MODELOS EXCEL SINTÉTICOS COM PLACEHOLDERS (PARA BENCHMARKS E TESTES) ---
+# Monta um modelo de súmula com estilos, várias abas e textos fixos. O openpyxl grava textos como inline strings;
+# com `shared_strings=True` o arquivo é convertido para sharedStrings.xml, como nos modelos salvos pelo Excel.
+import re
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill
+
+_REGEX_CELULA_INLINE = re.compile(r'<c ([^>]*?)t="inlineStr"><is><t(?: xml:space="preserve")?>(.*?)</t></is></c>', re.S)
+_TIPO_SHARED_STRINGS = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+_REL_SHARED_STRINGS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+
+def converter_para_shared_strings(caminho: Path) -> None:
+    """Reescreve o .xlsx trocando as células inline string por referências a um sharedStrings.xml."""
+    with zipfile.ZipFile(caminho) as arquivo_zip:
+        partes = {info.filename: arquivo_zip.read(info) for info in arquivo_zip.infolist()}
+    textos: Dict[str, int] = {}
+    referencias = 0
+
+    def _para_shared_string(match: "re.Match[str]") -> str:
+        nonlocal referencias
+        referencias += 1
+        indice = textos.setdefault(match.group(2), len(textos))
+        return f'<c {match.group(1)}t="s"><v>{indice}</v></c>'
+
+    for nome in [n for n in partes if n.startswith("xl/worksheets/")]:
+        partes[nome] = _REGEX_CELULA_INLINE.sub(_para_shared_string, partes[nome].decode("utf-8")).encode("utf-8")
+    preservar = ' xml:space="preserve"'
+    itens = "".join(f'<si><t{preservar if texto != texto.strip() else ""}>{texto}</t></si>' for texto in textos)
+    partes["xl/sharedStrings.xml"] = (f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{referencias}" '
+                                      f'uniqueCount="{len(textos)}">{itens}</sst>').encode("utf-8")
+    partes["[Content_Types].xml"] = partes["[Content_Types].xml"].replace(
+        b"</Types>", f'<Override PartName="/xl/sharedStrings.xml" ContentType="{_TIPO_SHARED_STRINGS}"/></Types>'.encode())
+    partes["xl/_rels/workbook.xml.rels"] = partes["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>", f'<Relationship Type="{_REL_SHARED_STRINGS}" Target="sharedStrings.xml" Id="rIdSst"/></Relationships>'.encode())
+    with zipfile.ZipFile(caminho, "w", zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for nome, conteudo in partes.items():
+            arquivo_zip.writestr(nome, conteudo)
+
+
+def gerar_modelo_xlsx(caminho: Path, linhas: int = 200, colunas: int = 12, placeholders: int = 80, shared_strings: bool = True) -> List[str]:
+    """Gera o modelo e retorna os placeholders usados ({{CAMPO_i}}); um a cada dez fica no meio de um texto."""
+    workbook = openpyxl.Workbook()
+    aba = workbook.active
+    aba.title = "Sumula"
+    negrito, fundo = Font(bold=True), PatternFill("solid", fgColor="DDEBF7")
+    for linha in range(1, linhas + 1):
+        for coluna in range(1, colunas + 1):
+            celula = aba.cell(row=linha, column=coluna, value=f"Rótulo {linha}-{coluna}" if coluna % 2 else linha * coluna)
+            if linha == 1:
+                celula.font, celula.fill = negrito, fundo
+    usados = []
+    for i in range(placeholders):
+        linha, coluna = 2 + (i * 7) % (linhas - 1), 2 * (1 + i % (colunas // 2))
+        texto = f"{{{{CAMPO_{i}}}}}" if i % 10 else f"Valor: {{{{CAMPO_{i}}}}} (ref. {{{{CAMPO_{i}_REF}}}})"
+        aba.cell(row=linha, column=coluna, value=texto).font = negrito
+        usados.append(f"{{{{CAMPO_{i}}}}}")
+    workbook.create_sheet("Parametros")["A1"] = "Texto fixo de outra aba {{NAO_PREENCHER}}"
+    workbook.save(caminho)
+    if shared_strings:
+        converter_para_shared_strings(caminho)
+    return usados
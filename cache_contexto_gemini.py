@@ -0,0 +1,194 @@
+# --- CACHE DE CONTEXTO DO PROMPT: PREFIXO ESTÁTICO REGISTRADO UMA VEZ NO PROVEDOR ---
+# O prefixo do prompt (regras + instruções dos blocos) é o mesmo para todos os documentos de um schema. Com o cache de
+# contexto da API Gemini ("context caching"), ele é registrado uma vez como conteúdo em cache, com TTL, e cada requisição
+# leva só o texto do documento e o reforço final. A chave é o hash do prefixo: schema alterado -> prefixo novo -> novo
+# conteúdo em cache (os anteriores saem pelo limite de entradas ou expiram pelo TTL). O TTL é renovado quando falta menos
+# de MARGEM_RENOVACAO_S para expirar. Se o provedor recusar o registro (ex.: prefixo abaixo do mínimo de tokens aceito
+# pelo modelo), o prefixo é marcado como indisponível e as requisições voltam a enviá-lo no próprio prompt.
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from cliente_gemini_async import estimar_tokens_prompt
+
+TTL_PADRAO_S = 3600
+MARGEM_RENOVACAO_S = 60
+MAX_ENTRADAS_PADRAO = 16 # Schemas reduzidos pelo extrator local podem gerar alguns prefixos distintos
+
+
+class CacheContextoPrompt:
+    """Interface: modelo cujas requisições já começam pelo prefixo registrado em cache (thread-safe).
+
+    Subclasses implementam _criar, _renovar, _excluir e _modelo_para; obter_modelo cuida de TTL, renovação e falhas.
+    """
+
+    def __init__(self, ttl_s: float = TTL_PADRAO_S, max_entradas: int = MAX_ENTRADAS_PADRAO,
+                 relogio: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Dict[str, Any]]" = OrderedDict() # chave -> {"conteudo", "modelo", "expira_em"}
+        self._indisponiveis: Set[str] = set()
+        self.criacoes = 0
+        self.renovacoes = 0
+        self.reutilizacoes = 0
+        self.falhas = 0
+
+    @staticmethod
+    def calcular_chave(prefixo: str) -> str:
+        return hashlib.sha256(prefixo.encode("utf-8")).hexdigest()
+
+    def obter_modelo(self, prefixo: str) -> Optional[Any]:
+        """Modelo ligado ao prefixo em cache (criado ou renovado se preciso); None se o cache não estiver disponível."""
+        chave = self.calcular_chave(prefixo)
+        with self._lock:
+            if chave in self._indisponiveis:
+                return None
+            entrada = self._entradas.get(chave)
+            agora = self._relogio() # Antes da chamada ao provedor: o TTL local nunca passa do TTL remoto
+            try:
+                if entrada is None or agora >= entrada["expira_em"]:
+                    if entrada is not None:
+                        self._excluir_sem_falhar(entrada["conteudo"]) # Expirado (normalmente já removido pelo provedor)
+                    conteudo = self._criar(chave, prefixo)
+                    entrada = {"conteudo": conteudo, "modelo": self._modelo_para(conteudo, prefixo), "expira_em": agora + self.ttl_s}
+                    self._entradas[chave] = entrada
+                    self.criacoes += 1
+                    self._remover_excedentes()
+                elif entrada["expira_em"] - agora < MARGEM_RENOVACAO_S:
+                    self._renovar(entrada["conteudo"])
+                    entrada["expira_em"] = agora + self.ttl_s
+                    self.renovacoes += 1
+                else:
+                    self.reutilizacoes += 1
+            except Exception as e:
+                self._entradas.pop(chave, None)
+                self._indisponiveis.add(chave)
+                self.falhas += 1
+                logging.warning(f"Cache de contexto indisponível para o prefixo ~{estimar_tokens_prompt(prefixo)} tokens "
+                                f"({type(e).__name__}: {e}). O prefixo volta a ser enviado em cada requisição.")
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada["modelo"]
+
+    def limpar(self) -> None:
+        """Exclui do provedor todos os conteúdos registrados por esta instância."""
+        with self._lock:
+            entradas = list(self._entradas.values())
+            self._entradas.clear()
+            self._indisponiveis.clear()
+        for entrada in entradas:
+            self._excluir_sem_falhar(entrada["conteudo"])
+
+    def estatisticas(self) -> Dict[str, int]:
+        return {"criacoes": self.criacoes, "renovacoes": self.renovacoes, "reutilizacoes": self.reutilizacoes, "falhas": self.falhas}
+
+    def _remover_excedentes(self) -> None:
+        while len(self._entradas) > self.max_entradas:
+            _, entrada = self._entradas.popitem(last=False)
+            self._excluir_sem_falhar(entrada["conteudo"])
+
+    def _excluir_sem_falhar(self, conteudo: Any) -> None:
+        try:
+            self._excluir(conteudo)
+        except Exception as e: # O conteúdo expira sozinho pelo TTL
+            logging.debug(f"Falha ao excluir conteúdo do cache de contexto: {e}")
+
+    def _criar(self, chave: str, prefixo: str) -> Any:
+        raise NotImplementedError
+
+    def _renovar(self, conteudo: Any) -> None:
+        raise NotImplementedError
+
+    def _excluir(self, conteudo: Any) -> None:
+        raise NotImplementedError
+
+    def _modelo_para(self, conteudo: Any, prefixo: str) -> Any:
+        raise NotImplementedError
+
+
+class CacheContextoGemini(CacheContextoPrompt):
+    """Cache de contexto da API Gemini (google.generativeai.caching.CachedContent).
+
+    O modelo precisa ter versão fixa (ex.: 'models/gemini-1.5-flash-002'); aliases '-latest' não aceitam cache de contexto.
+    """
+
+    def __init__(self, genai: Any, nome_modelo: str, ttl_s: float = TTL_PADRAO_S, max_entradas: int = MAX_ENTRADAS_PADRAO):
+        super().__init__(ttl_s, max_entradas)
+        self.genai = genai
+        self.nome_modelo = nome_modelo
+
+    def _criar(self, chave: str, prefixo: str) -> Any:
+        from google.generativeai import caching
+        return caching.CachedContent.create(model=self.nome_modelo, display_name=f"processarpdf-prefixo-{chave[:16]}",
+                                            contents=[prefixo], ttl=timedelta(seconds=self.ttl_s))
+
+    def _renovar(self, conteudo: Any) -> None:
+        conteudo.update(ttl=timedelta(seconds=self.ttl_s))
+
+    def _excluir(self, conteudo: Any) -> None:
+        conteudo.delete()
+
+    def _modelo_para(self, conteudo: Any, prefixo: str) -> Any:
+        return self.genai.GenerativeModel.from_cached_content(cached_content=conteudo)
+
+
+class _ModeloComPrefixoLocal:
+    """Modelo que antepõe o prefixo "em cache" às partes recebidas e informa os tokens do prefixo como a API faz."""
+
+    def __init__(self, modelo_base: Any, prefixo: str):
+        self.modelo_base = modelo_base
+        self.prefixo = prefixo
+        self.tokens_prefixo = estimar_tokens_prompt(prefixo)
+
+    def _marcar_tokens_cache(self, response: Any) -> Any:
+        uso = getattr(response, "usage_metadata", None)
+        if uso is not None and not isinstance(getattr(uso, "cached_content_token_count", None), int):
+            try:
+                uso.cached_content_token_count = self.tokens_prefixo
+            except AttributeError:
+                pass
+        return response
+
+    def _conteudo(self, prompt: Any) -> List[Any]:
+        return [self.prefixo] + (list(prompt) if isinstance(prompt, (list, tuple)) else [prompt])
+
+    def generate_content(self, prompt: Any, **kwargs: Any) -> Any:
+        return self._marcar_tokens_cache(self.modelo_base.generate_content(self._conteudo(prompt), **kwargs))
+
+    async def generate_content_async(self, prompt: Any, **kwargs: Any) -> Any:
+        return self._marcar_tokens_cache(await self.modelo_base.generate_content_async(self._conteudo(prompt), **kwargs))
+
+
+class CacheContextoLocal(CacheContextoPrompt):
+    """Substituto local (testes e benchmarks): guarda os prefixos em memória e os antepõe às requisições do modelo base."""
+
+    def __init__(self, modelo_base: Any, ttl_s: float = TTL_PADRAO_S, max_entradas: int = MAX_ENTRADAS_PADRAO,
+                 relogio: Callable[[], float] = time.monotonic, tokens_minimos: int = 0):
+        super().__init__(ttl_s, max_entradas, relogio)
+        self.modelo_base = modelo_base
+        self.tokens_minimos = tokens_minimos # Simula o mínimo de tokens exigido pelo provedor
+        self.prefixos: Dict[str, str] = {} # Conteúdos "registrados" (identificador -> prefixo)
+        self.excluidos: List[str] = []
+
+    def _criar(self, chave: str, prefixo: str) -> Any:
+        if estimar_tokens_prompt(prefixo) < self.tokens_minimos:
+            raise ValueError(f"conteúdo em cache abaixo do mínimo de {self.tokens_minimos} tokens")
+        identificador = f"local/{chave[:16]}/{self.criacoes + 1}"
+        self.prefixos[identificador] = prefixo
+        return identificador
+
+    def _renovar(self, conteudo: Any) -> None:
+        pass
+
+    def _excluir(self, conteudo: Any) -> None:
+        self.prefixos.pop(conteudo, None)
+        self.excluidos.append(conteudo)
+
+    def _modelo_para(self, conteudo: Any, prefixo: str) -> Any:
+        return _ModeloComPrefixoLocal(self.modelo_base, prefixo)
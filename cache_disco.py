@@ -0,0 +1,130 @@
+# --- CACHE EM DISCO ENDEREÇADO POR CONTEÚDO (LRU COM LIMITE DE TAMANHO) ---
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+GRAVACOES_ENTRE_VARREDURAS = 1000 # Reconcilia o total estimado com o diretório (outros processos também gravam nele)
+FRACAO_ALVO_DESPEJO = 0.9 # O despejo desce até 90% do limite: as gravações seguintes não varrem o diretório a cada vez
+
+
+class CacheDisco:
+    """Cache persistente de valores JSON, um arquivo por chave (hash SHA-256), com despejo LRU por tamanho total.
+
+    O "uso recente" é registrado no mtime de cada arquivo (atualizado a cada acerto), de modo que
+    vários processos (workers do lote, serviço HTTP) podem compartilhar o mesmo diretório. O tamanho total é
+    estimado em memória a partir das gravações do processo; o diretório só é varrido na primeira gravação, quando
+    a estimativa passa do limite e a cada GRAVACOES_ENTRE_VARREDURAS gravações (para somar o que outros processos gravaram).
+    """
+
+    def __init__(self, diretorio: Path, tamanho_max_bytes: int, habilitado: bool = True, atualizar: bool = False):
+        self.diretorio = Path(diretorio)
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.habilitado = habilitado # False: não lê nem grava (--no-cache)
+        self.atualizar = atualizar # True: ignora entradas existentes, mas grava a resposta nova (--refresh)
+        self.acertos = 0
+        self.faltas = 0
+        self._total_bytes_estimado: Optional[int] = None
+        self._gravacoes_desde_varredura = 0
+
+    @staticmethod
+    def calcular_chave(*partes: Any) -> str:
+        """Gera a chave SHA-256 a partir da serialização JSON canônica (chaves ordenadas) das partes."""
+        serializado = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.json"
+
+    def obter(self, chave: str) -> Optional[Any]:
+        """Retorna o valor armazenado para a chave (ou None) e marca a entrada como usada recentemente."""
+        if not self.habilitado or self.atualizar:
+            return None
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                valor = json.load(f)
+            os.utime(caminho, None) # Atualiza o mtime: base da ordem LRU
+        except FileNotFoundError:
+            self.faltas += 1
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Cache: entrada '{caminho.name}' ilegível ({e}). Será descartada.")
+            caminho.unlink(missing_ok=True)
+            self.faltas += 1
+            return None
+        self.acertos += 1
+        return valor
+
+    def gravar(self, chave: str, valor: Any) -> None:
+        """Grava o valor de forma atômica (arquivo temporário + rename) e aplica o limite de tamanho."""
+        if not self.habilitado:
+            return
+        caminho = self._caminho(chave)
+        caminho_tmp = None
+        try:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            fd, caminho_tmp = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(valor, f, ensure_ascii=False)
+                tamanho_novo = f.tell()
+            try:
+                tamanho_anterior = caminho.stat().st_size # Sobrescrita (--refresh): só a diferença entra no total
+            except FileNotFoundError:
+                tamanho_anterior = 0
+            os.replace(caminho_tmp, caminho)
+        except Exception as e:
+            logging.warning(f"Cache: falha ao gravar entrada '{chave[:12]}...' em '{self.diretorio}': {e}")
+            if caminho_tmp is not None:
+                Path(caminho_tmp).unlink(missing_ok=True) # Órfão '.tmp' não entra na varredura: escaparia do limite de tamanho
+            return
+        self._gravacoes_desde_varredura += 1
+        if self._total_bytes_estimado is not None:
+            self._total_bytes_estimado += tamanho_novo - tamanho_anterior
+        if (self._total_bytes_estimado is None or self._total_bytes_estimado > self.tamanho_max_bytes
+                or self._gravacoes_desde_varredura >= GRAVACOES_ENTRE_VARREDURAS):
+            self._aplicar_limite_tamanho()
+
+    def _varrer_diretorio(self) -> Tuple[List[Tuple[float, int, Path]], int]:
+        """(mtime, tamanho, caminho) de cada entrada e o tamanho total do diretório."""
+        entradas = []
+        total_bytes = 0
+        for caminho in self.diretorio.glob("*.json"):
+            try:
+                estat = caminho.stat()
+            except FileNotFoundError: # Removida por outro processo
+                continue
+            entradas.append((estat.st_mtime, estat.st_size, caminho))
+            total_bytes += estat.st_size
+        return entradas, total_bytes
+
+    def _aplicar_limite_tamanho(self) -> None:
+        """Varre o diretório e, acima do limite, remove as entradas menos recentemente usadas até FRACAO_ALVO_DESPEJO dele."""
+        entradas, total_bytes = self._varrer_diretorio()
+        if total_bytes > self.tamanho_max_bytes:
+            alvo_bytes = int(self.tamanho_max_bytes * FRACAO_ALVO_DESPEJO)
+            for _, tamanho, caminho in sorted(entradas):
+                caminho.unlink(missing_ok=True)
+                total_bytes -= tamanho
+                logging.debug(f"Cache: entrada LRU '{caminho.name}' removida ({tamanho} bytes).")
+                if total_bytes <= alvo_bytes:
+                    break
+        self._total_bytes_estimado = total_bytes
+        self._gravacoes_desde_varredura = 0
+
+    def taxa_acerto(self) -> float:
+        """Fração de consultas atendidas pelo cache (0.0 quando não houve consultas)."""
+        consultas = self.acertos + self.faltas
+        return self.acertos / consultas if consultas else 0.0
+
+
+def calcular_sha256_arquivo(caminho: Path, tamanho_bloco: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos."""
+    sha256 = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha256.update(bloco)
+    return sha256.hexdigest()
@@ -0,0 +1,223 @@
+# --- CLIENTE ASSÍNCRONO DA API GEMINI (CONCORRÊNCIA LIMITADA + LIMITADOR RPM/TPM) ---
+import asyncio
+import logging
+import random
+import re
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Union
+
+CARACTERES_POR_TOKEN_ESTIMADO = 4 # Estimativa usada para reservar tokens antes da chamada (a contagem real vem em usage_metadata)
+CODIGOS_HTTP_RETENTAVEIS = {429, 500, 503, 504}
+
+
+class ErroBloqueioGemini(Exception):
+    """A API bloqueou o prompt (prompt_feedback.block_reason); não adianta tentar novamente."""
+
+
+def estimar_tokens_prompt(prompt: Union[str, List[str]]) -> int:
+    """Tokens estimados de um prompt em string única ou em lista de partes."""
+    caracteres = len(prompt) if isinstance(prompt, str) else sum(len(parte) for parte in prompt)
+    return max(1, caracteres // CARACTERES_POR_TOKEN_ESTIMADO)
+
+
+def extrair_atraso_retry(erro: BaseException) -> Optional[float]:
+    """Obtém do erro da API o tempo de espera sugerido pelo servidor (RetryInfo / Retry-After), em segundos."""
+    atraso = getattr(erro, "retry_delay", None)
+    if isinstance(atraso, timedelta): return atraso.total_seconds()
+    if isinstance(atraso, (int, float)): return float(atraso)
+
+    for detalhe in getattr(erro, "details", None) or []:
+        atraso_detalhe = getattr(detalhe, "retry_delay", None) # RetryInfo (gRPC): Duration com seconds/nanos
+        if atraso_detalhe is not None and hasattr(atraso_detalhe, "seconds"):
+            return atraso_detalhe.seconds + getattr(atraso_detalhe, "nanos", 0) / 1e9
+        if isinstance(detalhe, dict) and isinstance(detalhe.get("retryDelay"), str): # RetryInfo (REST): "12s"
+            match = re.fullmatch(r"\s*([\d.]+)s\s*", detalhe["retryDelay"])
+            if match: return float(match.group(1))
+
+    cabecalhos = getattr(getattr(erro, "response", None), "headers", None) or {}
+    retry_after = cabecalhos.get("Retry-After") if hasattr(cabecalhos, "get") else None
+    if retry_after and str(retry_after).strip().replace(".", "", 1).isdigit():
+        return float(retry_after)
+
+    match = re.search(r"retry(?:_delay)?\s*(?:in|\{\s*seconds:)\s*([\d.]+)", str(erro), flags=re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def erro_e_retentavel(erro: BaseException) -> bool:
+    """Erros transitórios da API (429, 5xx, timeouts) que justificam uma nova tentativa."""
+    if isinstance(erro, ErroBloqueioGemini): return False
+    if isinstance(erro, (asyncio.TimeoutError, TimeoutError, ConnectionError)): return True
+    codigo = getattr(erro, "code", None)
+    try:
+        return int(codigo) in CODIGOS_HTTP_RETENTAVEIS
+    except (TypeError, ValueError):
+        return type(erro).__name__ in ("ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "TooManyRequests")
+
+
+def calcular_espera_retry(erro: BaseException, tentativa: int, espera_min: float = 2.0, espera_max: float = 30.0) -> float:
+    """Usa a dica do servidor quando existir; caso contrário, backoff exponencial com jitter."""
+    atraso_servidor = extrair_atraso_retry(erro)
+    if atraso_servidor is not None:
+        return max(atraso_servidor, 0.0)
+    return min(espera_max, espera_min * (2 ** (tentativa - 1))) * random.uniform(0.8, 1.2)
+
+
+def extrair_texto_resposta_gemini(response: Any) -> str:
+    """Retorna o texto da resposta; levanta ErroBloqueioGemini se o prompt foi bloqueado pela API."""
+    if not response.parts:
+        feedback = getattr(response, "prompt_feedback", None)
+        if feedback is not None and getattr(feedback, "block_reason", None):
+            razao = feedback.block_reason
+            raise ErroBloqueioGemini(f"Prompt foi bloqueado pela API Gemini. Razão do bloqueio: {getattr(razao, 'name', razao)}.")
+        logging.warning("Resposta da API Gemini não contém 'parts' e não parece ser um bloqueio. Retornando string vazia.")
+        return ""
+    return response.text
+
+
+def extrair_uso_resposta_gemini(response: Any) -> Dict[str, Any]:
+    """Tokens de entrada/saída (usage_metadata) e motivo de término do primeiro candidato; o que faltar fica None.
+
+    "tokens_cache" são os tokens de entrada vindos do cache de contexto (já incluídos em "tokens_entrada").
+    """
+    uso = getattr(response, "usage_metadata", None)
+    tokens_entrada = getattr(uso, "prompt_token_count", None)
+    tokens_saida = getattr(uso, "candidates_token_count", None)
+    tokens_cache = getattr(uso, "cached_content_token_count", None)
+    try:
+        motivo = getattr(response.candidates[0], "finish_reason", None)
+    except (AttributeError, IndexError, TypeError):
+        motivo = None
+    nome_motivo = getattr(motivo, "name", motivo)
+    return {
+        "tokens_entrada": tokens_entrada if isinstance(tokens_entrada, int) else None,
+        "tokens_saida": tokens_saida if isinstance(tokens_saida, int) else None,
+        "tokens_cache": tokens_cache if isinstance(tokens_cache, int) else None,
+        "motivo_fim": nome_motivo if isinstance(nome_motivo, str) else (str(nome_motivo) if isinstance(nome_motivo, int) else None),
+    }
+
+
+class _BaldeTokens:
+    """Balde de tokens com reposição contínua (capacidade = limite por minuto)."""
+
+    def __init__(self, limite_por_minuto: float):
+        self.capacidade = float(limite_por_minuto)
+        self.disponivel = float(limite_por_minuto)
+        self.taxa_por_segundo = limite_por_minuto / 60.0
+        self._ultima_reposicao = time.monotonic()
+
+    def repor(self) -> None:
+        agora = time.monotonic()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self._ultima_reposicao) * self.taxa_por_segundo)
+        self._ultima_reposicao = agora
+
+    def espera_para(self, quantidade: float) -> float:
+        self.repor()
+        quantidade = min(quantidade, self.capacidade) # Requisição maior que o balde: espera o balde encher
+        return 0.0 if self.disponivel >= quantidade else (quantidade - self.disponivel) / self.taxa_por_segundo
+
+
+class LimitadorTaxa:
+    """Limita requisições por minuto (RPM) e tokens por minuto (TPM); None desativa o respectivo limite."""
+
+    def __init__(self, requisicoes_por_minuto: Optional[float] = None, tokens_por_minuto: Optional[float] = None):
+        self._balde_requisicoes = _BaldeTokens(requisicoes_por_minuto) if requisicoes_por_minuto else None
+        self._balde_tokens = _BaldeTokens(tokens_por_minuto) if tokens_por_minuto else None
+        self._trava = asyncio.Lock()
+        self._liberado_em = 0.0 # time.monotonic() a partir do qual novas requisições podem sair (pausa após 429)
+        self.tempo_total_espera_s = 0.0
+
+    async def adquirir(self, tokens: int) -> None:
+        """Aguarda até haver capacidade para 1 requisição com `tokens` tokens e a consome (ordem FIFO)."""
+        async with self._trava:
+            while True:
+                espera = max(
+                    self._liberado_em - time.monotonic(),
+                    self._balde_requisicoes.espera_para(1) if self._balde_requisicoes else 0.0,
+                    self._balde_tokens.espera_para(tokens) if self._balde_tokens else 0.0,
+                )
+                if espera <= 0: break
+                self.tempo_total_espera_s += espera
+                await asyncio.sleep(espera)
+            if self._balde_requisicoes: self._balde_requisicoes.disponivel -= 1
+            if self._balde_tokens: self._balde_tokens.disponivel -= min(tokens, self._balde_tokens.capacidade)
+
+    def ajustar_tokens(self, diferenca: int) -> None:
+        """Corrige a reserva após conhecer o consumo real (diferença positiva consome mais; negativa devolve)."""
+        if self._balde_tokens:
+            self._balde_tokens.repor()
+            self._balde_tokens.disponivel = min(self._balde_tokens.capacidade, self._balde_tokens.disponivel - diferenca)
+
+    def pausar(self, segundos: float) -> None:
+        """Impede que qualquer nova requisição saia nos próximos `segundos` (após um 429)."""
+        self._liberado_em = max(self._liberado_em, time.monotonic() + segundos)
+
+
+class ClienteGeminiAsync:
+    """Cliente assíncrono: semáforo de requisições em voo + limitador RPM/TPM + retries guiados pelo servidor.
+
+    `modelo` é qualquer objeto com `generate_content_async(prompt, generation_config=...)`,
+    normalmente um genai.GenerativeModel.
+    """
+
+    def __init__(
+        self,
+        modelo: Any,
+        generation_config: Any = None,
+        max_em_voo: int = 8,
+        requisicoes_por_minuto: Optional[float] = None,
+        tokens_por_minuto: Optional[float] = None,
+        max_tentativas: int = 5,
+        timeout_s: Optional[float] = 300.0
+    ):
+        self.modelo = modelo
+        self.generation_config = generation_config
+        self.max_tentativas = max_tentativas
+        self.timeout_s = timeout_s
+        self.max_em_voo = max_em_voo
+        self.limitador = LimitadorTaxa(requisicoes_por_minuto, tokens_por_minuto)
+        self._semaforo = asyncio.Semaphore(max_em_voo)
+        self.em_voo = 0
+        self.requisicoes = 0
+        self.retries = 0
+        self.respostas_429 = 0
+
+    async def gerar(self, prompt: Union[str, List[str]], registro: Optional[Dict[str, Any]] = None, modelo: Any = None) -> str:
+        """Envia o prompt (string ou lista de partes) e retorna o texto da resposta, respeitando limites e dicas de retry do servidor.
+
+        Se `registro` for informado, recebe "tentativas" e o uso de tokens da resposta (extrair_uso_resposta_gemini).
+        `modelo` substitui o modelo do cliente nesta requisição (ex.: modelo ligado a um prefixo em cache de contexto).
+        """
+        modelo = modelo if modelo is not None else self.modelo
+        tokens_estimados = estimar_tokens_prompt(prompt)
+        for tentativa in range(1, self.max_tentativas + 1):
+            if registro is not None:
+                registro["tentativas"] = tentativa
+            await self.limitador.adquirir(tokens_estimados)
+            try:
+                async with self._semaforo:
+                    self.em_voo += 1; self.requisicoes += 1
+                    try:
+                        response = await asyncio.wait_for(
+                            modelo.generate_content_async(prompt, generation_config=self.generation_config),
+                            timeout=self.timeout_s)
+                    finally:
+                        self.em_voo -= 1
+                uso = getattr(response, "usage_metadata", None)
+                tokens_reais = getattr(uso, "total_token_count", None) if uso is not None else None
+                if isinstance(tokens_reais, int):
+                    self.limitador.ajustar_tokens(tokens_reais - tokens_estimados)
+                if registro is not None:
+                    registro.update(extrair_uso_resposta_gemini(response))
+                return extrair_texto_resposta_gemini(response)
+            except Exception as erro:
+                if not erro_e_retentavel(erro) or tentativa == self.max_tentativas:
+                    raise
+                espera = calcular_espera_retry(erro, tentativa)
+                self.retries += 1
+                if getattr(erro, "code", None) == 429 or type(erro).__name__ in ("ResourceExhausted", "TooManyRequests"):
+                    self.respostas_429 += 1
+                    self.limitador.pausar(espera) # Vale para todas as requisições, não só para esta
+                logging.warning(f"API Gemini (async): tentativa {tentativa}/{self.max_tentativas} falhou ({type(erro).__name__}: {erro}). Nova tentativa em {espera:.1f} s.")
+                await asyncio.sleep(espera)
+        raise RuntimeError("Número máximo de tentativas excedido.") # Inalcançável: a última tentativa propaga o erro
@@ -0,0 +1,11 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Antes de qualquer teste importar 'processar': log e caches persistentes (snapshot, texto dos PDFs) num diretório temporário,
+# não no repositório.
+_DIR_TESTES = tempfile.mkdtemp(prefix="processar_testes_")
+os.environ.setdefault("PROCESSAR_DIR_CACHE", os.path.join(_DIR_TESTES, "cache"))
+os.environ.setdefault("PROCESSAR_ARQUIVO_LOG", os.path.join(_DIR_TESTES, "processamento_pdf.log"))
+atexit.register(shutil.rmtree, _DIR_TESTES, ignore_errors=True)
@@ -0,0 +1,74 @@
+# --- CONTABILIDADE DE TOKENS DA API GEMINI (POR CHAMADA E POR PDF) E ORÇAMENTO POR REQUISIÇÃO ---
+# Cada chamada gera um registro: tokens de entrada (usage_metadata.prompt_token_count; sem ele, a estimativa feita antes
+# do envio; inclui os do cache de contexto, somados à parte em "tokens_cache"), tokens de saída, motivo de término, número de tentativas e latência (incluindo as esperas entre tentativas).
+import threading
+from typing import Any, Dict, List, Optional
+
+ACAO_ORCAMENTO_DIVIDIR = "dividir" # Reparte os blocos da requisição em requisições menores
+ACAO_ORCAMENTO_ABORTAR = "abortar" # Falha o documento sem chamar a API
+
+
+class ErroOrcamentoTokens(Exception):
+    """Uma requisição excede o orçamento de tokens de entrada e não pode (ou não deve) ser dividida."""
+
+
+class ContabilidadeTokens:
+    """Registros das chamadas à API de um documento (thread-safe: as partições podem ser enviadas em paralelo)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.chamadas: List[Dict[str, Any]] = []
+        self.divisoes = 0 # Requisições repartidas por excederem o orçamento
+
+    def registrar(self, registro: Dict[str, Any]) -> None:
+        with self._lock:
+            self.chamadas.append(registro)
+
+    def resumo(self) -> Dict[str, Any]:
+        """Totais do documento (dicionário simples, serializável para o processo principal)."""
+        with self._lock:
+            chamadas = list(self.chamadas)
+        motivos_fim: Dict[str, int] = {}
+        for registro in chamadas:
+            motivo = registro.get("motivo_fim") or ("ERRO" if registro.get("erro") else "DESCONHECIDO")
+            motivos_fim[motivo] = motivos_fim.get(motivo, 0) + 1
+        return {
+            "chamadas": len(chamadas),
+            "tentativas": sum(registro.get("tentativas", 0) for registro in chamadas),
+            "tokens_entrada": sum(_tokens_entrada(registro) for registro in chamadas),
+            "tokens_saida": sum(registro.get("tokens_saida") or 0 for registro in chamadas),
+            "tokens_cache": sum(registro.get("tokens_cache") or 0 for registro in chamadas),
+            "entrada_estimada": sum(1 for registro in chamadas if registro.get("tokens_entrada") is None), # Chamadas sem contagem da API
+            "latencia_s": sum(registro.get("latencia_s", 0.0) for registro in chamadas),
+            "motivos_fim": motivos_fim,
+            "divisoes": self.divisoes,
+        }
+
+
+def _tokens_entrada(registro: Dict[str, Any]) -> int:
+    tokens = registro.get("tokens_entrada")
+    return tokens if tokens is not None else registro.get("tokens_entrada_estimados", 0)
+
+
+def formatar_resumo_tokens(resumo: Dict[str, Any]) -> str:
+    """Linha de log com os totais de um documento."""
+    motivos = ", ".join(f"{motivo}={n}" for motivo, n in sorted(resumo["motivos_fim"].items())) or "-"
+    estimados = f" ({resumo['entrada_estimada']} chamada(s) com entrada estimada)" if resumo["entrada_estimada"] else ""
+    em_cache = f" ({resumo['tokens_cache']} do cache de contexto)" if resumo.get("tokens_cache") else ""
+    return (f"{resumo['tokens_entrada']} tokens de entrada{em_cache}{estimados}, {resumo['tokens_saida']} de saída em {resumo['chamadas']} chamada(s) "
+            f"({resumo['tentativas']} tentativa(s), {resumo['latencia_s']:.2f} s; término: {motivos})")
+
+
+def somar_resumos_tokens(resumos: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Soma os resumos de vários documentos (resumos ausentes são ignorados)."""
+    total: Dict[str, Any] = {"documentos": 0, "chamadas": 0, "tentativas": 0, "tokens_entrada": 0, "tokens_saida": 0, "tokens_cache": 0,
+                             "entrada_estimada": 0, "latencia_s": 0.0, "motivos_fim": {}, "divisoes": 0}
+    for resumo in resumos:
+        if not resumo:
+            continue
+        total["documentos"] += 1
+        for chave in ("chamadas", "tentativas", "tokens_entrada", "tokens_saida", "tokens_cache", "entrada_estimada", "latencia_s", "divisoes"):
+            total[chave] += resumo.get(chave, 0)
+        for motivo, n in resumo.get("motivos_fim", {}).items():
+            total["motivos_fim"][motivo] = total["motivos_fim"].get(motivo, 0) + n
+    return total
@@ -0,0 +1,93 @@
+# --- DIÁRIO (WRITE-BEHIND) DAS ADIÇÕES AO ARQUIVO DE MAPEAMENTO DE CHAVES ---
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+SECAO_MAPEAMENTO = "mapeamento_para_chaves_padronizadas"
+
+
+def gravar_json_atomico(caminho: Path, dados: Any) -> None:
+    """Grava o JSON (indentado, UTF-8) em arquivo temporário no mesmo diretório e substitui o destino com rename."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=caminho.parent, prefix=f".{caminho.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(caminho_tmp, caminho)
+    except BaseException:
+        Path(caminho_tmp).unlink(missing_ok=True)
+        raise
+
+
+class DiarioMapeamento:
+    """Registra novas entradas do mapeamento em um diário append-only (uma linha JSON por chave).
+
+    Cada registro é uma linha acrescentada e sincronizada em disco, em vez de reescrever o JSON inteiro;
+    `compactar()` incorpora o diário ao arquivo de mapeamento (gravação atômica) e o apaga. Reaplicar o
+    diário é idempotente, então uma queda entre a gravação do JSON e a remoção do diário não perde nem
+    duplica nada. Pressupõe um único processo gravando (a interface gráfica).
+    """
+
+    def __init__(self, caminho_mapeamento: Path):
+        self.caminho_mapeamento = Path(caminho_mapeamento)
+        self.caminho_diario = self.caminho_mapeamento.with_name(self.caminho_mapeamento.name + ".diario.jsonl")
+
+    def registrar(self, chave_ia: str, nome_padronizado: str) -> None:
+        """Acrescenta a entrada ao diário e força a gravação em disco (fsync)."""
+        linha = json.dumps({"chave": chave_ia, "nome": nome_padronizado}, ensure_ascii=False)
+        with open(self.caminho_diario, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pendentes(self) -> List[Tuple[str, str]]:
+        """Entradas ainda não compactadas, na ordem de registro. Uma última linha truncada (queda no meio da escrita) é ignorada."""
+        try:
+            with open(self.caminho_diario, "r", encoding="utf-8") as f:
+                linhas = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        entradas: List[Tuple[str, str]] = []
+        for num_linha, linha in enumerate(linhas, start=1):
+            if not linha.strip():
+                continue
+            try:
+                entrada = json.loads(linha)
+                entradas.append((str(entrada["chave"]), str(entrada["nome"])))
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                logging.warning(f"Diário de mapeamento: linha {num_linha} de '{self.caminho_diario.name}' ilegível ({e}). Ignorada.")
+        return entradas
+
+    def aplicar_pendentes(self, config_mapeamento: Dict[str, Any]) -> int:
+        """Aplica as entradas pendentes sobre o conteúdo carregado do arquivo de mapeamento. Retorna quantas foram aplicadas."""
+        entradas = self.pendentes()
+        if entradas:
+            if not isinstance(config_mapeamento.get(SECAO_MAPEAMENTO), dict):
+                config_mapeamento[SECAO_MAPEAMENTO] = {}
+            config_mapeamento[SECAO_MAPEAMENTO].update(entradas)
+        return len(entradas)
+
+    def compactar(self) -> int:
+        """Incorpora o diário ao arquivo de mapeamento (gravação atômica) e remove o diário. Retorna o nº de entradas."""
+        entradas = self.pendentes()
+        if not entradas:
+            self.caminho_diario.unlink(missing_ok=True)
+            return 0
+        config_mapeamento: Dict[str, Any] = {}
+        if self.caminho_mapeamento.is_file():
+            with open(self.caminho_mapeamento, "r", encoding="utf-8") as f:
+                config_mapeamento = json.load(f)
+            if not isinstance(config_mapeamento, dict):
+                raise ValueError(f"Conteúdo de '{self.caminho_mapeamento.name}' não é um dicionário JSON.")
+        if not isinstance(config_mapeamento.get(SECAO_MAPEAMENTO), dict):
+            config_mapeamento[SECAO_MAPEAMENTO] = {}
+        config_mapeamento[SECAO_MAPEAMENTO].update(entradas)
+        gravar_json_atomico(self.caminho_mapeamento, config_mapeamento)
+        self.caminho_diario.unlink(missing_ok=True)
+        return len(entradas)
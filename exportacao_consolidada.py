@@ -0,0 +1,58 @@
+# --- PLANILHA CONSOLIDADA DO LOTE: UMA LINHA POR SÚMULA (openpyxl EM MODO WRITE-ONLY) ---
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+COLUNA_PDF = "PDF"
+
+
+def _valor_celula(valor: Any) -> Any:
+    """Converte o valor normalizado em algo gravável numa célula (texto sem caracteres de controle proibidos no xlsx)."""
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    if not isinstance(valor, str):
+        valor = json.dumps(valor, ensure_ascii=False, default=str)
+    return ILLEGAL_CHARACTERS_RE.sub("", valor)
+
+
+class ExportadorConsolidado:
+    """Acumula os JSONs normalizados do lote e grava uma planilha com uma linha por súmula.
+
+    As colunas são a união das chaves normalizadas (na ordem em que aparecem), conhecida só ao fim do lote.
+    Por isso cada linha vai para um arquivo temporário (JSON por linha) e a planilha é escrita de uma vez em
+    `finalizar()`, com `Workbook(write_only=True)`: a memória usada não cresce com o número de linhas.
+    """
+
+    def __init__(self, caminho_saida: Path, nome_aba: str = "Sumulas", dir_temporario: Optional[Path] = None):
+        self.caminho_saida = Path(caminho_saida)
+        self.nome_aba = nome_aba
+        self.colunas: Dict[str, None] = {} # Conjunto ordenado das chaves normalizadas já vistas
+        self.linhas = 0
+        self._spool = tempfile.TemporaryFile(mode="w+", encoding="utf-8", dir=dir_temporario, suffix=".jsonl")
+
+    def adicionar(self, nome_pdf: str, json_normalizado: Dict[str, Any]) -> None:
+        """Registra a linha de uma súmula (ordem de chegada = ordem das linhas na planilha)."""
+        for chave in json_normalizado:
+            if chave not in self.colunas:
+                self.colunas[chave] = None
+        self._spool.write(json.dumps([nome_pdf, json_normalizado], ensure_ascii=False, default=str) + "\n")
+        self.linhas += 1
+
+    def finalizar(self) -> int:
+        """Grava a planilha consolidada e descarta o arquivo temporário. Retorna o número de linhas de dados."""
+        colunas = list(self.colunas)
+        workbook = Workbook(write_only=True)
+        aba = workbook.create_sheet(self.nome_aba)
+        aba.append([COLUNA_PDF] + colunas)
+        self._spool.seek(0)
+        for linha_json in self._spool:
+            nome_pdf, dados = json.loads(linha_json)
+            aba.append([nome_pdf] + [_valor_celula(dados.get(coluna)) for coluna in colunas])
+        self.caminho_saida.parent.mkdir(parents=True, exist_ok=True)
+        workbook.save(self.caminho_saida)
+        self._spool.close()
+        return self.linhas
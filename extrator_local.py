@@ -0,0 +1,160 @@
+# --- EXTRATOR LOCAL POR RÓTULOS: CAMPOS "Rótulo: valor" RESOLVIDOS SEM A IA ---
+# Regras declaradas no schema, por bloco:
+#   "regras_locais": {"escopo": "secao" | "documento", "campos": {"<campo de campos_esperados>": "<regex do rótulo>"}}
+# Com escopo "secao" (padrão) a busca fica restrita ao trecho que começa no 'titulo_padrao' do bloco e termina no
+# título do bloco seguinte. O valor é o texto após o rótulo até o fim da linha, parando antes de outro rótulo declarado,
+# de um rótulo genérico ("Palavra:" ou "Duas palavras:") ou de um espaçamento de coluna; se a regex tiver um grupo
+# de captura, o grupo 1 é o valor.
+# Ancore os rótulos no início da linha ou num espaçamento de coluna, ex.: "(?m)(?:^|[ \t]{2,})Vencimento:". Com "\b", o
+# rótulo também casa no fim de outro ("1º Vencimento:", "Primeiro Vencimento:") e o valor local, que prevalece sobre o
+# da IA, sai errado.
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+ESCOPO_SECAO = "secao"
+ESCOPO_DOCUMENTO = "documento"
+
+# Início de um rótulo não declarado na mesma linha: "Palavra:" / "Palavra outra:" (maiúscula seguida de minúsculas, para não
+# cortar valores em caixa alta como nomes) ou duas ou mais colunas de espaço (texto extraído com layout)
+_REGEX_PROXIMO_ROTULO = re.compile(r'[ \t]{2,}|[ \t][A-ZÀ-Ý][a-zà-ÿ]+(?:[ \t/][^\s:]+)?:')
+
+
+class RegrasLocaisBloco:
+    """Regras compiladas de um bloco do schema."""
+
+    def __init__(self, titulo: Optional[Pattern[str]], escopo: str, campos: Dict[str, Pattern[str]]):
+        self.titulo = titulo
+        self.escopo = escopo
+        self.campos = campos
+
+
+def validar_regras_locais(nome_bloco: str, config_bloco: Dict[str, Any]) -> Optional[str]:
+    """Mensagem de erro se as regras locais do bloco forem inválidas; None se estiverem corretas (ou ausentes)."""
+    regras = config_bloco.get("regras_locais")
+    if regras is None:
+        return None
+    if not isinstance(regras, dict) or not isinstance(regras.get("campos"), dict):
+        return f"'regras_locais' do bloco '{nome_bloco}' deve ser um objeto com a chave 'campos' (campo -> regex do rótulo)."
+    if regras.get("escopo", ESCOPO_SECAO) not in (ESCOPO_SECAO, ESCOPO_DOCUMENTO):
+        return f"'regras_locais.escopo' do bloco '{nome_bloco}' deve ser '{ESCOPO_SECAO}' ou '{ESCOPO_DOCUMENTO}'."
+    campos_esperados = config_bloco.get("campos_esperados") or []
+    for campo, padrao in regras["campos"].items():
+        if campo not in campos_esperados:
+            return f"'regras_locais' do bloco '{nome_bloco}' cita o campo '{campo}', que não está em 'campos_esperados'."
+        try:
+            re.compile(padrao)
+        except (re.error, TypeError) as e:
+            return f"Regex inválida em 'regras_locais' do bloco '{nome_bloco}', campo '{campo}': {e}"
+    return None
+
+
+def compilar_regras_locais(blocos_config_map: Dict[str, Any]) -> Dict[str, RegrasLocaisBloco]:
+    """Compila as regras dos blocos que as declaram (blocos com regras inválidas são ignorados)."""
+    compiladas: Dict[str, RegrasLocaisBloco] = {}
+    for nome_bloco, config_bloco in blocos_config_map.items():
+        if "regras_locais" not in config_bloco or validar_regras_locais(nome_bloco, config_bloco) is not None:
+            continue
+        regras = config_bloco["regras_locais"]
+        titulo = config_bloco.get("titulo_padrao")
+        compiladas[nome_bloco] = RegrasLocaisBloco(
+            re.compile(titulo) if isinstance(titulo, str) else None,
+            regras.get("escopo", ESCOPO_SECAO),
+            {campo: re.compile(padrao) for campo, padrao in regras["campos"].items()})
+    return compiladas
+
+
+def localizar_secoes(texto: str, titulos: Dict[str, Pattern[str]]) -> Dict[str, Tuple[int, int]]:
+    """(início, fim) do trecho de cada bloco cujo título aparece no texto: do título até o título seguinte."""
+    inicios: List[Tuple[int, str]] = []
+    for nome_bloco, regex_titulo in titulos.items():
+        match = regex_titulo.search(texto)
+        if match is not None:
+            inicios.append((match.start(), nome_bloco))
+    inicios.sort()
+    secoes: Dict[str, Tuple[int, int]] = {}
+    for i, (inicio, nome_bloco) in enumerate(inicios):
+        fim = next((inicio_seguinte for inicio_seguinte, _ in inicios[i + 1:] if inicio_seguinte > inicio), len(texto))
+        secoes[nome_bloco] = (inicio, fim)
+    return secoes
+
+
+def localizar_trechos(texto: str, titulos: Dict[str, Pattern[str]], cabecalhos: Tuple[str, ...] = ()) -> Dict[str, List[Tuple[int, int]]]:
+    """Todos os trechos (início, fim) de cada bloco: de cada ocorrência do título até o título seguinte de outro bloco.
+
+    Os blocos em `cabecalhos` (títulos repetidos no topo de cada página) não encerram os trechos dos demais, para que
+    uma seção que continua na página seguinte não seja cortada no cabeçalho.
+    """
+    ocorrencias = sorted((match.start(), nome_bloco) for nome_bloco, regex_titulo in titulos.items() for match in regex_titulo.finditer(texto))
+    trechos: Dict[str, List[Tuple[int, int]]] = {}
+    for i, (inicio, nome_bloco) in enumerate(ocorrencias):
+        fim = len(texto)
+        for inicio_seguinte, nome_seguinte in ocorrencias[i + 1:]:
+            if nome_seguinte != nome_bloco and (nome_bloco in cabecalhos or nome_seguinte not in cabecalhos):
+                fim = inicio_seguinte
+                break
+        trechos.setdefault(nome_bloco, []).append((inicio, fim))
+    return trechos
+
+
+def _extrair_valor(regex_rotulo: Pattern[str], texto: str, inicio: int, fim: int, delimitadores: List[Pattern[str]]) -> Optional[str]:
+    match = regex_rotulo.search(texto, inicio, fim)
+    if match is None:
+        return None
+    if regex_rotulo.groups:
+        valor = match.group(1)
+    else:
+        inicio_valor = match.end()
+        fim_valor = texto.find("\n", inicio_valor, fim)
+        fim_valor = fim if fim_valor < 0 else fim_valor
+        for regex_delimitador in [_REGEX_PROXIMO_ROTULO] + delimitadores:
+            proximo = regex_delimitador.search(texto, inicio_valor + 1, fim_valor) if regex_delimitador is not regex_rotulo else None
+            if proximo is not None:
+                fim_valor = proximo.start()
+        valor = texto[inicio_valor:fim_valor]
+    valor = valor.strip() if valor else None
+    return valor or None
+
+
+def extrair_campos_locais(
+    texto: str,
+    blocos_config_map: Dict[str, Any],
+    regras: Dict[str, RegrasLocaisBloco],
+    titulos_todos_blocos: Optional[Dict[str, Pattern[str]]] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], int]:
+    """Resolve localmente os campos com regras e devolve (dados por 'json_chave', blocos restantes para a IA, nº de campos).
+
+    Os blocos restantes são cópias reduzidas aos campos não resolvidos; blocos sem pendências (e sem listas) saem
+    da requisição. `titulos_todos_blocos` delimita as seções também pelos títulos de blocos fora do mapa (ex.: outras partições).
+    """
+    titulos = dict(titulos_todos_blocos or {})
+    titulos.update({nome: r.titulo for nome, r in regras.items() if r.titulo is not None})
+    secoes = localizar_secoes(texto, titulos)
+    delimitadores = [regex_rotulo for r in regras.values() if r.campos for regex_rotulo in r.campos.values() if not regex_rotulo.groups]
+    dados_locais: Dict[str, Dict[str, Any]] = {}
+    blocos_restantes: Dict[str, Any] = {}
+    campos_resolvidos = 0
+    for nome_bloco, config_bloco in blocos_config_map.items():
+        regras_bloco = regras.get(nome_bloco)
+        limites = (0, len(texto)) if regras_bloco is not None and regras_bloco.escopo == ESCOPO_DOCUMENTO else secoes.get(nome_bloco)
+        if regras_bloco is None or limites is None:
+            blocos_restantes[nome_bloco] = config_bloco; continue
+        valores: Dict[str, Any] = {}
+        for campo, regex_rotulo in regras_bloco.campos.items():
+            valor = _extrair_valor(regex_rotulo, texto, limites[0], limites[1], delimitadores)
+            if valor is not None:
+                valores[campo] = valor
+        if valores:
+            dados_locais[config_bloco["json_chave"]] = valores
+            campos_resolvidos += len(valores)
+        pendentes = [campo for campo in (config_bloco.get("campos_esperados") or []) if campo not in valores]
+        if pendentes or config_bloco.get("nome_lista_json"):
+            blocos_restantes[nome_bloco] = dict(config_bloco, campos_esperados=pendentes) if valores else config_bloco
+    return dados_locais, blocos_restantes, campos_resolvidos
+
+
+def mesclar_dados_locais(dados_ia: Dict[str, Any], dados_locais: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Junta os campos resolvidos localmente ao JSON da IA (o valor local prevalece no mesmo campo)."""
+    for json_chave, valores in dados_locais.items():
+        bloco_ia = dados_ia.get(json_chave)
+        dados_ia[json_chave] = {**bloco_ia, **valores} if isinstance(bloco_ia, dict) else dict(valores)
+    return dados_ia
@@ -0,0 +1,19 @@
+# Configuração do gunicorn para o serviço HTTP de extração: gunicorn -c gunicorn.conf.py servico_http:app
+import multiprocessing
+import os
+
+bind = os.getenv("PROCESSAR_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("PROCESSAR_WORKERS", str(multiprocessing.cpu_count())))
+# Cada requisição passa a maior parte do tempo aguardando a API Gemini: threads por worker aproveitam essa espera
+worker_class = "gthread"
+threads = int(os.getenv("PROCESSAR_THREADS", "4"))
+# Schema, mapeamento e cliente Gemini são carregados uma vez no master e herdados pelos workers no fork
+preload_app = True
+# O prazo de cada requisição (PROCESSAR_TIMEOUT_REQUISICAO_S) é aplicado pelo próprio serviço: as chamadas à API usam o tempo
+# restante como timeout e não são repetidas depois dele (504). Com gthread, o `timeout` do gunicorn só vigia o laço principal
+# do worker (worker travado), não as threads de requisição
+timeout = int(float(os.getenv("PROCESSAR_TIMEOUT_REQUISICAO_S", "180"))) + 30
+graceful_timeout = 30
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
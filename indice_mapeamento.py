@@ -0,0 +1,111 @@
+# --- ÍNDICE COMPILADO DAS CHAVES CURINGA ('*') DO MAPEAMENTO DE CHAVES ---
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_PRIORIDADE = Tuple[int, int, int] # (nº de '_', comprimento do padrão, -ordem no arquivo): maior vence
+
+
+def _prioridade_padrao(chave_padrao: str, ordem: int) -> _PRIORIDADE:
+    """Mesma precedência da busca sequencial: mais segmentos, depois mais longo, depois o que aparece primeiro."""
+    return (chave_padrao.count('_'), len(chave_padrao), -ordem)
+
+
+def _segmento_numerico(segmento: str) -> bool:
+    return segmento.isascii() and segmento.isdigit() # Equivale a [0-9]+ (isdigit sozinho aceita '²', '٣'...)
+
+
+class _NoTrie:
+    __slots__ = ("filhos", "curinga", "terminal")
+
+    def __init__(self) -> None:
+        self.filhos: Dict[str, "_NoTrie"] = {}
+        self.curinga: Optional["_NoTrie"] = None # Segmento '*': casa qualquer segmento só de dígitos
+        self.terminal: Optional[Tuple[_PRIORIDADE, str]] = None # Padrão que termina neste nó
+
+    # Estado em tupla: o pickle padrão de classes com __slots__ é cerca de 2x mais lento (snapshot de configuração)
+    def __getstate__(self) -> Tuple[Dict[str, "_NoTrie"], Optional["_NoTrie"], Optional[Tuple[_PRIORIDADE, str]]]:
+        return self.filhos, self.curinga, self.terminal
+
+    def __setstate__(self, estado: Tuple[Dict[str, "_NoTrie"], Optional["_NoTrie"], Optional[Tuple[_PRIORIDADE, str]]]) -> None:
+        self.filhos, self.curinga, self.terminal = estado
+
+
+class IndiceCuringasMapeamento:
+    """Resolve chaves achatadas da IA contra os padrões com '*' do mapeamento, sem testar regex por regex.
+
+    Padrões cujo '*' ocupa um segmento inteiro (ex.: 'modalidades_scr_*_prejuizo') ficam em uma trie de
+    segmentos separados por '_', com um nó curinga para segmentos numéricos; os demais (ex.: 'fiador*_nome')
+    usam expressões regulares. Entre os padrões que casam, vence o de mais segmentos, depois o mais longo.
+    """
+
+    def __init__(self, mapeamento_chaves: Dict[str, Any]):
+        self._raiz = _NoTrie()
+        self._destinos: Dict[str, str] = {}
+        self._padroes_regex: List[Tuple[_PRIORIDADE, str, re.Pattern]] = []
+        for ordem, (chave_padrao, nome_padronizado) in enumerate(mapeamento_chaves.items()):
+            if '*' not in chave_padrao:
+                continue
+            self._destinos[chave_padrao] = str(nome_padronizado)
+            prioridade = _prioridade_padrao(chave_padrao, ordem)
+            segmentos = chave_padrao.split('_')
+            if all(segmento == '*' or '*' not in segmento for segmento in segmentos):
+                no = self._raiz
+                for segmento in segmentos:
+                    if segmento == '*':
+                        no.curinga = no.curinga or _NoTrie()
+                        no = no.curinga
+                    else:
+                        no = no.filhos.setdefault(segmento, _NoTrie())
+                no.terminal = (prioridade, chave_padrao)
+            else:
+                regex = re.compile('^' + re.escape(chave_padrao).replace(r'\*', r'([0-9]+)') + '$')
+                self._padroes_regex.append((prioridade, chave_padrao, regex))
+        self._padroes_regex.sort(key=lambda item: item[0], reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._destinos)
+
+    def _buscar_na_trie(
+        self, no: _NoTrie, segmentos: List[str], posicao: int, primeiro_indice: Optional[str]
+    ) -> Optional[Tuple[_PRIORIDADE, str, Optional[str]]]:
+        """Melhor padrão da trie a partir de `no`: (prioridade, padrão, dígitos do primeiro '*').
+
+        O caminho é percorrido em laço; só há recursão quando o segmento casa tanto um filho literal quanto o curinga.
+        """
+        melhor: Optional[Tuple[_PRIORIDADE, str, Optional[str]]] = None
+        total_segmentos = len(segmentos)
+        while posicao < total_segmentos:
+            segmento = segmentos[posicao]
+            filho = no.filhos.get(segmento)
+            if no.curinga is not None and _segmento_numerico(segmento):
+                indice_curinga = segmento if primeiro_indice is None else primeiro_indice
+                if filho is None:
+                    no, primeiro_indice = no.curinga, indice_curinga
+                    posicao += 1
+                    continue
+                candidato = self._buscar_na_trie(no.curinga, segmentos, posicao + 1, indice_curinga)
+                if candidato is not None and (melhor is None or candidato[0] > melhor[0]):
+                    melhor = candidato
+            if filho is None:
+                return melhor
+            no = filho
+            posicao += 1
+        if no.terminal is not None and (melhor is None or no.terminal[0] > melhor[0]):
+            melhor = (no.terminal[0], no.terminal[1], primeiro_indice)
+        return melhor
+
+    def resolver(self, chave_ia: str) -> Optional[Tuple[str, str]]:
+        """Retorna (nome padronizado, padrão usado) para a chave, ou None se nenhum padrão com '*' casar."""
+        melhor = self._buscar_na_trie(self._raiz, chave_ia.split('_'), 0, None)
+        for prioridade, chave_padrao, regex in self._padroes_regex:
+            if melhor is not None and prioridade <= melhor[0]:
+                break # Lista ordenada por prioridade: nenhum padrão restante supera o da trie
+            match = regex.match(chave_ia)
+            if match:
+                melhor = (prioridade, chave_padrao, match.group(1))
+                break
+        if melhor is None:
+            return None
+        _, chave_padrao, indice = melhor
+        nome_base = self._destinos[chave_padrao]
+        return (nome_base.replace('*', indice) if '*' in nome_base and indice is not None else nome_base), chave_padrao
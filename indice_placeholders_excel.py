@@ -0,0 +1,96 @@
+# --- ÍNDICE DAS CÉLULAS COM PLACEHOLDERS {{CHAVE}} DE CADA MODELO EXCEL ---
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_disco import calcular_sha256_arquivo
+from diario_mapeamento import gravar_json_atomico
+
+REGEX_PLACEHOLDER_EXCEL = re.compile(r'\{\{([A-Z0-9_]+?)\}\}')
+VERSAO_INDICE_PLACEHOLDERS = 1 # Incrementar se o formato do índice ou a regex mudarem: invalida os índices gravados
+
+LocalPlaceholder = Tuple[str, str, List[Tuple[int, int]]] # (coordenada, texto original da célula, spans dos placeholders)
+
+
+def localizar_placeholders(planilha: Any) -> List[Tuple[Any, List[Tuple[int, int]]]]:
+    """Varre todas as células da aba e retorna (célula, spans) das que contêm placeholders."""
+    encontrados = []
+    for linha in planilha.iter_rows():
+        for celula in linha:
+            if celula.value and isinstance(celula.value, str):
+                spans = [match.span(0) for match in REGEX_PLACEHOLDER_EXCEL.finditer(celula.value)]
+                if spans:
+                    encontrados.append((celula, spans))
+    return encontrados
+
+
+def caminho_indice_placeholders(caminho_modelo: Path) -> Path:
+    return Path(caminho_modelo).with_name(Path(caminho_modelo).name + ".placeholders.json")
+
+
+class CacheIndicePlaceholders:
+    """Índices de placeholders por (SHA-256 do modelo, nome da aba), em memória e em arquivo ao lado do modelo.
+
+    O modelo não muda entre PDFs: a aba é varrida uma vez e os preenchimentos seguintes visitam apenas as
+    células listadas. O hash do modelo só é recalculado quando o mtime ou o tamanho do arquivo mudam.
+    """
+
+    def __init__(self) -> None:
+        self._indices: Dict[Tuple[str, str], List[LocalPlaceholder]] = {}
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+
+    def _sha256_modelo(self, caminho_modelo: Path) -> str:
+        estat = os.stat(caminho_modelo)
+        chave = (str(Path(caminho_modelo).resolve()), estat.st_mtime_ns, estat.st_size)
+        if chave not in self._hashes:
+            self._hashes[chave] = calcular_sha256_arquivo(Path(caminho_modelo))
+        return self._hashes[chave]
+
+    def obter(self, caminho_modelo: Path, nome_aba: str) -> Optional[List[LocalPlaceholder]]:
+        """Índice da aba do modelo (memória, depois arquivo ao lado do modelo), ou None se ainda não existir."""
+        try:
+            sha256 = self._sha256_modelo(caminho_modelo)
+        except (OSError, TypeError):
+            return None
+        indice = self._indices.get((sha256, nome_aba))
+        if indice is not None:
+            return indice
+        try:
+            with open(caminho_indice_placeholders(caminho_modelo), "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Índice de placeholders de '{Path(caminho_modelo).name}' ilegível ({e}). Será refeito.")
+            return None
+        if not isinstance(dados, dict) or dados.get("versao") != VERSAO_INDICE_PLACEHOLDERS or dados.get("sha256") != sha256 \
+           or nome_aba not in (dados.get("abas") or {}):
+            return None
+        indice = [(coordenada, texto, [tuple(span) for span in spans]) for coordenada, texto, spans in dados["abas"][nome_aba]]
+        self._indices[(sha256, nome_aba)] = indice
+        return indice
+
+    def gravar(self, caminho_modelo: Path, nome_aba: str, indice: List[LocalPlaceholder]) -> None:
+        """Guarda o índice em memória e tenta persisti-lo ao lado do modelo (falha de escrita não é erro)."""
+        try:
+            sha256 = self._sha256_modelo(caminho_modelo)
+        except (OSError, TypeError):
+            return
+        self._indices[(sha256, nome_aba)] = indice
+        caminho_indice = caminho_indice_placeholders(caminho_modelo)
+        dados: Dict[str, Any] = {"versao": VERSAO_INDICE_PLACEHOLDERS, "sha256": sha256, "abas": {}}
+        try:
+            with open(caminho_indice, "r", encoding="utf-8") as f:
+                existente = json.load(f)
+            if isinstance(existente, dict) and existente.get("versao") == VERSAO_INDICE_PLACEHOLDERS and existente.get("sha256") == sha256:
+                dados["abas"] = existente.get("abas") or {} # Mantém os índices das outras abas do mesmo modelo
+        except (OSError, json.JSONDecodeError):
+            pass
+        dados["abas"][nome_aba] = [[coordenada, texto, [list(span) for span in spans]] for coordenada, texto, spans in indice]
+        try:
+            gravar_json_atomico(caminho_indice, dados)
+        except OSError as e:
+            logging.debug(f"Índice de placeholders não persistido em '{caminho_indice}': {e}")
@@ -0,0 +1,107 @@
+# --- PIPELINE PRODUTOR/CONSUMIDOR EM ESTÁGIOS (FILAS LIMITADAS + MÉTRICAS DE UTILIZAÇÃO) ---
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+_FIM = object() # Sentinela de encerramento enviada a cada consumidor de um estágio
+
+
+class EstagioPipeline:
+    """Um estágio do pipeline: `funcao` assíncrona aplicada a cada item por `num_consumidores` tarefas concorrentes.
+
+    A fila de entrada do estágio tem no máximo `capacidade_fila` itens; com ela cheia, o estágio anterior
+    aguarda (contrapressão), o que limita a memória ocupada por documentos em andamento.
+    """
+
+    def __init__(self, nome: str, funcao: Callable[[Any], Awaitable[Any]], num_consumidores: int = 1, capacidade_fila: int = 2):
+        self.nome = nome
+        self.funcao = funcao
+        self.num_consumidores = max(1, num_consumidores)
+        self.capacidade_fila = max(1, capacidade_fila)
+        self.itens_processados = 0
+        self.tempo_ocupado_s = 0.0 # Soma do tempo de todos os consumidores dentro de `funcao`
+        self.tempo_bloqueado_s = 0.0 # Tempo aguardando vaga na fila de entrada (contrapressão sobre o estágio anterior)
+        self.profundidade_max_fila = 0
+        self._soma_profundidades = 0
+        self._amostras_profundidade = 0
+        self.fila: Optional[asyncio.Queue] = None
+
+    async def enfileirar(self, item: Any) -> None:
+        """Coloca o item na fila de entrada do estágio, registrando espera e profundidade."""
+        t_inicio = time.perf_counter()
+        await self.fila.put(item)
+        self.tempo_bloqueado_s += time.perf_counter() - t_inicio
+        if item is not _FIM:
+            profundidade = self.fila.qsize()
+            self.profundidade_max_fila = max(self.profundidade_max_fila, profundidade)
+            self._soma_profundidades += profundidade
+            self._amostras_profundidade += 1
+
+    def metricas(self, duracao_total_s: float) -> Dict[str, Any]:
+        """Utilização (fração do tempo com consumidores ocupados), vazão do estágio e profundidade da fila."""
+        capacidade_s = self.num_consumidores * duracao_total_s
+        return {
+            "consumidores": self.num_consumidores,
+            "itens": self.itens_processados,
+            "utilizacao": (self.tempo_ocupado_s / capacidade_s) if capacidade_s > 0 else 0.0,
+            "tempo_ocupado_s": self.tempo_ocupado_s,
+            "tempo_bloqueado_s": self.tempo_bloqueado_s,
+            "fila_capacidade": self.capacidade_fila,
+            "fila_profundidade_max": self.profundidade_max_fila,
+            "fila_profundidade_media": (self._soma_profundidades / self._amostras_profundidade) if self._amostras_profundidade else 0.0,
+        }
+
+
+async def executar_pipeline(
+    itens: Iterable[Any],
+    estagios: List[EstagioPipeline],
+    encerrado: Callable[[Any], bool] = lambda item: False,
+    ao_concluir: Optional[Callable[[Any], None]] = None
+) -> List[Any]:
+    """Passa cada item por todos os estágios, em sobreposição, e retorna os itens concluídos (em ordem de conclusão).
+
+    Um item para o qual `encerrado(item)` é verdadeiro (ex.: falhou) não segue para os estágios seguintes.
+    Exceções de `funcao` não são tratadas aqui: cada estágio deve registrar a falha no próprio item.
+    """
+    for estagio in estagios:
+        estagio.fila = asyncio.Queue(maxsize=estagio.capacidade_fila)
+    concluidos: List[Any] = []
+
+    def _concluir(item: Any) -> None:
+        concluidos.append(item)
+        if ao_concluir is not None:
+            ao_concluir(item)
+
+    async def _consumir(indice: int) -> None:
+        estagio = estagios[indice]
+        proximo = estagios[indice + 1] if indice + 1 < len(estagios) else None
+        while True:
+            item = await estagio.fila.get()
+            if item is _FIM:
+                return
+            t_inicio = time.perf_counter()
+            try:
+                item = await estagio.funcao(item)
+            finally:
+                estagio.tempo_ocupado_s += time.perf_counter() - t_inicio
+            estagio.itens_processados += 1
+            if proximo is None or encerrado(item):
+                _concluir(item)
+            else:
+                await proximo.enfileirar(item)
+
+    async def _executar_estagio(indice: int) -> None:
+        estagio = estagios[indice]
+        await asyncio.gather(*(_consumir(indice) for _ in range(estagio.num_consumidores)))
+        if indice + 1 < len(estagios): # Estágio esgotado: encerra os consumidores do seguinte
+            for _ in range(estagios[indice + 1].num_consumidores):
+                await estagios[indice + 1].enfileirar(_FIM)
+
+    async def _alimentar() -> None:
+        for item in itens:
+            await estagios[0].enfileirar(item)
+        for _ in range(estagios[0].num_consumidores):
+            await estagios[0].enfileirar(_FIM)
+
+    await asyncio.gather(_alimentar(), *(_executar_estagio(i) for i in range(len(estagios))))
+    return concluidos
@@ -1,6 +1,7 @@
 # --- 0. IMPORTAÇÕES DE BIBLIOTECAS ---
+from __future__ import annotations
 import pdfplumber
-import google.generativeai as genai
+from pdfplumber.utils.text import WordExtractor
 import json
 from pathlib import Path
 import tkinter as tk
@@ -13,9 +14,27 @@ import openpyxl
 from dotenv import load_dotenv
 import time
 import logging
-from tenacity import retry, stop_after_attempt, wait_exponential, RetryError
+import argparse
+import threading
+import asyncio
+import atexit
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tenacity import retry, stop_after_attempt, stop_any, RetryError
 from typing import Any, Dict, List, Optional, Tuple, Union
-from PIL import Image, ImageTk
+from cache_disco import CacheDisco, calcular_sha256_arquivo
+from cliente_gemini_async import ClienteGeminiAsync, calcular_espera_retry, estimar_tokens_prompt, extrair_uso_resposta_gemini
+from backend_llm import BACKEND_LLM_FALSO, BACKEND_LLM_GEMINI, BackendFalso, BackendLLM
+from cache_contexto_gemini import CacheContextoGemini, CacheContextoPrompt
+from contabilidade_tokens import ACAO_ORCAMENTO_ABORTAR, ACAO_ORCAMENTO_DIVIDIR, ContabilidadeTokens, ErroOrcamentoTokens, formatar_resumo_tokens, somar_resumos_tokens
+from pipeline_estagios import EstagioPipeline, executar_pipeline
+from indice_mapeamento import IndiceCuringasMapeamento
+from diario_mapeamento import DiarioMapeamento, gravar_json_atomico
+from snapshot_configuracao import arquivo_inalterado, carregar_snapshot, salvar_snapshot
+from indice_placeholders_excel import CacheIndicePlaceholders, localizar_placeholders
+from exportacao_consolidada import ExportadorConsolidado
+from preenchimento_xlsx_direto import preencher_xlsx_direto
+from extrator_local import RegrasLocaisBloco, compilar_regras_locais, extrair_campos_locais, localizar_trechos, mesclar_dados_locais, validar_regras_locais
+# google.generativeai (importação de ~1 s) e PIL (apenas GUI) são importados sob demanda.
 
 # --- Inicialização preventiva ---
 progress: Optional[ttk.Progressbar] = None
@@ -37,18 +56,75 @@ def resource_path(relative_path: str) -> Path:
         base_path = Path(__file__).resolve().parent
     return base_path / relative_path
 
+def caminho_dados_gravaveis(relative_path: str) -> Path:
+    """Caminho para arquivos gravados em execução (caches, log).
+
+    No executável do PyInstaller, _MEIPASS é temporário e removido ao sair: usa %LOCALAPPDATA%/ProcessarPDF
+    ou, sem ele, a pasta do executável. Em desenvolvimento, o mesmo diretório de resource_path.
+    """
+    if not getattr(sys, "frozen", False):
+        return resource_path(relative_path)
+    local_app_data = os.getenv("LOCALAPPDATA")
+    base_path = Path(local_app_data) / "ProcessarPDF" if local_app_data else Path(sys.executable).resolve().parent
+    return base_path / relative_path
+
 # --- CONSTANTES ---
 CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS = False # Mudar para True para salvar arquivos intermediários
 ARQUIVO_MAPEAMENTO_CONFIG = "mapeamento_config.json"
 ARQUIVO_SCHEMA_EXTRACAO = "extraction_schema.json"
-LOG_FILE_PATH = resource_path("processamento_pdf.log")
+LOG_FILE_PATH = Path(os.getenv("PROCESSAR_ARQUIVO_LOG") or caminho_dados_gravaveis("processamento_pdf.log")) # PROCESSAR_ARQUIVO_LOG: outro arquivo (ex.: testes)
 MAX_TEXT_LENGTH_IA = 60 # Limite de caracteres para campos de texto longo na IA
 MARCADOR_INICIO_TEXTO_PDF_PROMPT = "[INICIO_TEXTO_DOCUMENTO_SICOOB_XYZ123]"
 MARCADOR_FIM_TEXTO_PDF_PROMPT = "[FIM_TEXTO_DOCUMENTO_SICOOB_XYZ123]"
 INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES = True # Se True, insere "N/A" no Excel para placeholders não encontrados nos dados
+PREENCHER_XLSX_DIRETO = True # Se True, tenta preencher editando só o XML da aba no .xlsx; casos não suportados usam o openpyxl
+SALVAR_JSON_DADOS_PARA_EXCEL = True # Grava '<pdf>_dados_para_excel.json' em segundo plano (GUI); lote e serviço: só com --salvar-json-excel
 GEMINI_TEMPERATURE = 0.1 # Baixa para respostas mais determinísticas
 GEMINI_MAX_OUTPUT_TOKENS = 8190 # Limite máximo de tokens para a resposta da IA
 GEMINI_MODEL_NAME = 'gemini-1.5-flash-latest' # Modelo Gemini a ser utilizado
+GEMINI_TIMEOUT_REQUISICAO_S = 300 # Tempo máximo de cada chamada síncrona à API (request_options)
+ENVIAR_PARTICOES_EM_PARALELO = False # Opt-in: uma requisição por 'particao' do schema, em paralelo, em vez de uma única chamada
+MAX_REQUISICOES_PARALELAS_GEMINI = 4 # Limite de requisições simultâneas por documento no modo por partição
+ENVIAR_APENAS_SECOES_DOS_BLOCOS = True # Cada requisição leva só os trechos dos seus blocos (localizados por 'titulo_padrao'), não o documento inteiro
+MARGEM_SECAO_CARACTERES = 100 # Caracteres enviados antes e depois de cada trecho (títulos quebrados, rótulos na linha anterior)
+SEPARADOR_TRECHOS_PROMPT = "\n[...]\n"
+ORCAMENTO_TOKENS_POR_REQUISICAO: Optional[int] = None # Opcional: máximo de tokens de entrada (estimados) por requisição ao Gemini
+ACAO_ORCAMENTO_EXCEDIDO = ACAO_ORCAMENTO_DIVIDIR # Requisição acima do orçamento: "dividir" (reparte os blocos) ou "abortar" (falha o documento)
+BACKEND_LLM = os.getenv("PROCESSAR_BACKEND_LLM", BACKEND_LLM_GEMINI) # "gemini" ou "falso" (offline: JSON sintético do schema, para testes de carga sem rede)
+CONFIG_BACKEND_FALSO: Dict[str, Any] = {} # Parâmetros do ModeloFalso (latencia_s, distribuicao_latencia, taxa_erros, taxa_429, semente...); também via PROCESSAR_BACKEND_FALSO_CONFIG (JSON)
+USAR_CACHE_CONTEXTO_GEMINI = False # Opt-in: registra o prefixo de instruções no cache de contexto da API e envia só o texto + reforço
+TTL_CACHE_CONTEXTO_GEMINI_S = 3600 # Validade do conteúdo em cache (renovada enquanto estiver em uso)
+GEMINI_MODELO_CACHE_CONTEXTO: Optional[str] = None # O cache de contexto exige modelo com versão fixa (ex.: 'models/gemini-1.5-flash-002'); None = GEMINI_MODEL_NAME
+USAR_EXTRATOR_LOCAL = False # Opt-in: resolve sem a IA os campos com 'regras_locais' no schema; só blocos/campos pendentes vão ao Gemini
+# Modo assíncrono do lote (--async): requisições em voo e cota da API (None = sem limite)
+GEMINI_MAX_REQUISICOES_EM_VOO = 8
+GEMINI_REQUISICOES_POR_MINUTO: Optional[float] = None
+GEMINI_TOKENS_POR_MINUTO: Optional[float] = None
+CAPACIDADE_FILAS_PIPELINE_LOTE = 4 # Itens aguardando entre estágios do lote --async (contrapressão)
+VERSAO_PROMPT_GEMINI = 2 # Incrementar a cada mudança no texto do prompt: invalida as respostas em cache
+DIR_CACHE = Path(os.getenv("PROCESSAR_DIR_CACHE") or caminho_dados_gravaveis("cache")) # Diretório dos caches persistentes (PROCESSAR_DIR_CACHE: outro diretório)
+ARQUIVO_SNAPSHOT_CONFIG = DIR_CACHE / "snapshot_config.pickle" # Schema validado + partições + mapeamento compilado
+VERSAO_SNAPSHOT_CONFIG = 2 # Incrementar a cada mudança na validação do schema ou no índice do mapeamento: invalida o snapshot
+TAMANHO_MAX_CACHE_GEMINI_MB = 200 # Limite do cache de respostas da IA; acima dele, entradas menos usadas são removidas
+TAMANHO_MAX_CACHE_TEXTO_PDF_MB = 500 # Limite do cache de texto extraído dos PDFs
+VERSAO_EXTRACAO_TEXTO_PDF = 1 # Incrementar a cada mudança na lógica de extração/limpeza: invalida o cache de texto
+PDF_X_TOLERANCE = 1 # Parâmetros do pdfplumber extract_text
+PDF_Y_TOLERANCE = 3
+PDF_MIN_PALAVRAS_STREAM = 5 # Abaixo disso, a página é extraída novamente com layout=True
+# Remoções aplicadas ao texto completo extraído: (regex, flags, número máximo de remoções; 0 = todas)
+REGEX_LIMPEZA_TEXTO_PDF: List[Tuple[str, int, int]] = [
+    (r"^\s*Súmula de Crédito\s*$", re.MULTILINE | re.IGNORECASE, 0),
+    (r"^\s*SICOOB\s*\n(?!Data:)", re.IGNORECASE | re.MULTILINE, 1),
+    (r'Página:\s*\d+\s*\/\s*\d+\s*$', re.MULTILINE | re.IGNORECASE, 0),
+]
+
+# Cache de respostas da API Gemini (JSON já decodificado), endereçado pelo hash do texto + schema + parâmetros do modelo
+CACHE_RESPOSTAS_GEMINI = CacheDisco(DIR_CACHE / "gemini", TAMANHO_MAX_CACHE_GEMINI_MB * 1024 * 1024)
+# Cache do texto limpo (e offsets das páginas) extraído de cada PDF, endereçado pelo SHA-256 do arquivo + parâmetros de extração
+CACHE_TEXTO_PDF = CacheDisco(DIR_CACHE / "texto_pdf", TAMANHO_MAX_CACHE_TEXTO_PDF_MB * 1024 * 1024)
+# Células com placeholders de cada modelo Excel, por hash do modelo + aba (gravado em '<modelo>.placeholders.json')
+CACHE_INDICE_PLACEHOLDERS = CacheIndicePlaceholders()
+_EXECUTOR_ARTEFATOS = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artefatos") # Gravação dos artefatos opcionais (JSON para Excel)
 
 # --- CORES E FONTES PARA A GUI ---
 COR_FUNDO_JANELA = "#F0F0F0"
@@ -76,21 +152,34 @@ PADDING_X_BOTAO_STYLE = 15
 PADDING_Y_BOTAO_STYLE = 5
 
 # --- CONFIGURAÇÃO DO LOGGING ---
-logging.basicConfig(
-    level=logging.INFO, # Mudar para logging.DEBUG para mais detalhes durante desenvolvimento
-    format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(lineno)d - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH, encoding='utf-8', mode='w'), # 'w' para log limpo a cada execução
-        logging.StreamHandler(sys.stdout) # Também loga para o console
-    ]
-)
-logging.info("!!! CONFIGURAÇÃO DE LOGGING EXECUTADA NO TOPO DO SCRIPT !!!")
+_logging_configurado = False
+
+def configurar_logging(modo_arquivo: str = 'a') -> None:
+    """Configura o logging em arquivo e console uma única vez por processo ('w' limpa o log, 'a' acrescenta)."""
+    global _logging_configurado
+    if _logging_configurado: return
+    logging.basicConfig(
+        level=logging.INFO, # Mudar para logging.DEBUG para mais detalhes durante desenvolvimento
+        format='%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(lineno)d - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE_PATH, encoding='utf-8', mode=modo_arquivo),
+            logging.StreamHandler(sys.stdout) # Também loga para o console
+        ]
+    )
+    _logging_configurado = True
+    logging.info(f"Logging configurado (PID {os.getpid()}, modo do arquivo '{modo_arquivo}').")
 
 
 # --- 4. FUNÇÕES DE FEEDBACK DA INTERFACE GRÁFICA (log, progresso) ---
 
 def is_gui_widget_available(widget: Optional[Union[tk.Tk, tk.Widget]]) -> bool:
-    """Verifica se um widget da GUI não é None e ainda existe (não foi destruído)."""
+    """Verifica se um widget da GUI não é None e ainda existe (não foi destruído).
+
+    Fora da thread principal retorna False: o Tk não é thread-safe, então threads auxiliares
+    (ex.: requisições paralelas à API) apenas registram no logger, sem tocar na GUI.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
     return widget is not None and widget.winfo_exists()
 
 def setup_gui_logging_refs(root_window: tk.Tk, log_widget: tk.Text):
@@ -169,23 +258,139 @@ def limpar_log_gui() -> None:
     else:
         logging.warning("Tentativa de limpar log da GUI, mas widget de log ou janela raiz não disponível.")
 
-# --- 1. CARREGAR VARIÁVEIS DE AMBIENTE (.env) ---
-dotenv_path_obj = resource_path(".env")
-if dotenv_path_obj.exists():
-    load_dotenv(dotenv_path=dotenv_path_obj)
-    logging.info(f"Arquivo .env carregado de: {dotenv_path_obj}")
-else:
-    logging.warning(f"Arquivo .env não encontrado em: {dotenv_path_obj}. Usando variáveis de ambiente do sistema, se disponíveis.")
+# --- 1/2. VARIÁVEIS DE AMBIENTE (.env) E CONFIGURAÇÃO DA API GOOGLE GEMINI (SOB DEMANDA) ---
+GOOGLE_API_KEY: Optional[str] = None
+genai: Any = None # Módulo google.generativeai, atribuído por configurar_api_gemini()
+genai_config_ok = False
+_genai_config_tentada = False
+
+def configurar_api_gemini() -> bool:
+    """Carrega o .env, importa google.generativeai e configura a API Key; executa apenas na primeira chamada."""
+    global GOOGLE_API_KEY, genai, genai_config_ok, _genai_config_tentada
+    if _genai_config_tentada: return genai_config_ok
+    _genai_config_tentada = True
+
+    dotenv_path_obj = resource_path(".env")
+    if dotenv_path_obj.exists():
+        load_dotenv(dotenv_path=dotenv_path_obj)
+        logging.info(f"Arquivo .env carregado de: {dotenv_path_obj}")
+    else:
+        logging.warning(f"Arquivo .env não encontrado em: {dotenv_path_obj}. Usando variáveis de ambiente do sistema, se disponíveis.")
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+    if not GOOGLE_API_KEY:
+        log_to_gui("ERRO CRÍTICO: Variável de ambiente 'GOOGLE_API_KEY' não foi encontrada ou está vazia.", "CRITICAL")
+    elif GOOGLE_API_KEY == "SUA_CHAVE_DE_API_AQUI":
+        log_to_gui("ERRO CRÍTICO: A GOOGLE_API_KEY no arquivo .env ainda é o valor placeholder 'SUA_CHAVE_DE_API_AQUI'. Por favor, configure-a com sua chave real.", "CRITICAL")
+    else:
+        try:
+            import google.generativeai as genai_modulo
+            genai = genai_modulo
+            genai.configure(api_key=GOOGLE_API_KEY)
+            log_to_gui("API Key do Google Gemini configurada com sucesso.", "INFO")
+            genai_config_ok = True
+        except Exception as e:
+            log_to_gui(f"ERRO ao tentar configurar a API Key do Google Gemini: {e}. Verifique se a chave é válida.", "ERROR")
+            genai_config_ok = False
+    return genai_config_ok
+
+_modelo_gemini: Any = None
+# Criação dos objetos compartilhados do processo (modelo, backend, cache de contexto) sob demanda: as partições e o lote
+# chamam os obter_* de várias threads ao mesmo tempo. Reentrante: o cache de contexto obtém o backend.
+_lock_objetos_processo = threading.RLock()
+
+def obter_modelo_gemini() -> Any:
+    """GenerativeModel reutilizado por todas as requisições do processo (exige configurar_api_gemini()).
+
+    O cliente de rede só é criado na primeira chamada, então o objeto pode ser montado antes do fork dos workers.
+    """
+    global _modelo_gemini
+    if _modelo_gemini is None:
+        with _lock_objetos_processo:
+            if _modelo_gemini is None:
+                _modelo_gemini = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return _modelo_gemini
+
+class BackendGemini(BackendLLM):
+    """Backend da API Google Gemini (configuração e modelo compartilhados pelo processo)."""
+
+    nome = BACKEND_LLM_GEMINI
+
+    @property
+    def identificador_modelo(self) -> str:
+        return GEMINI_MODEL_NAME
+
+    def configurar(self) -> bool:
+        return configurar_api_gemini()
+
+    def obter_modelo(self) -> Any:
+        return obter_modelo_gemini()
+
+    def criar_generation_config(self) -> Any:
+        return _criar_generation_config_gemini()
+
+    def criar_cache_contexto(self, ttl_s: float) -> Optional[CacheContextoPrompt]:
+        return CacheContextoGemini(genai, GEMINI_MODELO_CACHE_CONTEXTO or GEMINI_MODEL_NAME, ttl_s)
+
+_backend_llm: Optional[BackendLLM] = None
+
+def obter_backend_llm() -> BackendLLM:
+    """Backend de LLM do processo, escolhido por BACKEND_LLM na primeira chamada (o falso usa o schema já carregado)."""
+    global _backend_llm
+    if _backend_llm is not None:
+        return _backend_llm
+    with _lock_objetos_processo:
+        if _backend_llm is not None:
+            return _backend_llm
+        if BACKEND_LLM == BACKEND_LLM_FALSO:
+            config_falso = dict(CONFIG_BACKEND_FALSO)
+            try:
+                config_falso = {**json.loads(os.getenv("PROCESSAR_BACKEND_FALSO_CONFIG") or "{}"), **config_falso}
+                _backend_llm = BackendFalso(BLOCO_CONFIG, marcador_fim=MARCADOR_FIM_TEXTO_PDF_PROMPT, **config_falso)
+            except (TypeError, ValueError) as e:
+                log_to_gui(f"ERRO: Configuração inválida do backend falso ({e}). Usando os parâmetros padrão.", "ERROR")
+                _backend_llm = BackendFalso(BLOCO_CONFIG, marcador_fim=MARCADOR_FIM_TEXTO_PDF_PROMPT)
+            CACHE_RESPOSTAS_GEMINI.habilitado = False # Respostas sintéticas não entram (nem despejam as pagas) no cache de produção
+            log_to_gui(f"Backend de LLM: falso (offline), parâmetros {config_falso or 'padrão'}; cache de respostas desligado.", "WARNING")
+        else:
+            if BACKEND_LLM != BACKEND_LLM_GEMINI:
+                log_to_gui(f"AVISO: Backend de LLM desconhecido '{BACKEND_LLM}'. Usando '{BACKEND_LLM_GEMINI}'.", "WARNING")
+            _backend_llm = BackendGemini()
+    return _backend_llm
+
+_cache_contexto_prompt: Optional[CacheContextoPrompt] = None
+
+def obter_cache_contexto_prompt() -> Optional[CacheContextoPrompt]:
+    """Cache de contexto do prefixo do prompt (None se USAR_CACHE_CONTEXTO_GEMINI estiver desligado; exige o backend configurado).
 
-# --- 2. CONFIGURAÇÃO DA API KEY DO GOOGLE ---
-GOOGLE_API_KEY: Optional[str] = os.getenv("GOOGLE_API_KEY")
+    Cada processo (ex.: worker do lote) registra o próprio conteúdo em cache; os que deixam de ser usados expiram pelo TTL.
+    """
+    global _cache_contexto_prompt
+    if not USAR_CACHE_CONTEXTO_GEMINI:
+        return None
+    if _cache_contexto_prompt is None:
+        with _lock_objetos_processo:
+            if _cache_contexto_prompt is None:
+                _cache_contexto_prompt = obter_backend_llm().criar_cache_contexto(TTL_CACHE_CONTEXTO_GEMINI_S)
+    return _cache_contexto_prompt
+
+def _modelo_e_partes_para_envio(partes_prompt: List[str]) -> Tuple[Any, List[str]]:
+    """(modelo ligado ao prefixo em cache, [texto, reforço]) ou (None, prompt completo) se o cache de contexto não estiver em uso."""
+    cache_contexto = obter_cache_contexto_prompt()
+    modelo_cache = cache_contexto.obter_modelo(partes_prompt[0]) if cache_contexto is not None else None
+    return (modelo_cache, partes_prompt[1:]) if modelo_cache is not None else (None, partes_prompt)
 
 # --- BLOCO DE CONFIGURAÇÃO (CARREGADO DE ARQUIVO EXTERNO) ---
 BLOCO_CONFIG: Dict[str, Any] = {} # Dicionário para armazenar a configuração do schema de extração
-
-def carregar_schema_extracao() -> bool:
-    """Carrega e valida o schema de extração do arquivo JSON especificado."""
-    global BLOCO_CONFIG
+_schema_extracao_sem_erros = False # True se a última validação pelo JSON não ignorou nenhum bloco (condição para gravar o snapshot)
+
+def carregar_schema_extracao(usar_snapshot: bool = True) -> bool:
+    """Carrega e valida o schema de extração (do snapshot binário, se estiver em dia, ou do arquivo JSON)."""
+    global BLOCO_CONFIG, _schema_extracao_sem_erros
+    t_inicio = time.perf_counter()
+    if usar_snapshot and carregar_snapshot_configuracao():
+        log_to_gui(f"Schema '{ARQUIVO_SCHEMA_EXTRACAO}' carregado do snapshot em {(time.perf_counter() - t_inicio) * 1000:.1f} ms. Número de blocos válidos: {len(BLOCO_CONFIG)}", "INFO")
+        return True
     caminho_schema_abs = resource_path(ARQUIVO_SCHEMA_EXTRACAO)
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
     try:
@@ -226,7 +431,8 @@ def carregar_schema_extracao() -> bool:
             # Validação de tipos para chaves opcionais (se presentes e não None)
             chaves_opcionais_com_tipo = {
                 "titulo_padrao": str, "campos_esperados": list, "nome_lista_json": str,
-                "sub_campos_lista": list, "campos_texto_longo_limitar": list, "sub_lista_aninhada": dict
+                "sub_campos_lista": list, "campos_texto_longo_limitar": list, "sub_lista_aninhada": dict,
+                "regras_locais": dict, "cabecalho_pagina": bool
             }
             for chave, tipo_esperado in chaves_opcionais_com_tipo.items():
                 if chave in config_bloco and config_bloco[chave] is not None and not isinstance(config_bloco[chave], tipo_esperado):
@@ -251,12 +457,18 @@ def carregar_schema_extracao() -> bool:
                     if not all(isinstance(item, str) for item in config_bloco[chave_lista_str]):
                         log_to_gui(f"AVISO SCHEMA: Bloco '{nome_bloco}', chave '{chave_lista_str}' deve conter uma lista de strings. Encontrados outros tipos.", "WARNING")
 
+            erro_regras_locais = validar_regras_locais(nome_bloco, config_bloco)
+            if erro_regras_locais:
+                log_to_gui(f"AVISO SCHEMA: {erro_regras_locais} As regras locais do bloco serão ignoradas (o bloco vai inteiro para a IA).", "WARNING")
+                config_bloco = {chave: valor for chave, valor in config_bloco.items() if chave != "regras_locais"}
+
             if bloco_atual_valido:
                 BLOCO_CONFIG_VALIDADO[nome_bloco] = config_bloco
             else: # Se o bloco atual não passou na validação, marca o schema geral como não totalmente válido
                 schema_geral_valido = False
 
         BLOCO_CONFIG = BLOCO_CONFIG_VALIDADO # Atualiza a configuração global com os blocos validados
+        _schema_extracao_sem_erros = schema_geral_valido
 
         if not schema_geral_valido and BLOCO_CONFIG_RAW: # Se houve erros/avisos, mas o arquivo não estava vazio
             log_to_gui(f"AVISO: O schema '{ARQUIVO_SCHEMA_EXTRACAO}' contém erros ou avisos. Alguns blocos podem ter sido ignorados ou podem não funcionar como esperado. Verifique os logs.", "WARNING")
@@ -271,7 +483,7 @@ def carregar_schema_extracao() -> bool:
         elif not BLOCO_CONFIG and not BLOCO_CONFIG_RAW: # Se o arquivo de schema estava completamente vazio
              log_to_gui(f"INFO: O arquivo de schema '{ARQUIVO_SCHEMA_EXTRACAO}' está vazio. Nenhum bloco de extração definido.", "INFO")
         elif BLOCO_CONFIG: # Se há blocos válidos
-            log_to_gui(f"Schema '{ARQUIVO_SCHEMA_EXTRACAO}' carregado e validado. Número de blocos válidos: {len(BLOCO_CONFIG)}", "INFO")
+            log_to_gui(f"Schema '{ARQUIVO_SCHEMA_EXTRACAO}' carregado e validado do JSON em {(time.perf_counter() - t_inicio) * 1000:.1f} ms. Número de blocos válidos: {len(BLOCO_CONFIG)}", "INFO")
         return True
 
     except FileNotFoundError:
@@ -289,11 +501,16 @@ def carregar_schema_extracao() -> bool:
         return False
 
 # --- DEFINIÇÃO DAS PARTIÇÕES DO BLOCO_CONFIG (DINÂMICO) ---
-# Usado para organizar o schema e logs, não para múltiplas chamadas de API.
+# Usado para organizar o schema e logs. O envio em múltiplas chamadas de API (uma por partição)
+# é opcional: ver ENVIAR_PARTICOES_EM_PARALELO e agrupar_blocos_por_particao().
 LISTA_DE_NOMES_BLOCOS_PARTICIONADA: List[List[str]] = []
 def gerar_particoes_dinamicamente() -> bool:
     """Organiza os nomes dos blocos do schema em 'partições' lógicas baseadas na chave 'particao'."""
     global LISTA_DE_NOMES_BLOCOS_PARTICIONADA
+    if _snapshot_configuracao is not None and _snapshot_configuracao["conteudo"]["bloco_config"] is BLOCO_CONFIG:
+        LISTA_DE_NOMES_BLOCOS_PARTICIONADA = [list(p_list) for p_list in _snapshot_configuracao["conteudo"]["particoes"]]
+        log_to_gui(f"Partições lógicas carregadas do snapshot: {len(LISTA_DE_NOMES_BLOCOS_PARTICIONADA)} ativas.", "INFO")
+        return True
     if not BLOCO_CONFIG:
         log_to_gui("AVISO: Schema (BLOCO_CONFIG) está vazio. Nenhuma partição lógica para gerar.", "WARNING")
         LISTA_DE_NOMES_BLOCOS_PARTICIONADA = []
@@ -343,109 +560,16 @@ def gerar_particoes_dinamicamente() -> bool:
     return True
 
 
-# --- 3. CONFIGURAÇÃO INICIAL DA INTERFACE GRÁFICA (Widgets Globais) ---
-root = tk.Tk()
-_root_ref_for_log = root
-
-root.title(f"Processador de Súmulas de Crédito - Gemini v{GEMINI_MODEL_NAME.split('-')[-2] if GEMINI_MODEL_NAME and '-' in GEMINI_MODEL_NAME else '?.?'}")
-root.geometry("900x750")
-root.configure(bg=COR_FUNDO_JANELA)
-
-# Configuração de Estilos ttk
-style = ttk.Style()
-style.theme_use('clam')
-style.configure("TButton", padding=6, relief="flat", borderwidth=0)
-style.configure("TLabel", font=FONTE_SUBTITULO, background=COR_FUNDO_JANELA, foreground=COR_TEXTO_PADRAO)
-style.configure("TProgressbar", thickness=15, background=COR_BOTAO_PRIMARIO_BG)
-style.configure("Title.TLabel", font=FONTE_TITULO_APP, foreground=COR_TEXTO_TITULO_GUI, background=COR_FUNDO_JANELA)
-style.configure("Header.TFrame", background=COR_FUNDO_JANELA)
-style.configure("Controls.TFrame", background=COR_FUNDO_JANELA)
-style.configure("Status.TFrame", background=COR_FUNDO_JANELA)
-style.configure("TLabelframe", background=COR_FUNDO_FRAMES_INTERNOS, relief=tk.GROOVE, borderwidth=1)
-style.configure("TLabelframe.Label", font=FONTE_LABELFRAME_TITULO, background=COR_FUNDO_FRAMES_INTERNOS, foreground=COR_TEXTO_PADRAO, padding=(5,2))
-
-# Frame do Topo (Título, Logo, Instrução, Botões Principais)
-frame_topo = ttk.Frame(root, padding=(20, 10), style="Header.TFrame")
-frame_topo.pack(pady=(10,0), fill=tk.X)
-
-# Seção Logo e Título
-logging.info("--- INICIANDO BLOCO DE CARREGAMENTO DO LOGO PRINCIPAL (GUI) ---")
-frame_titulo_com_logo = ttk.Frame(frame_topo, style="Header.TFrame")
-frame_titulo_com_logo.pack(pady=(0, 5), anchor=tk.CENTER)
-
-logo_app_image_tk: Optional[ImageTk.PhotoImage] = None
-caminho_logo_relativo = "assets/logo_sicoob.png"
-NOVO_LARGURA_LOGO = 45
-NOVO_ALTURA_LOGO = 45
-
-try:
-    caminho_logo_abs = resource_path(caminho_logo_relativo)
-    if caminho_logo_abs.is_file():
-        img_pil = Image.open(caminho_logo_abs)
-        img_redimensionada_pil = img_pil.resize((NOVO_LARGURA_LOGO, NOVO_ALTURA_LOGO), Image.Resampling.LANCZOS)
-        logo_app_image_tk = ImageTk.PhotoImage(img_redimensionada_pil)
-
-        label_logo = ttk.Label(frame_titulo_com_logo, image=logo_app_image_tk)
-        label_logo.image = logo_app_image_tk
-        label_logo.pack(side=tk.LEFT, padx=(0, 10), pady=5)
-        logging.info(f"Logo '{caminho_logo_relativo}' carregada.")
-    else:
-        logging.warning(f"Arquivo de logo '{caminho_logo_abs}' NÃO ENCONTRADO.")
-        log_to_gui(f"AVISO: Arquivo de logo '{caminho_logo_abs}' NÃO ENCONTRADO.", "WARNING")
-except Exception as e_logo:
-    logging.error(f"Erro ao carregar/redimensionar logo '{caminho_logo_relativo}': {e_logo}", exc_info=True)
-    log_to_gui(f"AVISO: Erro ao carregar/redimensionar logo '{caminho_logo_relativo}': {e_logo}", "WARNING")
-
-label_titulo_app = ttk.Label(frame_titulo_com_logo, text="Processador de Súmulas de Crédito", style="Title.TLabel")
-label_titulo_app.pack(side=tk.LEFT, pady=5)
-logging.info("--- FIM DO BLOCO DE CARREGAMENTO DO LOGO PRINCIPAL (GUI) ---")
-
-label_instrucao_app = ttk.Label(frame_topo, text="Selecione um PDF para análise. O log do processamento aparecerá abaixo.", justify=tk.CENTER)
-label_instrucao_app.pack(pady=(5,10))
-
-# Botões Principais
-frame_botoes_principais = ttk.Frame(frame_topo, style="Controls.TFrame")
-frame_botoes_principais.pack(pady=10, fill=tk.X, padx=20)
-
-# Status e Barra de Progresso
-frame_status_progresso = ttk.Frame(root, padding=(20,5), style="Status.TFrame")
-frame_status_progresso.pack(fill=tk.X, padx=10)
-progress = ttk.Progressbar(frame_status_progresso, orient="horizontal", length=500, mode="indeterminate")
-progress.pack(pady=5, fill=tk.X, expand=True)
-status_label = ttk.Label(frame_status_progresso, text="Pronto para iniciar.", foreground=COR_STATUS_LABEL_FG, font=FONTE_STATUS, anchor=tk.CENTER)
-status_label.pack(pady=5, fill=tk.X)
-
-# Área de Log
-log_labelframe = ttk.LabelFrame(root, text=" Log de Processamento ", padding=(10,5))
-log_labelframe.pack(pady=(5,10), padx=10, fill=tk.BOTH, expand=True)
-log_text_widget_instance = tk.Text(log_labelframe, height=15, width=90, wrap=tk.WORD, font=FONTE_LOG, bg=COR_FUNDO_LOG, fg=COR_TEXTO_LOG, relief=tk.SOLID, bd=1, state=tk.DISABLED)
-log_scrollbar_y = ttk.Scrollbar(log_labelframe, orient="vertical", command=log_text_widget_instance.yview)
-log_text_widget_instance.config(yscrollcommand=log_scrollbar_y.set)
-log_text_widget_instance.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=5, padx=(0,5))
-log_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
-
-setup_gui_logging_refs(root, log_text_widget_instance)
-
-# --- 5. CONFIGURAÇÃO DA API GOOGLE GEMINI ---
-genai_config_ok = False
-if not GOOGLE_API_KEY:
-    log_to_gui("ERRO CRÍTICO: Variável de ambiente 'GOOGLE_API_KEY' não foi encontrada ou está vazia.", "CRITICAL")
-elif GOOGLE_API_KEY == "SUA_CHAVE_DE_API_AQUI":
-    log_to_gui("ERRO CRÍTICO: A GOOGLE_API_KEY no arquivo .env ainda é o valor placeholder 'SUA_CHAVE_DE_API_AQUI'. Por favor, configure-a com sua chave real.", "CRITICAL")
-else:
-    try:
-        genai.configure(api_key=GOOGLE_API_KEY)
-        log_to_gui("API Key do Google Gemini configurada com sucesso.", "INFO")
-        genai_config_ok = True
-    except Exception as e:
-        log_to_gui(f"ERRO ao tentar configurar a API Key do Google Gemini: {e}. Verifique se a chave é válida.", "ERROR")
-        genai_config_ok = False
-
 # --- FUNÇÕES PARA CARREGAR E SALVAR MAPEAMENTO DE CHAVES ---
 def carregar_mapeamento_de_arquivo(caminho_arquivo_str: str) -> Optional[Dict[str, Any]]:
     """Carrega um arquivo de mapeamento JSON."""
     caminho_arquivo_abs = resource_path(caminho_arquivo_str)
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
+    mapeamento_snapshot = _mapeamento_do_snapshot(caminho_arquivo_abs)
+    if mapeamento_snapshot is not None:
+        obter_diario_mapeamento(caminho_arquivo_str).aplicar_pendentes(mapeamento_snapshot)
+        log_to_gui(f"Arquivo de mapeamento '{caminho_arquivo_abs.name}' carregado do snapshot.", "DEBUG")
+        return mapeamento_snapshot
     if not caminho_arquivo_abs.is_file():
         log_to_gui(f"Arquivo de mapeamento '{caminho_arquivo_abs.name}' não encontrado em '{caminho_arquivo_abs}'.", "WARNING")
         return None
@@ -457,6 +581,9 @@ def carregar_mapeamento_de_arquivo(caminho_arquivo_str: str) -> Optional[Dict[st
             log_to_gui(f"ERRO: Conteúdo do arquivo de mapeamento '{caminho_arquivo_abs.name}' não é um dicionário JSON válido.", "ERROR")
             if parent_dialog: messagebox.showerror("Erro de Mapeamento", f"O arquivo '{caminho_arquivo_abs.name}' não contém um dicionário JSON válido.", parent=parent_dialog)
             return None
+        num_pendentes = obter_diario_mapeamento(caminho_arquivo_str).aplicar_pendentes(mapeamento)
+        if num_pendentes:
+            log_to_gui(f"Diário de mapeamento: {num_pendentes} entrada(s) ainda não compactada(s) aplicada(s) sobre '{caminho_arquivo_abs.name}'.", "INFO")
         return mapeamento
     except json.JSONDecodeError as e:
         log_to_gui(f"ERRO ao decodificar JSON no arquivo de mapeamento '{caminho_arquivo_abs.name}': {e.msg} na linha {e.lineno} col {e.colno}", "ERROR")
@@ -472,9 +599,7 @@ def salvar_mapeamento_em_arquivo(mapeamento: Dict[str, Any], caminho_arquivo_str
     caminho_arquivo_abs = resource_path(caminho_arquivo_str)
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
     try:
-        caminho_arquivo_abs.parent.mkdir(parents=True, exist_ok=True)
-        with open(caminho_arquivo_abs, "w", encoding="utf-8") as f:
-            json.dump(mapeamento, f, indent=2, ensure_ascii=False)
+        gravar_json_atomico(caminho_arquivo_abs, mapeamento)
         log_to_gui(f"Arquivo de mapeamento salvo com sucesso em '{caminho_arquivo_abs.name}'.", "INFO")
         return True
     except Exception as e:
@@ -482,45 +607,198 @@ def salvar_mapeamento_em_arquivo(mapeamento: Dict[str, Any], caminho_arquivo_str
         if parent_dialog: messagebox.showerror("Erro ao Salvar Mapeamento", f"Não foi possível salvar o arquivo de mapeamento '{caminho_arquivo_abs.name}': {e}", parent=parent_dialog)
         return False
 
+_diarios_mapeamento: Dict[Path, DiarioMapeamento] = {}
+
+def obter_diario_mapeamento(caminho_arquivo_str: str) -> DiarioMapeamento:
+    """Diário de adições (write-behind) associado ao arquivo de mapeamento."""
+    caminho_arquivo_abs = resource_path(caminho_arquivo_str)
+    if caminho_arquivo_abs not in _diarios_mapeamento:
+        _diarios_mapeamento[caminho_arquivo_abs] = DiarioMapeamento(caminho_arquivo_abs)
+    return _diarios_mapeamento[caminho_arquivo_abs]
+
+def registrar_mapeamento_no_diario(chave_ia: str, nome_padronizado: str, caminho_arquivo_str: str) -> bool:
+    """Acrescenta uma nova entrada de mapeamento ao diário; o JSON só é reescrito na compactação."""
+    diario = obter_diario_mapeamento(caminho_arquivo_str)
+    try:
+        diario.registrar(chave_ia, nome_padronizado)
+        return True
+    except Exception as e:
+        log_to_gui(f"ERRO ao registrar '{chave_ia}' no diário de mapeamento '{diario.caminho_diario.name}': {e}", "ERROR")
+        return False
+
+def compactar_diario_mapeamento(caminho_arquivo_str: str = ARQUIVO_MAPEAMENTO_CONFIG) -> bool:
+    """Incorpora o diário de adições ao arquivo de mapeamento (uma gravação atômica). Chamada ao fim de cada PDF e ao sair."""
+    diario = obter_diario_mapeamento(caminho_arquivo_str)
+    try:
+        num_entradas = diario.compactar()
+    except Exception as e:
+        log_to_gui(f"ERRO ao compactar o diário de mapeamento em '{diario.caminho_mapeamento.name}': {e}. As entradas continuam no diário.", "ERROR")
+        return False
+    if num_entradas:
+        log_to_gui(f"Diário de mapeamento compactado: {num_entradas} entrada(s) gravada(s) em '{diario.caminho_mapeamento.name}'.", "INFO")
+    return True
+
+# --- SNAPSHOT BINÁRIO DA CONFIGURAÇÃO (SCHEMA VALIDADO, PARTIÇÕES E MAPEAMENTO COMPILADO) ---
+_snapshot_configuracao: Optional[Dict[str, Any]] = None # Snapshot em uso neste processo (None: configuração veio dos JSONs)
+
+def _fontes_snapshot_configuracao() -> Dict[str, Path]:
+    return {"schema": resource_path(ARQUIVO_SCHEMA_EXTRACAO), "mapeamento": resource_path(ARQUIVO_MAPEAMENTO_CONFIG)}
+
+def carregar_snapshot_configuracao() -> bool:
+    """Carrega schema validado, partições e índice do mapeamento do snapshot, se ele estiver em dia com os JSONs."""
+    global BLOCO_CONFIG, LISTA_DE_NOMES_BLOCOS_PARTICIONADA, _snapshot_configuracao, _indice_curingas_cache
+    snapshot = carregar_snapshot(ARQUIVO_SNAPSHOT_CONFIG, _fontes_snapshot_configuracao(), VERSAO_SNAPSHOT_CONFIG)
+    if snapshot is None:
+        _snapshot_configuracao = None
+        return False
+    conteudo = snapshot["conteudo"]
+    BLOCO_CONFIG = conteudo["bloco_config"]
+    LISTA_DE_NOMES_BLOCOS_PARTICIONADA = [list(p_list) for p_list in conteudo["particoes"]]
+    mapa_chaves = conteudo["config_mapeamento"]["mapeamento_para_chaves_padronizadas"]
+    _indice_curingas_cache = (tuple((chave, valor) for chave, valor in mapa_chaves.items() if '*' in chave), conteudo["indice_curingas"])
+    _snapshot_configuracao = snapshot
+    return True
+
+def _mapeamento_do_snapshot(caminho_arquivo_abs: Path) -> Optional[Dict[str, Any]]:
+    """Cópia do mapeamento guardado no snapshot, se o arquivo ainda for o mesmo que o gerou."""
+    if _snapshot_configuracao is None or not arquivo_inalterado(caminho_arquivo_abs, _snapshot_configuracao["fontes"]["mapeamento"]):
+        return None
+    config_mapeamento = _snapshot_configuracao["conteudo"]["config_mapeamento"]
+    return {**config_mapeamento, "mapeamento_para_chaves_padronizadas": dict(config_mapeamento["mapeamento_para_chaves_padronizadas"])}
+
+def atualizar_snapshot_configuracao() -> bool:
+    """Grava o snapshot a partir da configuração já carregada dos JSONs (nada a fazer se ela veio de um snapshot em dia)."""
+    global _snapshot_configuracao
+    if _snapshot_configuracao is not None:
+        return True
+    if not BLOCO_CONFIG or not _schema_extracao_sem_erros:
+        log_to_gui("Snapshot de configuração não gerado: schema vazio ou com blocos ignorados (os erros continuarão a ser exibidos a cada carga).", "WARNING")
+        return False
+    compactar_diario_mapeamento() # O snapshot deve refletir o arquivo de mapeamento, sem entradas pendentes no diário
+    config_mapeamento = carregar_mapeamento_de_arquivo(ARQUIVO_MAPEAMENTO_CONFIG)
+    if not config_mapeamento or not isinstance(config_mapeamento.get("mapeamento_para_chaves_padronizadas"), dict) \
+       or not gerar_particoes_dinamicamente():
+        log_to_gui("Snapshot de configuração não gerado: mapeamento ou partições indisponíveis.", "WARNING")
+        return False
+    conteudo = {
+        "bloco_config": BLOCO_CONFIG,
+        "particoes": LISTA_DE_NOMES_BLOCOS_PARTICIONADA,
+        "config_mapeamento": config_mapeamento,
+        "indice_curingas": obter_indice_curingas(config_mapeamento["mapeamento_para_chaves_padronizadas"]),
+    }
+    try:
+        salvar_snapshot(ARQUIVO_SNAPSHOT_CONFIG, _fontes_snapshot_configuracao(), conteudo, VERSAO_SNAPSHOT_CONFIG)
+    except Exception as e:
+        log_to_gui(f"ERRO ao gravar o snapshot de configuração '{ARQUIVO_SNAPSHOT_CONFIG}': {e}", "ERROR")
+        return False
+    _snapshot_configuracao = carregar_snapshot(ARQUIVO_SNAPSHOT_CONFIG, _fontes_snapshot_configuracao(), VERSAO_SNAPSHOT_CONFIG)
+    log_to_gui(f"Snapshot de configuração gravado em '{ARQUIVO_SNAPSHOT_CONFIG}'.", "INFO")
+    return True
+
+def compilar_snapshot_configuracao() -> bool:
+    """Revalida schema e mapeamento a partir dos JSONs e regrava o snapshot usado nas próximas inicializações."""
+    global _snapshot_configuracao
+    _snapshot_configuracao = None
+    if not carregar_schema_extracao(usar_snapshot=False):
+        return False
+    return atualizar_snapshot_configuracao()
+
 # --- 6. FUNÇÕES AUXILIARES DE PROCESSAMENTO ---
-def extrair_texto_do_pdf(caminho_pdf: Path) -> Optional[str]:
-    """Extrai texto de todas as páginas de um arquivo PDF."""
+def _limpar_texto_extraido(texto: str, offsets_paginas: List[int]) -> Tuple[str, List[int]]:
+    """Aplica REGEX_LIMPEZA_TEXTO_PDF (remoções) e strip(), ajustando os offsets de início de cada página."""
+    for padrao, flags, limite in REGEX_LIMPEZA_TEXTO_PDF:
+        spans_removidos = [m.span() for i, m in enumerate(re.finditer(padrao, texto, flags=flags)) if not limite or i < limite]
+        if not spans_removidos: continue
+        partes: List[str] = []
+        pos_anterior = 0
+        for inicio, fim in spans_removidos:
+            partes.append(texto[pos_anterior:inicio]); pos_anterior = fim
+        partes.append(texto[pos_anterior:])
+        texto = "".join(partes)
+        novos_offsets = []
+        for offset in offsets_paginas: # Offsets dentro de um trecho removido vão para o início desse trecho
+            removidos_antes = sum(min(fim, offset) - inicio for inicio, fim in spans_removidos if inicio < offset)
+            novos_offsets.append(offset - removidos_antes)
+        offsets_paginas = novos_offsets
+    tamanho_sem_strip_inicial = len(texto.lstrip())
+    removidos_inicio = len(texto) - tamanho_sem_strip_inicial
+    texto = texto.strip()
+    offsets_paginas = [min(max(offset - removidos_inicio, 0), len(texto)) for offset in offsets_paginas]
+    return texto, offsets_paginas
+
+def _extrair_textos_pagina(pagina: Any) -> Tuple[str, Optional[str]]:
+    """Extrai o texto da página em ordem de fluxo e, se tiver menos de PDF_MIN_PALAVRAS_STREAM palavras, também com layout.
+
+    Equivale a extract_text(layout=False) seguido de extract_text(layout=True), mas o agrupamento dos caracteres
+    em palavras (a parte cara) é feito uma única vez e as duas renderizações derivam do mesmo mapa de palavras.
+    """
+    mapa_palavras = WordExtractor(x_tolerance=PDF_X_TOLERANCE, y_tolerance=PDF_Y_TOLERANCE).extract_wordmap(pagina.chars)
+    parametros_renderizacao = dict(layout_width=pagina.width, layout_height=pagina.height, layout_bbox=pagina.bbox,
+                                   y_tolerance=PDF_Y_TOLERANCE, presorted=True)
+    texto_pagina_stream = mapa_palavras.to_textmap(layout=False, **parametros_renderizacao).as_string
+    texto_pagina_layout = None
+    if not texto_pagina_stream or len(texto_pagina_stream.split()) < PDF_MIN_PALAVRAS_STREAM:
+        texto_pagina_layout = mapa_palavras.to_textmap(layout=True, **parametros_renderizacao).as_string
+    return texto_pagina_stream, texto_pagina_layout
+
+def _extrair_paginas_com_pdfplumber(caminho_pdf: Path) -> Tuple[str, List[int]]:
+    """Extrai o texto bruto de todas as páginas, retornando o texto concatenado e o offset de início de cada página."""
     texto_completo = ""
+    offsets_paginas: List[int] = []
+    parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
+    with pdfplumber.open(caminho_pdf) as pdf:
+        num_paginas = len(pdf.pages)
+        log_to_gui(f"Iniciando extração de texto do PDF '{caminho_pdf.name}' ({num_paginas} páginas)...", "INFO")
+        for i, pagina in enumerate(pdf.pages):
+            if is_gui_widget_available(parent_dialog) and \
+               is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and \
+               isinstance(parent_dialog, tk.Tk):
+                status_label.config(text=f"Extraindo texto da página {i+1}/{num_paginas}...")
+                parent_dialog.update_idletasks()
+
+            texto_pagina_stream, texto_pagina_layout = _extrair_textos_pagina(pagina)
+
+            texto_pagina_final = texto_pagina_stream
+            if texto_pagina_layout and (not texto_pagina_stream or len(texto_pagina_layout.split()) > len(texto_pagina_stream.split())):
+                log_to_gui(f"Página {i+1}: Usando extração com layout=True pois produziu mais texto ou stream falhou.", "DEBUG")
+                texto_pagina_final = texto_pagina_layout
+
+            offsets_paginas.append(len(texto_completo))
+            if texto_pagina_final:
+                texto_completo += texto_pagina_final if texto_pagina_final.endswith("\n") else texto_pagina_final + "\n"
+            else:
+                log_to_gui(f"Página {i+1} do PDF '{caminho_pdf.name}' não retornou texto (nem com layout=False, nem com layout=True).", "DEBUG")
+
+        log_to_gui("Extração de texto do PDF concluída.", "INFO")
+    return texto_completo, offsets_paginas
+
+def extrair_texto_e_paginas_do_pdf(caminho_pdf: Path) -> Optional[Tuple[str, List[int]]]:
+    """Extrai e limpa o texto do PDF, retornando (texto limpo, offset de início de cada página no texto limpo).
+
+    O resultado fica no CACHE_TEXTO_PDF, indexado pelo SHA-256 do arquivo e pelos parâmetros de extração,
+    de modo que reprocessar o mesmo PDF não executa o pdfplumber novamente.
+    """
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
+    chave_cache: Optional[str] = None
     try:
-        with pdfplumber.open(caminho_pdf) as pdf:
-            num_paginas = len(pdf.pages)
-            log_to_gui(f"Iniciando extração de texto do PDF '{caminho_pdf.name}' ({num_paginas} páginas)...", "INFO")
-            for i, pagina in enumerate(pdf.pages):
-                if is_gui_widget_available(parent_dialog) and \
-                   is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and \
-                   isinstance(parent_dialog, tk.Tk):
-                    status_label.config(text=f"Extraindo texto da página {i+1}/{num_paginas}...")
-                    parent_dialog.update_idletasks()
-
-                texto_pagina_stream = pagina.extract_text(x_tolerance=1, y_tolerance=3, layout=False)
-                texto_pagina_layout = None
-
-                if not texto_pagina_stream or len(texto_pagina_stream.split()) < 5:
-                    texto_pagina_layout = pagina.extract_text(x_tolerance=1, y_tolerance=3, layout=True)
-
-                texto_pagina_final = texto_pagina_stream
-                if texto_pagina_layout and (not texto_pagina_stream or len(texto_pagina_layout.split()) > len(texto_pagina_stream.split())):
-                    log_to_gui(f"Página {i+1}: Usando extração com layout=True pois produziu mais texto ou stream falhou.", "DEBUG")
-                    texto_pagina_final = texto_pagina_layout
-
-                if texto_pagina_final:
-                    texto_completo += texto_pagina_final if texto_pagina_final.endswith("\n") else texto_pagina_final + "\n"
-                else:
-                    log_to_gui(f"Página {i+1} do PDF '{caminho_pdf.name}' não retornou texto (nem com layout=False, nem com layout=True).", "DEBUG")
-
-            log_to_gui("Extração de texto do PDF concluída.", "INFO")
-            texto_limpo_para_ia = texto_completo
-            texto_limpo_para_ia = re.sub(r"^\s*Súmula de Crédito\s*$", "", texto_limpo_para_ia, flags=re.MULTILINE | re.IGNORECASE)
-            texto_limpo_para_ia = re.sub(r"^\s*SICOOB\s*\n(?!Data:)", "", texto_limpo_para_ia, count=1, flags=re.IGNORECASE | re.MULTILINE)
-            texto_limpo_para_ia = re.sub(r'Página:\s*\d+\s*\/\s*\d+\s*$', '', texto_limpo_para_ia, flags=re.MULTILINE | re.IGNORECASE)
-            texto_limpo_para_ia = texto_limpo_para_ia.strip()
-            return texto_limpo_para_ia
+        chave_cache = CacheDisco.calcular_chave(
+            calcular_sha256_arquivo(caminho_pdf), VERSAO_EXTRACAO_TEXTO_PDF, PDF_X_TOLERANCE, PDF_Y_TOLERANCE,
+            PDF_MIN_PALAVRAS_STREAM, [(padrao, int(flags), limite) for padrao, flags, limite in REGEX_LIMPEZA_TEXTO_PDF])
+    except OSError as e_hash:
+        log_to_gui(f"Cache de texto indisponível para '{caminho_pdf.name}' (falha ao calcular o hash: {e_hash}).", "DEBUG")
+
+    if chave_cache:
+        dados_em_cache = CACHE_TEXTO_PDF.obter(chave_cache)
+        if dados_em_cache is not None:
+            log_to_gui(f"Cache de texto: texto de '{caminho_pdf.name}' reutilizado ({len(dados_em_cache['offsets_paginas'])} páginas). pdfplumber não executado.", "INFO")
+            return dados_em_cache["texto"], dados_em_cache["offsets_paginas"]
+
+    try:
+        texto_completo, offsets_paginas = _extrair_paginas_com_pdfplumber(caminho_pdf)
+        texto_limpo_para_ia, offsets_paginas = _limpar_texto_extraido(texto_completo, offsets_paginas)
+        if chave_cache:
+            CACHE_TEXTO_PDF.gravar(chave_cache, {"texto": texto_limpo_para_ia, "offsets_paginas": offsets_paginas})
+        return texto_limpo_para_ia, offsets_paginas
     except pdfplumber.exceptions.PDFSyntaxError as e_syntax:
         log_to_gui(f"Erro de sintaxe no arquivo PDF '{caminho_pdf.name}': {e_syntax}. O arquivo pode estar corrompido ou mal formatado.", "ERROR")
         if parent_dialog: messagebox.showerror("Erro de PDF", f"Erro de sintaxe no PDF '{caminho_pdf.name}':\n{e_syntax}\nO arquivo pode estar corrompido.", parent=parent_dialog)
@@ -531,6 +809,67 @@ def extrair_texto_do_pdf(caminho_pdf: Path) -> Optional[str]:
         if parent_dialog: messagebox.showerror("Erro na Extração de Texto do PDF", f"Ocorreu um erro inesperado ao tentar extrair o texto do PDF '{caminho_pdf.name}':\n{e}", parent=parent_dialog)
         return None
 
+def extrair_texto_do_pdf(caminho_pdf: Path) -> Optional[str]:
+    """Extrai texto de todas as páginas de um arquivo PDF."""
+    resultado = extrair_texto_e_paginas_do_pdf(caminho_pdf)
+    return resultado[0] if resultado is not None else None
+
+def _obter_celulas_com_placeholders(sheet: Any, caminho_excel_modelo: Path) -> List[Tuple[Any, List[Tuple[int, int]]]]:
+    """Células da aba que contêm placeholders: do índice do modelo, se existir, ou de uma varredura completa (que gera o índice)."""
+    indice = CACHE_INDICE_PLACEHOLDERS.obter(caminho_excel_modelo, sheet.title)
+    if indice is not None:
+        celulas: List[Tuple[Any, List[Tuple[int, int]]]] = []
+        for coordenada, texto_original, spans in indice:
+            cell = sheet[coordenada]
+            if cell.value != texto_original:
+                log_to_gui(f"AVISO: Índice de placeholders de '{caminho_excel_modelo.name}' não confere com a célula {coordenada}. Refazendo a varredura da aba '{sheet.title}'.", "WARNING")
+                break
+            celulas.append((cell, spans))
+        else:
+            log_to_gui(f"Índice de placeholders do modelo usado: {len(celulas)} célula(s) na aba '{sheet.title}'.", "DEBUG")
+            return celulas
+    celulas = localizar_placeholders(sheet)
+    CACHE_INDICE_PLACEHOLDERS.gravar(caminho_excel_modelo, sheet.title, [(cell.coordinate, cell.value, spans) for cell, spans in celulas])
+    return celulas
+
+def _substituir_placeholders_celula(cell: Any, spans: List[Tuple[int, int]], dados_para_preencher: Dict[str, Any]) -> int:
+    """Substitui os placeholders de uma célula (spans do texto original) e retorna o número de substituições."""
+    original_cell_value = str(cell.value)
+    substituicoes_feitas = 0
+    is_single_full_match = len(spans) == 1 and spans[0] == (0, len(original_cell_value))
+
+    if is_single_full_match:
+        placeholder_com_chaves = original_cell_value
+        if placeholder_com_chaves in dados_para_preencher:
+            cell.value = dados_para_preencher[placeholder_com_chaves]
+            substituicoes_feitas += 1
+        elif INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES:
+            cell.value = "N/A"
+            substituicoes_feitas += 1
+        return substituicoes_feitas
+
+    current_cell_string = original_cell_value
+    modified_in_loop = False
+    for span_inicio, span_fim in reversed(spans):
+        placeholder_com_chaves = original_cell_value[span_inicio:span_fim]
+        if placeholder_com_chaves in dados_para_preencher:
+            valor_substituto = dados_para_preencher[placeholder_com_chaves]
+            valor_substituto_str = str(valor_substituto) if valor_substituto is not None else ""
+            current_cell_string = current_cell_string[:span_inicio] + valor_substituto_str + current_cell_string[span_fim:]
+            modified_in_loop = True; substituicoes_feitas += 1
+        elif INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES:
+            current_cell_string = current_cell_string[:span_inicio] + "N/A" + current_cell_string[span_fim:]
+            modified_in_loop = True; substituicoes_feitas += 1
+    if modified_in_loop: cell.value = current_cell_string
+    return substituicoes_feitas
+
+def _avisar_resultado_substituicoes(nome_aba: str, substituicoes_feitas: int, parent_dialog: Any) -> None:
+    if substituicoes_feitas == 0:
+        log_to_gui(f"AVISO: Nenhuma substituição de placeholder foi realizada na planilha '{nome_aba}'. Verifique se os placeholders no Excel (formato {{CHAVE}}) correspondem às chaves dos dados normalizados.", "WARNING")
+        if parent_dialog: messagebox.showwarning("Nenhuma Substituição no Excel", "Nenhum placeholder foi substituído na planilha. Verifique o modelo Excel e os dados JSON gerados.", parent=parent_dialog)
+    else:
+        log_to_gui(f"INFO: {substituicoes_feitas} substituições de placeholders realizadas com sucesso na planilha '{nome_aba}'.", "INFO")
+
 def preencher_excel_novo_com_placeholders(
     caminho_json_dados: Path,
     caminho_excel_modelo: Path,
@@ -538,23 +877,51 @@ def preencher_excel_novo_com_placeholders(
     nome_planilha_alvo: Optional[str] = None
 ) -> bool:
     """Preenche um arquivo Excel modelo com dados de um JSON, substituindo placeholders."""
-    log_to_gui(f"Iniciando preenchimento do Excel: Modelo='{caminho_excel_modelo.name}', Dados='{caminho_json_dados.name}', Saída='{caminho_excel_saida.name}'", "INFO")
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
-    if is_gui_widget_available(parent_dialog): iniciar_progresso()
-
     try:
         with open(caminho_json_dados, 'r', encoding='utf-8') as f:
             dados_para_preencher: Dict[str, Any] = json.load(f)
+    except FileNotFoundError as e:
+        log_to_gui(f"ERRO: Arquivo de dados para o Excel não encontrado: {e.filename}", "ERROR")
+        if parent_dialog: messagebox.showerror("Erro de Arquivo no Excel", f"Arquivo não encontrado durante o processo do Excel: {e.filename}", parent=parent_dialog)
+        return False
+    except json.JSONDecodeError as e:
+        log_to_gui(f"ERRO: JSON inválido no arquivo de dados '{caminho_json_dados.name}' usado para preencher o Excel: {e.msg} L{e.lineno}C{e.colno}", "ERROR")
+        if parent_dialog: messagebox.showerror("Erro de JSON para Excel", f"Erro de JSON no arquivo de dados para Excel ('{caminho_json_dados.name}'): {e.msg}", parent=parent_dialog)
+        return False
+    return preencher_excel_com_dados(dados_para_preencher, caminho_excel_modelo, caminho_excel_saida, nome_planilha_alvo)
+
+def preencher_excel_com_dados(
+    dados_para_preencher: Dict[str, Any],
+    caminho_excel_modelo: Path,
+    caminho_excel_saida: Path,
+    nome_planilha_alvo: Optional[str] = None
+) -> bool:
+    """Preenche um arquivo Excel modelo a partir do dicionário {'{{CHAVE}}': valor} já em memória."""
+    log_to_gui(f"Iniciando preenchimento do Excel: Modelo='{caminho_excel_modelo.name}', Placeholders com dados: {len(dados_para_preencher)}, Saída='{caminho_excel_saida.name}'", "INFO")
+    parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
+    if is_gui_widget_available(parent_dialog): iniciar_progresso()
 
+    try:
         if not dados_para_preencher:
-            log_to_gui("AVISO: Arquivo JSON de dados para preenchimento do Excel está vazio. O arquivo Excel de saída será uma cópia do modelo.", "WARNING")
+            log_to_gui("AVISO: Dados para preenchimento do Excel estão vazios. O arquivo Excel de saída será uma cópia do modelo.", "WARNING")
             if parent_dialog:
-                messagebox.showwarning("Dados Vazios para Excel", "O arquivo JSON de dados está vazio. O Excel de saída será uma cópia do modelo, sem preenchimentos.", parent=parent_dialog)
+                messagebox.showwarning("Dados Vazios para Excel", "Os dados para preenchimento estão vazios. O Excel de saída será uma cópia do modelo, sem preenchimentos.", parent=parent_dialog)
             workbook = openpyxl.load_workbook(caminho_excel_modelo)
             workbook.save(caminho_excel_saida)
-            if is_gui_widget_available(parent_dialog): parar_progresso(f"Excel copiado (JSON de dados vazio): {caminho_excel_saida.name}")
+            if is_gui_widget_available(parent_dialog): parar_progresso(f"Excel copiado (dados vazios): {caminho_excel_saida.name}")
             return True
 
+        if PREENCHER_XLSX_DIRETO:
+            resultado_direto = preencher_xlsx_direto(caminho_excel_modelo, caminho_excel_saida, dados_para_preencher, nome_planilha_alvo,
+                                                     "N/A" if INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES else None)
+            if resultado_direto is not None:
+                _avisar_resultado_substituicoes(resultado_direto[0], resultado_direto[1], parent_dialog)
+                log_to_gui(f"Novo arquivo Excel preenchido salvo em '{caminho_excel_saida.name}' (preenchimento direto do XML).", "INFO")
+                if is_gui_widget_available(parent_dialog): parar_progresso(f"Excel Gerado: {caminho_excel_saida.name}")
+                return True
+            log_to_gui(f"Modelo '{caminho_excel_modelo.name}' fora do caso do preenchimento direto; usando o openpyxl.", "DEBUG")
+
         workbook = openpyxl.load_workbook(caminho_excel_modelo)
         sheet: Optional[openpyxl.worksheet.worksheet.Worksheet] = None
 
@@ -576,57 +943,20 @@ def preencher_excel_novo_com_placeholders(
                 parar_progresso("Erro no Excel: Planilha não encontrada")
             return False
 
-        log_to_gui(f"Iniciando varredura da planilha '{sheet.title}' para substituição de placeholders...", "INFO")
+        log_to_gui(f"Iniciando substituição de placeholders na planilha '{sheet.title}'...", "INFO")
         substituicoes_feitas = 0
-        placeholder_regex = re.compile(r'\{\{([A-Z0-9_]+?)\}\}')
+        celulas_com_placeholders = _obter_celulas_com_placeholders(sheet, caminho_excel_modelo)
 
-        for r_idx, row in enumerate(sheet.iter_rows()):
+        for idx_celula, (cell, spans) in enumerate(celulas_com_placeholders):
             if is_gui_widget_available(parent_dialog) and \
                is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and \
                isinstance(parent_dialog, tk.Tk) and \
-               r_idx > 0 and r_idx % 50 == 0:
-                status_label.config(text=f"Processando linha {r_idx+1} do Excel...")
+               idx_celula > 0 and idx_celula % 50 == 0:
+                status_label.config(text=f"Preenchendo célula {idx_celula+1} de {len(celulas_com_placeholders)} do Excel...")
                 parent_dialog.update_idletasks()
+            substituicoes_feitas += _substituir_placeholders_celula(cell, spans, dados_para_preencher)
 
-            for cell in row:
-                if cell.value and isinstance(cell.value, str):
-                    original_cell_value = str(cell.value)
-                    current_cell_string = original_cell_value
-                    modified_in_loop = False
-                    matches_in_cell = list(placeholder_regex.finditer(original_cell_value))
-
-                    if not matches_in_cell: continue
-
-                    is_single_full_match = len(matches_in_cell) == 1 and matches_in_cell[0].group(0) == original_cell_value
-
-                    if is_single_full_match:
-                        placeholder_com_chaves = matches_in_cell[0].group(0)
-                        if placeholder_com_chaves in dados_para_preencher:
-                            cell.value = dados_para_preencher[placeholder_com_chaves]
-                            substituicoes_feitas += 1
-                        elif INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES:
-                            cell.value = "N/A"
-                            substituicoes_feitas += 1
-                    else:
-                        for match_obj in reversed(matches_in_cell):
-                            placeholder_com_chaves = match_obj.group(0)
-                            span_inicio, span_fim = match_obj.span(0)
-
-                            if placeholder_com_chaves in dados_para_preencher:
-                                valor_substituto = dados_para_preencher[placeholder_com_chaves]
-                                valor_substituto_str = str(valor_substituto) if valor_substituto is not None else ""
-                                current_cell_string = current_cell_string[:span_inicio] + valor_substituto_str + current_cell_string[span_fim:]
-                                modified_in_loop = True; substituicoes_feitas += 1
-                            elif INSERIR_NA_PARA_PLACEHOLDERS_AUSENTES:
-                                current_cell_string = current_cell_string[:span_inicio] + "N/A" + current_cell_string[span_fim:]
-                                modified_in_loop = True; substituicoes_feitas += 1
-                        if modified_in_loop: cell.value = current_cell_string
-
-        if substituicoes_feitas == 0:
-            log_to_gui(f"AVISO: Nenhuma substituição de placeholder foi realizada na planilha '{sheet.title}'. Verifique se os placeholders no Excel (formato {{CHAVE}}) correspondem às chaves no JSON de dados.", "WARNING")
-            if parent_dialog: messagebox.showwarning("Nenhuma Substituição no Excel", "Nenhum placeholder foi substituído na planilha. Verifique o modelo Excel e os dados JSON gerados.", parent=parent_dialog)
-        else:
-            log_to_gui(f"INFO: {substituicoes_feitas} substituições de placeholders realizadas com sucesso na planilha '{sheet.title}'.", "INFO")
+        _avisar_resultado_substituicoes(sheet.title, substituicoes_feitas, parent_dialog)
 
         workbook.save(caminho_excel_saida)
         log_to_gui(f"Novo arquivo Excel preenchido salvo em '{caminho_excel_saida.name}'.", "INFO")
@@ -636,9 +966,6 @@ def preencher_excel_novo_com_placeholders(
     except FileNotFoundError as e:
         log_to_gui(f"ERRO: Arquivo não encontrado ao tentar preencher o Excel: {e.filename}", "ERROR")
         if parent_dialog: messagebox.showerror("Erro de Arquivo no Excel", f"Arquivo não encontrado durante o processo do Excel: {e.filename}", parent=parent_dialog)
-    except json.JSONDecodeError as e:
-        log_to_gui(f"ERRO: JSON inválido no arquivo de dados '{caminho_json_dados.name}' usado para preencher o Excel: {e.msg} L{e.lineno}C{e.colno}", "ERROR")
-        if parent_dialog: messagebox.showerror("Erro de JSON para Excel", f"Erro de JSON no arquivo de dados para Excel ('{caminho_json_dados.name}'): {e.msg}", parent=parent_dialog)
     except Exception as e:
         log_to_gui(f"ERRO geral e inesperado ao preencher o arquivo Excel: {e}", "ERROR")
         logging.error("Erro geral ao preencher Excel:", exc_info=True)
@@ -669,16 +996,55 @@ def salvar_json_em_arquivo(dados: Dict[str, Any], nome_arquivo_path: Path) -> No
         log_to_gui(f"Erro ao salvar arquivo JSON '{nome_arquivo_path.name}': {e}", "ERROR")
         if parent_dialog: messagebox.showerror("Erro ao Salvar JSON", f"Erro ao tentar salvar o arquivo JSON '{nome_arquivo_path.name}': {e}", parent=parent_dialog)
 
-@retry(wait=wait_exponential(multiplier=1, min=2, max=30), stop=stop_after_attempt(3), reraise=True)
-def gerar_conteudo_gemini_com_retry(model: genai.GenerativeModel, prompt_usuario: str, generation_config: genai.types.GenerationConfig) -> str:
-    """Envia um prompt para a API Gemini com política de retry e tratamento de feedback."""
+class ErroPrazoEsgotado(Exception):
+    """O prazo da requisição (ex.: /extract do serviço HTTP) acabou antes de uma nova chamada à API."""
+
+def _espera_retry_gemini(retry_state: Any) -> float:
+    """Espera entre tentativas: dica de retry enviada pelo servidor (ex.: 429) ou backoff exponencial de 2 a 30 s (nunca além do prazo)."""
+    erro = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    espera = calcular_espera_retry(erro, retry_state.attempt_number) if erro is not None else 2.0
+    prazo = retry_state.kwargs.get("prazo")
+    return espera if prazo is None else max(0.0, min(espera, prazo - time.monotonic()))
+
+def _prazo_gemini_esgotado(retry_state: Any) -> bool:
+    prazo = retry_state.kwargs.get("prazo")
+    return prazo is not None and time.monotonic() >= prazo
+
+@retry(wait=_espera_retry_gemini, stop=stop_any(stop_after_attempt(3), _prazo_gemini_esgotado), reraise=True)
+def gerar_conteudo_gemini_com_retry(
+    model: genai.GenerativeModel,
+    prompt_usuario: Union[str, List[str]],
+    generation_config: genai.types.GenerationConfig,
+    registro: Optional[Dict[str, Any]] = None,
+    prazo: Optional[float] = None
+) -> str:
+    """Envia um prompt para a API Gemini com política de retry e tratamento de feedback.
+
+    Se `registro` for informado, recebe o número de tentativas e o uso de tokens da resposta (contabilidade da chamada).
+    Com `prazo` (instante em time.monotonic(), passado por nome), cada chamada usa como timeout o tempo restante e não
+    há novas tentativas depois dele (ErroPrazoEsgotado ou o erro da última tentativa).
+    """
+    timeout_s = GEMINI_TIMEOUT_REQUISICAO_S
+    if prazo is not None:
+        timeout_s = min(timeout_s, prazo - time.monotonic())
+        if timeout_s <= 0:
+            raise ErroPrazoEsgotado("Prazo da requisição esgotado antes da chamada à API Gemini.")
+    if registro is not None:
+        registro["tentativas"] = registro.get("tentativas", 0) + 1
     log_to_gui("Enviando requisição para API Gemini (com retry)...", "DEBUG")
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
     if is_gui_widget_available(parent_dialog) and isinstance(parent_dialog, tk.Tk):
         parent_dialog.update_idletasks()
 
-    response = model.generate_content(prompt_usuario, generation_config=generation_config)
+    response = model.generate_content(prompt_usuario, generation_config=generation_config,
+                                      request_options={"timeout": timeout_s})
     log_to_gui("Resposta recebida da API Gemini.", "DEBUG")
+    uso = extrair_uso_resposta_gemini(response)
+    if registro is not None:
+        registro.update(uso)
+    if uso["tokens_entrada"] is not None:
+        log_to_gui(f"API Gemini: {uso['tokens_entrada']} tokens de entrada (estimados antes do envio: ~{estimar_tokens_prompt(prompt_usuario)}), "
+                   f"{uso['tokens_saida']} de saída, término: {uso['motivo_fim']}.", "DEBUG")
 
     if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
         log_to_gui(f"API Gemini - Prompt Feedback: Block Reason: {response.prompt_feedback.block_reason}, Safety Ratings: {response.prompt_feedback.safety_ratings}", "DEBUG")
@@ -716,176 +1082,535 @@ def gerar_conteudo_gemini_com_retry(model: genai.GenerativeModel, prompt_usuario
         return ""
     return response.text
 
-def enviar_texto_completo_para_gemini_todos_blocos(
+def _instrucao_bloco_gemini(nome_bloco: str, config_bloco: Dict[str, Any]) -> str:
+    """Instruções de um bloco do schema; os limites de texto longo só citam os campos (a regra é a Regra 6, comum a todos)."""
+    json_chave = config_bloco["json_chave"]
+    campos_esperados = config_bloco.get("campos_esperados") or []
+    nome_lista_json = config_bloco.get("nome_lista_json")
+    sub_campos_lista = config_bloco.get("sub_campos_lista") or []
+    sub_lista_aninhada_config = config_bloco.get("sub_lista_aninhada")
+    campos_texto_longo_limitar = config_bloco.get("campos_texto_longo_limitar") or []
+
+    instrucao_especifica = (
+        f"Para o bloco '{nome_bloco}' (geralmente identificado por títulos como '{config_bloco.get('titulo_padrao', nome_bloco)}'), "
+        f"mapeie todas as informações extraídas para a chave JSON principal '{json_chave}':\n")
+
+    if nome_bloco == "0 Informacoes do Documento":
+        instrucao_especifica += (
+            "  - Dados do cabeçalho/topo do documento: o valor após 'Cooperativa:' para 'cooperativa', após 'PA:' (Posto de Atendimento) para 'pa', "
+            "após 'Data:' (emissão) para 'data', após 'Hora:' (emissão) para 'hora' e após 'Data/hora referência:' para 'data_ref_doc'. "
+            "Ignore 'SICOOB' ou 'Súmula de Crédito' soltos como títulos.\n")
+        campos_ja_tratados_info_doc = ["cooperativa", "pa", "data", "hora", "data_ref_doc"]
+        campos_esperados_restantes = [c for c in campos_esperados if c not in campos_ja_tratados_info_doc]
+    else:
+        campos_esperados_restantes = campos_esperados
+
+    if campos_esperados_restantes:
+        instrucao_especifica += f"  - Extraia os seguintes campos diretos (chave-valor): {', '.join(campos_esperados_restantes)}.\n"
+        limitar = [c for c in campos_texto_longo_limitar if c in campos_esperados_restantes]
+        if limitar:
+            instrucao_especifica += f"    - Texto longo (Regra 6): {', '.join(limitar)}.\n"
+
+    if nome_lista_json and sub_campos_lista:
+        instrucao_especifica += (
+            f"  - Extraia uma LISTA DE OBJETOS JSON sob a chave '{nome_lista_json}'. Cada objeto na lista deve conter os campos: {', '.join(sub_campos_lista)}.\n")
+        limitar = [c for c in campos_texto_longo_limitar if c in sub_campos_lista]
+        if limitar:
+            instrucao_especifica += f"    - Texto longo (Regra 6) em cada objeto de '{nome_lista_json}': {', '.join(limitar)}.\n"
+        if sub_lista_aninhada_config and isinstance(sub_lista_aninhada_config, dict):
+            nome_sub_lista = sub_lista_aninhada_config.get("nome_json")
+            campos_sub_lista_aninhada = sub_lista_aninhada_config.get("campos") or []
+            if nome_sub_lista and campos_sub_lista_aninhada:
+                instrucao_especifica += (
+                    f"    - Dentro de CADA objeto da lista '{nome_lista_json}', se aplicável, extraia uma SUB-LISTA DE OBJETOS JSON sob a chave '{nome_sub_lista}', com campos: {', '.join(campos_sub_lista_aninhada)}.\n")
+                limitar = [c for c in campos_texto_longo_limitar if c in campos_sub_lista_aninhada]
+                if limitar:
+                    instrucao_especifica += f"      - Texto longo (Regra 6) em '{nome_sub_lista}': {', '.join(limitar)}.\n"
+        instrucao_especifica += f"  - Se não houver itens para a lista '{nome_lista_json}', retorne uma lista vazia ([]) para ela.\n"
+    return instrucao_especifica
+
+MAX_MOLDURAS_PROMPT_GEMINI = 256
+_molduras_prompt_gemini: Dict[str, Tuple[str, str]] = {} # hash do schema enviado -> (prefixo estático, sufixo) do prompt
+
+def obter_moldura_prompt_gemini(blocos_config_map: Dict[str, Any]) -> Tuple[str, str]:
+    """Prefixo (regras + instruções dos blocos, até o marcador de início) e sufixo do prompt, compilados uma vez por schema."""
+    chave = CacheDisco.calcular_chave(VERSAO_PROMPT_GEMINI, MAX_TEXT_LENGTH_IA, blocos_config_map)
+    moldura = _molduras_prompt_gemini.get(chave)
+    if moldura is not None:
+        return moldura
+
+    usa_texto_longo = any(config.get("campos_texto_longo_limitar") for config in blocos_config_map.values())
+    regra_texto_longo = (
+        f"6.  CAMPOS DE TEXTO LONGO (marcados 'Texto longo (Regra 6)' nos blocos): no máximo {MAX_TEXT_LENGTH_IA} caracteres, "
+        "com o texto original TRUNCADO ou resumido de forma concisa dentro desse limite, sempre em string JSON válida. "
+        "Se não for possível (ex.: caracteres de controle que não podem ser escapados), retorne a string literal 'TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL'. "
+        f"NÃO exceda {MAX_TEXT_LENGTH_IA} caracteres nesses campos.\n") if usa_texto_longo else ""
+    prefixo = (
+        "Você é um especialista em análise de documentos Súmula de Crédito do SICOOB. "
+        "Sua tarefa é analisar o texto do documento fornecido, que estará entre os marcadores "
+        f"'{MARCADOR_INICIO_TEXTO_PDF_PROMPT}' e '{MARCADOR_FIM_TEXTO_PDF_PROMPT}'.\n"
+        "Você deve EXTRAIR INFORMAÇÕES **EXCLUSIVAMENTE PARA OS BLOCOS E CAMPOS ESPECIFICADOS ABAIXO**. "
+        "Ignore completamente quaisquer outros blocos ou seções do documento não listados nas instruções.\n"
+        "A saída DEVE SER UM ÚNICO OBJETO JSON VÁLIDO.\n\n"
+        "REGRAS IMPORTANTES PARA O JSON DE SAÍDA:\n"
+        "1.  O JSON deve ser estritamente válido (chaves e strings com aspas duplas, escapes corretos como \\\" para aspas e \\n para novas linhas dentro de strings, etc.).\n"
+        "2.  Se um valor para um campo solicitado não for encontrado no texto, omita a chave correspondente do objeto JSON, OU use `null` para campos simples e `[]` (lista vazia) para campos de lista, conforme especificado para cada bloco.\n"
+        "2.1. NÃO INVENTE dados. Se a informação não estiver explicitamente no texto fornecido para um campo, siga a regra de omissão ou uso de null/[] (Regra 2).\n"
+        "3.  Use EXATAMENTE as 'json_chave' fornecidas nas instruções para cada bloco como chaves de primeiro nível no objeto JSON de saída.\n"
+        "4.  Extraia os valores o mais literalmente possível, mas limpe espaços extras desnecessários no início/fim.\n"
+        "5.  Preserve o formato original de datas, números, códigos e CPFs/CNPJs.\n"
+        f"{regra_texto_longo}\n"
+        "INSTRUÇÕES ESPECÍFICAS PARA CADA BLOCO A SER EXTRAÍDO (IGNORE TODOS OS OUTROS BLOCOS DO DOCUMENTO):\n"
+        + "\n".join(_instrucao_bloco_gemini(nome_bloco, config_bloco) for nome_bloco, config_bloco in blocos_config_map.items()) + "\n"
+        f"TEXTO COMPLETO DO DOCUMENTO (lembre-se de focar apenas nos blocos e campos listados acima):\n{MARCADOR_INICIO_TEXTO_PDF_PROMPT}\n"
+    )
+    sufixo = (
+        f"\n{MARCADOR_FIM_TEXTO_PDF_PROMPT}\n\n"
+        "REFORÇO CRÍTICO: Sua resposta DEVE ser um ÚNICO objeto JSON cujo nível raiz contém APENAS as chaves "
+        + ", ".join(f'"{config_bloco["json_chave"]}"' for config_bloco in blocos_config_map.values()) + ", "
+        "cada uma com os dados extraídos do respectivo bloco. Verifique DUAS VEZES a sintaxe JSON"
+        + (" e os limites de caracteres dos textos longos" if usa_texto_longo else "") + " antes de finalizar a resposta."
+    )
+    if len(_molduras_prompt_gemini) >= MAX_MOLDURAS_PROMPT_GEMINI: # Schemas reduzidos pelo extrator local variam por documento
+        _molduras_prompt_gemini.clear()
+    _molduras_prompt_gemini[chave] = (prefixo, sufixo)
+    log_to_gui(f"Prompt Gemini compilado para {len(blocos_config_map)} bloco(s): ~{estimar_tokens_prompt(prefixo + sufixo)} tokens de instruções.", "DEBUG")
+    return prefixo, sufixo
+
+def construir_partes_prompt_gemini(texto_completo_do_pdf: str, blocos_config_map: Dict[str, Any]) -> List[str]:
+    """Prompt como lista de partes [instruções, texto do PDF, reforço final]: o texto do documento não é copiado."""
+    prefixo, sufixo = obter_moldura_prompt_gemini(blocos_config_map)
+    return [prefixo, texto_completo_do_pdf, sufixo]
+
+def construir_prompt_gemini(texto_completo_do_pdf: str, blocos_config_map: Dict[str, Any]) -> str:
+    """Prompt de extração em uma única string (usado no arquivo de debug)."""
+    return "".join(construir_partes_prompt_gemini(texto_completo_do_pdf, blocos_config_map))
+
+def agrupar_blocos_por_particao(blocos_config_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Divide o schema em sub-schemas, um por valor de 'particao', em ordem crescente de partição."""
+    grupos: Dict[int, Dict[str, Any]] = {}
+    for nome_bloco, config_bloco in blocos_config_map.items():
+        grupos.setdefault(config_bloco.get("particao", 1), {})[nome_bloco] = config_bloco
+    return [grupos[num] for num in sorted(grupos)]
+
+_schema_compilado: Optional[Tuple[Dict[str, Any], Dict[str, RegrasLocaisBloco], Dict[str, Any], Tuple[str, ...]]] = None # (BLOCO_CONFIG de origem, regras, títulos, cabeçalhos)
+
+def _obter_schema_compilado() -> Tuple[Dict[str, RegrasLocaisBloco], Dict[str, Any], Tuple[str, ...]]:
+    """Regras locais, títulos e blocos de cabeçalho de página do schema carregado (compilados uma vez por schema)."""
+    global _schema_compilado
+    if _schema_compilado is None or _schema_compilado[0] is not BLOCO_CONFIG:
+        titulos: Dict[str, Any] = {}
+        for nome_bloco, config_bloco in BLOCO_CONFIG.items():
+            try:
+                titulos[nome_bloco] = re.compile(config_bloco["titulo_padrao"])
+            except (KeyError, TypeError, re.error):
+                pass
+        cabecalhos = tuple(nome for nome, config in BLOCO_CONFIG.items() if config.get("cabecalho_pagina"))
+        _schema_compilado = (BLOCO_CONFIG, compilar_regras_locais(BLOCO_CONFIG), titulos, cabecalhos)
+    return _schema_compilado[1:]
+
+def _obter_regras_locais(blocos_config_map: Dict[str, Any]) -> Tuple[Dict[str, RegrasLocaisBloco], Dict[str, Any]]:
+    """Regras locais dos blocos do mapa e títulos de todos os blocos do schema."""
+    regras_schema, titulos, _ = _obter_schema_compilado()
+    regras = {nome: regras_schema[nome] for nome in blocos_config_map if nome in regras_schema and BLOCO_CONFIG.get(nome) is blocos_config_map[nome]}
+    regras.update(compilar_regras_locais({nome: config for nome, config in blocos_config_map.items()
+                                          if BLOCO_CONFIG.get(nome) is not config and "regras_locais" in config}))
+    return regras, titulos
+
+def resolver_campos_localmente(
     texto_completo_do_pdf: str,
     blocos_config_map: Dict[str, Any],
     pdf_path_para_logs: Path
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """Aplica o extrator local por rótulos e retorna (dados resolvidos por 'json_chave', blocos que ainda vão para a IA)."""
+    if not USAR_EXTRATOR_LOCAL:
+        return {}, blocos_config_map
+    regras, titulos = _obter_regras_locais(blocos_config_map)
+    if not regras:
+        return {}, blocos_config_map
+    dados_locais, blocos_restantes, campos_resolvidos = extrair_campos_locais(texto_completo_do_pdf, blocos_config_map, regras, titulos)
+    if campos_resolvidos:
+        log_to_gui(f"Extrator local: {campos_resolvidos} campo(s) resolvido(s) sem a IA para '{pdf_path_para_logs.name}'; "
+                   f"{len(blocos_config_map) - len(blocos_restantes)} bloco(s) dispensado(s) da requisição.", "INFO")
+    return dados_locais, blocos_restantes
+
+def localizar_trechos_documento(texto_completo_do_pdf: str) -> Dict[str, List[Tuple[int, int]]]:
+    """Varre o texto uma vez e retorna os trechos (início, fim) de cada bloco do schema, pelos seus 'titulo_padrao'.
+
+    Um bloco de cabeçalho de página cujo título não aparece (a limpeza do texto remove linhas repetidas entre páginas)
+    fica com o início do documento, até o primeiro título encontrado.
+    """
+    _, titulos, cabecalhos = _obter_schema_compilado()
+    trechos = localizar_trechos(texto_completo_do_pdf, titulos, cabecalhos)
+    if trechos:
+        primeiro_titulo = min(inicio for trechos_bloco in trechos.values() for inicio, _ in trechos_bloco)
+        for nome_bloco in cabecalhos:
+            trechos.setdefault(nome_bloco, [(0, primeiro_titulo)])
+    return trechos
+
+def recortar_texto_para_blocos(texto_completo_do_pdf: str, blocos_config_map: Dict[str, Any], trechos: Dict[str, List[Tuple[int, int]]]) -> str:
+    """Texto a enviar para um conjunto de blocos: só os seus trechos (com MARGEM_SECAO_CARACTERES antes e depois).
+
+    Se o título de algum bloco não foi encontrado, envia o documento inteiro (o bloco pode estar em qualquer lugar).
+    """
+    if any(nome_bloco not in trechos for nome_bloco in blocos_config_map):
+        return texto_completo_do_pdf
+    intervalos = sorted((max(0, inicio - MARGEM_SECAO_CARACTERES), min(len(texto_completo_do_pdf), fim + MARGEM_SECAO_CARACTERES))
+                        for nome_bloco in blocos_config_map for inicio, fim in trechos[nome_bloco])
+    mesclados: List[List[int]] = []
+    for inicio, fim in intervalos:
+        if mesclados and inicio <= mesclados[-1][1]:
+            mesclados[-1][1] = max(mesclados[-1][1], fim)
+        else:
+            mesclados.append([inicio, fim])
+    if len(mesclados) == 1 and mesclados[0] == [0, len(texto_completo_do_pdf)]:
+        return texto_completo_do_pdf
+    return SEPARADOR_TRECHOS_PROMPT.join(texto_completo_do_pdf[inicio:fim] for inicio, fim in mesclados)
+
+def _planejar_requisicoes(
+    texto_completo_do_pdf: str,
+    subconjuntos_blocos: List[Dict[str, Any]],
+    pdf_path_para_logs: Path,
+    contabilidade: Optional[ContabilidadeTokens] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Blocos e texto de cada requisição: o texto é recortado pelas seções dos blocos (ENVIAR_APENAS_SECOES_DOS_BLOCOS)
+    e, com ORCAMENTO_TOKENS_POR_REQUISICAO, requisições acima do orçamento são divididas ao meio até caberem.
+
+    Levanta ErroOrcamentoTokens se um único bloco não couber ou se ACAO_ORCAMENTO_EXCEDIDO for "abortar".
+    """
+    trechos = localizar_trechos_documento(texto_completo_do_pdf) if ENVIAR_APENAS_SECOES_DOS_BLOCOS else {}
+    planejados: List[Tuple[Dict[str, Any], str]] = []
+    pendentes = list(reversed(subconjuntos_blocos))
+    while pendentes:
+        subconjunto = pendentes.pop()
+        texto_subconjunto = recortar_texto_para_blocos(texto_completo_do_pdf, subconjunto, trechos) if trechos else texto_completo_do_pdf
+        if ORCAMENTO_TOKENS_POR_REQUISICAO is not None:
+            tokens = estimar_tokens_prompt(construir_partes_prompt_gemini(texto_subconjunto, subconjunto))
+            if tokens > ORCAMENTO_TOKENS_POR_REQUISICAO:
+                if ACAO_ORCAMENTO_EXCEDIDO == ACAO_ORCAMENTO_ABORTAR or len(subconjunto) == 1:
+                    raise ErroOrcamentoTokens(f"Requisição de ~{tokens} tokens para {list(subconjunto)} excede o orçamento de "
+                                              f"{ORCAMENTO_TOKENS_POR_REQUISICAO} tokens por requisição.")
+                nomes_blocos = list(subconjunto)
+                meio = len(nomes_blocos) // 2
+                pendentes.append({nome: subconjunto[nome] for nome in nomes_blocos[meio:]})
+                pendentes.append({nome: subconjunto[nome] for nome in nomes_blocos[:meio]})
+                if contabilidade is not None:
+                    contabilidade.divisoes += 1
+                log_to_gui(f"Orçamento de tokens: requisição de ~{tokens} tokens para '{pdf_path_para_logs.name}' dividida em duas.", "INFO")
+                continue
+        planejados.append((subconjunto, texto_subconjunto))
+
+    textos = [texto for _, texto in planejados]
+    tokens_inteiro = estimar_tokens_prompt(texto_completo_do_pdf) * len(textos)
+    tokens_recortados = estimar_tokens_prompt(textos)
+    if tokens_recortados < tokens_inteiro:
+        log_to_gui(f"Recorte por seções para '{pdf_path_para_logs.name}': ~{tokens_recortados} tokens de texto do documento "
+                   f"em {len(textos)} requisição(ões) (documento inteiro: ~{tokens_inteiro}).", "INFO")
+    return [subconjunto for subconjunto, _ in planejados], textos
+
+def _decodificar_resposta_gemini(resposta_texto_bruto_api: str, pdf_path_para_logs: Path) -> Dict[str, Any]:
+    """Remove cercas de código da resposta da IA e decodifica o JSON (propaga json.JSONDecodeError)."""
+    resposta_texto_bruto_api = resposta_texto_bruto_api.strip()
+    if resposta_texto_bruto_api.startswith("```json"): resposta_texto_bruto_api = resposta_texto_bruto_api[7:]
+    if resposta_texto_bruto_api.endswith("```"): resposta_texto_bruto_api = resposta_texto_bruto_api[:-3]
+    resposta_texto_bruto_api = resposta_texto_bruto_api.strip()
+
+    if not (resposta_texto_bruto_api.startswith("{") and resposta_texto_bruto_api.endswith("}")):
+        log_to_gui(f"AVISO: Resposta da API Gemini não parece ser um objeto JSON completo (não começa com '{{' e termina com '}}'). Início: '{resposta_texto_bruto_api[:100]}...', Fim: '...{resposta_texto_bruto_api[-100:]}'. Tentando decodificar...", "WARNING")
+    try:
+        return json.loads(resposta_texto_bruto_api)
+    except json.JSONDecodeError as e_json:
+        log_to_gui(f"ERRO JSONDecodeError API: Não foi possível decodificar a resposta JSON da API Gemini. Erro: {e_json.msg} na posição {e_json.pos}. Resposta bruta: '{resposta_texto_bruto_api[:500]}...'", "ERROR")
+        if CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS:
+            nome_arq_erro = pdf_path_para_logs.parent / f"gemini_resposta_erro_json_{pdf_path_para_logs.stem}.txt"
+            salvar_texto_em_arquivo(resposta_texto_bruto_api or "Nenhuma resposta da API recebida.", nome_arq_erro)
+            log_to_gui(f"Resposta bruta da API com erro JSON salva em '{nome_arq_erro.name}'.", "INFO")
+        raise
+
+def _criar_generation_config_gemini() -> Any:
+    """Parâmetros de geração usados em todas as chamadas de extração (exige configurar_api_gemini())."""
+    return genai.types.GenerationConfig(
+        temperature=GEMINI_TEMPERATURE,
+        max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS,
+        response_mime_type="application/json"
+    )
+
+def _chave_cache_gemini(texto_completo_do_pdf: str, blocos_config_map: Dict[str, Any]) -> str:
+    """Chave do CACHE_RESPOSTAS_GEMINI para uma requisição (texto + blocos + modelo + parâmetros + versão do prompt)."""
+    return CacheDisco.calcular_chave(
+        VERSAO_PROMPT_GEMINI, obter_backend_llm().identificador_modelo, GEMINI_TEMPERATURE, GEMINI_MAX_OUTPUT_TOKENS,
+        blocos_config_map, texto_completo_do_pdf)
+
+def _registrar_tokens_prompt(partes_prompt: List[str], pdf_path_para_logs: Path) -> None:
+    """Loga a estimativa de tokens de entrada da requisição (instruções + texto do documento)."""
+    tokens_instrucoes = estimar_tokens_prompt([partes_prompt[0], partes_prompt[2]])
+    log_to_gui(f"Prompt Gemini para '{pdf_path_para_logs.name}': ~{estimar_tokens_prompt(partes_prompt)} tokens de entrada "
+               f"(instruções ~{tokens_instrucoes}, texto do documento ~{estimar_tokens_prompt(partes_prompt[1])}).", "DEBUG")
+
+def _solicitar_blocos_gemini(
+    texto_completo_do_pdf: str,
+    blocos_config_map: Dict[str, Any],
+    pdf_path_para_logs: Path,
+    chave_cache: str,
+    contabilidade: Optional[ContabilidadeTokens] = None,
+    prazo: Optional[float] = None
+) -> Dict[str, Any]:
+    """Executa uma requisição à API Gemini para um conjunto de blocos e grava o JSON decodificado no cache."""
+    partes_prompt = construir_partes_prompt_gemini(texto_completo_do_pdf, blocos_config_map)
+    _registrar_tokens_prompt(partes_prompt, pdf_path_para_logs)
+    if CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS:
+        sufixo_blocos = "completo" if blocos_config_map is BLOCO_CONFIG else f"particao_{next(iter(blocos_config_map.values())).get('particao')}"
+        salvar_texto_em_arquivo("".join(partes_prompt), pdf_path_para_logs.parent / f"{pdf_path_para_logs.stem}_prompt_gemini_{sufixo_blocos}.txt")
+
+    modelo_cache, partes_envio = _modelo_e_partes_para_envio(partes_prompt)
+    backend = obter_backend_llm()
+    model = modelo_cache if modelo_cache is not None else backend.obter_modelo()
+    registro: Dict[str, Any] = {"tokens_entrada_estimados": estimar_tokens_prompt(partes_prompt), "tentativas": 0}
+    t_inicio = time.perf_counter()
+    try:
+        resposta_texto_bruto_api = gerar_conteudo_gemini_com_retry(model, partes_envio, backend.criar_generation_config(), registro, prazo=prazo)
+    except Exception:
+        registro["erro"] = True
+        raise
+    finally:
+        registro["latencia_s"] = time.perf_counter() - t_inicio
+        if contabilidade is not None:
+            contabilidade.registrar(registro)
+    dados_json = _decodificar_resposta_gemini(resposta_texto_bruto_api, pdf_path_para_logs)
+    CACHE_RESPOSTAS_GEMINI.gravar(chave_cache, dados_json)
+    return dados_json
+
+def enviar_texto_completo_para_gemini_todos_blocos(
+    texto_completo_do_pdf: str,
+    blocos_config_map: Dict[str, Any],
+    pdf_path_para_logs: Path,
+    metricas: Optional[Dict[str, Any]] = None,
+    prazo: Optional[float] = None
 ) -> Optional[Dict[str, Any]]:
-    """Envia o texto completo do PDF e o schema de extração para a API Gemini em uma única chamada."""
+    """Envia o texto do PDF e o schema de extração para a API Gemini e retorna o JSON combinado de todos os blocos.
+
+    Por padrão, todos os blocos vão em uma única chamada. Com ENVIAR_PARTICOES_EM_PARALELO, cada partição do
+    schema vira uma requisição separada, executadas em paralelo, e os JSONs parciais são mesclados por 'json_chave'.
+    Se `metricas` for informado, recebe "cache_acerto" (True quando todas as partes vieram do cache),
+    "contabilidade" (ContabilidadeTokens das chamadas feitas) e, em caso de falha, "erro" (a exceção original,
+    para quem decide se vale tentar novamente). `prazo` (instante em time.monotonic()) limita o timeout e as novas
+    tentativas de cada chamada à API.
+    """
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
     if not texto_completo_do_pdf:
         log_to_gui("Nenhum texto foi extraído do PDF para enviar à API. Abortando.", "WARNING"); return None
-    if not genai_config_ok:
+
+    dados_locais, blocos_config_map = resolver_campos_localmente(texto_completo_do_pdf, blocos_config_map, pdf_path_para_logs)
+    if not blocos_config_map:
+        return mesclar_dados_locais({}, dados_locais)
+
+    contabilidade = ContabilidadeTokens()
+    if metricas is not None:
+        metricas["contabilidade"] = contabilidade
+    subconjuntos_blocos = agrupar_blocos_por_particao(blocos_config_map) if ENVIAR_PARTICOES_EM_PARALELO else [blocos_config_map]
+    try:
+        subconjuntos_blocos, textos_subconjuntos = _planejar_requisicoes(texto_completo_do_pdf, subconjuntos_blocos, pdf_path_para_logs, contabilidade)
+    except ErroOrcamentoTokens as e_orcamento:
+        if metricas is not None: metricas["erro"] = e_orcamento
+        log_to_gui(f"ERRO: {e_orcamento} Documento '{pdf_path_para_logs.name}' não enviado à API.", "ERROR")
+        return None
+    resultados_parciais: List[Optional[Dict[str, Any]]] = []
+    chaves_cache: List[str] = []
+    for texto_subconjunto, subconjunto in zip(textos_subconjuntos, subconjuntos_blocos):
+        chave_cache = _chave_cache_gemini(texto_subconjunto, subconjunto)
+        chaves_cache.append(chave_cache)
+        resultados_parciais.append(CACHE_RESPOSTAS_GEMINI.obter(chave_cache))
+    pendentes = [i for i, resultado in enumerate(resultados_parciais) if resultado is None]
+    if metricas is not None:
+        metricas["cache_acerto"] = not pendentes
+    if len(pendentes) < len(subconjuntos_blocos):
+        log_to_gui(f"Cache Gemini: {len(subconjuntos_blocos) - len(pendentes)}/{len(subconjuntos_blocos)} resposta(s) reutilizada(s) para '{pdf_path_para_logs.name}'. Chamadas à API evitadas.", "INFO")
+
+    if pendentes and not obter_backend_llm().configurar():
         log_to_gui("Configuração da API Key do Google Gemini falhou ou não foi realizada. Abortando chamada à API.", "ERROR")
         if parent_dialog:
             messagebox.showerror("Erro de API", "A API Key do Google Gemini não está configurada corretamente. Verifique o arquivo .env e os logs.", parent=parent_dialog)
         return None
 
-    resposta_texto_bruto_api = ""
     try:
-        log_to_gui("Construindo prompt detalhado para a API Gemini com todos os blocos do schema...", "DEBUG")
-        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-        prompt_instrucoes_blocos = []
-
-        for nome_bloco, config_bloco in blocos_config_map.items():
-            json_chave = config_bloco["json_chave"]
-            titulo_bloco_regex_hint = config_bloco.get("titulo_padrao", nome_bloco)
-            campos_esperados = config_bloco.get("campos_esperados", [])
-            nome_lista_json = config_bloco.get("nome_lista_json")
-            sub_campos_lista = config_bloco.get("sub_campos_lista", [])
-            sub_lista_aninhada_config = config_bloco.get("sub_lista_aninhada")
-            campos_texto_longo_limitar = config_bloco.get("campos_texto_longo_limitar", [])
-
-            instrucao_especifica = (
-                f"Para o bloco '{nome_bloco}' (geralmente identificado por títulos como '{titulo_bloco_regex_hint}'), "
-                f"mapeie todas as informações extraídas para a chave JSON principal '{json_chave}':\n")
-
-            if nome_bloco == "0 Informacoes do Documento":
-                instrucao_especifica += (
-                    "  - Para este bloco específico ('0 Informacoes do Documento'), extraia os seguintes dados geralmente encontrados no cabeçalho ou topo do documento:\n"
-                    "    - O valor após 'Cooperativa:' para o campo 'cooperativa'.\n"
-                    "    - O valor após 'PA:' (Posto de Atendimento) para o campo 'pa'.\n"
-                    "    - O valor após 'Data:' (data de emissão do documento) para o campo 'data'.\n"
-                    "    - O valor após 'Hora:' (hora de emissão do documento) para o campo 'hora'.\n"
-                    "    - O valor após 'Data/hora referência:' para o campo 'data_ref_doc'.\n"
-                    "    - Ignore termos isolados como 'SICOOB' ou 'Súmula de Crédito' se aparecerem como títulos soltos; foque nos valores rotulados.\n"
-                )
-                campos_ja_tratados_info_doc = ["cooperativa", "pa", "data", "hora", "data_ref_doc"]
-                campos_esperados_restantes = [c for c in (campos_esperados or []) if c not in campos_ja_tratados_info_doc]
-            else:
-                campos_esperados_restantes = campos_esperados or []
-
-            if campos_esperados_restantes:
-                instrucao_especifica += f"  - Extraia os seguintes campos diretos (chave-valor): {', '.join(campos_esperados_restantes)}.\n"
-                for campo_limitar in (campos_texto_longo_limitar or []):
-                    if campo_limitar in campos_esperados_restantes:
-                        instrucao_especifica += (
-                            f"    - Para o campo '{campo_limitar}', limite o texto extraído aos primeiros {MAX_TEXT_LENGTH_IA} caracteres OU forneça um resumo conciso DENTRO desse limite. "
-                            f"Se o texto original for mais longo, TRUNQUE-O. Garanta JSON válido. Se impossível serializar ou se o resumo exceder o limite, retorne 'TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL'. NÃO exceda {MAX_TEXT_LENGTH_IA} caracteres.\n"
-                        )
-
-            if nome_lista_json and (sub_campos_lista or []):
-                instrucao_especifica += (
-                    f"  - Extraia uma LISTA DE OBJETOS JSON sob a chave '{nome_lista_json}'. Cada objeto na lista deve conter os campos: {', '.join(sub_campos_lista)}.\n")
-                for campo_limitar in (campos_texto_longo_limitar or []):
-                    if campo_limitar in (sub_campos_lista or []):
-                         instrucao_especifica += (
-                            f"    - Dentro de cada objeto da lista '{nome_lista_json}', para o campo '{campo_limitar}', limite o texto a {MAX_TEXT_LENGTH_IA} chars OU um resumo. "
-                            f"Se mais longo, TRUNQUE. Use 'TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL' se necessário. NÃO exceda {MAX_TEXT_LENGTH_IA} chars.\n"
-                        )
-                if sub_lista_aninhada_config and isinstance(sub_lista_aninhada_config, dict):
-                    nome_sub_lista = sub_lista_aninhada_config.get("nome_json")
-                    campos_sub_lista_aninhada = sub_lista_aninhada_config.get("campos", [])
-                    if nome_sub_lista and (campos_sub_lista_aninhada or []):
-                        instrucao_especifica += (
-                            f"    - Dentro de CADA objeto da lista '{nome_lista_json}', se aplicável, extraia uma SUB-LISTA DE OBJETOS JSON sob a chave '{nome_sub_lista}', com campos: {', '.join(campos_sub_lista_aninhada)}.\n")
-                        for campo_limitar_sub in (campos_texto_longo_limitar or []):
-                            if campo_limitar_sub in (campos_sub_lista_aninhada or []):
-                                instrucao_especifica += (
-                                    f"      - Em '{nome_sub_lista}', para o campo '{campo_limitar_sub}', limite a {MAX_TEXT_LENGTH_IA} chars OU resumo. "
-                                    f"Se mais longo, TRUNQUE. Use 'TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL' se necessário. NÃO exceda {MAX_TEXT_LENGTH_IA} chars.\n"
-                                )
-                instrucao_especifica += f"  - Se não houver itens para a lista '{nome_lista_json}', retorne uma lista vazia ([]) para ela.\n"
-            prompt_instrucoes_blocos.append(instrucao_especifica)
-
-        prompt_usuario = (
-            "Você é um especialista em análise de documentos Súmula de Crédito do SICOOB. "
-            "Sua tarefa é analisar o texto do documento fornecido, que estará entre os marcadores "
-            f"'{MARCADOR_INICIO_TEXTO_PDF_PROMPT}' e '{MARCADOR_FIM_TEXTO_PDF_PROMPT}'.\n"
-            "Você deve EXTRAIR INFORMAÇÕES **EXCLUSIVAMENTE PARA OS BLOCOS E CAMPOS ESPECIFICADOS ABAIXO**. "
-            "Ignore completamente quaisquer outros blocos ou seções do documento não listados nas instruções.\n"
-            "A saída DEVE SER UM ÚNICO OBJETO JSON VÁLIDO.\n\n"
-            "REGRAS IMPORTANTES PARA O JSON DE SAÍDA:\n"
-            "1.  O JSON deve ser estritamente válido (chaves e strings com aspas duplas, escapes corretos como \\\" para aspas e \\n para novas linhas dentro de strings, etc.).\n"
-            "2.  Se um valor para um campo solicitado não for encontrado no texto, omita a chave correspondente do objeto JSON, OU use `null` para campos simples e `[]` (lista vazia) para campos de lista, conforme especificado para cada bloco.\n"
-            "2.1. NÃO INVENTE dados. Se a informação não estiver explicitamente no texto fornecido para um campo, siga a regra de omissão ou uso de null/[] (Regra 2).\n"
-            "3.  Use EXATAMENTE as 'json_chave' fornecidas nas instruções para cada bloco como chaves de primeiro nível no objeto JSON de saída.\n"
-            "4.  Extraia os valores o mais literalmente possível, mas limpe espaços extras desnecessários no início/fim.\n"
-            "5.  Preserve o formato original de datas, números, códigos e CPFs/CNPJs.\n"
-            f"6.  Para CAMPOS DE TEXTO LONGO (como pareceres, observações, etc.) que estão listados em 'campos_texto_longo_limitar': o texto extraído DEVE ser limitado a um máximo de {MAX_TEXT_LENGTH_IA} caracteres OU um resumo muito conciso que caiba nesse limite. Se o texto original for maior, ele DEVE ser TRUNCADO para respeitar o limite. Certifique-se de que a string resultante (truncada ou resumida) seja válida em JSON. Se, mesmo após a tentativa de resumo ou truncamento, o conteúdo for muito complexo para serializar corretamente (ex: caracteres de controle estranhos que não podem ser escapados) ou ainda exceder o limite de forma significativa, você DEVE retornar a string literal 'TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL' para esse campo específico. É CRUCIAL não exceder os {MAX_TEXT_LENGTH_IA} caracteres para esses campos.\n\n"
-            f"INSTRUÇÕES ESPECÍFICAS PARA CADA BLOCO A SER EXTRAÍDO (IGNORE TODOS OS OUTROS BLOCOS DO DOCUMENTO):\n"
-            + "\n\n".join(prompt_instrucoes_blocos) + "\n\n"
-            f"TEXTO COMPLETO DO DOCUMENTO (lembre-se de focar apenas nos blocos e campos listados acima):\n{MARCADOR_INICIO_TEXTO_PDF_PROMPT}\n"
-            f"{texto_completo_do_pdf}\n"
-            f"{MARCADOR_FIM_TEXTO_PDF_PROMPT}\n\n"
-            "REFORÇO CRÍTICO: Sua resposta DEVE ser um ÚNICO objeto JSON. O nível raiz deste objeto JSON DEVE conter APENAS as seguintes chaves de primeiro nível (correspondentes às 'json_chave' dos blocos solicitados): " +
-            ", ".join([f'"{blocos_config_map[bn]["json_chave"]}"' for bn in blocos_config_map.keys() if bn in blocos_config_map]) + ". " +
-            "Cada uma dessas chaves de primeiro nível conterá os dados extraídos para o respectivo bloco. Verifique DUAS VEZES a sintaxe JSON e os limites de caracteres para textos longos antes de finalizar a resposta."
-        )
-
-        log_to_gui(f"Enviando {len(texto_completo_do_pdf)} caracteres (aprox.) para API Gemini (Modelo: {GEMINI_MODEL_NAME})...", "INFO")
-        if CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS:
-            prompt_debug_path = pdf_path_para_logs.parent / f"{pdf_path_para_logs.stem}_prompt_gemini_completo.txt"
-            salvar_texto_em_arquivo(prompt_usuario, prompt_debug_path)
-
-        generation_config = genai.types.GenerationConfig(
-            temperature=GEMINI_TEMPERATURE,
-            max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS,
-            response_mime_type="application/json"
-        )
-
-        resposta_texto_bruto_api = gerar_conteudo_gemini_com_retry(model, prompt_usuario, generation_config).strip()
-
-        if resposta_texto_bruto_api.startswith("```json"): resposta_texto_bruto_api = resposta_texto_bruto_api[7:]
-        if resposta_texto_bruto_api.endswith("```"): resposta_texto_bruto_api = resposta_texto_bruto_api[:-3]
-        resposta_texto_bruto_api = resposta_texto_bruto_api.strip()
-
-        if not (resposta_texto_bruto_api.startswith("{") and resposta_texto_bruto_api.endswith("}")):
-            log_to_gui(f"AVISO: Resposta da API Gemini não parece ser um objeto JSON completo (não começa com '{{' e termina com '}}'). Início: '{resposta_texto_bruto_api[:100]}...', Fim: '...{resposta_texto_bruto_api[-100:]}'. Tentando decodificar...", "WARNING")
-
-        dados_json_combinados: Dict[str, Any] = json.loads(resposta_texto_bruto_api)
+        if pendentes:
+            log_to_gui(f"Enviando {sum(len(textos_subconjuntos[i]) for i in pendentes)} caracteres (aprox.) para API Gemini (Modelo: {GEMINI_MODEL_NAME}) em {len(pendentes)} requisição(ões)...", "INFO")
+        t_inicio = time.perf_counter()
+        if len(pendentes) == 1:
+            i = pendentes[0]
+            resultados_parciais[i] = _solicitar_blocos_gemini(textos_subconjuntos[i], subconjuntos_blocos[i], pdf_path_para_logs, chaves_cache[i], contabilidade, prazo)
+        elif pendentes:
+            with ThreadPoolExecutor(max_workers=min(len(pendentes), MAX_REQUISICOES_PARALELAS_GEMINI)) as executor:
+                futuros = {i: executor.submit(_solicitar_blocos_gemini, textos_subconjuntos[i], subconjuntos_blocos[i], pdf_path_para_logs, chaves_cache[i], contabilidade, prazo)
+                           for i in pendentes}
+                try:
+                    for i, futuro in futuros.items():
+                        resultados_parciais[i] = futuro.result()
+                except BaseException:
+                    executor.shutdown(wait=False, cancel_futures=True) # Documento já falhou: só as requisições em voo terminam
+                    raise
+        if pendentes:
+            log_to_gui(f"API Gemini: {len(pendentes)} requisição(ões) concluída(s) em {time.perf_counter() - t_inicio:.2f} s.", "INFO")
+            log_to_gui(f"Tokens Gemini para '{pdf_path_para_logs.name}': {formatar_resumo_tokens(contabilidade.resumo())}.", "INFO")
+
+        dados_json_combinados: Dict[str, Any] = {}
+        for resultado_parcial in resultados_parciais:
+            dados_json_combinados.update(resultado_parcial or {})
         log_to_gui("JSON da API Gemini decodificado com sucesso.", "INFO")
-        return dados_json_combinados
+        return mesclar_dados_locais(dados_json_combinados, dados_locais)
 
     except RetryError as e_retry:
+        if metricas is not None: metricas["erro"] = e_retry
         log_to_gui(f"ERRO FATAL API: Falha na conexão com Gemini após múltiplas tentativas: {e_retry}. Verifique sua conexão e as configurações da API.", "CRITICAL")
         if parent_dialog: messagebox.showerror("Erro de API", f"Falha na conexão com a API Gemini após várias tentativas: {e_retry}", parent=parent_dialog)
+    except ErroPrazoEsgotado as e_prazo:
+        if metricas is not None: metricas["erro"] = e_prazo
+        log_to_gui(f"ERRO API: {e_prazo} Documento '{pdf_path_para_logs.name}'.", "ERROR")
     except json.JSONDecodeError as e_json:
-        log_to_gui(f"ERRO JSONDecodeError API: Não foi possível decodificar a resposta JSON da API Gemini. Erro: {e_json.msg} na posição {e_json.pos}. Resposta bruta: '{resposta_texto_bruto_api[:500]}...'", "ERROR")
-        if CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS:
-            nome_arq_erro = pdf_path_para_logs.parent / f"gemini_resposta_erro_json_{pdf_path_para_logs.stem}.txt"
-            salvar_texto_em_arquivo(resposta_texto_bruto_api or "Nenhuma resposta da API recebida.", nome_arq_erro)
-            log_to_gui(f"Resposta bruta da API com erro JSON salva em '{nome_arq_erro.name}'.", "INFO")
+        if metricas is not None: metricas["erro"] = e_json
         if parent_dialog: messagebox.showerror("Erro de API", f"A resposta da API Gemini não foi um JSON válido: {e_json.msg}", parent=parent_dialog)
     except Exception as e_api_general:
+        if metricas is not None: metricas["erro"] = e_api_general
         log_to_gui(f"ERRO GERAL DURANTE CHAMADA À API GEMINI: {e_api_general}", "ERROR")
         logging.exception("Erro geral durante chamada à API Gemini:")
         if parent_dialog: messagebox.showerror("Erro de API", f"Ocorreu um erro inesperado ao comunicar com a API Gemini: {e_api_general}", parent=parent_dialog)
     return None
 
+def criar_cliente_gemini_async(
+    max_em_voo: int = GEMINI_MAX_REQUISICOES_EM_VOO,
+    requisicoes_por_minuto: Optional[float] = GEMINI_REQUISICOES_POR_MINUTO,
+    tokens_por_minuto: Optional[float] = GEMINI_TOKENS_POR_MINUTO
+) -> Optional[ClienteGeminiAsync]:
+    """Cria o cliente assíncrono do backend de LLM (None se o backend, ex.: a API Key do Gemini, não estiver configurado)."""
+    backend = obter_backend_llm()
+    if not backend.configurar():
+        return None
+    return ClienteGeminiAsync(
+        backend.obter_modelo(), backend.criar_generation_config(),
+        max_em_voo=max_em_voo, requisicoes_por_minuto=requisicoes_por_minuto, tokens_por_minuto=tokens_por_minuto)
+
+async def enviar_texto_completo_para_gemini_todos_blocos_async(
+    texto_completo_do_pdf: str,
+    blocos_config_map: Dict[str, Any],
+    pdf_path_para_logs: Path,
+    cliente: ClienteGeminiAsync,
+    metricas: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Versão assíncrona (sem diálogos) de enviar_texto_completo_para_gemini_todos_blocos, via ClienteGeminiAsync.
+
+    Se `metricas` for informado, recebe "cache_acerto" (True quando todas as partes vieram do cache),
+    "contabilidade" (ContabilidadeTokens das chamadas feitas) e, em caso de falha, "erro". Se uma requisição falhar,
+    as demais do documento são canceladas (não seguem ocupando vagas nem cota do cliente).
+    O trabalho síncrono (extrator local, recorte das seções, chave e leitura/gravação do cache em disco) roda em
+    threads (asyncio.to_thread) para não parar as demais requisições em voo no laço de eventos.
+    """
+    if not texto_completo_do_pdf:
+        log_to_gui("Nenhum texto foi extraído do PDF para enviar à API. Abortando.", "WARNING"); return None
+
+    dados_locais, blocos_config_map = await asyncio.to_thread(resolver_campos_localmente, texto_completo_do_pdf, blocos_config_map, pdf_path_para_logs)
+    if not blocos_config_map:
+        return mesclar_dados_locais({}, dados_locais)
+
+    contabilidade = ContabilidadeTokens()
+    if metricas is not None:
+        metricas["contabilidade"] = contabilidade
+    subconjuntos_blocos = agrupar_blocos_por_particao(blocos_config_map) if ENVIAR_PARTICOES_EM_PARALELO else [blocos_config_map]
+    try:
+        subconjuntos_blocos, textos_subconjuntos = await asyncio.to_thread(
+            _planejar_requisicoes, texto_completo_do_pdf, subconjuntos_blocos, pdf_path_para_logs, contabilidade)
+    except ErroOrcamentoTokens as e_orcamento:
+        if metricas is not None: metricas["erro"] = e_orcamento
+        log_to_gui(f"ERRO: {e_orcamento} Documento '{pdf_path_para_logs.name}' não enviado à API.", "ERROR")
+        return None
+
+    faltas_cache: List[str] = []
+
+    def _consultar_cache(texto_subconjunto: str, subconjunto: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        chave_cache = _chave_cache_gemini(texto_subconjunto, subconjunto)
+        return chave_cache, CACHE_RESPOSTAS_GEMINI.obter(chave_cache)
+
+    async def _resolver(texto_subconjunto: str, subconjunto: Dict[str, Any]) -> Dict[str, Any]:
+        chave_cache, dados_em_cache = await asyncio.to_thread(_consultar_cache, texto_subconjunto, subconjunto)
+        if dados_em_cache is not None:
+            return dados_em_cache
+        faltas_cache.append(chave_cache)
+        partes_prompt = construir_partes_prompt_gemini(texto_subconjunto, subconjunto)
+        _registrar_tokens_prompt(partes_prompt, pdf_path_para_logs)
+        modelo_cache, partes_envio = (await asyncio.to_thread(_modelo_e_partes_para_envio, partes_prompt) # O registro no cache de contexto é uma chamada de rede
+                                      if USAR_CACHE_CONTEXTO_GEMINI else (None, partes_prompt))
+        registro: Dict[str, Any] = {"tokens_entrada_estimados": estimar_tokens_prompt(partes_prompt), "tentativas": 0}
+        t_inicio = time.perf_counter()
+        try:
+            resposta_texto_bruto_api = await cliente.gerar(partes_envio, registro, modelo_cache)
+        except Exception:
+            registro["erro"] = True
+            raise
+        finally:
+            registro["latencia_s"] = time.perf_counter() - t_inicio
+            contabilidade.registrar(registro)
+        dados_json = _decodificar_resposta_gemini(resposta_texto_bruto_api, pdf_path_para_logs)
+        await asyncio.to_thread(CACHE_RESPOSTAS_GEMINI.gravar, chave_cache, dados_json)
+        return dados_json
+
+    async def _resolver_todos() -> List[Dict[str, Any]]:
+        tarefas = [asyncio.ensure_future(_resolver(texto_subconjunto, subconjunto)) for texto_subconjunto, subconjunto in zip(textos_subconjuntos, subconjuntos_blocos)]
+        try:
+            return await asyncio.gather(*tarefas)
+        except BaseException:
+            for tarefa in tarefas:
+                tarefa.cancel() # O gather repassa a primeira falha mas deixaria as demais requisições do documento rodando
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            raise
+
+    try:
+        resultados_parciais = await _resolver_todos()
+        if metricas is not None:
+            metricas["cache_acerto"] = not faltas_cache
+    except json.JSONDecodeError as e_json:
+        if metricas is not None: metricas["erro"] = e_json
+        return None # Detalhes já registrados por _decodificar_resposta_gemini
+    except Exception as e_api_general:
+        if metricas is not None: metricas["erro"] = e_api_general
+        log_to_gui(f"ERRO GERAL DURANTE CHAMADA ASSÍNCRONA À API GEMINI ('{pdf_path_para_logs.name}'): {type(e_api_general).__name__}: {e_api_general}", "ERROR")
+        return None
+    if faltas_cache:
+        log_to_gui(f"Tokens Gemini para '{pdf_path_para_logs.name}': {formatar_resumo_tokens(contabilidade.resumo())}.", "INFO")
+    dados_json_combinados: Dict[str, Any] = {}
+    for resultado_parcial in resultados_parciais:
+        dados_json_combinados.update(resultado_parcial)
+    return mesclar_dados_locais(dados_json_combinados, dados_locais)
+
 def achatar_json(objeto_json: Union[Dict[str, Any], List[Any]], prefixo_pai: str = '', separador: str = '_') -> Dict[str, Any]:
-    """Converte um JSON aninhado (dicionários e listas) em um dicionário achatado."""
+    """Converte um JSON aninhado (dicionários e listas) em um dicionário achatado.
+
+    Percorre a estrutura com uma pilha explícita (sem limite de profundidade por recursão) gravando direto no
+    dicionário de saída. Itens de listas são numerados a partir de 1; listas só de valores simples viram um texto.
+    """
     items_achatados: Dict[str, Any] = {}
-    if isinstance(objeto_json, dict):
-        for chave, valor in objeto_json.items():
-            chave_str = str(chave)
-            nova_chave_prefixada = f"{prefixo_pai}{separador}{chave_str}" if prefixo_pai else chave_str
-            items_achatados.update(achatar_json(valor, nova_chave_prefixada, separador=separador))
-    elif isinstance(objeto_json, list):
-        if not objeto_json:
-            pass
-        elif not any(isinstance(item, (dict, list)) for item in objeto_json):
-            try:
-                items_achatados[prefixo_pai if prefixo_pai else "lista_simples_na_raiz"] = ', '.join(map(str, objeto_json))
-            except TypeError:
-                 items_achatados[prefixo_pai if prefixo_pai else "erro_lista_simples_na_raiz"] = str(objeto_json)
+    # Cada nível da pilha: (início comum das chaves dos filhos, iterador de (chave, valor) dos filhos)
+    pilha: List[Tuple[str, Any]] = [('', iter(((prefixo_pai, objeto_json),)))]
+    while pilha:
+        inicio_chave, filhos = pilha[-1]
+        for chave, valor in filhos:
+            chave_prefixada = inicio_chave + str(chave)
+            if isinstance(valor, dict):
+                pilha.append((f"{chave_prefixada}{separador}" if chave_prefixada else '', iter(valor.items())))
+                break # Desce no dicionário; o iterador deste nível continua de onde parou
+            elif isinstance(valor, list):
+                if not valor:
+                    continue
+                if not any(isinstance(item, (dict, list)) for item in valor):
+                    try:
+                        items_achatados[chave_prefixada if chave_prefixada else "lista_simples_na_raiz"] = ', '.join(map(str, valor))
+                    except TypeError:
+                        items_achatados[chave_prefixada if chave_prefixada else "erro_lista_simples_na_raiz"] = str(valor)
+                    continue
+                pilha.append((f"{chave_prefixada}{separador}", enumerate(valor, 1)))
+                break
+            elif chave_prefixada:
+                items_achatados[chave_prefixada] = valor
         else:
-            for i, item_lista in enumerate(objeto_json):
-                chave_item_lista_indexada = f"{prefixo_pai}{separador}{i+1}"
-                items_achatados.update(achatar_json(item_lista, chave_item_lista_indexada, separador=separador))
-    else:
-        if prefixo_pai:
-            items_achatados[prefixo_pai] = objeto_json
+            pilha.pop()
     return items_achatados
 
 def gerenciar_chave_nao_mapeada_interativamente(
@@ -953,20 +1678,11 @@ def gerenciar_chave_nao_mapeada_interativamente(
         return chave_original_nao_mapeada, False, False, False
 
     if nome_para_salvar_no_mapa and not pular_todas_proximas_neste_pdf:
-        config_completo_map = carregar_mapeamento_de_arquivo(caminho_arquivo_config_str) or {"mapeamento_para_chaves_padronizadas": {}}
-        if "mapeamento_para_chaves_padronizadas" not in config_completo_map or \
-           not isinstance(config_completo_map.get("mapeamento_para_chaves_padronizadas"), dict):
-            config_completo_map["mapeamento_para_chaves_padronizadas"] = {}
-            log_to_gui(f"AVISO: Estrutura 'mapeamento_para_chaves_padronizadas' recriada no arquivo '{caminho_arquivo_config_abs.name}'.", "WARNING")
-
-        current_mapping_on_file = config_completo_map["mapeamento_para_chaves_padronizadas"]
-
-        if current_mapping_on_file.get(chave_original_nao_mapeada) != nome_para_salvar_no_mapa:
-            current_mapping_on_file[chave_original_nao_mapeada] = nome_para_salvar_no_mapa
-            if salvar_mapeamento_em_arquivo(config_completo_map, caminho_arquivo_config_str):
+        if mapa_atual_em_memoria.get(chave_original_nao_mapeada) != nome_para_salvar_no_mapa:
+            if registrar_mapeamento_no_diario(chave_original_nao_mapeada, nome_para_salvar_no_mapa, caminho_arquivo_config_str):
                 mapa_foi_atualizado_no_arquivo = True
                 mapa_atual_em_memoria[chave_original_nao_mapeada] = nome_para_salvar_no_mapa
-                log_to_gui(f"MAPEAMENTO SALVO: Chave IA '{chave_original_nao_mapeada}' mapeada para '{nome_para_salvar_no_mapa}' e salva em '{caminho_arquivo_config_abs.name}'.", "INFO")
+                log_to_gui(f"MAPEAMENTO SALVO: Chave IA '{chave_original_nao_mapeada}' mapeada para '{nome_para_salvar_no_mapa}' (diário de '{caminho_arquivo_config_abs.name}').", "INFO")
             else:
                 log_to_gui(f"ERRO: Falha ao salvar o novo mapeamento para '{chave_original_nao_mapeada}' no arquivo '{caminho_arquivo_config_abs.name}'.", "ERROR")
         else:
@@ -975,6 +1691,17 @@ def gerenciar_chave_nao_mapeada_interativamente(
 
     return nome_padronizado_escolhido, mapa_foi_atualizado_no_arquivo, pular_todas_proximas_neste_pdf, mapear_todas_auto_neste_pdf
 
+_indice_curingas_cache: Optional[Tuple[Tuple[Tuple[str, Any], ...], IndiceCuringasMapeamento]] = None
+
+def obter_indice_curingas(mapeamento_chaves: Dict[str, Any]) -> IndiceCuringasMapeamento:
+    """Índice dos padrões com '*' do mapeamento, reconstruído apenas quando esses padrões mudam."""
+    global _indice_curingas_cache
+    assinatura = tuple((chave, valor) for chave, valor in mapeamento_chaves.items() if '*' in chave)
+    if _indice_curingas_cache is None or _indice_curingas_cache[0] != assinatura:
+        _indice_curingas_cache = (assinatura, IndiceCuringasMapeamento(mapeamento_chaves))
+        log_to_gui(f"Índice de mapeamento: {len(assinatura)} padrões com '*' compilados.", "DEBUG")
+    return _indice_curingas_cache[1]
+
 def normalizar_chaves_json(
     json_achatado_da_ia: Dict[str, Any],
     mapeamento_chaves_padronizadas: Optional[Dict[str, str]],
@@ -990,18 +1717,9 @@ def normalizar_chaves_json(
 
     _pular_interacao_nesta_sessao = pular_mapeamento_interativo_pdf_inicial
     _mapear_automatico_nesta_sessao = False
+    houve_registro_no_diario = False
 
-    mapa_regex_wildcard: Dict[str, re.Pattern] = {}
-    if mapa_em_memoria_atual:
-        chaves_wildcard_ordenadas = sorted(
-            [k for k in mapa_em_memoria_atual.keys() if '*' in k],
-            key=lambda k: (k.count('_'), len(k)), reverse=True
-        )
-        for chave_wc_mapa in chaves_wildcard_ordenadas:
-            regex_str = '^' + re.escape(chave_wc_mapa).replace(r'\*', r'([0-9]+)') + '$'
-            try: mapa_regex_wildcard[chave_wc_mapa] = re.compile(regex_str)
-            except re.error as e_re:
-                log_to_gui(f"ERRO ao compilar regex para wildcard '{chave_wc_mapa}': {e_re}", "ERROR")
+    indice_curingas = obter_indice_curingas(mapa_em_memoria_atual)
 
     for chave_ia, valor in json_achatado_da_ia.items():
         nome_padronizado_final: Optional[str] = None
@@ -1011,32 +1729,23 @@ def normalizar_chaves_json(
         elif chave_ia in mapa_em_memoria_atual:
             nome_padronizado_final = str(mapa_em_memoria_atual[chave_ia])
         else:
-            for chave_wc_mapa_original, regex_compilado in mapa_regex_wildcard.items():
-                match = regex_compilado.match(chave_ia)
-                if match:
-                    nome_base_wc_padronizado = str(mapa_em_memoria_atual[chave_wc_mapa_original])
-                    try:
-                        if '*' in nome_base_wc_padronizado and match.groups():
-                            nome_padronizado_final = nome_base_wc_padronizado.replace("*", match.group(1))
-                        else: nome_padronizado_final = nome_base_wc_padronizado
-                    except IndexError: nome_padronizado_final = nome_base_wc_padronizado.replace("*", "ERRO_IDX_WC")
-                    log_to_gui(f"MAPEAMENTO WILDCARD: Chave IA '{chave_ia}' -> '{nome_padronizado_final}' usando padrão '{chave_wc_mapa_original}'.", "DEBUG")
-                    break
+            resolucao_wildcard = indice_curingas.resolver(chave_ia)
+            if resolucao_wildcard:
+                nome_padronizado_final, chave_wc_mapa_original = resolucao_wildcard
+                log_to_gui(f"MAPEAMENTO WILDCARD: Chave IA '{chave_ia}' -> '{nome_padronizado_final}' usando padrão '{chave_wc_mapa_original}'.", "DEBUG")
 
             if not nome_padronizado_final:
                 if _mapear_automatico_nesta_sessao:
                     nome_padronizado_final = chave_ia.replace("_", " ").title()
                     mapa_em_memoria_atual[chave_ia] = nome_padronizado_final
-                    config_mapa_atual = carregar_mapeamento_de_arquivo(ARQUIVO_MAPEAMENTO_CONFIG) or {"mapeamento_para_chaves_padronizadas": {}}
-                    if "mapeamento_para_chaves_padronizadas" not in config_mapa_atual or not isinstance(config_mapa_atual.get("mapeamento_para_chaves_padronizadas"), dict):
-                        config_mapa_atual["mapeamento_para_chaves_padronizadas"] = {}
-                    config_mapa_atual["mapeamento_para_chaves_padronizadas"][chave_ia] = nome_padronizado_final
-                    salvar_mapeamento_em_arquivo(config_mapa_atual, ARQUIVO_MAPEAMENTO_CONFIG)
-                    log_to_gui(f"MAPEAMENTO AUTOMÁTICO (Opção 3): Chave IA '{chave_ia}' -> '{nome_padronizado_final}' (salvo).", "INFO")
+                    if registrar_mapeamento_no_diario(chave_ia, nome_padronizado_final, ARQUIVO_MAPEAMENTO_CONFIG):
+                        houve_registro_no_diario = True
+                    log_to_gui(f"MAPEAMENTO AUTOMÁTICO (Opção 3): Chave IA '{chave_ia}' -> '{nome_padronizado_final}' (salvo no diário).", "INFO")
                 elif not _pular_interacao_nesta_sessao:
-                    nome_escolhido_usr, _, _pular_agora_usr, _mapear_auto_agora_usr = \
+                    nome_escolhido_usr, _mapa_atualizado_usr, _pular_agora_usr, _mapear_auto_agora_usr = \
                         gerenciar_chave_nao_mapeada_interativamente(
                             chave_ia, ARQUIVO_MAPEAMENTO_CONFIG, mapa_em_memoria_atual)
+                    if _mapa_atualizado_usr: houve_registro_no_diario = True
                     if _pular_agora_usr: _pular_interacao_nesta_sessao = True
                     if _mapear_auto_agora_usr: _mapear_automatico_nesta_sessao = True
                     nome_padronizado_final = nome_escolhido_usr
@@ -1067,6 +1776,9 @@ def normalizar_chaves_json(
             json_final_com_placeholders[chave_colisao] = valor
             log_to_gui(f"AVISO: Conflito de placeholder para '{placeholder_excel}' (de '{nome_padronizado_final}'). Salvo como '{chave_colisao}'. Verifique o mapeamento.", "WARNING")
 
+    if houve_registro_no_diario:
+        compactar_diario_mapeamento(ARQUIVO_MAPEAMENTO_CONFIG) # Uma única reescrita do arquivo por PDF
+
     return json_final_com_placeholders, mapa_em_memoria_atual, _pular_interacao_nesta_sessao
 
 def gerar_mapeamento_sugestao(json_achatado_ia: Dict[str, Any], nome_arquivo_origem: str = "Desconhecido") -> Dict[str, str]:
@@ -1128,13 +1840,31 @@ def gerar_mapeamento_sugestao(json_achatado_ia: Dict[str, Any], nome_arquivo_ori
     log_to_gui(f"--- Copie o bloco acima e cole/edite no arquivo '{caminho_map_config_abs.name}' para refinar os mapeamentos. --- \n", "INFO")
     return sugestoes
 
+def montar_json_com_chaves_placeholder(json_dados_normalizados: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte as chaves normalizadas em placeholders do Excel ({{CHAVE}})."""
+    return { f"{{{{{key}}}}}" : val for key, val in json_dados_normalizados.items() }
+
+def _gravar_json_placeholders(dados_placeholders: Dict[str, Any], caminho_arquivo: Path) -> bool:
+    """Grava o artefato '<pdf>_dados_para_excel.json' (executada fora da thread da GUI: registra só no log em arquivo)."""
+    try:
+        gravar_json_atomico(caminho_arquivo, dados_placeholders)
+        logging.info(f"JSON formatado com placeholders para Excel salvo em: '{caminho_arquivo.name}'")
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao salvar JSON formatado com placeholders para Excel ('{caminho_arquivo.name}'): {e}")
+        return False
+
+def salvar_json_placeholders_em_segundo_plano(dados_placeholders: Dict[str, Any], caminho_arquivo: Path) -> Future:
+    """Agenda a gravação do JSON de placeholders (artefato de conferência) sem atrasar o preenchimento do Excel."""
+    return _EXECUTOR_ARTEFATOS.submit(_gravar_json_placeholders, dict(dados_placeholders), caminho_arquivo)
+
 def gerar_json_com_chaves_placeholder(json_dados_normalizados: Dict[str, Any], nome_arq_saida_path: Path) -> bool:
     """Gera um JSON onde as chaves são formatadas como placeholders para o Excel."""
     if not json_dados_normalizados:
         log_to_gui("JSON para Placeholders: Dados normalizados estão vazios. Nenhum arquivo JSON para Excel será gerado.", "WARNING"); return False
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
 
-    json_para_excel: Dict[str, Any] = { f"{{{{{key}}}}}" : val for key, val in json_dados_normalizados.items() }
+    json_para_excel = montar_json_com_chaves_placeholder(json_dados_normalizados)
 
     try:
         nome_arq_saida_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1169,7 +1899,10 @@ def processar_pdf_e_gerar_saidas(caminho_pdf_path_obj: Path) -> bool:
     if CRIAR_ARQUIVOS_DEBUG_INTERMEDIARIOS:
         salvar_texto_em_arquivo(texto_completo_extraido, caminho_pdf_path_obj.parent / f"{caminho_pdf_path_obj.stem}_texto_completo_para_ia.txt")
 
-    log_to_gui(f"Enviando todos os {len(BLOCO_CONFIG)} blocos do schema em uma única requisição para a API Gemini...", "INFO")
+    if ENVIAR_PARTICOES_EM_PARALELO:
+        log_to_gui(f"Enviando os {len(BLOCO_CONFIG)} blocos do schema em uma requisição por partição (em paralelo) para a API Gemini...", "INFO")
+    else:
+        log_to_gui(f"Enviando todos os {len(BLOCO_CONFIG)} blocos do schema em uma única requisição para a API Gemini...", "INFO")
     if parent_dialog and is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and isinstance(parent_dialog, tk.Tk):
         status_label.config(text=f"Processando PDF com IA ({len(BLOCO_CONFIG)} blocos)...")
         parent_dialog.update_idletasks()
@@ -1245,12 +1978,14 @@ def processar_pdf_e_gerar_saidas(caminho_pdf_path_obj: Path) -> bool:
         salvar_json_em_arquivo(json_final_excel, caminho_pdf_path_obj.parent / f"{caminho_pdf_path_obj.stem}_final_normalizado_debug.json")
 
     if parent_dialog and is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and isinstance(parent_dialog, tk.Tk):
-        status_label.config(text="Gerando JSON final para preenchimento do Excel...")
+        status_label.config(text="Preparando dados para preenchimento do Excel...")
         parent_dialog.update_idletasks()
 
-    arq_json_para_excel = caminho_pdf_path_obj.parent / f"{caminho_pdf_path_obj.stem}_dados_para_excel.json"
-    if gerar_json_com_chaves_placeholder(json_final_excel, arq_json_para_excel):
-        log_to_gui("JSON para Excel gerado. Por favor, selecione o ARQUIVO EXCEL MODELO.", "INFO")
+    dados_para_excel = montar_json_com_chaves_placeholder(json_final_excel) if json_final_excel else {}
+    if dados_para_excel:
+        if SALVAR_JSON_DADOS_PARA_EXCEL:
+            salvar_json_placeholders_em_segundo_plano(dados_para_excel, caminho_pdf_path_obj.parent / f"{caminho_pdf_path_obj.stem}_dados_para_excel.json")
+        log_to_gui("Dados para o Excel prontos. Por favor, selecione o ARQUIVO EXCEL MODELO.", "INFO")
         if parent_dialog and is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label) and isinstance(parent_dialog, tk.Tk):
             status_label.config(text="Aguardando seleção do Excel modelo...")
             parent_dialog.update_idletasks()
@@ -1275,7 +2010,7 @@ def processar_pdf_e_gerar_saidas(caminho_pdf_path_obj: Path) -> bool:
                     parent=parent_dialog)
                 nome_planilha_final = nome_aba_excel.strip() if nome_aba_excel and nome_aba_excel.strip() else None
 
-                if not preencher_excel_novo_com_placeholders(arq_json_para_excel, caminho_template_excel, caminho_excel_saida_final, nome_planilha_final):
+                if not preencher_excel_com_dados(dados_para_excel, caminho_template_excel, caminho_excel_saida_final, nome_planilha_final):
                     log_to_gui(f"Falha ao preencher o arquivo Excel '{caminho_excel_saida_final.name}'.", "ERROR")
             else:
                 if parent_dialog: parar_progresso("Salvamento do arquivo Excel cancelado.")
@@ -1284,8 +2019,8 @@ def processar_pdf_e_gerar_saidas(caminho_pdf_path_obj: Path) -> bool:
             if parent_dialog: parar_progresso("Seleção do modelo Excel cancelada.")
             log_to_gui("Seleção do arquivo Excel modelo cancelada.", "INFO")
     else:
-        if parent_dialog: parar_progresso(f"Falha gerar JSON para Excel do PDF {caminho_pdf_path_obj.name}")
-        log_to_gui(f"ERRO: Não foi possível gerar o arquivo JSON com placeholders para o Excel ('{arq_json_para_excel.name}').", "ERROR")
+        if parent_dialog: parar_progresso(f"Falha gerar dados para Excel do PDF {caminho_pdf_path_obj.name}")
+        log_to_gui("ERRO: Dados normalizados vazios. Nenhum dado para preencher o Excel.", "ERROR")
 
     log_to_gui(f"--- Fim do processamento para: {caminho_pdf_path_obj.name} ---", "INFO")
     if parent_dialog and is_gui_widget_available(status_label) and isinstance(status_label, ttk.Label):
@@ -1293,13 +2028,540 @@ def processar_pdf_e_gerar_saidas(caminho_pdf_path_obj: Path) -> bool:
             parar_progresso(f"Processamento de {caminho_pdf_path_obj.name} finalizado.")
     return True
 
+# --- PROCESSAMENTO EM LOTE (SEM GUI) ---
+ETAPAS_PIPELINE_LOTE = ("extracao_texto", "api_gemini", "achatamento", "normalizacao", "preenchimento_excel")
+_mapa_chaves_worker_lote: Optional[Dict[str, str]] = None # Mapeamento carregado uma vez por processo worker
+
+def inicializar_worker_lote(usar_cache: bool = True, atualizar_cache: bool = False, particoes_em_paralelo: bool = False,
+                            salvar_json_dados_excel: bool = False, orcamento_tokens: Optional[int] = None,
+                            acao_orcamento: Optional[str] = None, cache_contexto: Optional[bool] = None,
+                            backend_llm: Optional[str] = None, config_backend_falso: Optional[Dict[str, Any]] = None) -> None:
+    """Carrega o schema e o mapeamento de chaves uma única vez em cada processo worker do lote.
+
+    `orcamento_tokens`, `acao_orcamento`, `cache_contexto`, `backend_llm` e `config_backend_falso`, quando informados,
+    substituem ORCAMENTO_TOKENS_POR_REQUISICAO, ACAO_ORCAMENTO_EXCEDIDO, USAR_CACHE_CONTEXTO_GEMINI, BACKEND_LLM e CONFIG_BACKEND_FALSO.
+    """
+    global _mapa_chaves_worker_lote, ENVIAR_PARTICOES_EM_PARALELO, SALVAR_JSON_DADOS_PARA_EXCEL, ORCAMENTO_TOKENS_POR_REQUISICAO, ACAO_ORCAMENTO_EXCEDIDO
+    global USAR_CACHE_CONTEXTO_GEMINI, BACKEND_LLM, CONFIG_BACKEND_FALSO, _backend_llm, _cache_contexto_prompt
+    if (backend_llm is not None and backend_llm != BACKEND_LLM) or (config_backend_falso is not None and config_backend_falso != CONFIG_BACKEND_FALSO):
+        with _lock_objetos_processo:
+            if _cache_contexto_prompt is not None: _cache_contexto_prompt.limpar()
+            _backend_llm = _cache_contexto_prompt = None # Processo reutilizado (worker Celery) com outro backend: recria no próximo uso
+    ENVIAR_PARTICOES_EM_PARALELO = particoes_em_paralelo
+    SALVAR_JSON_DADOS_PARA_EXCEL = salvar_json_dados_excel # Sem GUI, o JSON intermediário só é gravado se pedido
+    if orcamento_tokens is not None: ORCAMENTO_TOKENS_POR_REQUISICAO = orcamento_tokens
+    if acao_orcamento is not None: ACAO_ORCAMENTO_EXCEDIDO = acao_orcamento
+    if cache_contexto is not None: USAR_CACHE_CONTEXTO_GEMINI = cache_contexto
+    if backend_llm is not None: BACKEND_LLM = backend_llm
+    if config_backend_falso is not None: CONFIG_BACKEND_FALSO = config_backend_falso
+    configurar_logging()
+    for cache in (CACHE_RESPOSTAS_GEMINI, CACHE_TEXTO_PDF):
+        cache.habilitado = usar_cache
+        cache.atualizar = atualizar_cache
+    if BACKEND_LLM == BACKEND_LLM_FALSO:
+        CACHE_RESPOSTAS_GEMINI.habilitado = False # Teste de carga: não grava respostas sintéticas no cache de produção
+    if not BLOCO_CONFIG:
+        carregar_schema_extracao()
+    obter_backend_llm().configurar() # Depois do schema: o backend falso responde conforme os blocos carregados
+    map_config = carregar_mapeamento_de_arquivo(ARQUIVO_MAPEAMENTO_CONFIG)
+    if map_config and isinstance(map_config.get("mapeamento_para_chaves_padronizadas"), dict):
+        _mapa_chaves_worker_lote = map_config["mapeamento_para_chaves_padronizadas"]
+    else:
+        log_to_gui(f"AVISO LOTE: Mapeamento '{ARQUIVO_MAPEAMENTO_CONFIG}' indisponível. Chaves originais da IA serão usadas.", "WARNING")
+
+def _novo_resultado_lote(caminho_pdf: Path) -> Dict[str, Any]:
+    return {"pdf": caminho_pdf.name, "sucesso": False, "erro": None, "tempos": {}, "cache_gemini_acerto": None, "tokens_gemini": None}
+
+def extrair_texto_pdf_lote(caminho_pdf: Path) -> Tuple[Optional[str], float]:
+    """Etapa de extração do lote (executável em processo worker): retorna o texto e o tempo gasto."""
+    t_inicio = time.perf_counter()
+    texto_extraido = extrair_texto_do_pdf(caminho_pdf)
+    return texto_extraido, time.perf_counter() - t_inicio
+
+def normalizar_resultado_api_lote(resultado: Dict[str, Any], resultado_api: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Etapas de achatamento e normalização do lote; retorna o resultado atualizado e o JSON normalizado (None se falhar)."""
+    tempos: Dict[str, float] = resultado["tempos"]
+    try:
+        t_inicio = time.perf_counter()
+        json_achatado = achatar_json(resultado_api)
+        tempos["achatamento"] = time.perf_counter() - t_inicio
+        if not json_achatado:
+            resultado["erro"] = "JSON achatado da IA resultou vazio."; return resultado, None
+
+        t_inicio = time.perf_counter()
+        # Sem janela, chaves não mapeadas mantêm o nome original da IA (nenhum diálogo é aberto)
+        json_normalizado, _, _ = normalizar_chaves_json(json_achatado, _mapa_chaves_worker_lote, False)
+        tempos["normalizacao"] = time.perf_counter() - t_inicio
+        if not json_normalizado:
+            resultado["erro"] = "Normalização das chaves resultou vazia."; return resultado, None
+    except Exception as e:
+        resultado["erro"] = f"Erro inesperado: {e}"
+        logging.exception(f"Erro no processamento em lote de {resultado['pdf']}:")
+        return resultado, None
+    return resultado, json_normalizado
+
+def preencher_excel_lote(
+    resultado: Dict[str, Any],
+    json_normalizado: Dict[str, Any],
+    caminho_pdf: Path,
+    caminho_excel_modelo: Optional[Path],
+    dir_saida: Path,
+    nome_planilha_alvo: Optional[str] = None,
+    anexar_json_normalizado: bool = False
+) -> Dict[str, Any]:
+    """Etapa de preenchimento do Excel do lote; atualiza e retorna o dicionário de resultado.
+
+    Sem modelo (`caminho_excel_modelo=None`), nenhum Excel é gerado por PDF: o lote só alimenta a planilha
+    consolidada. Com `anexar_json_normalizado`, o JSON normalizado volta no resultado para o processo principal.
+    """
+    if caminho_excel_modelo is None:
+        resultado["sucesso"] = True
+        if anexar_json_normalizado: resultado["json_normalizado"] = json_normalizado
+        return resultado
+    try:
+        t_inicio = time.perf_counter()
+        caminho_excel_saida = dir_saida / f"{caminho_pdf.stem}_PREENCHIDO.xlsx"
+        dados_para_excel = montar_json_com_chaves_placeholder(json_normalizado)
+        if SALVAR_JSON_DADOS_PARA_EXCEL:
+            salvar_json_placeholders_em_segundo_plano(dados_para_excel, dir_saida / f"{caminho_pdf.stem}_dados_para_excel.json")
+        excel_ok = bool(dados_para_excel) and preencher_excel_com_dados(dados_para_excel, caminho_excel_modelo, caminho_excel_saida, nome_planilha_alvo)
+        resultado["tempos"]["preenchimento_excel"] = time.perf_counter() - t_inicio
+        if not excel_ok:
+            resultado["erro"] = f"Falha ao gerar o Excel '{caminho_excel_saida.name}'."; return resultado
+        resultado["sucesso"] = True
+        if anexar_json_normalizado: resultado["json_normalizado"] = json_normalizado
+    except Exception as e:
+        resultado["erro"] = f"Erro inesperado: {e}"
+        logging.exception(f"Erro no processamento em lote de {caminho_pdf.name}:")
+    return resultado
+
+def finalizar_pdf_lote(
+    resultado: Dict[str, Any],
+    resultado_api: Dict[str, Any],
+    caminho_pdf: Path,
+    caminho_excel_modelo: Optional[Path],
+    dir_saida: Path,
+    nome_planilha_alvo: Optional[str] = None,
+    anexar_json_normalizado: bool = False
+) -> Dict[str, Any]:
+    """Etapas pós-IA do lote (achatamento, normalização e Excel); atualiza e retorna o dicionário de resultado."""
+    resultado, json_normalizado = normalizar_resultado_api_lote(resultado, resultado_api)
+    if json_normalizado is None:
+        return resultado
+    return preencher_excel_lote(resultado, json_normalizado, caminho_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo,
+                                anexar_json_normalizado)
+
+def processar_pdf_sem_interface(
+    caminho_pdf: Path,
+    caminho_excel_modelo: Optional[Path],
+    dir_saida: Path,
+    nome_planilha_alvo: Optional[str] = None,
+    anexar_json_normalizado: bool = False
+) -> Dict[str, Any]:
+    """Executa extração, Gemini, achatamento, normalização e preenchimento do Excel para um PDF, sem diálogos."""
+    resultado = _novo_resultado_lote(caminho_pdf)
+    tempos: Dict[str, float] = resultado["tempos"]
+    try:
+        if not BLOCO_CONFIG:
+            resultado["erro"] = "Schema de extração (BLOCO_CONFIG) vazio ou não carregado."; return resultado
+
+        texto_extraido, tempos["extracao_texto"] = extrair_texto_pdf_lote(caminho_pdf)
+        if texto_extraido is None:
+            resultado["erro"] = "Falha na extração de texto do PDF."; return resultado
+
+        t_inicio = time.perf_counter()
+        metricas_api: Dict[str, Any] = {}
+        resultado_api = enviar_texto_completo_para_gemini_todos_blocos(texto_extraido, BLOCO_CONFIG, caminho_pdf, metricas_api)
+        tempos["api_gemini"] = time.perf_counter() - t_inicio
+        if CACHE_RESPOSTAS_GEMINI.habilitado and not CACHE_RESPOSTAS_GEMINI.atualizar:
+            resultado["cache_gemini_acerto"] = metricas_api.get("cache_acerto")
+        if "contabilidade" in metricas_api:
+            resultado["tokens_gemini"] = metricas_api["contabilidade"].resumo()
+        if not resultado_api:
+            resultado["erro"] = "Resposta da API Gemini inválida ou vazia."; return resultado
+    except Exception as e:
+        resultado["erro"] = f"Erro inesperado: {e}"
+        logging.exception(f"Erro no processamento em lote de {caminho_pdf.name}:")
+        return resultado
+    return finalizar_pdf_lote(resultado, resultado_api, caminho_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo,
+                              anexar_json_normalizado)
+
+def calcular_percentil(valores: List[float], percentil: float) -> float:
+    """Calcula o percentil (0-100) por interpolação linear; retorna 0.0 para lista vazia."""
+    if not valores: return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * percentil / 100.0
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+def resumir_lote(resultados: List[Dict[str, Any]], duracao_total_s: float) -> Dict[str, Any]:
+    """Consolida os resultados do lote em métricas de vazão, falhas e p50/p95 por etapa."""
+    falhas = [r for r in resultados if not r.get("sucesso")]
+    resumo: Dict[str, Any] = {
+        "documentos": len(resultados),
+        "sucessos": len(resultados) - len(falhas),
+        "falhas": len(falhas),
+        "duracao_total_s": duracao_total_s,
+        "documentos_por_minuto": (len(resultados) / duracao_total_s * 60.0) if duracao_total_s > 0 else 0.0,
+        "etapas": {},
+        "erros": {r["pdf"]: r.get("erro") for r in falhas},
+    }
+    consultas_cache = [r["cache_gemini_acerto"] for r in resultados if r.get("cache_gemini_acerto") is not None]
+    resumo["cache_gemini"] = {
+        "consultas": len(consultas_cache),
+        "acertos": sum(consultas_cache),
+        "taxa_acerto": (sum(consultas_cache) / len(consultas_cache)) if consultas_cache else 0.0,
+    }
+    for etapa in ETAPAS_PIPELINE_LOTE:
+        valores = [r["tempos"][etapa] for r in resultados if etapa in r.get("tempos", {})]
+        resumo["etapas"][etapa] = {"n": len(valores), "p50_s": calcular_percentil(valores, 50), "p95_s": calcular_percentil(valores, 95)}
+    tokens_por_pdf = [r["tokens_gemini"] for r in resultados if r.get("tokens_gemini") and r["tokens_gemini"]["chamadas"]]
+    resumo["tokens_gemini"] = somar_resumos_tokens(tokens_por_pdf)
+    tokens_por_documento = [t["tokens_entrada"] + t["tokens_saida"] for t in tokens_por_pdf]
+    resumo["tokens_gemini"]["p50_por_documento"] = calcular_percentil(tokens_por_documento, 50)
+    resumo["tokens_gemini"]["p95_por_documento"] = calcular_percentil(tokens_por_documento, 95)
+    return resumo
+
+def finalizar_exportacao_consolidada(exportador: ExportadorConsolidado) -> Dict[str, Any]:
+    """Grava a planilha consolidada do lote e retorna o bloco 'consolidado' do resumo."""
+    estat: Dict[str, Any] = {"arquivo": str(exportador.caminho_saida), "linhas": exportador.linhas, "colunas": len(exportador.colunas), "erro": None}
+    t_inicio = time.perf_counter()
+    try:
+        exportador.finalizar()
+        log_to_gui(f"LOTE: Planilha consolidada '{exportador.caminho_saida}' gravada ({estat['linhas']} linhas, {estat['colunas']} colunas) em {time.perf_counter() - t_inicio:.2f} s.", "INFO")
+    except Exception as e:
+        estat["erro"] = str(e)
+        log_to_gui(f"ERRO ao gravar a planilha consolidada '{exportador.caminho_saida}': {e}", "ERROR")
+        logging.exception("Erro na planilha consolidada do lote:")
+    return estat
+
+def formatar_resumo_lote(resumo: Dict[str, Any]) -> str:
+    """Formata o resumo do lote como texto para o console."""
+    linhas = [
+        "--- RESUMO DO LOTE ---",
+        f"Documentos: {resumo['documentos']} | Sucessos: {resumo['sucessos']} | Falhas: {resumo['falhas']}",
+        f"Duração total: {resumo['duracao_total_s']:.1f} s | Vazão: {resumo['documentos_por_minuto']:.2f} docs/min",
+        f"Cache Gemini: {resumo['cache_gemini']['acertos']}/{resumo['cache_gemini']['consultas']} acertos ({resumo['cache_gemini']['taxa_acerto']:.0%})",
+        f"{'Etapa':<22}{'n':>6}{'p50 (s)':>12}{'p95 (s)':>12}",
+    ]
+    for etapa, estat in resumo["etapas"].items():
+        linhas.append(f"{etapa:<22}{estat['n']:>6}{estat['p50_s']:>12.3f}{estat['p95_s']:>12.3f}")
+    if "pipeline" in resumo:
+        linhas.append(f"{'Estágio (pipeline)':<22}{'cons.':>6}{'utiliz.':>10}{'fila máx':>10}{'fila méd':>10}{'bloq. (s)':>11}")
+        for nome_estagio, estat in resumo["pipeline"].items():
+            linhas.append(f"{nome_estagio:<22}{estat['consumidores']:>6}{estat['utilizacao']:>10.0%}"
+                          f"{estat['fila_profundidade_max']:>7}/{estat['fila_capacidade']:<2}{estat['fila_profundidade_media']:>10.1f}{estat['tempo_bloqueado_s']:>11.2f}")
+    tokens = resumo.get("tokens_gemini")
+    if tokens and tokens["documentos"]:
+        linhas.append(f"Tokens Gemini: {formatar_resumo_tokens(tokens)} | {tokens['documentos']} documento(s), "
+                      f"por documento p50 {tokens['p50_por_documento']:.0f} / p95 {tokens['p95_por_documento']:.0f}"
+                      f"{' | ' + str(tokens['divisoes']) + ' divisão(ões) por orçamento' if tokens['divisoes'] else ''}")
+    if "api_gemini_async" in resumo:
+        estat_api = resumo["api_gemini_async"]
+        linhas.append(f"API (async): {estat_api['requisicoes']} requisições | {estat_api['retries']} retries | "
+                      f"{estat_api['respostas_429']} respostas 429 | espera no limitador: {estat_api['espera_limitador_s']:.1f} s")
+    if "consolidado" in resumo:
+        estat_consolidado = resumo["consolidado"]
+        linhas.append(f"Planilha consolidada: {estat_consolidado['arquivo']} | {estat_consolidado['linhas']} linhas | {estat_consolidado['colunas']} colunas"
+                      f"{' | ERRO: ' + estat_consolidado['erro'] if estat_consolidado['erro'] else ''}")
+    for nome_pdf, erro in resumo["erros"].items():
+        linhas.append(f"FALHA: {nome_pdf}: {erro}")
+    return "\n".join(linhas)
+
+def executar_lote(
+    dir_pdfs: Path,
+    caminho_excel_modelo: Optional[Path],
+    nome_planilha_alvo: Optional[str] = None,
+    num_workers: int = 1,
+    dir_saida: Optional[Path] = None,
+    usar_cache: bool = True,
+    atualizar_cache: bool = False,
+    particoes_em_paralelo: bool = False,
+    salvar_json_dados_excel: bool = False,
+    caminho_consolidado: Optional[Path] = None,
+    orcamento_tokens: Optional[int] = None,
+    acao_orcamento: Optional[str] = None,
+    cache_contexto: Optional[bool] = None,
+    backend_llm: Optional[str] = None,
+    config_backend_falso: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Processa todos os PDFs de um diretório em paralelo com um pool de processos e retorna o resumo.
+
+    Com `caminho_consolidado`, grava também uma planilha com uma linha por súmula (colunas = chaves normalizadas).
+    """
+    dir_saida = dir_saida or dir_pdfs
+    dir_saida.mkdir(parents=True, exist_ok=True)
+    caminhos_pdf = sorted(p for p in dir_pdfs.iterdir() if p.is_file() and p.suffix.lower() == ".pdf")
+    log_to_gui(f"LOTE: {len(caminhos_pdf)} PDFs encontrados em '{dir_pdfs}'. Workers: {num_workers}.", "INFO")
+
+    resultados: List[Dict[str, Any]] = []
+    exportador = ExportadorConsolidado(caminho_consolidado) if caminho_consolidado else None
+    t_inicio_lote = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, num_workers), initializer=inicializar_worker_lote,
+                             initargs=(usar_cache, atualizar_cache, particoes_em_paralelo, salvar_json_dados_excel,
+                                       orcamento_tokens, acao_orcamento, cache_contexto, backend_llm, config_backend_falso)) as executor:
+        futuros = {
+            executor.submit(processar_pdf_sem_interface, caminho_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo,
+                            exportador is not None): caminho_pdf
+            for caminho_pdf in caminhos_pdf
+        }
+        for futuro in as_completed(futuros):
+            caminho_pdf = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e: # Ex.: worker encerrado abruptamente
+                resultado = {"pdf": caminho_pdf.name, "sucesso": False, "erro": f"Falha no worker: {e}", "tempos": {}, "cache_gemini_acerto": None, "tokens_gemini": None}
+            json_normalizado = resultado.pop("json_normalizado", None) # A linha vai para o disco, não fica nos resultados
+            if exportador is not None and json_normalizado:
+                exportador.adicionar(resultado["pdf"], json_normalizado)
+            resultados.append(resultado)
+            log_to_gui(f"LOTE [{len(resultados)}/{len(caminhos_pdf)}] {resultado['pdf']}: {'OK' if resultado['sucesso'] else 'FALHA - ' + str(resultado['erro'])}", "INFO" if resultado["sucesso"] else "ERROR")
+
+    resumo = resumir_lote(resultados, time.perf_counter() - t_inicio_lote)
+    if exportador is not None:
+        resumo["consolidado"] = finalizar_exportacao_consolidada(exportador)
+    return resumo
+
+async def _processar_lote_async(
+    caminhos_pdf: List[Path],
+    caminho_excel_modelo: Optional[Path],
+    dir_saida: Path,
+    nome_planilha_alvo: Optional[str],
+    executor: ProcessPoolExecutor,
+    num_workers: int,
+    cliente: ClienteGeminiAsync,
+    capacidade_filas: int,
+    exportador: Optional[ExportadorConsolidado] = None
+) -> Tuple[List[Dict[str, Any]], List[EstagioPipeline]]:
+    """Lote assíncrono em estágios: enquanto um PDF aguarda a IA, o seguinte é extraído e o anterior vai para o Excel."""
+    loop = asyncio.get_running_loop()
+
+    async def _estagio_extracao(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        resultado = trabalho["resultado"]
+        try:
+            trabalho["texto"], resultado["tempos"]["extracao_texto"] = await loop.run_in_executor(
+                executor, extrair_texto_pdf_lote, trabalho["caminho_pdf"])
+            if trabalho["texto"] is None:
+                resultado["erro"] = "Falha na extração de texto do PDF."
+        except Exception as e: # Ex.: worker encerrado abruptamente
+            resultado["erro"] = f"Falha no worker de extração: {e}"
+        return trabalho
+
+    async def _estagio_api(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        resultado = trabalho["resultado"]
+        t_inicio = time.perf_counter()
+        metricas_api: Dict[str, Any] = {}
+        trabalho["resultado_api"] = await enviar_texto_completo_para_gemini_todos_blocos_async(
+            trabalho.pop("texto"), BLOCO_CONFIG, trabalho["caminho_pdf"], cliente, metricas_api)
+        resultado["tempos"]["api_gemini"] = time.perf_counter() - t_inicio
+        if CACHE_RESPOSTAS_GEMINI.habilitado and not CACHE_RESPOSTAS_GEMINI.atualizar:
+            resultado["cache_gemini_acerto"] = metricas_api.get("cache_acerto")
+        if "contabilidade" in metricas_api:
+            resultado["tokens_gemini"] = metricas_api["contabilidade"].resumo()
+        if not trabalho["resultado_api"]:
+            resultado["erro"] = "Resposta da API Gemini inválida ou vazia."
+        return trabalho
+
+    async def _estagio_normalizacao(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            trabalho["resultado"], trabalho["json_normalizado"] = await loop.run_in_executor(
+                executor, normalizar_resultado_api_lote, trabalho["resultado"], trabalho.pop("resultado_api"))
+        except Exception as e:
+            trabalho["resultado"]["erro"] = f"Falha no worker de normalização: {e}"
+        return trabalho
+
+    async def _estagio_excel(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            trabalho["resultado"] = await loop.run_in_executor(
+                executor, preencher_excel_lote, trabalho["resultado"], trabalho.pop("json_normalizado"),
+                trabalho["caminho_pdf"], caminho_excel_modelo, dir_saida, nome_planilha_alvo, exportador is not None)
+        except Exception as e:
+            trabalho["resultado"]["erro"] = f"Falha no worker do Excel: {e}"
+        return trabalho
+
+    # Os estágios de CPU dividem o mesmo pool: o tempo "ocupado" deles inclui a espera por um worker livre
+    estagios = [
+        EstagioPipeline("extracao_texto", _estagio_extracao, num_workers, capacidade_filas),
+        EstagioPipeline("api_gemini", _estagio_api, cliente.max_em_voo, capacidade_filas),
+        EstagioPipeline("normalizacao", _estagio_normalizacao, num_workers, capacidade_filas),
+        EstagioPipeline("preenchimento_excel", _estagio_excel, num_workers, capacidade_filas),
+    ]
+    concluidos: List[Dict[str, Any]] = []
+
+    def _registrar_conclusao(trabalho: Dict[str, Any]) -> None:
+        resultado = trabalho["resultado"]
+        json_normalizado = resultado.pop("json_normalizado", None)
+        if exportador is not None and json_normalizado:
+            exportador.adicionar(resultado["pdf"], json_normalizado)
+        concluidos.append(resultado)
+        log_to_gui(f"LOTE [{len(concluidos)}/{len(caminhos_pdf)}] {resultado['pdf']}: {'OK' if resultado['sucesso'] else 'FALHA - ' + str(resultado['erro'])}", "INFO" if resultado["sucesso"] else "ERROR")
+
+    trabalhos = ({"caminho_pdf": caminho_pdf, "resultado": _novo_resultado_lote(caminho_pdf)} for caminho_pdf in caminhos_pdf)
+    await executar_pipeline(trabalhos, estagios, encerrado=lambda trabalho: trabalho["resultado"]["erro"] is not None,
+                            ao_concluir=_registrar_conclusao)
+    return concluidos, estagios
+
+def executar_lote_async(
+    dir_pdfs: Path,
+    caminho_excel_modelo: Optional[Path],
+    nome_planilha_alvo: Optional[str] = None,
+    num_workers: int = 1,
+    dir_saida: Optional[Path] = None,
+    usar_cache: bool = True,
+    atualizar_cache: bool = False,
+    particoes_em_paralelo: bool = False,
+    salvar_json_dados_excel: bool = False,
+    max_em_voo: int = GEMINI_MAX_REQUISICOES_EM_VOO,
+    requisicoes_por_minuto: Optional[float] = GEMINI_REQUISICOES_POR_MINUTO,
+    tokens_por_minuto: Optional[float] = GEMINI_TOKENS_POR_MINUTO,
+    capacidade_filas: int = CAPACIDADE_FILAS_PIPELINE_LOTE,
+    caminho_consolidado: Optional[Path] = None,
+    orcamento_tokens: Optional[int] = None,
+    acao_orcamento: Optional[str] = None,
+    cache_contexto: Optional[bool] = None,
+    backend_llm: Optional[str] = None,
+    config_backend_falso: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Processa o diretório com um único cliente assíncrono (cota RPM/TPM compartilhada) e retorna o resumo."""
+    dir_saida = dir_saida or dir_pdfs
+    dir_saida.mkdir(parents=True, exist_ok=True)
+    caminhos_pdf = sorted(p for p in dir_pdfs.iterdir() if p.is_file() and p.suffix.lower() == ".pdf")
+    log_to_gui(f"LOTE ASYNC: {len(caminhos_pdf)} PDFs encontrados em '{dir_pdfs}'. Workers: {num_workers}. "
+               f"Requisições em voo: {max_em_voo}. RPM: {requisicoes_por_minuto or 'sem limite'}. TPM: {tokens_por_minuto or 'sem limite'}.", "INFO")
+    inicializar_worker_lote(usar_cache, atualizar_cache, particoes_em_paralelo, salvar_json_dados_excel, # O processo principal chama a IA
+                            orcamento_tokens, acao_orcamento, cache_contexto, backend_llm, config_backend_falso)
+    cliente = criar_cliente_gemini_async(max_em_voo, requisicoes_por_minuto, tokens_por_minuto)
+    if cliente is None:
+        log_to_gui("ERRO CRÍTICO: API Key do Google Gemini não configurada. Lote assíncrono não pode ser processado.", "CRITICAL")
+        return None
+
+    exportador = ExportadorConsolidado(caminho_consolidado) if caminho_consolidado else None
+    t_inicio_lote = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, num_workers), initializer=inicializar_worker_lote,
+                             initargs=(usar_cache, atualizar_cache, particoes_em_paralelo, salvar_json_dados_excel,
+                                       orcamento_tokens, acao_orcamento, cache_contexto, backend_llm, config_backend_falso)) as executor:
+        resultados, estagios = asyncio.run(_processar_lote_async(
+            caminhos_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo, executor, max(1, num_workers),
+            cliente, capacidade_filas, exportador))
+
+    duracao_total_s = time.perf_counter() - t_inicio_lote
+    resumo = resumir_lote(resultados, duracao_total_s)
+    resumo["pipeline"] = {estagio.nome: estagio.metricas(duracao_total_s) for estagio in estagios}
+    resumo["api_gemini_async"] = {
+        "requisicoes": cliente.requisicoes,
+        "retries": cliente.retries,
+        "respostas_429": cliente.respostas_429,
+        "espera_limitador_s": cliente.limitador.tempo_total_espera_s,
+    }
+    if exportador is not None:
+        resumo["consolidado"] = finalizar_exportacao_consolidada(exportador)
+    return resumo
+
+def executar_cli(argv: List[str]) -> int:
+    """Ponto de entrada de linha de comando: `python -m processar batch <dir> --template X.xlsx [--consolidado lote.xlsx]`."""
+    global BACKEND_LLM, CONFIG_BACKEND_FALSO
+    parser = argparse.ArgumentParser(prog="python -m processar", description="Processador de Súmulas de Crédito (modo sem interface gráfica).")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    parser_lote = subparsers.add_parser("batch", help="Processa todos os PDFs de um diretório.")
+    parser_lote.add_argument("diretorio", type=Path, help="Diretório com os PDFs de súmulas.")
+    parser_lote.add_argument("--workers", type=int, default=None, help="Número de processos workers (padrão: nº de CPUs; com --celery, use --concurrency no worker).")
+    parser_lote.add_argument("--template", type=Path, default=None, help="Arquivo Excel modelo (.xlsx) com placeholders {{CHAVE}} (um Excel por PDF).")
+    parser_lote.add_argument("--consolidado", type=Path, default=None, help="Planilha .xlsx única do lote, com uma linha por súmula (dispensa --template).")
+    parser_lote.add_argument("--sheet", default=None, help="Aba do modelo a preencher (padrão: aba ativa).")
+    parser_lote.add_argument("--saida", type=Path, default=None, help="Diretório de saída (padrão: o próprio diretório dos PDFs).")
+    parser_lote.add_argument("--no-cache", dest="usar_cache", action="store_false", help="Não lê nem grava os caches (texto dos PDFs e respostas da IA).")
+    parser_lote.add_argument("--refresh", action="store_true", help="Ignora as entradas em cache, reprocessa e regrava os caches.")
+    parser_lote.add_argument("--particoes-paralelas", action="store_true", help="Envia uma requisição à IA por partição do schema, em paralelo.")
+    parser_lote.add_argument("--async", dest="modo_async", action="store_true", help="Usa um único cliente assíncrono da IA para todo o lote (respeita --rpm/--tpm).")
+    parser_lote.add_argument("--max-em-voo", type=int, default=GEMINI_MAX_REQUISICOES_EM_VOO, help="Modo --async: máximo de requisições simultâneas à IA.")
+    parser_lote.add_argument("--rpm", type=float, default=GEMINI_REQUISICOES_POR_MINUTO, help="Modo --async: limite de requisições por minuto da cota.")
+    parser_lote.add_argument("--tpm", type=float, default=GEMINI_TOKENS_POR_MINUTO, help="Modo --async: limite de tokens por minuto da cota.")
+    parser_lote.add_argument("--celery", action="store_true", help="Enfileira o lote nos workers Celery (broker em PROCESSAR_CELERY_BROKER) e aguarda o resumo.")
+    parser_lote.add_argument("--celery-timeout", type=float, default=None, help="Modo --celery: espera máxima pelo resumo do lote, em segundos (padrão: PROCESSAR_CELERY_TIMEOUT_LOTE_S ou 6 h).")
+    parser_lote.add_argument("--capacidade-filas", type=int, default=CAPACIDADE_FILAS_PIPELINE_LOTE, help="Modo --async: itens máximos em cada fila entre estágios.")
+    parser_lote.add_argument("--orcamento-tokens", type=int, default=None, help="Máximo de tokens de entrada (estimados) por requisição à IA.")
+    parser_lote.add_argument("--orcamento-acao", choices=(ACAO_ORCAMENTO_DIVIDIR, ACAO_ORCAMENTO_ABORTAR), default=None,
+                             help="Requisição acima de --orcamento-tokens: divide os blocos em requisições menores (padrão) ou falha o documento.")
+    parser_lote.add_argument("--cache-contexto", action="store_true", default=None,
+                             help="Registra as instruções do prompt no cache de contexto da API Gemini e envia só o texto de cada documento.")
+    parser_lote.add_argument("--backend", choices=(BACKEND_LLM_GEMINI, BACKEND_LLM_FALSO), default=None,
+                             help="Backend de LLM (padrão: PROCESSAR_BACKEND_LLM ou gemini); 'falso' responde offline, para medir o pipeline sem rede.")
+    parser_lote.add_argument("--backend-falso-config", type=json.loads, default=None,
+                             help='Parâmetros do backend falso em JSON, ex.: \'{"latencia_s": 0.8, "distribuicao_latencia": "lognormal", "desvio_latencia_s": 0.3, "taxa_429": 0.05}\'.')
+    parser_lote.add_argument("--salvar-json-excel", action="store_true", help="Também grava '<pdf>_dados_para_excel.json' (em segundo plano) para conferência.")
+    subparsers.add_parser("compilar-config", help="Revalida o schema e o mapeamento e grava o snapshot binário da configuração.")
+    args = parser.parse_args(argv)
+
+    if args.comando == "compilar-config":
+        t_inicio = time.perf_counter()
+        if not compilar_snapshot_configuracao():
+            return 2
+        print(f"Snapshot gravado em '{ARQUIVO_SNAPSHOT_CONFIG}' em {(time.perf_counter() - t_inicio) * 1000:.1f} ms.")
+        return 0
+
+    if not args.diretorio.is_dir():
+        parser.error(f"Diretório de PDFs não encontrado: {args.diretorio}")
+    if args.template is None and args.consolidado is None:
+        parser.error("Informe --template e/ou --consolidado.")
+    if args.template is not None and not args.template.is_file():
+        parser.error(f"Modelo Excel não encontrado: {args.template}")
+    if args.celery and (args.workers is not None or args.modo_async):
+        parser.error("--workers e --async não se aplicam a --celery: a concorrência é a dos workers (celery worker --concurrency).")
+    num_workers = args.workers or os.cpu_count() or 1
+    if not carregar_schema_extracao() or not BLOCO_CONFIG:
+        log_to_gui("ERRO CRÍTICO: Schema de extração vazio ou inválido. Lote não pode ser processado.", "CRITICAL")
+        return 2
+    if args.backend is not None: BACKEND_LLM = args.backend
+    if args.backend_falso_config is not None: CONFIG_BACKEND_FALSO = args.backend_falso_config
+    if not obter_backend_llm().configurar():
+        log_to_gui("ERRO CRÍTICO: API Key do Google Gemini não configurada. Lote não pode ser processado.", "CRITICAL")
+        return 2
+    atualizar_snapshot_configuracao() # Os workers do lote partem do snapshot em vez de revalidar os JSONs
+
+    if args.celery:
+        import tarefas_celery # Importação tardia: tarefas_celery importa este módulo
+        opcoes_lote = {"usar_cache": args.usar_cache, "atualizar_cache": args.refresh, "particoes_em_paralelo": args.particoes_paralelas,
+                       "salvar_json_dados_excel": args.salvar_json_excel, "orcamento_tokens": args.orcamento_tokens,
+                       "acao_orcamento": args.orcamento_acao, "cache_contexto": args.cache_contexto,
+                       "backend_llm": args.backend, "config_backend_falso": args.backend_falso_config}
+        resultado_lote = tarefas_celery.enfileirar_lote(args.diretorio.resolve(), args.template.resolve() if args.template else None, args.sheet,
+                                                        args.saida.resolve() if args.saida else None,
+                                                        args.consolidado.resolve() if args.consolidado else None,
+                                                        {opcao: valor for opcao, valor in opcoes_lote.items() if valor is not None})
+        resumo = tarefas_celery.aguardar_resumo_lote(resultado_lote, args.celery_timeout)
+        if resumo is None:
+            return 2
+    elif args.modo_async:
+        resumo = executar_lote_async(args.diretorio, args.template, args.sheet, num_workers, args.saida,
+                                     usar_cache=args.usar_cache, atualizar_cache=args.refresh,
+                                     particoes_em_paralelo=args.particoes_paralelas, salvar_json_dados_excel=args.salvar_json_excel,
+                                     max_em_voo=args.max_em_voo,
+                                     requisicoes_por_minuto=args.rpm, tokens_por_minuto=args.tpm,
+                                     capacidade_filas=args.capacidade_filas, caminho_consolidado=args.consolidado,
+                                     orcamento_tokens=args.orcamento_tokens, acao_orcamento=args.orcamento_acao,
+                                     cache_contexto=args.cache_contexto,
+                                     backend_llm=args.backend, config_backend_falso=args.backend_falso_config)
+        if resumo is None:
+            return 2
+    else:
+        resumo = executar_lote(args.diretorio, args.template, args.sheet, num_workers, args.saida,
+                               usar_cache=args.usar_cache, atualizar_cache=args.refresh,
+                               particoes_em_paralelo=args.particoes_paralelas, salvar_json_dados_excel=args.salvar_json_excel,
+                               caminho_consolidado=args.consolidado,
+                               orcamento_tokens=args.orcamento_tokens, acao_orcamento=args.orcamento_acao,
+                               cache_contexto=args.cache_contexto,
+                               backend_llm=args.backend, config_backend_falso=args.backend_falso_config)
+    print(formatar_resumo_lote(resumo))
+    return 0 if resumo["falhas"] == 0 else 1
+
 # --- FUNÇÕES DA INTERFACE E MAINLOOP ---
 def iniciar_fluxo_analise_pdf() -> None:
     """Inicia o fluxo principal de análise de um PDF selecionado pelo usuário."""
     log_to_gui("\n--- Novo Ciclo de Análise de PDF Iniciado ---", "INFO")
     parent_dialog = _root_ref_for_log if is_gui_widget_available(_root_ref_for_log) else None
 
-    if not genai_config_ok:
+    if not obter_backend_llm().configurar():
         log_to_gui("AVISO: API Key do Google Gemini não configurada/inválida. Extração de dados falhará.", "WARNING")
         if parent_dialog:
             messagebox.showerror("Erro API", "API Key do Google Gemini não configurada. Verifique .env e logs.", parent=parent_dialog)
@@ -1399,62 +2661,159 @@ def abrir_arquivo_para_edicao(nome_arq_relativo: str, desc_arq: str) -> None:
 def abrir_mapeamento_para_edicao(): abrir_arquivo_para_edicao(ARQUIVO_MAPEAMENTO_CONFIG, "mapeamento de chaves")
 def abrir_schema_para_edicao(): abrir_arquivo_para_edicao(ARQUIVO_SCHEMA_EXTRACAO, "schema de extração da IA")
 
-# --- 8. CONFIGURAÇÃO FINAL DA GUI (Botões, Menu, mainloop) ---
-style.configure("Primary.TButton", font=FONTE_BOTAO_PRINCIPAL, padding=(PADDING_X_BOTAO_STYLE, PADDING_Y_BOTAO_STYLE), foreground=COR_BOTAO_PRIMARIO_FG, background=COR_BOTAO_PRIMARIO_BG)
-style.configure("Secondary.TButton", font=FONTE_BOTAO_SECUNDARIO, padding=(PADDING_X_BOTAO_STYLE, PADDING_Y_BOTAO_STYLE), foreground=COR_BOTAO_SECUNDARIO_FG, background=COR_BOTAO_SECUNDARIO_BG)
-style.map("Primary.TButton", background=[('active', COR_BOTAO_HOVER_PRIMARIO), ('pressed', COR_BOTAO_HOVER_PRIMARIO), ('!disabled', COR_BOTAO_PRIMARIO_BG)], foreground=[('!disabled', COR_BOTAO_PRIMARIO_FG)])
-style.map("Secondary.TButton", background=[('active', COR_BOTAO_HOVER_SECUNDARIO), ('pressed', COR_BOTAO_HOVER_SECUNDARIO), ('!disabled', COR_BOTAO_SECUNDARIO_BG)], foreground=[('!disabled', COR_BOTAO_SECUNDARIO_FG)])
-
-frame_botoes_principais.columnconfigure(0, weight=1)
-frame_botoes_principais.columnconfigure(1, weight=1)
-frame_botoes_principais.columnconfigure(2, weight=1)
-
-botao_analisar = ttk.Button(frame_botoes_principais, text="Analisar PDF e Gerar Saídas", command=iniciar_fluxo_analise_pdf, style="Primary.TButton")
-botao_analisar.grid(row=0, column=0, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
-
-botao_editar_mapeamento = ttk.Button(frame_botoes_principais, text="Editar Mapeamento Chaves", command=abrir_mapeamento_para_edicao, style="Secondary.TButton")
-botao_editar_mapeamento.grid(row=0, column=1, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
-
-botao_editar_schema = ttk.Button(frame_botoes_principais, text="Editar Schema Extração IA", command=abrir_schema_para_edicao, style="Secondary.TButton")
-botao_editar_schema.grid(row=0, column=2, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
-
-menu_bar = tk.Menu(root, font=FONTE_MENU)
-menu_arquivo = tk.Menu(menu_bar, tearoff=0, font=FONTE_MENU)
-icone_menu_pdf_tk: Optional[ImageTk.PhotoImage] = None
-caminho_icone_menu_relativo = "assets/icone_pdf.ico"
-
-try:
-    caminho_icone_menu_abs = resource_path(caminho_icone_menu_relativo)
-    if caminho_icone_menu_abs.is_file():
-        img_pil_menu = Image.open(caminho_icone_menu_abs)
-        img_pil_menu = img_pil_menu.resize((16, 16), Image.Resampling.LANCZOS)
-        icone_menu_pdf_tk = ImageTk.PhotoImage(img_pil_menu)
-        log_to_gui(f"Ícone de menu '{caminho_icone_menu_relativo}' carregado.", "DEBUG")
+# --- 3. CONSTRUÇÃO DA INTERFACE GRÁFICA (executada apenas pelo __main__) ---
+def construir_interface_grafica() -> tk.Tk:
+    """Cria a janela principal, estilos, logo, área de log, botões e menu da aplicação."""
+    global progress, status_label, botao_analisar, _root_ref_for_log
+    from PIL import Image, ImageTk # Importado aqui: só a GUI precisa carregar/redimensionar imagens
+
+    root = tk.Tk()
+    _root_ref_for_log = root
+
+    root.title(f"Processador de Súmulas de Crédito - Gemini v{GEMINI_MODEL_NAME.split('-')[-2] if GEMINI_MODEL_NAME and '-' in GEMINI_MODEL_NAME else '?.?'}")
+    root.geometry("900x750")
+    root.configure(bg=COR_FUNDO_JANELA)
+
+    # Configuração de Estilos ttk
+    style = ttk.Style()
+    style.theme_use('clam')
+    style.configure("TButton", padding=6, relief="flat", borderwidth=0)
+    style.configure("TLabel", font=FONTE_SUBTITULO, background=COR_FUNDO_JANELA, foreground=COR_TEXTO_PADRAO)
+    style.configure("TProgressbar", thickness=15, background=COR_BOTAO_PRIMARIO_BG)
+    style.configure("Title.TLabel", font=FONTE_TITULO_APP, foreground=COR_TEXTO_TITULO_GUI, background=COR_FUNDO_JANELA)
+    style.configure("Header.TFrame", background=COR_FUNDO_JANELA)
+    style.configure("Controls.TFrame", background=COR_FUNDO_JANELA)
+    style.configure("Status.TFrame", background=COR_FUNDO_JANELA)
+    style.configure("TLabelframe", background=COR_FUNDO_FRAMES_INTERNOS, relief=tk.GROOVE, borderwidth=1)
+    style.configure("TLabelframe.Label", font=FONTE_LABELFRAME_TITULO, background=COR_FUNDO_FRAMES_INTERNOS, foreground=COR_TEXTO_PADRAO, padding=(5,2))
+
+    # Frame do Topo (Título, Logo, Instrução, Botões Principais)
+    frame_topo = ttk.Frame(root, padding=(20, 10), style="Header.TFrame")
+    frame_topo.pack(pady=(10,0), fill=tk.X)
+
+    # Seção Logo e Título
+    logging.info("--- INICIANDO BLOCO DE CARREGAMENTO DO LOGO PRINCIPAL (GUI) ---")
+    frame_titulo_com_logo = ttk.Frame(frame_topo, style="Header.TFrame")
+    frame_titulo_com_logo.pack(pady=(0, 5), anchor=tk.CENTER)
+
+    logo_app_image_tk: Optional[ImageTk.PhotoImage] = None
+    caminho_logo_relativo = "assets/logo_sicoob.png"
+    NOVO_LARGURA_LOGO = 45
+    NOVO_ALTURA_LOGO = 45
+
+    try:
+        caminho_logo_abs = resource_path(caminho_logo_relativo)
+        if caminho_logo_abs.is_file():
+            img_pil = Image.open(caminho_logo_abs)
+            img_redimensionada_pil = img_pil.resize((NOVO_LARGURA_LOGO, NOVO_ALTURA_LOGO), Image.Resampling.LANCZOS)
+            logo_app_image_tk = ImageTk.PhotoImage(img_redimensionada_pil)
+
+            label_logo = ttk.Label(frame_titulo_com_logo, image=logo_app_image_tk)
+            label_logo.image = logo_app_image_tk
+            label_logo.pack(side=tk.LEFT, padx=(0, 10), pady=5)
+            logging.info(f"Logo '{caminho_logo_relativo}' carregada.")
+        else:
+            logging.warning(f"Arquivo de logo '{caminho_logo_abs}' NÃO ENCONTRADO.")
+            log_to_gui(f"AVISO: Arquivo de logo '{caminho_logo_abs}' NÃO ENCONTRADO.", "WARNING")
+    except Exception as e_logo:
+        logging.error(f"Erro ao carregar/redimensionar logo '{caminho_logo_relativo}': {e_logo}", exc_info=True)
+        log_to_gui(f"AVISO: Erro ao carregar/redimensionar logo '{caminho_logo_relativo}': {e_logo}", "WARNING")
+
+    label_titulo_app = ttk.Label(frame_titulo_com_logo, text="Processador de Súmulas de Crédito", style="Title.TLabel")
+    label_titulo_app.pack(side=tk.LEFT, pady=5)
+    logging.info("--- FIM DO BLOCO DE CARREGAMENTO DO LOGO PRINCIPAL (GUI) ---")
+
+    label_instrucao_app = ttk.Label(frame_topo, text="Selecione um PDF para análise. O log do processamento aparecerá abaixo.", justify=tk.CENTER)
+    label_instrucao_app.pack(pady=(5,10))
+
+    # Botões Principais
+    frame_botoes_principais = ttk.Frame(frame_topo, style="Controls.TFrame")
+    frame_botoes_principais.pack(pady=10, fill=tk.X, padx=20)
+
+    # Status e Barra de Progresso
+    frame_status_progresso = ttk.Frame(root, padding=(20,5), style="Status.TFrame")
+    frame_status_progresso.pack(fill=tk.X, padx=10)
+    progress = ttk.Progressbar(frame_status_progresso, orient="horizontal", length=500, mode="indeterminate")
+    progress.pack(pady=5, fill=tk.X, expand=True)
+    status_label = ttk.Label(frame_status_progresso, text="Pronto para iniciar.", foreground=COR_STATUS_LABEL_FG, font=FONTE_STATUS, anchor=tk.CENTER)
+    status_label.pack(pady=5, fill=tk.X)
+
+    # Área de Log
+    log_labelframe = ttk.LabelFrame(root, text=" Log de Processamento ", padding=(10,5))
+    log_labelframe.pack(pady=(5,10), padx=10, fill=tk.BOTH, expand=True)
+    log_text_widget_instance = tk.Text(log_labelframe, height=15, width=90, wrap=tk.WORD, font=FONTE_LOG, bg=COR_FUNDO_LOG, fg=COR_TEXTO_LOG, relief=tk.SOLID, bd=1, state=tk.DISABLED)
+    log_scrollbar_y = ttk.Scrollbar(log_labelframe, orient="vertical", command=log_text_widget_instance.yview)
+    log_text_widget_instance.config(yscrollcommand=log_scrollbar_y.set)
+    log_text_widget_instance.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=5, padx=(0,5))
+    log_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+
+    setup_gui_logging_refs(root, log_text_widget_instance)
+
+    # --- Botões e Menu ---
+    style.configure("Primary.TButton", font=FONTE_BOTAO_PRINCIPAL, padding=(PADDING_X_BOTAO_STYLE, PADDING_Y_BOTAO_STYLE), foreground=COR_BOTAO_PRIMARIO_FG, background=COR_BOTAO_PRIMARIO_BG)
+    style.configure("Secondary.TButton", font=FONTE_BOTAO_SECUNDARIO, padding=(PADDING_X_BOTAO_STYLE, PADDING_Y_BOTAO_STYLE), foreground=COR_BOTAO_SECUNDARIO_FG, background=COR_BOTAO_SECUNDARIO_BG)
+    style.map("Primary.TButton", background=[('active', COR_BOTAO_HOVER_PRIMARIO), ('pressed', COR_BOTAO_HOVER_PRIMARIO), ('!disabled', COR_BOTAO_PRIMARIO_BG)], foreground=[('!disabled', COR_BOTAO_PRIMARIO_FG)])
+    style.map("Secondary.TButton", background=[('active', COR_BOTAO_HOVER_SECUNDARIO), ('pressed', COR_BOTAO_HOVER_SECUNDARIO), ('!disabled', COR_BOTAO_SECUNDARIO_BG)], foreground=[('!disabled', COR_BOTAO_SECUNDARIO_FG)])
+
+    frame_botoes_principais.columnconfigure(0, weight=1)
+    frame_botoes_principais.columnconfigure(1, weight=1)
+    frame_botoes_principais.columnconfigure(2, weight=1)
+
+    botao_analisar = ttk.Button(frame_botoes_principais, text="Analisar PDF e Gerar Saídas", command=iniciar_fluxo_analise_pdf, style="Primary.TButton")
+    botao_analisar.grid(row=0, column=0, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
+
+    botao_editar_mapeamento = ttk.Button(frame_botoes_principais, text="Editar Mapeamento Chaves", command=abrir_mapeamento_para_edicao, style="Secondary.TButton")
+    botao_editar_mapeamento.grid(row=0, column=1, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
+
+    botao_editar_schema = ttk.Button(frame_botoes_principais, text="Editar Schema Extração IA", command=abrir_schema_para_edicao, style="Secondary.TButton")
+    botao_editar_schema.grid(row=0, column=2, padx=5, pady=10, ipadx=5, ipady=5, sticky="ew")
+
+    menu_bar = tk.Menu(root, font=FONTE_MENU)
+    menu_arquivo = tk.Menu(menu_bar, tearoff=0, font=FONTE_MENU)
+    icone_menu_pdf_tk: Optional[ImageTk.PhotoImage] = None
+    caminho_icone_menu_relativo = "assets/icone_pdf.ico"
+
+    try:
+        caminho_icone_menu_abs = resource_path(caminho_icone_menu_relativo)
+        if caminho_icone_menu_abs.is_file():
+            img_pil_menu = Image.open(caminho_icone_menu_abs)
+            img_pil_menu = img_pil_menu.resize((16, 16), Image.Resampling.LANCZOS)
+            icone_menu_pdf_tk = ImageTk.PhotoImage(img_pil_menu)
+            log_to_gui(f"Ícone de menu '{caminho_icone_menu_relativo}' carregado.", "DEBUG")
+        else:
+            log_to_gui(f"AVISO: Ícone de menu '{caminho_icone_menu_abs}' NÃO ENCONTRADO.", "WARNING")
+    except Exception as e_icon_menu:
+        log_to_gui(f"ERRO ao carregar ícone de menu '{caminho_icone_menu_relativo}': {e_icon_menu}", "ERROR")
+        logging.exception(f"Erro detalhado ao carregar ícone de menu '{caminho_icone_menu_relativo}':")
+
+    if icone_menu_pdf_tk:
+        menu_arquivo.add_command(label="Analisar PDF e Gerar Saídas...", image=icone_menu_pdf_tk, compound="left", command=iniciar_fluxo_analise_pdf)
+        menu_arquivo.image = icone_menu_pdf_tk # Mantém a referência da imagem (evita coleta pelo garbage collector)
     else:
-        log_to_gui(f"AVISO: Ícone de menu '{caminho_icone_menu_abs}' NÃO ENCONTRADO.", "WARNING")
-except Exception as e_icon_menu:
-    log_to_gui(f"ERRO ao carregar ícone de menu '{caminho_icone_menu_relativo}': {e_icon_menu}", "ERROR")
-    logging.exception(f"Erro detalhado ao carregar ícone de menu '{caminho_icone_menu_relativo}':")
-
-if icone_menu_pdf_tk:
-    menu_arquivo.add_command(label="Analisar PDF e Gerar Saídas...", image=icone_menu_pdf_tk, compound="left", command=iniciar_fluxo_analise_pdf)
-else:
-    menu_arquivo.add_command(label="Analisar PDF e Gerar Saídas...", command=iniciar_fluxo_analise_pdf)
-
-menu_arquivo.add_command(label=f"Editar Mapeamento ({Path(ARQUIVO_MAPEAMENTO_CONFIG).name})", command=abrir_mapeamento_para_edicao)
-menu_arquivo.add_command(label=f"Editar Schema IA ({Path(ARQUIVO_SCHEMA_EXTRACAO).name})", command=abrir_schema_para_edicao)
-menu_arquivo.add_separator()
-menu_arquivo.add_command(label="Limpar Log da Tela", command=limpar_log_gui)
-menu_arquivo.add_separator()
-menu_arquivo.add_command(label="Sair", command=sair_aplicacao)
-menu_bar.add_cascade(label="Arquivo", menu=menu_arquivo)
-menu_ajuda = tk.Menu(menu_bar, tearoff=0, font=FONTE_MENU)
-menu_ajuda.add_command(label="Sobre", command=mostrar_sobre)
-menu_bar.add_cascade(label="Ajuda", menu=menu_ajuda)
-root.config(menu=menu_bar)
-root.protocol("WM_DELETE_WINDOW", sair_aplicacao)
+        menu_arquivo.add_command(label="Analisar PDF e Gerar Saídas...", command=iniciar_fluxo_analise_pdf)
+
+    menu_arquivo.add_command(label=f"Editar Mapeamento ({Path(ARQUIVO_MAPEAMENTO_CONFIG).name})", command=abrir_mapeamento_para_edicao)
+    menu_arquivo.add_command(label=f"Editar Schema IA ({Path(ARQUIVO_SCHEMA_EXTRACAO).name})", command=abrir_schema_para_edicao)
+    menu_arquivo.add_separator()
+    menu_arquivo.add_command(label="Limpar Log da Tela", command=limpar_log_gui)
+    menu_arquivo.add_separator()
+    menu_arquivo.add_command(label="Sair", command=sair_aplicacao)
+    menu_bar.add_cascade(label="Arquivo", menu=menu_arquivo)
+    menu_ajuda = tk.Menu(menu_bar, tearoff=0, font=FONTE_MENU)
+    menu_ajuda.add_command(label="Sobre", command=mostrar_sobre)
+    menu_bar.add_cascade(label="Ajuda", menu=menu_ajuda)
+    root.config(menu=menu_bar)
+    root.protocol("WM_DELETE_WINDOW", sair_aplicacao)
+    return root
+
+if __name__ == "__main__" and len(sys.argv) > 1: # Subcomandos de linha de comando (ex.: batch), sem GUI
+    configurar_logging(modo_arquivo='w') # 'w' para log limpo a cada execução
+    sys.exit(executar_cli(sys.argv[1:]))
 
 if __name__ == "__main__":
+    configurar_logging(modo_arquivo='w') # 'w' para log limpo a cada execução
+    atexit.register(compactar_diario_mapeamento) # Garante que mapeamentos ainda no diário cheguem ao JSON ao sair
+    root = construir_interface_grafica()
     log_to_gui(f"Aplicação Processador de Súmulas iniciada. PID: {os.getpid()}", "INFO")
     log_to_gui(f"O arquivo de log principal está sendo salvo em: {LOG_FILE_PATH.resolve()}", "INFO")
     log_to_gui("Verifique o arquivo de log para mensagens de erro ou avisos da inicialização.", "INFO")
@@ -1472,6 +2831,8 @@ if __name__ == "__main__":
         else:
             particoes_logicas_ok = True
             log_to_gui("INFO: Schema de extração carregado, mas está vazio (sem blocos).", "INFO")
+        if particoes_logicas_ok and BLOCO_CONFIG:
+            atualizar_snapshot_configuracao() # Próximas inicializações carregam o snapshot
 
     configuracao_critica_falhou = False
     msg_erro_critico_str = ""
@@ -1492,7 +2853,7 @@ if __name__ == "__main__":
 
     log_to_gui("Interface Gráfica Pronta e Aguardando Ações.", "INFO")
 
-    if not genai_config_ok:
+    if not obter_backend_llm().configurar(): # Depois do schema: o backend falso responde conforme os blocos carregados
         log_to_gui("AVISO IMPORTANTE: API Key do Google Gemini não configurada ou inválida. A extração de dados dos PDFs FALHARÁ.", "CRITICAL")
         if is_gui_widget_available(_root_ref_for_log) and isinstance(_root_ref_for_log, tk.Tk):
             messagebox.showwarning("Configuração da API Gemini Pendente",
@@ -0,0 +1,174 @@
+# --- SERVIÇO HTTP DE EXTRAÇÃO DE SÚMULAS (FLASK + GUNICORN) ---
+# Produção: gunicorn -c gunicorn.conf.py servico_http:app   (com preload_app, o estado é carregado uma vez no master)
+# Desenvolvimento: python servico_http.py [--porta 8000]
+#
+# POST /extract   multipart: pdf=<arquivo.pdf> [template=<modelo.xlsx>] [sheet=<aba>]; ?formato=json|xlsx
+# GET  /healthz   estado do schema, do mapeamento e da API
+# Teste de carga sem rede: PROCESSAR_BACKEND_LLM=falso [PROCESSAR_BACKEND_FALSO_CONFIG='{"latencia_s": 0.8}'] (backend_llm.BackendFalso)
+import argparse
+import io
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, jsonify, request, send_file
+from werkzeug.utils import secure_filename
+
+import processar
+
+TAMANHO_MAX_UPLOAD_MB = int(os.getenv("PROCESSAR_TAMANHO_MAX_UPLOAD_MB", "32"))
+TIMEOUT_REQUISICAO_S = float(os.getenv("PROCESSAR_TIMEOUT_REQUISICAO_S", "180")) # Prazo de cada /extract: limita o timeout e as novas tentativas das chamadas à API
+MODELO_EXCEL_PADRAO = os.getenv("PROCESSAR_MODELO_EXCEL") # Modelo usado em ?formato=xlsx quando nenhum 'template' é enviado
+MIMETYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class ErroRequisicao(Exception):
+    """Falha de uma requisição, com o status HTTP a devolver."""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def inicializar_servico() -> Dict[str, Any]:
+    """Carrega uma única vez schema, mapeamento de chaves, caches e cliente Gemini; retorna o estado para o /healthz."""
+    processar.inicializar_worker_lote(particoes_em_paralelo=processar.ENVIAR_PARTICOES_EM_PARALELO)
+    backend = processar.obter_backend_llm()
+    backend_ok = backend.configurar()
+    if backend_ok:
+        backend.obter_modelo()
+    estado = {
+        "schema_blocos": len(processar.BLOCO_CONFIG),
+        "mapeamento_chaves": len(processar._mapa_chaves_worker_lote or {}),
+        "backend_llm": backend.nome,
+        "api_gemini_configurada": backend_ok,
+        "carregado_em": time.time(),
+    }
+    logging.info(f"Serviço HTTP: estado carregado (pid {os.getpid()}): {estado}")
+    return estado
+
+
+def _verificar_prazo(t_inicio: float, etapa: str) -> None:
+    if time.perf_counter() - t_inicio > TIMEOUT_REQUISICAO_S:
+        raise ErroRequisicao(504, f"Tempo limite de {TIMEOUT_REQUISICAO_S:.0f} s excedido após a etapa '{etapa}'.")
+
+
+def processar_upload(
+    caminho_pdf: Path,
+    caminho_excel_modelo: Optional[Path],
+    nome_planilha_alvo: Optional[str],
+    dir_trabalho: Path,
+    nome_pdf: Optional[str] = None
+) -> Tuple[Dict[str, Any], Optional[Path]]:
+    """Executa o núcleo do processar_pdf_e_gerar_saidas sem diálogos; retorna o resultado e o Excel gerado (se pedido).
+
+    `nome_pdf` é o nome original do upload (o arquivo em disco tem nome fixo), usado no resultado.
+    """
+    nome_pdf = nome_pdf or caminho_pdf.name
+    t_inicio = time.perf_counter()
+    prazo = time.monotonic() + TIMEOUT_REQUISICAO_S # Repassado às chamadas à API: nenhuma espera ou tentativa passa dele
+    resultado: Dict[str, Any] = {"pdf": nome_pdf, "tempos": {}, "cache_gemini_acerto": None}
+
+    texto_extraido, resultado["tempos"]["extracao_texto"] = processar.extrair_texto_pdf_lote(caminho_pdf)
+    if texto_extraido is None:
+        raise ErroRequisicao(422, "Falha na extração de texto do PDF.")
+    _verificar_prazo(t_inicio, "extracao_texto")
+
+    t_etapa = time.perf_counter()
+    metricas_api: Dict[str, Any] = {}
+    resultado_api = processar.enviar_texto_completo_para_gemini_todos_blocos(texto_extraido, processar.BLOCO_CONFIG, caminho_pdf, metricas_api,
+                                                                             prazo=prazo)
+    resultado["tempos"]["api_gemini"] = time.perf_counter() - t_etapa
+    resultado["cache_gemini_acerto"] = metricas_api.get("cache_acerto")
+    if isinstance(metricas_api.get("erro"), processar.ErroPrazoEsgotado):
+        raise ErroRequisicao(504, f"Tempo limite de {TIMEOUT_REQUISICAO_S:.0f} s esgotado durante a etapa 'api_gemini'.")
+    if not resultado_api:
+        _verificar_prazo(t_inicio, "api_gemini") # Timeout da última tentativa, cortada no prazo: 504, não 502
+        raise ErroRequisicao(502, "Resposta da API Gemini inválida ou vazia.")
+    _verificar_prazo(t_inicio, "api_gemini")
+
+    resultado_lote = {"pdf": nome_pdf, "sucesso": False, "erro": None, "tempos": resultado["tempos"]}
+    resultado_lote, json_normalizado = processar.normalizar_resultado_api_lote(resultado_lote, resultado_api)
+    if json_normalizado is None:
+        raise ErroRequisicao(422, resultado_lote["erro"] or "Normalização das chaves resultou vazia.")
+    resultado["placeholders"] = processar.montar_json_com_chaves_placeholder(json_normalizado)
+    _verificar_prazo(t_inicio, "normalizacao")
+
+    caminho_excel_saida: Optional[Path] = None
+    if caminho_excel_modelo is not None:
+        resultado_lote = processar.preencher_excel_lote(resultado_lote, json_normalizado, caminho_pdf, caminho_excel_modelo, dir_trabalho, nome_planilha_alvo)
+        if not resultado_lote["sucesso"]:
+            raise ErroRequisicao(422, resultado_lote["erro"] or "Falha ao gerar o Excel.")
+        caminho_excel_saida = dir_trabalho / f"{caminho_pdf.stem}_PREENCHIDO.xlsx"
+    resultado["tempos"]["total"] = time.perf_counter() - t_inicio
+    return resultado, caminho_excel_saida
+
+
+def criar_app() -> Flask:
+    """Cria a aplicação Flask com o estado do processador já carregado."""
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = TAMANHO_MAX_UPLOAD_MB * 1024 * 1024
+    estado_servico = inicializar_servico()
+
+    @app.errorhandler(ErroRequisicao)
+    def _tratar_erro_requisicao(erro: ErroRequisicao):
+        return jsonify({"erro": erro.mensagem}), erro.status
+
+    @app.errorhandler(413)
+    def _tratar_upload_grande(_erro: Any):
+        return jsonify({"erro": f"Arquivo maior que o limite de {TAMANHO_MAX_UPLOAD_MB} MB."}), 413
+
+    @app.get("/healthz")
+    def healthz():
+        pronto = estado_servico["schema_blocos"] > 0 and estado_servico["api_gemini_configurada"]
+        return jsonify({"status": "ok" if pronto else "indisponivel", "pid": os.getpid(), **estado_servico}), 200 if pronto else 503
+
+    @app.post("/extract")
+    def extract():
+        if not processar.BLOCO_CONFIG:
+            raise ErroRequisicao(503, "Schema de extração não carregado.")
+        arquivo_pdf = request.files.get("pdf")
+        if arquivo_pdf is None or not arquivo_pdf.filename:
+            raise ErroRequisicao(400, "Envie o PDF no campo multipart 'pdf'.")
+        formato = request.args.get("formato", "json").lower()
+        if formato not in ("json", "xlsx"):
+            raise ErroRequisicao(400, "Parâmetro 'formato' deve ser 'json' ou 'xlsx'.")
+        arquivo_modelo = request.files.get("template")
+        if formato == "xlsx" and arquivo_modelo is None and not MODELO_EXCEL_PADRAO:
+            raise ErroRequisicao(400, "Envie o modelo Excel no campo 'template' (ou configure PROCESSAR_MODELO_EXCEL).")
+
+        with tempfile.TemporaryDirectory(prefix="extract_") as dir_tmp:
+            dir_trabalho = Path(dir_tmp)
+            nome_pdf = secure_filename(arquivo_pdf.filename) or "documento.pdf"
+            caminho_pdf = dir_trabalho / "documento.pdf" # Nome fixo: um upload chamado 'modelo.xlsx' não colide com o modelo
+            arquivo_pdf.save(caminho_pdf)
+            caminho_excel_modelo: Optional[Path] = None
+            if formato == "xlsx":
+                if arquivo_modelo is not None:
+                    caminho_excel_modelo = dir_trabalho / "modelo.xlsx"
+                    arquivo_modelo.save(caminho_excel_modelo)
+                else:
+                    caminho_excel_modelo = Path(MODELO_EXCEL_PADRAO)
+
+            resultado, caminho_excel_saida = processar_upload(caminho_pdf, caminho_excel_modelo, request.form.get("sheet") or None, dir_trabalho, nome_pdf)
+            if caminho_excel_saida is None:
+                return jsonify(resultado)
+            conteudo_excel = caminho_excel_saida.read_bytes() # Lido antes de o diretório temporário ser removido
+        resposta = send_file(io.BytesIO(conteudo_excel), mimetype=MIMETYPE_XLSX, as_attachment=True, download_name=f"{Path(nome_pdf).stem}_PREENCHIDO.xlsx")
+        resposta.headers["X-Tempo-Total-s"] = f"{resultado['tempos']['total']:.3f}"
+        return resposta
+
+    return app
+
+
+app = criar_app() # Criado na importação: com `gunicorn --preload`, uma única vez no master, antes do fork dos workers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP de extração de súmulas (servidor de desenvolvimento).")
+    parser.add_argument("--porta", type=int, default=8000)
+    args = parser.parse_args()
+    app.run(host="127.0.0.1", port=args.porta, threaded=True)
@@ -0,0 +1,77 @@
+# --- SNAPSHOT BINÁRIO (PICKLE) DA CONFIGURAÇÃO JÁ VALIDADA, INVALIDADO POR MTIME/HASH DOS ARQUIVOS DE ORIGEM ---
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from cache_disco import calcular_sha256_arquivo
+
+VERSAO_FORMATO_SNAPSHOT = 1 # Incrementar se a estrutura do arquivo de snapshot mudar
+
+
+def assinatura_arquivo(caminho: Path) -> Dict[str, Any]:
+    """Identifica o conteúdo de um arquivo de origem: mtime e tamanho (verificação rápida) + SHA-256."""
+    estat = os.stat(caminho)
+    return {"caminho": str(Path(caminho).resolve()), "mtime_ns": estat.st_mtime_ns, "tamanho": estat.st_size,
+            "sha256": calcular_sha256_arquivo(Path(caminho))}
+
+
+def arquivo_inalterado(caminho: Path, assinatura: Dict[str, Any]) -> bool:
+    """True se o arquivo ainda corresponde à assinatura. Só recalcula o hash quando o mtime mudou (ex.: arquivo tocado)."""
+    try:
+        estat = os.stat(caminho)
+        if str(Path(caminho).resolve()) != assinatura["caminho"] or estat.st_size != assinatura["tamanho"]:
+            return False
+        if estat.st_mtime_ns == assinatura["mtime_ns"]:
+            return True
+        return calcular_sha256_arquivo(Path(caminho)) == assinatura["sha256"]
+    except (OSError, TypeError, KeyError):
+        return False
+
+
+def salvar_snapshot(caminho_snapshot: Path, fontes: Dict[str, Path], conteudo: Dict[str, Any], versao: int) -> None:
+    """Grava o snapshot de forma atômica (arquivo temporário + rename), junto das assinaturas das fontes."""
+    caminho_snapshot = Path(caminho_snapshot)
+    dados = {
+        "formato": VERSAO_FORMATO_SNAPSHOT,
+        "versao": versao,
+        "python": tuple(sys.version_info[:2]),
+        "fontes": {nome: assinatura_arquivo(caminho) for nome, caminho in fontes.items()},
+        "conteudo": conteudo,
+    }
+    caminho_snapshot.parent.mkdir(parents=True, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=caminho_snapshot.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(caminho_tmp, caminho_snapshot)
+    except BaseException:
+        Path(caminho_tmp).unlink(missing_ok=True)
+        raise
+
+
+def carregar_snapshot(caminho_snapshot: Path, fontes: Dict[str, Path], versao: int) -> Optional[Dict[str, Any]]:
+    """Retorna o snapshot ('conteudo' e assinaturas das 'fontes') se existir, for da mesma versão e as fontes estiverem inalteradas.
+
+    O snapshot é um pickle gravado pela própria aplicação no diretório de cache local: não carregar arquivos de terceiros.
+    """
+    try:
+        with open(caminho_snapshot, "rb") as f:
+            dados = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Snapshot de configuração '{Path(caminho_snapshot).name}' ilegível ({e}). Será ignorado.")
+        return None
+    if not isinstance(dados, dict) or dados.get("formato") != VERSAO_FORMATO_SNAPSHOT or dados.get("versao") != versao \
+       or dados.get("python") != tuple(sys.version_info[:2]):
+        return None
+    assinaturas = dados.get("fontes") or {}
+    if set(assinaturas) != set(fontes):
+        return None
+    if not all(arquivo_inalterado(caminho, assinaturas[nome]) for nome, caminho in fontes.items()):
+        return None
+    return dados
@@ -0,0 +1,195 @@
+# --- FILA DE TAREFAS (CELERY + REDIS) PARA PROCESSAMENTO ASSÍNCRONO DE SÚMULAS ---
+# Worker: celery -A tarefas_celery worker --loglevel=INFO --concurrency=4
+# Para escalar, inicie workers em quantas máquinas forem necessárias apontando para o mesmo broker;
+# todas precisam enxergar os mesmos caminhos de PDFs, modelos e saída (ex.: compartilhamento de rede).
+#
+# Cada PDF percorre a cadeia extrair_texto -> extrair_dados_gemini -> normalizar -> preencher_excel;
+# um lote é um chord dessas cadeias cujo callback (resumir) produz o mesmo resumo do `batch` da CLI.
+# As opções do lote (--no-cache, --refresh, --particoes-paralelas, orçamento, cache de contexto, backend...) seguem com cada PDF
+# e são aplicadas no worker por inicializar_worker_lote antes da tarefa; a concorrência é a do worker (--concurrency).
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from celery import Celery, chain, chord
+from celery.exceptions import TimeoutError as TimeoutErrorCelery
+from celery.result import AsyncResult
+from celery.signals import worker_process_init
+
+import processar
+from cliente_gemini_async import calcular_espera_retry, erro_e_retentavel
+
+URL_BROKER_CELERY = os.getenv("PROCESSAR_CELERY_BROKER", "redis://localhost:6379/0")
+URL_RESULTADOS_CELERY = os.getenv("PROCESSAR_CELERY_RESULTADOS", "redis://localhost:6379/1")
+MAX_RETRIES_API_GEMINI = 5 # Novas tentativas da tarefa da IA para erros transitórios (429, 5xx, timeouts)
+TIMEOUT_RESUMO_LOTE_S = float(os.getenv("PROCESSAR_CELERY_TIMEOUT_LOTE_S", str(6 * 3600))) # Espera máxima da CLI pelo resumo do lote
+
+app = Celery("processar", broker=URL_BROKER_CELERY, backend=URL_RESULTADOS_CELERY)
+app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=7 * 24 * 3600, # JSON normalizado de cada PDF fica disponível por 7 dias
+    task_acks_late=True, # Tarefa só sai da fila depois de concluída: um worker perdido não perde o PDF
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1, # Tarefas longas: cada processo reserva apenas a próxima
+    task_always_eager=os.getenv("PROCESSAR_CELERY_EAGER") == "1", # Execução local, sem broker (testes)
+    task_eager_propagates=True,
+)
+
+
+# Configuração do processo worker ao iniciar; as opções de cada lote são aplicadas por cima dela
+_OPCOES_PADRAO_WORKER: Dict[str, Any] = {
+    "usar_cache": True,
+    "atualizar_cache": False,
+    "particoes_em_paralelo": processar.ENVIAR_PARTICOES_EM_PARALELO,
+    "salvar_json_dados_excel": False,
+    "orcamento_tokens": processar.ORCAMENTO_TOKENS_POR_REQUISICAO,
+    "acao_orcamento": processar.ACAO_ORCAMENTO_EXCEDIDO,
+    "cache_contexto": processar.USAR_CACHE_CONTEXTO_GEMINI,
+    "backend_llm": processar.BACKEND_LLM, # --backend falso da CLI vale também nos workers (sem chamadas faturadas à API)
+    "config_backend_falso": dict(processar.CONFIG_BACKEND_FALSO),
+}
+_opcoes_lote_aplicadas: Optional[Dict[str, Any]] = None
+
+
+def _aplicar_opcoes_lote(opcoes_lote: Dict[str, Any]) -> None:
+    """Reconfigura o processo com as opções do lote (o mesmo worker atende lotes com opções diferentes)."""
+    global _opcoes_lote_aplicadas
+    opcoes = {**_OPCOES_PADRAO_WORKER, **opcoes_lote}
+    processar.ORCAMENTO_TOKENS_POR_REQUISICAO = opcoes.pop("orcamento_tokens") # None desliga: inicializar_worker_lote trataria como "manter"
+    processar.inicializar_worker_lote(**opcoes)
+    _opcoes_lote_aplicadas = dict(opcoes_lote)
+
+
+@worker_process_init.connect
+def _carregar_estado_worker(**_kwargs: Any) -> None:
+    """Carrega schema, mapeamento e caches ao iniciar cada processo do worker (antes da primeira tarefa)."""
+    _aplicar_opcoes_lote({})
+
+
+def _garantir_estado_carregado(opcoes_lote: Optional[Dict[str, Any]] = None) -> None:
+    """Aplica as opções do lote quando mudam; no modo eager (sem worker_process_init), também carrega o estado."""
+    opcoes_lote = opcoes_lote or {}
+    if not processar.BLOCO_CONFIG or opcoes_lote != _opcoes_lote_aplicadas:
+        _aplicar_opcoes_lote(opcoes_lote)
+
+
+def _novo_trabalho(caminho_pdf: str, opcoes_lote: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"caminho_pdf": caminho_pdf, "resultado": processar._novo_resultado_lote(Path(caminho_pdf)), "opcoes_lote": opcoes_lote or {}}
+
+
+@app.task(name="processar.extrair_texto")
+def extrair_texto(caminho_pdf: str, opcoes_lote: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Etapa 1: extrai o texto do PDF (o texto segue para a próxima tarefa pelo broker)."""
+    _garantir_estado_carregado(opcoes_lote)
+    trabalho = _novo_trabalho(caminho_pdf, opcoes_lote)
+    trabalho["texto"], trabalho["resultado"]["tempos"]["extracao_texto"] = processar.extrair_texto_pdf_lote(Path(caminho_pdf))
+    if trabalho["texto"] is None:
+        trabalho["resultado"]["erro"] = "Falha na extração de texto do PDF."
+    return trabalho
+
+
+@app.task(name="processar.extrair_dados_gemini", bind=True, max_retries=MAX_RETRIES_API_GEMINI)
+def extrair_dados_gemini(self: Any, trabalho: Dict[str, Any]) -> Dict[str, Any]:
+    """Etapa 2: envia o texto à API Gemini; erros transitórios reenfileiram a tarefa com a espera sugerida pelo servidor."""
+    _garantir_estado_carregado(trabalho.get("opcoes_lote"))
+    resultado = trabalho["resultado"]
+    if resultado["erro"] is not None:
+        return trabalho
+    t_inicio = time.perf_counter()
+    metricas_api: Dict[str, Any] = {}
+    resultado_api = processar.enviar_texto_completo_para_gemini_todos_blocos(
+        trabalho["texto"], processar.BLOCO_CONFIG, Path(trabalho["caminho_pdf"]), metricas_api)
+    resultado["tempos"]["api_gemini"] = time.perf_counter() - t_inicio
+    if processar.CACHE_RESPOSTAS_GEMINI.habilitado and not processar.CACHE_RESPOSTAS_GEMINI.atualizar:
+        resultado["cache_gemini_acerto"] = metricas_api.get("cache_acerto")
+    if "contabilidade" in metricas_api:
+        resultado["tokens_gemini"] = metricas_api["contabilidade"].resumo()
+    if not resultado_api:
+        erro = metricas_api.get("erro")
+        if erro is not None and erro_e_retentavel(erro) and self.request.retries < self.max_retries:
+            raise self.retry(exc=erro, countdown=calcular_espera_retry(erro, self.request.retries + 1))
+        resultado["erro"] = f"Resposta da API Gemini inválida ou vazia.{f' Último erro: {erro}' if erro is not None else ''}"
+        return trabalho
+    del trabalho["texto"]
+    trabalho["resultado_api"] = resultado_api
+    return trabalho
+
+
+@app.task(name="processar.normalizar")
+def normalizar(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+    """Etapa 3: achata e normaliza as chaves; o JSON normalizado fica guardado no backend de resultados."""
+    _garantir_estado_carregado(trabalho.get("opcoes_lote"))
+    if trabalho["resultado"]["erro"] is not None:
+        return trabalho
+    trabalho["resultado"], trabalho["json_normalizado"] = processar.normalizar_resultado_api_lote(
+        trabalho["resultado"], trabalho.pop("resultado_api"))
+    return trabalho
+
+
+@app.task(name="processar.preencher_excel")
+def preencher_excel(trabalho: Dict[str, Any], caminho_excel_modelo: Optional[str], dir_saida: str, nome_planilha_alvo: Optional[str] = None) -> Dict[str, Any]:
+    """Etapa 4: preenche o Excel; retorna o resultado no formato do lote, com o JSON normalizado anexado."""
+    _garantir_estado_carregado(trabalho.get("opcoes_lote"))
+    resultado = trabalho["resultado"]
+    json_normalizado = trabalho.get("json_normalizado")
+    if resultado["erro"] is None and json_normalizado:
+        resultado = processar.preencher_excel_lote(resultado, json_normalizado, Path(trabalho["caminho_pdf"]),
+                                                   Path(caminho_excel_modelo) if caminho_excel_modelo else None, Path(dir_saida), nome_planilha_alvo)
+    resultado["json_normalizado"] = json_normalizado
+    return resultado
+
+
+@app.task(name="processar.resumir")
+def resumir(resultados: List[Dict[str, Any]], t_inicio_lote: float, caminho_consolidado: Optional[str] = None) -> Dict[str, Any]:
+    """Callback do chord: consolida os resultados dos PDFs no resumo do lote (e, se pedido, na planilha consolidada)."""
+    exportador = processar.ExportadorConsolidado(Path(caminho_consolidado)) if caminho_consolidado else None
+    for resultado in resultados:
+        json_normalizado = resultado.pop("json_normalizado", None)
+        if exportador is not None and resultado.get("sucesso") and json_normalizado:
+            exportador.adicionar(resultado["pdf"], json_normalizado)
+    resumo = processar.resumir_lote(resultados, time.time() - t_inicio_lote)
+    if exportador is not None:
+        resumo["consolidado"] = processar.finalizar_exportacao_consolidada(exportador)
+    return resumo
+
+
+def criar_fluxo_pdf(caminho_pdf: Path, caminho_excel_modelo: Optional[Path], dir_saida: Path, nome_planilha_alvo: Optional[str] = None,
+                    opcoes_lote: Optional[Dict[str, Any]] = None) -> Any:
+    """Cadeia de tarefas de um PDF (assinatura Celery, ainda não enfileirada); `opcoes_lote` vai para inicializar_worker_lote."""
+    return chain(
+        extrair_texto.s(str(caminho_pdf), opcoes_lote or {}),
+        extrair_dados_gemini.s(),
+        normalizar.s(),
+        preencher_excel.s(str(caminho_excel_modelo) if caminho_excel_modelo else None, str(dir_saida), nome_planilha_alvo),
+    )
+
+
+def enfileirar_pdf(caminho_pdf: Path, caminho_excel_modelo: Path, dir_saida: Path, nome_planilha_alvo: Optional[str] = None,
+                   opcoes_lote: Optional[Dict[str, Any]] = None) -> AsyncResult:
+    """Enfileira o processamento de um PDF e retorna o AsyncResult (resultado do lote + JSON normalizado)."""
+    return criar_fluxo_pdf(caminho_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo, opcoes_lote).apply_async()
+
+
+def enfileirar_lote(dir_pdfs: Path, caminho_excel_modelo: Optional[Path], nome_planilha_alvo: Optional[str] = None, dir_saida: Optional[Path] = None,
+                    caminho_consolidado: Optional[Path] = None, opcoes_lote: Optional[Dict[str, Any]] = None) -> AsyncResult:
+    """Enfileira todos os PDFs do diretório como um chord; o AsyncResult final contém o resumo do lote."""
+    dir_saida = dir_saida or dir_pdfs
+    dir_saida.mkdir(parents=True, exist_ok=True)
+    caminhos_pdf = sorted(p for p in dir_pdfs.iterdir() if p.is_file() and p.suffix.lower() == ".pdf")
+    processar.log_to_gui(f"LOTE CELERY: {len(caminhos_pdf)} PDFs de '{dir_pdfs}' enfileirados em '{URL_BROKER_CELERY}'.", "INFO")
+    fluxos = [criar_fluxo_pdf(caminho_pdf, caminho_excel_modelo, dir_saida, nome_planilha_alvo, opcoes_lote) for caminho_pdf in caminhos_pdf]
+    return chord(fluxos)(resumir.s(time.time(), str(caminho_consolidado) if caminho_consolidado else None))
+
+
+def aguardar_resumo_lote(resultado_lote: AsyncResult, timeout_s: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Aguarda o resumo do chord por até `timeout_s` (padrão: TIMEOUT_RESUMO_LOTE_S); None se o prazo acabar."""
+    timeout_s = TIMEOUT_RESUMO_LOTE_S if timeout_s is None else timeout_s
+    try:
+        return resultado_lote.get(timeout=timeout_s)
+    except TimeoutErrorCelery:
+        processar.log_to_gui(f"ERRO LOTE CELERY: resumo do lote não recebido em {timeout_s:.0f} s (id {resultado_lote.id}). "
+                             "As tarefas continuam nos workers; consulte o resultado pelo id.", "ERROR")
+        return None
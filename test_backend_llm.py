@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import tenacity
+
+import processar
+from backend_llm import BackendFalso, ModeloFalso, gerar_json_sintetico
+from cache_disco import CacheDisco
+from cliente_gemini_async import ClienteGeminiAsync, erro_e_retentavel, extrair_atraso_retry
+
+BLOCOS = {
+    "a": {"json_chave": "chave_a", "particao": 1, "campos_esperados": ["nome_associado", "valor_proposta"]},
+    "b": {"json_chave": "chave_b", "particao": 2, "campos_esperados": [], "nome_lista_json": "itens", "sub_campos_lista": ["produto"],
+          "sub_lista_aninhada": {"nome_json": "garantias", "campos": ["tipo"]}},
+}
+
+class TestBackendLLM(unittest.TestCase):
+
+    def test_json_sintetico_segue_o_schema_real(self):
+        with patch("processar.BLOCO_CONFIG", {}):
+            self.assertTrue(processar.carregar_schema_extracao(usar_snapshot=False))
+            schema = processar.BLOCO_CONFIG
+        dados = gerar_json_sintetico(schema)
+        self.assertEqual(set(dados), {config["json_chave"] for config in schema.values()})
+        for config in schema.values():
+            bloco = dados[config["json_chave"]]
+            self.assertTrue(set(config.get("campos_esperados") or []) <= set(bloco))
+            for item in bloco.get(config.get("nome_lista_json"), []):
+                self.assertTrue(set(config.get("sub_campos_lista") or []) <= set(item))
+
+    def test_responde_so_os_blocos_do_prompt_com_erros_deterministicos(self):
+        modelo = ModeloFalso(BLOCOS, marcador_fim="[FIM]", latencia_s=0, taxa_429=0.5, atraso_retry_429_s=2.0, semente=7)
+        desfechos = []
+        for _ in range(20):
+            try:
+                resposta = modelo.generate_content(["instruções citam \"chave_b\"", "texto", "[FIM] chaves: \"chave_a\""])
+                self.assertEqual(resposta.text, '{"chave_a": {"nome_associado": "NOME_ASSOCIADO 1", "valor_proposta": "2.000,00"}}')
+                desfechos.append("ok")
+            except Exception as erro:
+                self.assertTrue(erro_e_retentavel(erro))
+                self.assertEqual((erro.code, extrair_atraso_retry(erro)), (429, 2.0))
+                desfechos.append("429")
+        self.assertIn("ok", desfechos)
+        self.assertEqual(modelo.respostas_429, desfechos.count("429"))
+        outro = ModeloFalso(BLOCOS, marcador_fim="[FIM]", latencia_s=0, taxa_429=0.5, semente=7)
+        self.assertEqual(["ok" if outro._planejar("")[2] is None else "429" for _ in range(20)], desfechos)
+        self.assertEqual(gerar_json_sintetico({"b": BLOCOS["b"]}, itens_por_lista=1),
+                         {"chave_b": {"itens": [{"produto": "PRODUTO 1", "garantias": [{"tipo": "TIPO 1"}]}]}})
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.USAR_EXTRATOR_LOCAL", False)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_pipeline_completo_sem_rede_com_retries(self, mock_cache):
+        mock_cache.obter.return_value = None
+        backend = BackendFalso(BLOCOS, marcador_fim=processar.MARCADOR_FIM_TEXTO_PDF_PROMPT, latencia_s=0, taxa_429=0.3, semente=1)
+        esperado = gerar_json_sintetico(BLOCOS)
+        with patch("processar._backend_llm", backend), patch("processar.configurar_api_gemini") as mock_configurar_api, \
+             patch.object(processar.gerar_conteudo_gemini_com_retry.retry, "wait", tenacity.wait_none()), \
+             patch.object(processar.gerar_conteudo_gemini_com_retry.retry, "stop", tenacity.stop_after_attempt(10)):
+            for _ in range(5):
+                metricas = {}
+                self.assertEqual(processar.enviar_texto_completo_para_gemini_todos_blocos("Texto", BLOCOS, Path("/mocked/file.pdf"), metricas), esperado)
+            cliente = ClienteGeminiAsync(backend.obter_modelo(), max_tentativas=10)
+            with patch("cliente_gemini_async.calcular_espera_retry", return_value=0):
+                self.assertEqual(asyncio.run(processar.enviar_texto_completo_para_gemini_todos_blocos_async("Texto", BLOCOS, Path("/mocked/file.pdf"), cliente)), esperado)
+        mock_configurar_api.assert_not_called()
+        self.assertGreater(backend.modelo.respostas_429, 0)
+        self.assertEqual(backend.modelo.requisicoes, 12 + backend.modelo.respostas_429)
+
+    def test_configuracao_invalida_do_backend_falso_usa_o_padrao(self):
+        cache_respostas = CacheDisco(Path("/mocked/cache"), 1024)
+        with patch("processar._backend_llm", None), patch("processar.BACKEND_LLM", "falso"), \
+             patch("processar.CONFIG_BACKEND_FALSO", {"latencia_s": 0, "parametro_inexistente": 1}), \
+             patch("processar.CACHE_RESPOSTAS_GEMINI", cache_respostas), patch("processar.log_to_gui") as mock_log:
+            backend = processar.obter_backend_llm()
+            self.assertIsInstance(backend, BackendFalso)
+            self.assertFalse(cache_respostas.habilitado) # Respostas sintéticas fora do cache de produção
+            self.assertTrue(backend.configurar())
+            self.assertEqual(backend.identificador_modelo, "falso")
+            self.assertIn("ERROR", [chamada.args[1] for chamada in mock_log.call_args_list])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import processar
+from cache_contexto_gemini import MARGEM_RENOVACAO_S, CacheContextoLocal
+from cliente_gemini_async import ClienteGeminiAsync, estimar_tokens_prompt
+
+def _resposta(texto, tokens_entrada=1000):
+    return SimpleNamespace(parts=[texto], text=texto, prompt_feedback=None,
+                           usage_metadata=SimpleNamespace(prompt_token_count=tokens_entrada, candidates_token_count=10, total_token_count=tokens_entrada + 10),
+                           candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name="STOP"))])
+
+class _ModeloBase:
+    """Registra o conteúdo recebido (já com o prefixo anteposto pelo substituto local)."""
+
+    def __init__(self, texto_resposta):
+        self.texto_resposta = texto_resposta
+        self.conteudos = []
+
+    def generate_content(self, conteudo, generation_config=None, request_options=None):
+        self.conteudos.append(conteudo)
+        return _resposta(self.texto_resposta)
+
+    async def generate_content_async(self, conteudo, generation_config=None):
+        return self.generate_content(conteudo)
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+BLOCOS = {"a": {"json_chave": "chave_a", "particao": 1, "campos_esperados": ["x"]}}
+
+class TestCacheContextoGemini(unittest.TestCase):
+
+    def test_ttl_renovacao_troca_de_prefixo_e_limite_de_entradas(self):
+        relogio = _Relogio()
+        cache = CacheContextoLocal(_ModeloBase(""), ttl_s=600, max_entradas=2, relogio=relogio)
+        modelo = cache.obter_modelo("prefixo v1")
+        self.assertIs(cache.obter_modelo("prefixo v1"), modelo)
+        relogio.agora = 600 - MARGEM_RENOVACAO_S + 1
+        self.assertIs(cache.obter_modelo("prefixo v1"), modelo)
+        self.assertEqual((cache.criacoes, cache.renovacoes, cache.reutilizacoes), (1, 1, 1))
+        relogio.agora += 600 # Expirado: registra de novo
+        self.assertIsNot(cache.obter_modelo("prefixo v1"), modelo)
+        self.assertEqual(cache.criacoes, 2)
+        cache.obter_modelo("prefixo v2") # Schema alterado -> outro prefixo -> outro conteúdo
+        cache.obter_modelo("prefixo v3")
+        self.assertEqual(cache.criacoes, 4)
+        self.assertEqual(len(cache.excluidos), 2) # O expirado e o mais antigo além do limite
+        self.assertEqual(sorted(cache.prefixos.values()), ["prefixo v2", "prefixo v3"])
+
+    def test_prefixo_recusado_pelo_provedor_volta_ao_envio_inline(self):
+        cache = CacheContextoLocal(_ModeloBase(""), tokens_minimos=1000)
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(cache.obter_modelo("curto"))
+        self.assertIsNone(cache.obter_modelo("curto"))
+        self.assertEqual((cache.criacoes, cache.falhas), (0, 1))
+
+    @patch("processar.ENVIAR_APENAS_SECOES_DOS_BLOCOS", False)
+    @patch("processar.USAR_EXTRATOR_LOCAL", False)
+    @patch("processar.USAR_CACHE_CONTEXTO_GEMINI", True)
+    @patch("processar._criar_generation_config_gemini", return_value=None)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_requisicoes_levam_so_o_texto_e_o_reforco(self, mock_cache, mock_configurar_api, mock_config):
+        mock_cache.obter.return_value = None
+        modelo_base = _ModeloBase('{"chave_a": {"x": 1}}')
+        cache_contexto = CacheContextoLocal(modelo_base)
+        prefixo, sufixo = processar.obter_moldura_prompt_gemini(BLOCOS)
+        with patch("processar._cache_contexto_prompt", cache_contexto), patch("processar.obter_modelo_gemini") as mock_modelo:
+            metricas = {}
+            for texto in ("Documento 1", "Documento 2"):
+                self.assertEqual(processar.enviar_texto_completo_para_gemini_todos_blocos(texto, BLOCOS, Path("/mocked/file.pdf"), metricas),
+                                 {"chave_a": {"x": 1}})
+            cliente = ClienteGeminiAsync(mock_modelo.return_value)
+            self.assertEqual(asyncio.run(processar.enviar_texto_completo_para_gemini_todos_blocos_async("Documento 3", BLOCOS, Path("/mocked/file.pdf"), cliente)),
+                             {"chave_a": {"x": 1}})
+        mock_modelo.assert_not_called()
+        mock_modelo.return_value.generate_content_async.assert_not_called()
+        self.assertEqual(modelo_base.conteudos, [[prefixo, f"Documento {i}", sufixo] for i in (1, 2, 3)])
+        self.assertEqual((cache_contexto.criacoes, cache_contexto.reutilizacoes), (1, 2))
+        self.assertEqual(metricas["contabilidade"].resumo()["tokens_cache"], estimar_tokens_prompt(prefixo))
+    @patch("processar.USAR_CACHE_CONTEXTO_GEMINI", True)
+    @patch("processar.BACKEND_LLM", processar.BACKEND_LLM_GEMINI)
+    def test_threads_simultaneas_criam_backend_e_cache_uma_vez(self):
+        criacoes = []
+
+        class _BackendLento(processar.BackendGemini):
+            def __init__(self):
+                criacoes.append("backend")
+                time.sleep(0.05) # Janela em que outra thread ainda vê o global vazio
+
+            def criar_cache_contexto(self, ttl_s):
+                criacoes.append("cache")
+                time.sleep(0.05)
+                return CacheContextoLocal(_ModeloBase(""))
+
+        n_threads = 8
+        barreira = threading.Barrier(n_threads)
+        resultados = []
+
+        def _obter():
+            barreira.wait()
+            resultados.append(processar.obter_cache_contexto_prompt())
+
+        with patch("processar._backend_llm", None), patch("processar._cache_contexto_prompt", None), \
+             patch("processar.BackendGemini", _BackendLento):
+            threads = [threading.Thread(target=_obter) for _ in range(n_threads)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        self.assertEqual(criacoes, ["backend", "cache"])
+        self.assertEqual(len(resultados), n_threads)
+        self.assertTrue(all(cache is resultados[0] for cache in resultados))
+
+if __name__ == "__main__":
+    unittest.main()
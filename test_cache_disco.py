@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from cache_disco import FRACAO_ALVO_DESPEJO, GRAVACOES_ENTRE_VARREDURAS, CacheDisco
+
+class TestCacheDisco(unittest.TestCase):
+
+    def setUp(self):
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        self.diretorio = Path(self._dir_tmp.name)
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def test_chave_independe_da_ordem_das_chaves(self):
+        self.assertEqual(CacheDisco.calcular_chave({"a": 1, "b": 2}, "texto"), CacheDisco.calcular_chave({"b": 2, "a": 1}, "texto"))
+        self.assertNotEqual(CacheDisco.calcular_chave({"a": 1}, "texto"), CacheDisco.calcular_chave({"a": 1}, "texto2"))
+
+    def test_obter_e_gravar(self):
+        cache = CacheDisco(self.diretorio, 1024 * 1024)
+        self.assertIsNone(cache.obter("k1"))
+        cache.gravar("k1", {"dados": ["x", 1]})
+        self.assertEqual(cache.obter("k1"), {"dados": ["x", 1]})
+        self.assertEqual((cache.acertos, cache.faltas), (1, 1))
+        self.assertEqual(cache.taxa_acerto(), 0.5)
+
+    def test_despejo_lru_por_tamanho(self):
+        cache = CacheDisco(self.diretorio, 250)
+        for i, chave in enumerate(["antiga", "usada", "nova"]):
+            cache.gravar(chave, "x" * 100)
+            os.utime(self.diretorio / f"{chave}.json", (1000 + i, 1000 + i))
+        # A terceira gravação estoura o limite e remove apenas a entrada menos recente ('antiga')
+        cache.obter("usada")
+        cache.gravar("outra", "y" * 10)
+        self.assertIsNone(cache.obter("antiga"))
+        self.assertIsNotNone(cache.obter("usada"))
+        self.assertIsNotNone(cache.obter("outra"))
+
+    def test_gravacoes_nao_varrem_o_diretorio_a_cada_vez(self):
+        cache = CacheDisco(self.diretorio, 1000)
+        with patch.object(cache, "_varrer_diretorio", wraps=cache._varrer_diretorio) as mock_varrer:
+            for i in range(5):
+                cache.gravar(f"k{i}", "x" * 98) # 100 bytes por entrada
+            self.assertEqual(mock_varrer.call_count, 1) # Só a primeira gravação (total ainda desconhecido)
+            cache.gravar("k0", "x" * 198) # Sobrescrita: soma só a diferença
+            self.assertEqual(cache._total_bytes_estimado, 600)
+            for i in range(5, 10):
+                cache.gravar(f"k{i}", "x" * 98)
+            self.assertEqual(mock_varrer.call_count, 2) # Estimativa passou de 1000: varre e despeja
+        total = sum(caminho.stat().st_size for caminho in self.diretorio.glob("*.json"))
+        self.assertLessEqual(total, 1000 * FRACAO_ALVO_DESPEJO)
+        self.assertEqual(cache._total_bytes_estimado, total)
+        self.assertFalse((self.diretorio / "k1.json").exists())
+
+        CacheDisco(self.diretorio, 1000).gravar("outro_processo", 1)
+        with patch.object(cache, "_varrer_diretorio", wraps=cache._varrer_diretorio) as mock_varrer:
+            for i in range(GRAVACOES_ENTRE_VARREDURAS):
+                cache.gravar("k9", "x" * 98)
+            self.assertEqual(mock_varrer.call_count, 1) # Reconciliação periódica com o que os outros processos gravaram
+        self.assertEqual(cache._total_bytes_estimado, sum(caminho.stat().st_size for caminho in self.diretorio.glob("*.json")))
+
+    def test_falha_na_gravacao_nao_deixa_temporario(self):
+        cache = CacheDisco(self.diretorio, 1024)
+        with self.assertLogs(level="WARNING"):
+            cache.gravar("k", {"valor": object()}) # Não serializável em JSON
+        with patch("cache_disco.os.replace", side_effect=OSError("disco cheio")), self.assertLogs(level="WARNING"):
+            cache.gravar("k", 1)
+        self.assertEqual(list(self.diretorio.iterdir()), [])
+
+    def test_no_cache_e_refresh(self):
+        desabilitado = CacheDisco(self.diretorio, 1024, habilitado=False)
+        desabilitado.gravar("k", 1)
+        self.assertFalse((self.diretorio / "k.json").exists())
+
+        CacheDisco(self.diretorio, 1024).gravar("k", 1)
+        atualizar = CacheDisco(self.diretorio, 1024, atualizar=True)
+        self.assertIsNone(atualizar.obter("k"))
+        atualizar.gravar("k", 2)
+        self.assertEqual(CacheDisco(self.diretorio, 1024).obter("k"), 2)
+
+if __name__ == "__main__":
+    unittest.main()
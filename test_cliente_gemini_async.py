@@ -0,0 +1,92 @@
+import asyncio
+import time
+import unittest
+from datetime import timedelta
+from types import SimpleNamespace
+
+from cliente_gemini_async import ClienteGeminiAsync, ErroBloqueioGemini, LimitadorTaxa, extrair_atraso_retry
+
+class ErroCota(Exception):
+    code = 429
+
+class ModeloFalso:
+    """Simula genai.GenerativeModel: falha com 429 nas primeiras chamadas e depois responde."""
+
+    def __init__(self, falhas_429=0, atraso_sugerido_s=0.05):
+        self.falhas_429 = falhas_429
+        self.atraso_sugerido_s = atraso_sugerido_s
+        self.chamadas = 0
+        self.max_simultaneas = 0
+        self._simultaneas = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.chamadas += 1
+        self._simultaneas += 1
+        self.max_simultaneas = max(self.max_simultaneas, self._simultaneas)
+        try:
+            await asyncio.sleep(0.01)
+            if self.falhas_429 > 0:
+                self.falhas_429 -= 1
+                erro = ErroCota("Resource exhausted")
+                erro.retry_delay = timedelta(seconds=self.atraso_sugerido_s)
+                raise erro
+            return SimpleNamespace(parts=["ok"], text=f'{{"eco": "{prompt}"}}', usage_metadata=SimpleNamespace(total_token_count=10))
+        finally:
+            self._simultaneas -= 1
+
+class TestClienteGeminiAsync(unittest.TestCase):
+
+    def test_extrair_atraso_retry(self):
+        erro = Exception("429 Resource exhausted")
+        erro.details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "12s"}]
+        self.assertEqual(extrair_atraso_retry(erro), 12.0)
+        erro_grpc = Exception("quota")
+        erro_grpc.details = [SimpleNamespace(retry_delay=SimpleNamespace(seconds=3, nanos=500_000_000))]
+        self.assertEqual(extrair_atraso_retry(erro_grpc), 3.5)
+        self.assertEqual(extrair_atraso_retry(Exception("Please retry in 7.5s.")), 7.5)
+        self.assertIsNone(extrair_atraso_retry(Exception("erro qualquer")))
+
+    def test_retry_respeita_dica_do_servidor_apos_429(self):
+        modelo = ModeloFalso(falhas_429=2, atraso_sugerido_s=0.05)
+        cliente = ClienteGeminiAsync(modelo, max_em_voo=2)
+        t_inicio = time.monotonic()
+        resposta = asyncio.run(cliente.gerar("p1"))
+        self.assertEqual(resposta, '{"eco": "p1"}')
+        self.assertEqual((modelo.chamadas, cliente.retries, cliente.respostas_429), (3, 2, 2))
+        self.assertGreaterEqual(time.monotonic() - t_inicio, 0.1)
+
+    def test_concorrencia_limitada(self):
+        modelo = ModeloFalso()
+        cliente = ClienteGeminiAsync(modelo, max_em_voo=3)
+
+        async def _executar():
+            return await asyncio.gather(*(cliente.gerar(f"p{i}") for i in range(10)))
+
+        respostas = asyncio.run(_executar())
+        self.assertEqual(len(respostas), 10)
+        self.assertLessEqual(modelo.max_simultaneas, 3)
+
+    def test_bloqueio_nao_e_retentado(self):
+        class ModeloBloqueado:
+            chamadas = 0
+            async def generate_content_async(self, prompt, generation_config=None):
+                ModeloBloqueado.chamadas += 1
+                return SimpleNamespace(parts=[], prompt_feedback=SimpleNamespace(block_reason="SAFETY"))
+
+        with self.assertRaises(ErroBloqueioGemini):
+            asyncio.run(ClienteGeminiAsync(ModeloBloqueado()).gerar("p"))
+        self.assertEqual(ModeloBloqueado.chamadas, 1)
+
+    def test_limitador_rpm(self):
+        async def _executar():
+            limitador = LimitadorTaxa(requisicoes_por_minuto=600) # 10 req/s, balde inicial de 600
+            limitador._balde_requisicoes.disponivel = 1 # Força o ritmo a partir da 2ª requisição
+            t_inicio = time.monotonic()
+            for _ in range(4):
+                await limitador.adquirir(1)
+            return time.monotonic() - t_inicio
+
+        self.assertGreaterEqual(asyncio.run(_executar()), 0.25) # 3 requisições a 0,1 s cada
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import tenacity
+
+import processar
+from contabilidade_tokens import ACAO_ORCAMENTO_ABORTAR, ErroOrcamentoTokens
+
+def _resposta(texto, tokens_entrada, tokens_saida, motivo="STOP"):
+    return SimpleNamespace(parts=[texto], text=texto, prompt_feedback=None,
+                           usage_metadata=SimpleNamespace(prompt_token_count=tokens_entrada, candidates_token_count=tokens_saida),
+                           candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name=motivo))])
+
+class _ModeloFalso:
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+
+BLOCOS = {
+    "a": {"json_chave": "chave_a", "particao": 1, "campos_esperados": ["x"]},
+    "b": {"json_chave": "chave_b", "particao": 1, "campos_esperados": ["y"]},
+}
+
+class TestContabilidadeTokens(unittest.TestCase):
+
+    @patch("processar.ENVIAR_APENAS_SECOES_DOS_BLOCOS", False)
+    @patch("processar.USAR_EXTRATOR_LOCAL", False)
+    @patch("processar._criar_generation_config_gemini", return_value=None)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_registra_tokens_motivo_tentativas_e_latencia_por_pdf(self, mock_cache, mock_configurar_api, mock_config):
+        mock_cache.obter.return_value = None
+        modelo = _ModeloFalso([ConnectionError("queda"), _resposta('{"chave_a": {"x": 1}, "chave_b": {}}', 1200, 80)])
+        metricas = {}
+        with patch("processar.obter_modelo_gemini", return_value=modelo), \
+             patch.object(processar.gerar_conteudo_gemini_com_retry.retry, "wait", tenacity.wait_none()):
+            resultado = processar.enviar_texto_completo_para_gemini_todos_blocos("Texto do PDF", BLOCOS, Path("/mocked/file.pdf"), metricas)
+        self.assertEqual(resultado["chave_a"], {"x": 1})
+        resumo = metricas["contabilidade"].resumo()
+        self.assertEqual({k: resumo[k] for k in ("chamadas", "tentativas", "tokens_entrada", "tokens_saida", "entrada_estimada", "motivos_fim")},
+                         {"chamadas": 1, "tentativas": 2, "tokens_entrada": 1200, "tokens_saida": 80, "entrada_estimada": 0, "motivos_fim": {"STOP": 1}})
+        self.assertGreater(resumo["latencia_s"], 0)
+
+    @patch("processar.ENVIAR_APENAS_SECOES_DOS_BLOCOS", False)
+    def test_orcamento_divide_a_requisicao_ou_aborta(self):
+        texto = "x" * 4000
+        tokens_um_bloco = processar.estimar_tokens_prompt(processar.construir_partes_prompt_gemini(texto, {"a": BLOCOS["a"]}))
+        with patch("processar.ORCAMENTO_TOKENS_POR_REQUISICAO", tokens_um_bloco + 10):
+            contabilidade = processar.ContabilidadeTokens()
+            subconjuntos, textos = processar._planejar_requisicoes(texto, [BLOCOS], Path("/mocked/file.pdf"), contabilidade)
+            self.assertEqual([list(s) for s in subconjuntos], [["a"], ["b"]])
+            self.assertEqual(contabilidade.divisoes, 1)
+            with patch("processar.ACAO_ORCAMENTO_EXCEDIDO", ACAO_ORCAMENTO_ABORTAR):
+                self.assertRaises(ErroOrcamentoTokens, processar._planejar_requisicoes, texto, [BLOCOS], Path("/mocked/file.pdf"))
+        with patch("processar.ORCAMENTO_TOKENS_POR_REQUISICAO", 10), patch("processar.configurar_api_gemini") as mock_configurar_api:
+            metricas = {}
+            self.assertIsNone(processar.enviar_texto_completo_para_gemini_todos_blocos(texto, BLOCOS, Path("/mocked/file.pdf"), metricas))
+            self.assertIsInstance(metricas["erro"], ErroOrcamentoTokens)
+            mock_configurar_api.assert_not_called()
+
+    def test_resumo_do_lote_soma_os_documentos(self):
+        por_pdf = [
+            {"chamadas": 2, "tentativas": 3, "tokens_entrada": 1000, "tokens_saida": 100, "entrada_estimada": 0, "latencia_s": 1.5, "motivos_fim": {"STOP": 2}, "divisoes": 0},
+            {"chamadas": 1, "tentativas": 1, "tokens_entrada": 3000, "tokens_saida": 300, "entrada_estimada": 1, "latencia_s": 2.0, "motivos_fim": {"MAX_TOKENS": 1}, "divisoes": 1},
+        ]
+        resultados = [{"pdf": f"{i}.pdf", "sucesso": True, "tempos": {}, "tokens_gemini": t} for i, t in enumerate(por_pdf)]
+        resultados.append({"pdf": "cache.pdf", "sucesso": True, "tempos": {}, "tokens_gemini": None})
+        tokens = processar.resumir_lote(resultados, 10.0)["tokens_gemini"]
+        self.assertEqual((tokens["documentos"], tokens["chamadas"], tokens["tokens_entrada"], tokens["tokens_saida"]), (2, 3, 4000, 400))
+        self.assertEqual(tokens["motivos_fim"], {"STOP": 2, "MAX_TOKENS": 1})
+        self.assertEqual(tokens["p50_por_documento"], 2200)
+        self.assertIn("4000 tokens de entrada", processar.formatar_resumo_lote(processar.resumir_lote(resultados, 10.0)))
+
+if __name__ == "__main__":
+    unittest.main()
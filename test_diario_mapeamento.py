@@ -0,0 +1,56 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import processar
+from diario_mapeamento import DiarioMapeamento, gravar_json_atomico
+
+class TestDiarioMapeamento(unittest.TestCase):
+
+    def setUp(self):
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        self.caminho_mapeamento = Path(self._dir_tmp.name) / "mapeamento_config.json"
+        gravar_json_atomico(self.caminho_mapeamento, {"versao": 3, "mapeamento_para_chaves_padronizadas": {"nome": "NOME"}})
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def test_compactar_incorpora_diario_e_preserva_demais_secoes(self):
+        diario = DiarioMapeamento(self.caminho_mapeamento)
+        diario.registrar("cpf", "CPF")
+        diario.registrar("renda_bruta", "Renda Bruta")
+        self.assertEqual(diario.pendentes(), [("cpf", "CPF"), ("renda_bruta", "Renda Bruta")])
+        self.assertEqual(diario.compactar(), 2)
+        with open(self.caminho_mapeamento, encoding="utf-8") as f:
+            config = json.load(f)
+        self.assertEqual(config["versao"], 3)
+        self.assertEqual(config["mapeamento_para_chaves_padronizadas"], {"nome": "NOME", "cpf": "CPF", "renda_bruta": "Renda Bruta"})
+        self.assertFalse(diario.caminho_diario.exists())
+        self.assertEqual(list(Path(self._dir_tmp.name).glob("*.tmp")), [])
+
+    def test_linha_truncada_e_ignorada_e_reaplicar_e_idempotente(self):
+        diario = DiarioMapeamento(self.caminho_mapeamento)
+        diario.registrar("cpf", "CPF")
+        with open(diario.caminho_diario, "a", encoding="utf-8") as f:
+            f.write('{"chave": "renda", "no') # Queda no meio da escrita
+        self.assertEqual(diario.pendentes(), [("cpf", "CPF")])
+        config = {"mapeamento_para_chaves_padronizadas": {"cpf": "CPF"}}
+        self.assertEqual(diario.aplicar_pendentes(config), 1)
+        self.assertEqual(config["mapeamento_para_chaves_padronizadas"], {"cpf": "CPF"})
+
+    def test_opcao_3_grava_o_arquivo_uma_vez_por_pdf(self):
+        json_ia = {"chave_nova_a": "1", "chave_nova_b": "2", "chave_nova_c": "3", "nome": "FULANO"}
+        with patch("processar.resource_path", return_value=self.caminho_mapeamento), \
+             patch("processar.gerenciar_chave_nao_mapeada_interativamente", return_value=("chave_nova_a", False, False, True)), \
+             patch("diario_mapeamento.gravar_json_atomico", wraps=gravar_json_atomico) as mock_gravar:
+            mapa = processar.carregar_mapeamento_de_arquivo("mapeamento_config.json")["mapeamento_para_chaves_padronizadas"]
+            json_normalizado, mapa_final, _ = processar.normalizar_chaves_json(json_ia, mapa, False)
+            recarregado = processar.carregar_mapeamento_de_arquivo("mapeamento_config.json")
+        self.assertEqual(mock_gravar.call_count, 1)
+        self.assertEqual(json_normalizado, {"CHAVE_NOVA_A": "1", "CHAVE_NOVA_B": "2", "CHAVE_NOVA_C": "3", "NOME": "FULANO"})
+        self.assertEqual(recarregado["mapeamento_para_chaves_padronizadas"], mapa_final)
+
+if __name__ == "__main__":
+    unittest.main()
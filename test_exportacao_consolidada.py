@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import openpyxl
+
+import processar
+from exportacao_consolidada import ExportadorConsolidado
+
+class TestExportacaoConsolidada(unittest.TestCase):
+
+    def setUp(self):
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        self.dir_tmp = Path(self._dir_tmp.name)
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def test_colunas_sao_a_uniao_das_chaves_na_ordem_de_chegada(self):
+        caminho_saida = self.dir_tmp / "lote" / "consolidado.xlsx"
+        exportador = ExportadorConsolidado(caminho_saida)
+        exportador.adicionar("a.pdf", {"NOME": "FULANO", "CPF": "000.000.000-00"})
+        exportador.adicionar("b.pdf", {"NOME": "BELTRANO\x07", "RENDA": 1500.5, "GARANTIAS": ["AVAL", "ALIENACAO"]})
+        self.assertEqual(exportador.finalizar(), 2)
+
+        linhas = [list(linha) for linha in openpyxl.load_workbook(caminho_saida)["Sumulas"].iter_rows(values_only=True)]
+        self.assertEqual(linhas, [
+            ["PDF", "NOME", "CPF", "RENDA", "GARANTIAS"],
+            ["a.pdf", "FULANO", "000.000.000-00", None, None],
+            ["b.pdf", "BELTRANO", None, 1500.5, '["AVAL", "ALIENACAO"]'],
+        ])
+
+    def test_lote_sem_modelo_devolve_json_normalizado_sem_gerar_excel(self):
+        resultado = processar.preencher_excel_lote({"tempos": {}}, {"NOME": "FULANO"}, self.dir_tmp / "sumula.pdf",
+                                                   None, self.dir_tmp, anexar_json_normalizado=True)
+        self.assertTrue(resultado["sucesso"])
+        self.assertEqual(resultado["json_normalizado"], {"NOME": "FULANO"})
+        self.assertEqual(list(self.dir_tmp.iterdir()), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import re
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import processar
+from extrator_local import compilar_regras_locais, extrair_campos_locais, localizar_trechos, validar_regras_locais
+
+TEXTO = (
+    "SICOOB Súmula de Crédito\n"
+    "Cooperativa: 3001 PA: 01 Data: 15/03/2024 Hora: 10:01\n"
+    "Dados do Associado\n"
+    "Nome: JOÃO DA SILVA CPF/CNPJ: 123.456.789-00\n"
+    "Endereço: RUA A, 10\n"
+    "Dados da Proposta\n"
+    "Número da Proposta: 998877\n"
+    "Nome: NÃO É DO ASSOCIADO\n"
+)
+
+BLOCOS = {
+    "0 Doc": {"titulo_padrao": "SICOOB\\s*Súmula de Crédito", "json_chave": "inf_documento", "particao": 1,
+              "campos_esperados": ["cooperativa", "pa", "data_documento"],
+              "regras_locais": {"escopo": "documento", "campos": {"cooperativa": "\\bCooperativa:", "pa": "\\bPA:", "data_documento": "\\bData:"}}},
+    "1 Associado": {"titulo_padrao": "Dados do Associado", "json_chave": "dados_associado", "particao": 1,
+                    "campos_esperados": ["nome_associado", "cpf_cnpj_associado", "endereco_associado"],
+                    "regras_locais": {"campos": {"nome_associado": "\\bNome:", "cpf_cnpj_associado": "CPF/CNPJ:"}}},
+    "3 Proposta": {"titulo_padrao": "Dados da Proposta", "json_chave": "dados_proposta", "particao": 2,
+                   "campos_esperados": ["nr_proposta"]},
+}
+
+class TestExtratorLocal(unittest.TestCase):
+
+    def test_extrai_por_rotulo_restrito_a_secao_e_reduz_blocos_pendentes(self):
+        dados, restantes, n_campos = extrair_campos_locais(TEXTO, BLOCOS, compilar_regras_locais(BLOCOS))
+        self.assertEqual(dados, {
+            "inf_documento": {"cooperativa": "3001", "pa": "01", "data_documento": "15/03/2024"},
+            "dados_associado": {"nome_associado": "JOÃO DA SILVA", "cpf_cnpj_associado": "123.456.789-00"},
+        })
+        self.assertEqual(n_campos, 5)
+        self.assertEqual(list(restantes), ["1 Associado", "3 Proposta"])
+        self.assertEqual(restantes["1 Associado"]["campos_esperados"], ["endereco_associado"])
+        self.assertIs(restantes["3 Proposta"], BLOCOS["3 Proposta"])
+
+    def test_trechos_de_secoes_repetidas_nao_sao_cortados_pelo_cabecalho_de_pagina(self):
+        texto = "CAB\nSA\na1\nCAB\na2\nSB\nb1\nCAB\nSA\na3"
+        titulos = {"cab": re.compile("CAB"), "a": re.compile("SA"), "b": re.compile("SB")}
+        trechos = localizar_trechos(texto, titulos, ("cab",))
+        self.assertEqual([texto[i:f] for i, f in trechos["a"]], ["SA\na1\nCAB\na2\n", "SA\na3"])
+        self.assertEqual([texto[i:f] for i, f in trechos["b"]], ["SB\nb1\nCAB\n"])
+        self.assertEqual([texto[i:f] for i, f in trechos["cab"]], ["CAB\n", "CAB\na2\n", "CAB\n"])
+
+    def test_regras_invalidas_sao_rejeitadas(self):
+        self.assertIsNone(validar_regras_locais("0 Doc", BLOCOS["0 Doc"]))
+        self.assertIn("não está em 'campos_esperados'", validar_regras_locais(
+            "x", {"campos_esperados": ["a"], "regras_locais": {"campos": {"b": "B:"}}}))
+        self.assertIn("Regex inválida", validar_regras_locais(
+            "x", {"campos_esperados": ["a"], "regras_locais": {"campos": {"a": "(A:"}}}))
+        self.assertIsNotNone(validar_regras_locais("x", {"campos_esperados": ["a"], "regras_locais": {"escopo": "pagina", "campos": {}}}))
+
+    def test_rotulo_que_e_sufixo_de_outro_nao_casa_no_rotulo_maior(self):
+        with patch("processar.BLOCO_CONFIG", {}):
+            self.assertTrue(processar.carregar_schema_extracao(usar_snapshot=False))
+            schema = processar.BLOCO_CONFIG
+        proposta = {"3 Dados da Proposta": schema["3 Dados da Proposta"]}
+        texto = ("Dados da Proposta\n"
+                 "1º Vencimento: 10/04/2024  Primeiro Vencimento: 10/04/2024\n"
+                 "Vencimento: 10/03/2029  Prazo: 60\n"
+                 "Valor da Tarifa: 99,00  Prazo Carência: 30\n"
+                 "Tarifa: 150,00\n")
+        dados, _, _ = extrair_campos_locais(texto, proposta, compilar_regras_locais(proposta))
+        self.assertEqual(dados["dados_proposta"], {"vencimento_proposta": "10/03/2029", "prazo_proposta": "60", "tarifa_proposta": "150,00"})
+        regras = {"x": {"titulo_padrao": "T", "json_chave": "x", "campos_esperados": ["venc"],
+                        "regras_locais": {"campos": {"venc": "(?m)(?:^|[ \\t]{2,})Vencimento:"}}}}
+        dados, _, _ = extrair_campos_locais("T\nPrimeiro Vencimento: 01/01/2024\n", regras, compilar_regras_locais(regras))
+        self.assertEqual(dados, {})
+
+    @patch("processar.USAR_EXTRATOR_LOCAL", True)
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    @patch("processar._solicitar_blocos_gemini")
+    def test_blocos_resolvidos_nao_vao_para_a_ia(self, mock_solicitar, mock_cache, mock_configurar_api):
+        mock_cache.obter.return_value = None
+        mock_solicitar.side_effect = lambda texto, blocos, pdf, chave, contabilidade=None, prazo=None: {
+            c["json_chave"]: {campo: "IA" for campo in c["campos_esperados"]} for c in blocos.values()}
+        with patch("processar.BLOCO_CONFIG", BLOCOS):
+            resultado = processar.enviar_texto_completo_para_gemini_todos_blocos(TEXTO, BLOCOS, Path("/mocked/file.pdf"))
+            blocos_enviados = [nome for chamada in mock_solicitar.call_args_list for nome in chamada.args[1]]
+            self.assertEqual(blocos_enviados, ["1 Associado", "3 Proposta"])
+            self.assertEqual(resultado["dados_associado"], {"endereco_associado": "IA", "nome_associado": "JOÃO DA SILVA", "cpf_cnpj_associado": "123.456.789-00"})
+            self.assertEqual(resultado["inf_documento"]["cooperativa"], "3001")
+
+            mock_solicitar.reset_mock()
+            mock_configurar_api.reset_mock()
+            so_locais = {"0 Doc": BLOCOS["0 Doc"]}
+            self.assertEqual(processar.enviar_texto_completo_para_gemini_todos_blocos(TEXTO, so_locais, Path("/mocked/file.pdf")),
+                             {"inf_documento": {"cooperativa": "3001", "pa": "01", "data_documento": "15/03/2024"}})
+            mock_solicitar.assert_not_called()
+            mock_configurar_api.assert_not_called()
+
+    def test_regra_invalida_no_schema_mantem_o_bloco_para_a_ia(self):
+        schema = {"bloco": {"titulo_padrao": "T", "json_chave": "c", "campos_esperados": ["a"], "particao": 1,
+                            "regras_locais": {"campos": {"a": "(A:"}}}}
+        with patch("processar.BLOCO_CONFIG", {}), patch("processar.json.load", return_value=schema), \
+             patch("processar.open"), patch("processar.resource_path"):
+            processar.carregar_schema_extracao(usar_snapshot=False)
+            self.assertEqual(list(processar.BLOCO_CONFIG), ["bloco"])
+            self.assertNotIn("regras_locais", processar.BLOCO_CONFIG["bloco"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import random
+import re
+import unittest
+from pathlib import Path
+
+from indice_mapeamento import IndiceCuringasMapeamento
+
+def resolver_sequencial(mapeamento, chave_ia):
+    """Busca anterior do normalizar_chaves_json: uma regex por padrão, testadas em ordem de precedência."""
+    for chave_padrao in sorted([k for k in mapeamento if '*' in k], key=lambda k: (k.count('_'), len(k)), reverse=True):
+        match = re.match('^' + re.escape(chave_padrao).replace(r'\*', r'([0-9]+)') + '$', chave_ia)
+        if match:
+            nome_base = str(mapeamento[chave_padrao])
+            return (nome_base.replace("*", match.group(1)) if '*' in nome_base else nome_base), chave_padrao
+    return None
+
+class TestIndiceMapeamento(unittest.TestCase):
+
+    def test_equivale_a_busca_sequencial_no_mapeamento_real(self):
+        with open(Path(__file__).parent / "mapeamento_config.json", encoding="utf-8") as f:
+            mapeamento = json.load(f)["mapeamento_para_chaves_padronizadas"]
+        indice = IndiceCuringasMapeamento(mapeamento)
+        gerador = random.Random(7)
+        chaves = []
+        for chave_padrao in mapeamento:
+            chaves.append(chave_padrao.replace('*', str(gerador.randint(0, 120))))
+            chaves.append(chave_padrao.replace('*', 'x'))
+            chaves.append(chave_padrao + "_extra")
+        for chave_ia in chaves:
+            self.assertEqual(indice.resolver(chave_ia), resolver_sequencial(mapeamento, chave_ia), chave_ia)
+
+    def test_precedencia_mais_segmentos_depois_mais_longo(self):
+        mapeamento = {
+            "lista_*_nome": "NOME_*",
+            "lista_10_*": "DEZ_*", # Também casa 'lista_10_nome', mas é mais curto que 'lista_*_nome'
+            "lista_*_nome_completo": "NOME_COMPLETO_*",
+            "a_*_b": "PRIMEIRO",
+            "a_1_*": "SEGUNDO", # Empate com 'a_*_b' em segmentos e comprimento: vale a ordem do arquivo
+        }
+        indice = IndiceCuringasMapeamento(mapeamento)
+        for chave_ia in ("lista_10_nome", "lista_3_nome_completo", "a_1_b", "a_1_2", "lista_10_7"):
+            self.assertEqual(indice.resolver(chave_ia), resolver_sequencial(mapeamento, chave_ia), chave_ia)
+        self.assertEqual(indice.resolver("a_1_b"), ("PRIMEIRO", "a_*_b"))
+
+    def test_curinga_dentro_do_segmento_e_digitos_nao_ascii(self):
+        mapeamento = {"fiador*_nome": "FIADOR_*_NOME", "item_*": "ITEM_*"}
+        indice = IndiceCuringasMapeamento(mapeamento)
+        self.assertEqual(indice.resolver("fiador2_nome"), ("FIADOR_2_NOME", "fiador*_nome"))
+        self.assertEqual(indice.resolver("item_12"), ("ITEM_12", "item_*"))
+        self.assertIsNone(indice.resolver("item_²"))
+        self.assertIsNone(indice.resolver("item_"))
+
+if __name__ == "__main__":
+    unittest.main()
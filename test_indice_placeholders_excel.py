@@ -0,0 +1,63 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+
+import processar
+from indice_placeholders_excel import CacheIndicePlaceholders, caminho_indice_placeholders
+
+DADOS = {"{{NOME}}": "FULANO DE TAL", "{{CPF}}": "000.000.000-00"}
+
+class TestIndicePlaceholdersExcel(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("processar.PREENCHER_XLSX_DIRETO", False) # O índice é usado pelo caminho openpyxl
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        self.dir_tmp = Path(self._dir_tmp.name)
+        self.caminho_modelo = self.dir_tmp / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Sumula"
+        ws["A1"] = "{{NOME}}"
+        ws["B2"] = "CPF: {{CPF}} / Renda: {{RENDA}}"
+        ws["C3"] = "Texto fixo"
+        ws["D40"] = 123
+        wb.save(self.caminho_modelo)
+        self.caminho_json = self.dir_tmp / "dados.json"
+        self.caminho_json.write_text(json.dumps(DADOS), encoding="utf-8")
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def _preencher(self, nome_saida):
+        caminho_saida = self.dir_tmp / nome_saida
+        self.assertTrue(processar.preencher_excel_novo_com_placeholders(self.caminho_json, self.caminho_modelo, caminho_saida, "Sumula"))
+        ws = openpyxl.load_workbook(caminho_saida)["Sumula"]
+        return ws["A1"].value, ws["B2"].value, ws["C3"].value
+
+    @patch("processar.CACHE_INDICE_PLACEHOLDERS", new_callable=CacheIndicePlaceholders)
+    def test_segundo_preenchimento_usa_indice_e_gera_a_mesma_saida(self, mock_cache):
+        primeira = self._preencher("saida_1.xlsx")
+        self.assertTrue(caminho_indice_placeholders(self.caminho_modelo).is_file())
+        with patch("processar.localizar_placeholders") as mock_localizar:
+            segunda = self._preencher("saida_2.xlsx")
+        mock_localizar.assert_not_called()
+        self.assertEqual(primeira, segunda)
+        self.assertEqual(primeira, ("FULANO DE TAL", "CPF: 000.000.000-00 / Renda: N/A", "Texto fixo"))
+
+    def test_indice_persistido_vale_so_para_o_mesmo_conteudo(self):
+        CacheIndicePlaceholders().gravar(self.caminho_modelo, "Sumula", [("A1", "{{NOME}}", [(0, 8)])])
+        self.assertEqual(CacheIndicePlaceholders().obter(self.caminho_modelo, "Sumula"), [("A1", "{{NOME}}", [(0, 8)])])
+        self.assertIsNone(CacheIndicePlaceholders().obter(self.caminho_modelo, "Outra"))
+        wb = openpyxl.load_workbook(self.caminho_modelo)
+        wb["Sumula"]["E5"] = "{{NOVO}}"
+        wb.save(self.caminho_modelo)
+        self.assertIsNone(CacheIndicePlaceholders().obter(self.caminho_modelo, "Sumula"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+import unittest
+
+from pipeline_estagios import EstagioPipeline, executar_pipeline
+
+def _estagio_com_atraso(nome, atraso_s, num_consumidores=1, capacidade_fila=2):
+    async def _funcao(item):
+        await asyncio.sleep(atraso_s)
+        item["etapas"].append(nome)
+        return item
+    return EstagioPipeline(nome, _funcao, num_consumidores, capacidade_fila)
+
+class TestPipelineEstagios(unittest.TestCase):
+
+    def test_estagios_se_sobrepoem(self):
+        estagios = [_estagio_com_atraso(nome, 0.05) for nome in ("a", "b", "c")]
+        t_inicio = time.perf_counter()
+        concluidos = asyncio.run(executar_pipeline(({"id": i, "etapas": []} for i in range(6)), estagios))
+        duracao = time.perf_counter() - t_inicio
+        self.assertEqual(sorted(item["id"] for item in concluidos), list(range(6)))
+        self.assertTrue(all(item["etapas"] == ["a", "b", "c"] for item in concluidos))
+        # Em sequência seriam 6 x 3 x 0,05 = 0,9 s; em pipeline, ~(6 + 2) x 0,05 = 0,4 s
+        self.assertLess(duracao, 0.7)
+        metricas = estagios[1].metricas(duracao)
+        self.assertEqual(metricas["itens"], 6)
+        self.assertGreater(metricas["utilizacao"], 0.5)
+        self.assertLessEqual(metricas["fila_profundidade_max"], 2)
+
+    def test_item_encerrado_nao_segue_para_proximos_estagios(self):
+        async def _marcar_falha(item):
+            item["erro"] = item["id"] % 2 == 0
+            return item
+        estagios = [EstagioPipeline("falha", _marcar_falha), _estagio_com_atraso("seguinte", 0)]
+        concluidos = asyncio.run(executar_pipeline(({"id": i, "etapas": []} for i in range(4)), estagios,
+                                                   encerrado=lambda item: item["erro"]))
+        self.assertEqual(len(concluidos), 4)
+        self.assertEqual({item["id"]: item["etapas"] for item in concluidos}, {0: [], 1: ["seguinte"], 2: [], 3: ["seguinte"]})
+        self.assertEqual(estagios[1].itens_processados, 2)
+
+    def test_fila_limitada_aplica_contrapressao(self):
+        estagios = [_estagio_com_atraso("rapido", 0, capacidade_fila=1), _estagio_com_atraso("lento", 0.02, capacidade_fila=1)]
+        asyncio.run(executar_pipeline(({"id": i, "etapas": []} for i in range(5)), estagios))
+        self.assertLessEqual(estagios[1].profundidade_max_fila, 1)
+        self.assertGreater(estagios[1].tempo_bloqueado_s, 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+import processar
+from benchmarks.xlsx_sintetico import gerar_modelo_xlsx
+from preenchimento_xlsx_direto import preencher_xlsx_direto
+
+def _valores(caminho):
+    wb = openpyxl.load_workbook(caminho)
+    return {ws.title: [[c.value for c in linha] for linha in ws.iter_rows()] for ws in wb.worksheets}
+
+class TestPreenchimentoXlsxDireto(unittest.TestCase):
+
+    def setUp(self):
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        self.dir_tmp = Path(self._dir_tmp.name)
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def test_mesma_saida_que_o_openpyxl_e_demais_partes_intactas(self):
+        for shared_strings in (True, False):
+            with self.subTest(shared_strings=shared_strings):
+                caminho_modelo = self.dir_tmp / f"modelo_{shared_strings}.xlsx"
+                placeholders = gerar_modelo_xlsx(caminho_modelo, linhas=40, colunas=8, placeholders=30, shared_strings=shared_strings)
+                dados = {ph: f"valor <{i}> & cia" for i, ph in enumerate(placeholders[:20])}
+                dados[placeholders[21]] = 1234.5
+                dados[placeholders[22]] = None
+                dados[placeholders[23]] = " com espaços "
+                caminho_direto = self.dir_tmp / f"direto_{shared_strings}.xlsx"
+                caminho_openpyxl = self.dir_tmp / f"openpyxl_{shared_strings}.xlsx"
+
+                with patch("processar.openpyxl.load_workbook", side_effect=AssertionError("o modelo não deve ser carregado")):
+                    self.assertTrue(processar.preencher_excel_com_dados(dados, caminho_modelo, caminho_direto, "Sumula"))
+                with patch("processar.PREENCHER_XLSX_DIRETO", False):
+                    self.assertTrue(processar.preencher_excel_com_dados(dados, caminho_modelo, caminho_openpyxl, "Sumula"))
+
+                self.assertEqual(_valores(caminho_direto), _valores(caminho_openpyxl))
+                self.assertEqual(openpyxl.load_workbook(caminho_direto)["Sumula"]["B2"].font.b, True)
+                with zipfile.ZipFile(caminho_modelo) as modelo, zipfile.ZipFile(caminho_direto) as saida:
+                    self.assertEqual(modelo.namelist(), saida.namelist())
+                    alteradas = {n for n in modelo.namelist() if modelo.read(n) != saida.read(n)}
+                self.assertEqual(alteradas, {"xl/worksheets/sheet1.xml", "xl/sharedStrings.xml"} if shared_strings else {"xl/worksheets/sheet1.xml"})
+
+    def test_casos_nao_suportados_voltam_none_sem_gravar(self):
+        caminho_modelo = self.dir_tmp / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = CellRichText([TextBlock(InlineFont(b=True), "Nome: "), "{{NOME}}"])
+        wb.active["A2"] = '=CONCATENATE("{{CPF}}")'
+        wb.save(caminho_modelo)
+        caminho_saida = self.dir_tmp / "saida.xlsx"
+        self.assertIsNone(preencher_xlsx_direto(caminho_modelo, caminho_saida, {"{{NOME}}": "FULANO"}))
+        self.assertFalse(caminho_saida.exists())
+        self.assertIsNone(preencher_xlsx_direto(caminho_modelo, caminho_saida, {}, "Inexistente"))
+        self.assertIsNone(preencher_xlsx_direto(self.dir_tmp / "nao_existe.xlsx", caminho_saida, {}))
+
+if __name__ == "__main__":
+    unittest.main()
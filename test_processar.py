@@ -3,7 +3,14 @@ from unittest.mock import patch, MagicMock
 from pathlib import Path
 import json
 import os
+import tempfile
+import time
 
+import pdfplumber
+
+import processar
+
+from benchmarks.pdf_sintetico import gerar_pdf_sumula
 from processar import (
     resource_path,
     carregar_schema_extracao,
@@ -13,6 +20,15 @@ from processar import (
     salvar_texto_em_arquivo,
     salvar_json_em_arquivo,
     achatar_json,
+    calcular_percentil,
+    resumir_lote,
+    enviar_texto_completo_para_gemini_todos_blocos,
+    construir_partes_prompt_gemini,
+    _limpar_texto_extraido,
+    _extrair_textos_pagina,
+    PDF_X_TOLERANCE,
+    PDF_Y_TOLERANCE,
+    MARCADOR_INICIO_TEXTO_PDF_PROMPT,
 )
 
 class TestProcessar(unittest.TestCase):
@@ -31,6 +47,17 @@ class TestProcessar(unittest.TestCase):
         result = resource_path("test_file.txt")
         self.assertEqual(result, Path("/mocked/meipass/test_file.txt"))
 
+    def test_caminho_dados_gravaveis_fora_do_meipass_no_executavel(self):
+        with patch("processar.sys") as mock_sys:
+            mock_sys.frozen = True
+            mock_sys._MEIPASS = "/mocked/meipass"
+            mock_sys.executable = "/mocked/app/ProcessarPDF.exe"
+            with patch.dict(os.environ, {"LOCALAPPDATA": "/mocked/localappdata"}):
+                self.assertEqual(processar.caminho_dados_gravaveis("cache"), Path("/mocked/localappdata/ProcessarPDF/cache"))
+            with patch.dict(os.environ, {}, clear=True):
+                self.assertEqual(processar.caminho_dados_gravaveis("cache"), Path("/mocked/app/cache").resolve())
+        self.assertEqual(processar.caminho_dados_gravaveis("cache"), Path(processar.__file__).resolve().parent / "cache") # Desenvolvimento
+
     @patch("processar.open", new_callable=MagicMock)
     @patch("processar.resource_path")
     def test_carregar_schema_extracao_valid(self, mock_resource_path, mock_open):
@@ -55,17 +82,45 @@ class TestProcessar(unittest.TestCase):
         result = gerar_particoes_dinamicamente()
         self.assertTrue(result)
 
+    @patch("processar._extrair_textos_pagina", side_effect=[("Texto da página 1", None), ("Texto da página 2", None)])
     @patch("processar.pdfplumber.open")
-    def test_extrair_texto_do_pdf(self, mock_pdfplumber_open):
+    def test_extrair_texto_do_pdf(self, mock_pdfplumber_open, mock_extrair_textos_pagina):
         mock_pdf = MagicMock()
         mock_pdf.pages = [MagicMock(), MagicMock()]
-        mock_pdf.pages[0].extract_text.return_value = "Texto da página 1"
-        mock_pdf.pages[1].extract_text.return_value = "Texto da página 2"
         mock_pdfplumber_open.return_value.__enter__.return_value = mock_pdf
 
         result = extrair_texto_do_pdf(Path("/mocked/file.pdf"))
         self.assertEqual(result, "Texto da página 1\nTexto da página 2")
 
+    @patch("processar._extrair_textos_pagina", side_effect=[("Capa", "Capa   Súmula   de   Crédito   2024"), ("Texto da página 2", None)])
+    @patch("processar.pdfplumber.open")
+    def test_extrair_texto_do_pdf_usa_layout_quando_tem_mais_palavras(self, mock_pdfplumber_open, mock_extrair_textos_pagina):
+        mock_pdf = MagicMock()
+        mock_pdf.pages = [MagicMock(), MagicMock()]
+        mock_pdfplumber_open.return_value.__enter__.return_value = mock_pdf
+
+        result = extrair_texto_do_pdf(Path("/mocked/file.pdf"))
+        self.assertEqual(result, "Capa   Súmula   de   Crédito   2024\nTexto da página 2")
+
+    def test_extrair_textos_pagina_equivale_a_extract_text(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            caminho_pdf = gerar_pdf_sumula(Path(dir_tmp) / "sumula.pdf", num_paginas=3, paginas_esparsas=1)
+            with pdfplumber.open(caminho_pdf) as pdf:
+                for pagina in pdf.pages:
+                    texto_stream, texto_layout = _extrair_textos_pagina(pagina)
+                    self.assertEqual(texto_stream, pagina.extract_text(x_tolerance=PDF_X_TOLERANCE, y_tolerance=PDF_Y_TOLERANCE, layout=False))
+                    if texto_layout is not None:
+                        self.assertEqual(texto_layout, pagina.extract_text(x_tolerance=PDF_X_TOLERANCE, y_tolerance=PDF_Y_TOLERANCE, layout=True))
+                self.assertIsNotNone(_extrair_textos_pagina(pdf.pages[0])[1]) # Página esparsa (capa) também gera o layout
+
+    def test_limpar_texto_extraido_ajusta_offsets_paginas(self):
+        pagina1 = "Súmula de Crédito\nCooperativa: 3001\nPágina: 1 / 2\n"
+        pagina2 = "Dados do Associado\nNome: X\nPágina: 2 / 2\n"
+        texto, offsets = _limpar_texto_extraido(pagina1 + pagina2, [0, len(pagina1)])
+        self.assertEqual(texto, "Cooperativa: 3001\n\nDados do Associado\nNome: X")
+        self.assertEqual(offsets[0], 0)
+        self.assertTrue(texto[offsets[1]:].lstrip().startswith("Dados do Associado"))
+
     @patch("processar.openpyxl.load_workbook")
     @patch("processar.open")
     def test_preencher_excel_novo_com_placeholders(self, mock_open, mock_load_workbook):
@@ -112,5 +167,226 @@ class TestProcessar(unittest.TestCase):
         result = achatar_json(input_json)
         self.assertEqual(result, expected_output)
 
+    def test_achatar_json_equivale_a_versao_recursiva(self):
+        from benchmarks.bench_achatar_json import _achatar_json_recursivo, _gerar_resposta
+        casos = [
+            _gerar_resposta(50),
+            ["a", 1, None], # Lista simples na raiz
+            [{"x": 1}, [2, {"y": []}]], # Lista de contêineres na raiz: chaves começam com '_1'
+            {"": {"x": [1, 2]}, "a_b": 1, "a": {"b": 2, "c": {}}}, # Chave vazia e colisão 'a_b'
+            "valor_solto",
+        ]
+        for caso in casos:
+            for prefixo in ("", "raiz"):
+                esperado = _achatar_json_recursivo(caso, prefixo)
+                obtido = achatar_json(caso, prefixo)
+                self.assertEqual(list(obtido.items()), list(esperado.items()), (caso, prefixo))
+
+    def test_achatar_json_sem_limite_de_recursao(self):
+        aninhado = {"folha": "fim"}
+        for _ in range(5000):
+            aninhado = {"n": [aninhado, {"x": 1}]}
+        achatado = achatar_json(aninhado)
+        self.assertEqual(len(achatado), 5001)
+        self.assertTrue(next(iter(achatado)).endswith("_1_folha"))
+
+    @patch("processar.configurar_api_gemini")
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_enviar_para_gemini_usa_cache(self, mock_cache, mock_configurar_api):
+        mock_cache.obter.return_value = {"chave1": {"campo": "valor"}}
+        result = enviar_texto_completo_para_gemini_todos_blocos(
+            "Texto do PDF", {"bloco1": {"json_chave": "chave1", "particao": 1}}, Path("/mocked/file.pdf"))
+        self.assertEqual(result, {"chave1": {"campo": "valor"}})
+        mock_configurar_api.assert_not_called()
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    @patch("processar._solicitar_blocos_gemini")
+    def test_enviar_para_gemini_por_particao_mescla_resultados(self, mock_solicitar, mock_cache, mock_configurar_api):
+        mock_cache.obter.return_value = None
+        mock_solicitar.side_effect = lambda texto, blocos, pdf, chave, contabilidade=None, prazo=None: {c["json_chave"]: {"particao": c["particao"]} for c in blocos.values()}
+        blocos = {
+            "bloco_b": {"json_chave": "chave_b", "particao": 2},
+            "bloco_a": {"json_chave": "chave_a", "particao": 1},
+            "bloco_a2": {"json_chave": "chave_a2", "particao": 1},
+        }
+        result = enviar_texto_completo_para_gemini_todos_blocos("Texto do PDF", blocos, Path("/mocked/file.pdf"))
+        self.assertEqual(mock_solicitar.call_count, 2)
+        self.assertEqual(list(result), ["chave_a", "chave_a2", "chave_b"])
+        self.assertEqual(result["chave_b"], {"particao": 2})
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.MAX_REQUISICOES_PARALELAS_GEMINI", 1)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    @patch("processar._solicitar_blocos_gemini")
+    def test_enviar_para_gemini_por_particao_cancela_pendentes_apos_falha(self, mock_solicitar, mock_cache, mock_configurar_api):
+        mock_cache.obter.return_value = None
+        def _solicitar(texto, blocos, pdf, chave, contabilidade=None, prazo=None):
+            if "a" in blocos:
+                raise RuntimeError("falha na partição 1")
+            time.sleep(0.2) # Partição 2 pode já estar em voo; a 3 ainda estaria na fila
+            return {}
+        mock_solicitar.side_effect = _solicitar
+        blocos = {nome: {"json_chave": f"chave_{nome}", "particao": particao} for particao, nome in enumerate("abc", start=1)}
+        metricas = {}
+        with patch("processar.log_to_gui"), patch("processar.logging.exception"):
+            self.assertIsNone(enviar_texto_completo_para_gemini_todos_blocos("Texto do PDF", blocos, Path("/mocked/file.pdf"), metricas))
+        self.assertIsInstance(metricas["erro"], RuntimeError)
+        self.assertNotIn("c", [next(iter(chamada.args[1])) for chamada in mock_solicitar.call_args_list])
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.MARGEM_SECAO_CARACTERES", 0)
+    @patch("processar.configurar_api_gemini", return_value=True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    @patch("processar._solicitar_blocos_gemini", return_value={})
+    def test_enviar_para_gemini_por_particao_envia_so_as_secoes_dos_blocos(self, mock_solicitar, mock_cache, mock_configurar_api):
+        mock_cache.obter.return_value = None
+        blocos = {
+            "a": {"json_chave": "chave_a", "particao": 1, "titulo_padrao": "Seção A"},
+            "b": {"json_chave": "chave_b", "particao": 2, "titulo_padrao": "Seção B"},
+            "c": {"json_chave": "chave_c", "particao": 3, "titulo_padrao": "Seção C"},
+        }
+        texto = "Capa\nSeção A\nvalor a1\nSeção B\nvalor b\nSeção A\nvalor a2\n"
+        with patch("processar.BLOCO_CONFIG", blocos):
+            enviar_texto_completo_para_gemini_todos_blocos(texto, blocos, Path("/mocked/file.pdf"))
+        textos_enviados = {next(iter(chamada.args[1])): chamada.args[0] for chamada in mock_solicitar.call_args_list}
+        self.assertEqual(textos_enviados["a"], "Seção A\nvalor a1\n" + processar.SEPARADOR_TRECHOS_PROMPT + "Seção A\nvalor a2\n")
+        self.assertEqual(textos_enviados["b"], "Seção B\nvalor b\n")
+        self.assertIs(textos_enviados["c"], texto) # Título não encontrado: documento inteiro
+
+    def test_prompt_em_partes_com_prefixo_compilado_uma_vez(self):
+        blocos = {
+            "bloco_a": {"json_chave": "chave_a", "campos_esperados": ["parecer", "obs", "nr"], "campos_texto_longo_limitar": ["parecer", "obs"]},
+            "bloco_b": {"json_chave": "chave_b", "nome_lista_json": "itens", "sub_campos_lista": ["descricao"], "campos_texto_longo_limitar": ["descricao"]},
+        }
+        texto = "Texto do PDF " * 100
+        partes = construir_partes_prompt_gemini(texto, blocos)
+        self.assertIs(partes[1], texto)
+        self.assertTrue(partes[0].endswith(MARCADOR_INICIO_TEXTO_PDF_PROMPT + "\n"))
+        self.assertIn('"chave_a", "chave_b"', partes[2])
+        self.assertEqual(partes[0].count("TEXTO_LONGO_COMPLEXO_VERIFICAR_ORIGINAL"), 1)
+        self.assertIn("Texto longo (Regra 6): parecer, obs.", partes[0])
+        self.assertIn("Texto longo (Regra 6) em cada objeto de 'itens': descricao.", partes[0])
+        self.assertIs(construir_partes_prompt_gemini("outro texto", json.loads(json.dumps(blocos)))[0], partes[0])
+        self.assertNotIn("TEXTO_LONGO", construir_partes_prompt_gemini(texto, {"bloco_c": {"json_chave": "chave_c", "campos_esperados": ["nr"]}})[0])
+
+    def test_resumir_lote(self):
+        resultados = [
+            {"pdf": "a.pdf", "sucesso": True, "erro": None, "tempos": {"extracao_texto": 1.0, "api_gemini": 10.0}},
+            {"pdf": "b.pdf", "sucesso": True, "erro": None, "tempos": {"extracao_texto": 3.0, "api_gemini": 20.0}},
+            {"pdf": "c.pdf", "sucesso": False, "erro": "Falha na extração de texto do PDF.", "tempos": {"extracao_texto": 2.0}},
+        ]
+        resumo = resumir_lote(resultados, 60.0)
+        self.assertEqual(resumo["falhas"], 1)
+        self.assertEqual(resumo["documentos_por_minuto"], 3.0)
+        self.assertEqual(resumo["etapas"]["extracao_texto"]["p50_s"], 2.0)
+        self.assertAlmostEqual(resumo["etapas"]["api_gemini"]["p95_s"], 19.5)
+        self.assertEqual(resumo["erros"], {"c.pdf": "Falha na extração de texto do PDF."})
+        self.assertEqual(calcular_percentil([], 95), 0.0)
+
+    def test_preencher_excel_lote_sem_json_intermediario(self):
+        import openpyxl
+        import processar
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            dir_tmp = Path(dir_tmp)
+            caminho_modelo = dir_tmp / "modelo.xlsx"
+            wb = openpyxl.Workbook()
+            wb.active["A1"] = "{{NOME}}"
+            wb.save(caminho_modelo)
+            for salvar_json in (False, True):
+                dir_saida = dir_tmp / f"saida_{salvar_json}"
+                dir_saida.mkdir()
+                with patch("processar.SALVAR_JSON_DADOS_PARA_EXCEL", salvar_json), \
+                     patch("processar.open", side_effect=AssertionError("JSON intermediário não deve ser relido")):
+                    resultado = processar.preencher_excel_lote({"tempos": {}}, {"NOME": "FULANO"}, dir_tmp / "sumula.pdf", caminho_modelo, dir_saida)
+                processar._EXECUTOR_ARTEFATOS.submit(lambda: None).result() # Aguarda a gravação em segundo plano
+                self.assertTrue(resultado["sucesso"], resultado.get("erro"))
+                self.assertEqual(openpyxl.load_workbook(dir_saida / "sumula_PREENCHIDO.xlsx").active["A1"].value, "FULANO")
+                caminho_json = dir_saida / "sumula_dados_para_excel.json"
+                self.assertEqual(caminho_json.exists(), salvar_json)
+                if salvar_json:
+                    self.assertEqual(json.loads(caminho_json.read_text(encoding="utf-8")), {"{{NOME}}": "FULANO"})
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", False)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_envio_assincrono_nao_bloqueia_o_laco_no_cache_em_disco(self, mock_cache):
+        import asyncio
+        blocos = {"bloco_a": {"json_chave": "chave_a", "particao": 1, "campos_esperados": ["x"]}}
+
+        def _obter_lento(chave):
+            time.sleep(0.3) # Disco lento / varredura do diretório
+            return {"chave_a": {"x": 1}}
+
+        mock_cache.obter.side_effect = _obter_lento
+
+        async def _lote():
+            return await asyncio.gather(*(processar.enviar_texto_completo_para_gemini_todos_blocos_async(
+                f"Documento {i}", blocos, Path(f"/mocked/{i}.pdf"), MagicMock()) for i in range(4)))
+
+        t_inicio = time.perf_counter()
+        self.assertEqual(asyncio.run(_lote()), [{"chave_a": {"x": 1}}] * 4)
+        self.assertLess(time.perf_counter() - t_inicio, 0.9) # No laço de eventos, as 4 leituras somariam 1,2 s
+
+    @patch("processar.ENVIAR_PARTICOES_EM_PARALELO", True)
+    @patch("processar.CACHE_RESPOSTAS_GEMINI")
+    def test_envio_assincrono_cancela_as_demais_requisicoes_apos_falha(self, mock_cache):
+        import asyncio
+        mock_cache.obter.return_value = None
+        blocos = {nome: {"json_chave": f"chave_{nome}", "particao": particao} for particao, nome in enumerate("abc", start=1)}
+        chamadas, canceladas = [], []
+
+        class _ClienteFalho:
+            async def gerar(self, partes, registro, modelo_cache=None):
+                chamadas.append(partes)
+                if len(chamadas) == 1:
+                    await asyncio.sleep(0.01)
+                    raise RuntimeError("falha na partição")
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    canceladas.append(partes)
+                    raise
+
+        async def _enviar():
+            metricas = {}
+            resultado = await processar.enviar_texto_completo_para_gemini_todos_blocos_async(
+                "Texto do PDF", blocos, Path("/mocked/file.pdf"), _ClienteFalho(), metricas)
+            return resultado, metricas, len(canceladas) # Contado no retorno: nada pode seguir rodando depois dele
+
+        with patch("processar.log_to_gui"):
+            resultado, metricas, n_canceladas = asyncio.run(_enviar())
+        self.assertIsNone(resultado)
+        self.assertIsInstance(metricas["erro"], RuntimeError)
+        self.assertEqual((len(chamadas), n_canceladas), (3, 2))
+
+    def test_retry_gemini_respeita_o_prazo_da_requisicao(self):
+        from backend_llm import ErroSimuladoLLM
+        timeouts = []
+
+        def _gerar(prompt, generation_config=None, request_options=None):
+            timeouts.append(request_options["timeout"])
+            time.sleep(0.1)
+            raise ErroSimuladoLLM(503, "indisponível")
+
+        modelo = MagicMock()
+        modelo.generate_content.side_effect = _gerar
+        t_inicio = time.monotonic()
+        with self.assertRaises(processar.ErroPrazoEsgotado):
+            processar.gerar_conteudo_gemini_com_retry(modelo, "prompt", None, prazo=t_inicio + 0.3)
+        self.assertLess(time.monotonic() - t_inicio, 1.0) # Sem o prazo: timeout de 300 s e backoff de 2 s entre 3 tentativas
+        self.assertEqual(len(timeouts), 1)
+        self.assertLessEqual(timeouts[0], 0.3)
+
+    def test_cli_celery_recusa_opcoes_que_nao_chegam_aos_workers(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            for opcao in (["--workers", "2"], ["--async"]):
+                with patch("processar.carregar_schema_extracao") as mock_schema, self.assertRaises(SystemExit) as contexto, \
+                     patch("sys.stderr"):
+                    processar.executar_cli(["batch", dir_tmp, "--consolidado", str(Path(dir_tmp) / "lote.xlsx"), "--celery", *opcao])
+                self.assertEqual(contexto.exception.code, 2)
+                mock_schema.assert_not_called()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
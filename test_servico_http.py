@@ -0,0 +1,93 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+
+import processar
+from benchmarks.pdf_sintetico import gerar_pdf_sumula
+from servico_http import app
+
+RESPOSTA_GEMINI = {"dados_associado": {"nome": "FULANO DE TAL", "cpf": "000.000.000-00"}}
+
+class TestServicoHttp(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._dir_tmp = tempfile.TemporaryDirectory()
+        cls.caminho_pdf = gerar_pdf_sumula(Path(cls._dir_tmp.name) / "sumula.pdf", num_paginas=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._dir_tmp.cleanup()
+
+    def setUp(self):
+        self.cliente = app.test_client()
+
+    def _upload(self, **campos_extras):
+        dados = {"pdf": (io.BytesIO(self.caminho_pdf.read_bytes()), "sumula.pdf")}
+        dados.update(campos_extras)
+        return dados
+
+    def test_healthz_informa_estado_carregado(self):
+        resposta = self.cliente.get("/healthz")
+        self.assertIn(resposta.status_code, (200, 503)) # 503 quando a GOOGLE_API_KEY não está configurada
+        self.assertGreater(resposta.get_json()["schema_blocos"], 0)
+
+    def test_extract_sem_pdf(self):
+        resposta = self.cliente.post("/extract", data={}, content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 400)
+
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=RESPOSTA_GEMINI)
+    def test_extract_retorna_placeholders(self, mock_enviar):
+        resposta = self.cliente.post("/extract", data=self._upload(), content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 200)
+        corpo = resposta.get_json()
+        self.assertIn("FULANO DE TAL", corpo["placeholders"].values())
+        self.assertTrue(all(chave.startswith("{{") and chave.endswith("}}") for chave in corpo["placeholders"]))
+        self.assertIn("extracao_texto", corpo["tempos"])
+
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=None)
+    def test_extract_falha_da_api(self, mock_enviar):
+        resposta = self.cliente.post("/extract", data=self._upload(), content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 502)
+
+    def test_extract_prazo_esgotado_na_api(self):
+        def _enviar(texto, blocos, pdf_path, metricas=None, prazo=None):
+            self.assertIsNotNone(prazo)
+            metricas["erro"] = processar.ErroPrazoEsgotado("Prazo da requisição esgotado antes da chamada à API Gemini.")
+            return None
+
+        with patch("processar.enviar_texto_completo_para_gemini_todos_blocos", side_effect=_enviar):
+            resposta = self.cliente.post("/extract", data=self._upload(), content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 504)
+
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=RESPOSTA_GEMINI)
+    def test_extract_xlsx_com_modelo(self, mock_enviar):
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = "Associado: {{DADOS_ASSOCIADO_NOME}}"
+        modelo = io.BytesIO()
+        wb.save(modelo)
+        modelo.seek(0)
+        resposta = self.cliente.post("/extract?formato=xlsx", data=self._upload(template=(modelo, "modelo.xlsx")),
+                                     content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.mimetype, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.assertTrue(resposta.data.startswith(b"PK"))
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=RESPOSTA_GEMINI)
+    def test_extract_pdf_com_nome_do_modelo_nao_e_sobrescrito(self, mock_enviar):
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = "Associado: {{DADOS_ASSOCIADO_NOME}}"
+        modelo = io.BytesIO()
+        wb.save(modelo)
+        modelo.seek(0)
+        dados = {"pdf": (io.BytesIO(self.caminho_pdf.read_bytes()), "modelo.xlsx"), "template": (modelo, "modelo.xlsx")}
+        resposta = self.cliente.post("/extract?formato=xlsx", data=dados, content_type="multipart/form-data")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("modelo_PREENCHIDO.xlsx", resposta.headers["Content-Disposition"])
+        self.assertEqual(openpyxl.load_workbook(io.BytesIO(resposta.data)).active["A1"].value, "Associado: FULANO DE TAL")
+
+if __name__ == "__main__":
+    unittest.main()
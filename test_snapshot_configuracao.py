@@ -0,0 +1,49 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from indice_mapeamento import IndiceCuringasMapeamento
+from snapshot_configuracao import carregar_snapshot, salvar_snapshot
+
+class TestSnapshotConfiguracao(unittest.TestCase):
+
+    def setUp(self):
+        self._dir_tmp = tempfile.TemporaryDirectory()
+        dir_tmp = Path(self._dir_tmp.name)
+        self.fontes = {"schema": dir_tmp / "extraction_schema.json", "mapeamento": dir_tmp / "mapeamento_config.json"}
+        self.fontes["schema"].write_text(json.dumps({"bloco": {"json_chave": "bloco", "particao": 1}}), encoding="utf-8")
+        self.fontes["mapeamento"].write_text(json.dumps({"mapeamento_para_chaves_padronizadas": {"lista_*_nome": "NOME_*"}}), encoding="utf-8")
+        self.caminho_snapshot = dir_tmp / "cache" / "snapshot_config.pickle"
+        salvar_snapshot(self.caminho_snapshot, self.fontes, {"particoes": [["bloco"]]}, versao=1)
+
+    def tearDown(self):
+        self._dir_tmp.cleanup()
+
+    def test_snapshot_em_dia_e_carregado(self):
+        snapshot = carregar_snapshot(self.caminho_snapshot, self.fontes, versao=1)
+        self.assertEqual(snapshot["conteudo"], {"particoes": [["bloco"]]})
+        self.assertIsNone(carregar_snapshot(self.caminho_snapshot, self.fontes, versao=2))
+        self.assertIsNone(carregar_snapshot(Path(self._dir_tmp.name) / "inexistente.pickle", self.fontes, versao=1))
+
+    def test_mtime_alterado_com_mesmo_conteudo_mantem_snapshot(self):
+        estat = os.stat(self.fontes["schema"])
+        os.utime(self.fontes["schema"], ns=(estat.st_atime_ns, estat.st_mtime_ns + 5_000_000_000))
+        self.assertIsNotNone(carregar_snapshot(self.caminho_snapshot, self.fontes, versao=1))
+
+    def test_conteudo_alterado_invalida_snapshot(self):
+        estat = os.stat(self.fontes["mapeamento"])
+        self.fontes["mapeamento"].write_text(json.dumps({"mapeamento_para_chaves_padronizadas": {"lista_*_nome": "NOMEX*"}}), encoding="utf-8")
+        os.utime(self.fontes["mapeamento"], ns=(estat.st_atime_ns, estat.st_mtime_ns + 5_000_000_000)) # Mesmo tamanho: só o hash denuncia
+        self.assertIsNone(carregar_snapshot(self.caminho_snapshot, self.fontes, versao=1))
+
+    def test_indice_curingas_sobrevive_ao_pickle(self):
+        indice = IndiceCuringasMapeamento({"lista_*_nome": "NOME_*", "fiador*_nome": "FIADOR_*", "lista_1_*": "UM_*"})
+        copia = pickle.loads(pickle.dumps(indice, protocol=pickle.HIGHEST_PROTOCOL))
+        for chave_ia in ("lista_7_nome", "fiador2_nome", "lista_1_9", "lista_x_nome"):
+            self.assertEqual(copia.resolver(chave_ia), indice.resolver(chave_ia), chave_ia)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import openpyxl
+
+import processar
+from benchmarks.pdf_sintetico import gerar_pdf_sumula
+
+try:
+    import tarefas_celery
+except ImportError: # Celery/redis não instalados neste ambiente
+    tarefas_celery = None
+
+RESPOSTA_GEMINI = {"dados_associado": {"nome": "FULANO DE TAL", "cpf": "000.000.000-00"}}
+
+class ErroCota(Exception):
+    code = 429
+
+@unittest.skipIf(tarefas_celery is None, "Celery não instalado")
+class TestTarefasCelery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        tarefas_celery.app.conf.task_always_eager = True
+        cls._dir_tmp = tempfile.TemporaryDirectory()
+        cls.dir_pdfs = Path(cls._dir_tmp.name) / "pdfs"
+        cls.dir_pdfs.mkdir()
+        for i in range(3):
+            gerar_pdf_sumula(cls.dir_pdfs / f"sumula_{i}.pdf", num_paginas=2)
+        cls.caminho_modelo = Path(cls._dir_tmp.name) / "modelo.xlsx"
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = "{{DADOS_ASSOCIADO_NOME}}"
+        wb.save(cls.caminho_modelo)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._dir_tmp.cleanup()
+
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=RESPOSTA_GEMINI)
+    def test_fluxo_pdf_guarda_json_normalizado(self, mock_enviar):
+        dir_saida = Path(self._dir_tmp.name) / "saida_pdf"
+        dir_saida.mkdir(exist_ok=True)
+        resultado = tarefas_celery.enfileirar_pdf(self.dir_pdfs / "sumula_0.pdf", self.caminho_modelo, dir_saida).get()
+        self.assertTrue(resultado["sucesso"], resultado["erro"])
+        self.assertIn("FULANO DE TAL", resultado["json_normalizado"].values())
+        self.assertTrue((dir_saida / "sumula_0_PREENCHIDO.xlsx").exists())
+
+    @patch("processar.enviar_texto_completo_para_gemini_todos_blocos", return_value=RESPOSTA_GEMINI)
+    def test_lote_em_chord_retorna_resumo(self, mock_enviar):
+        resumo = tarefas_celery.enfileirar_lote(self.dir_pdfs, self.caminho_modelo, dir_saida=Path(self._dir_tmp.name) / "saida_lote").get()
+        self.assertEqual((resumo["documentos"], resumo["sucessos"]), (3, 3))
+
+    @patch("tarefas_celery.calcular_espera_retry", return_value=0)
+    def test_erro_transitorio_da_api_e_retentado(self, mock_espera):
+        chamadas = []
+
+        def _enviar(texto, blocos, pdf_path, metricas=None):
+            chamadas.append(pdf_path)
+            if len(chamadas) == 1:
+                metricas["erro"] = ErroCota("Resource exhausted")
+                return None
+            return RESPOSTA_GEMINI
+
+        with patch("processar.enviar_texto_completo_para_gemini_todos_blocos", side_effect=_enviar):
+            trabalho = tarefas_celery.extrair_dados_gemini.apply(args=(tarefas_celery.extrair_texto(str(self.dir_pdfs / "sumula_1.pdf")),)).get()
+        self.assertEqual(len(chamadas), 2)
+        self.assertIsNone(trabalho["resultado"]["erro"])
+        self.assertEqual(trabalho["resultado_api"], RESPOSTA_GEMINI)
+
+    def test_opcoes_do_lote_sao_aplicadas_no_worker(self):
+        estados = []
+
+        def _enviar(texto, blocos, pdf_path, metricas=None):
+            estados.append((processar.CACHE_RESPOSTAS_GEMINI.habilitado, processar.ENVIAR_PARTICOES_EM_PARALELO,
+                            processar.ORCAMENTO_TOKENS_POR_REQUISICAO, processar.obter_backend_llm().nome))
+            return RESPOSTA_GEMINI
+
+        dir_saida = Path(self._dir_tmp.name) / "saida_opcoes"
+        dir_saida.mkdir(exist_ok=True)
+        with patch("processar.enviar_texto_completo_para_gemini_todos_blocos", side_effect=_enviar):
+            opcoes = {"usar_cache": False, "particoes_em_paralelo": True, "orcamento_tokens": 5000, "backend_llm": "falso"}
+            tarefas_celery.enfileirar_pdf(self.dir_pdfs / "sumula_2.pdf", self.caminho_modelo, dir_saida, opcoes_lote=opcoes).get()
+            tarefas_celery.enfileirar_pdf(self.dir_pdfs / "sumula_2.pdf", self.caminho_modelo, dir_saida).get()
+        padrao = tarefas_celery._OPCOES_PADRAO_WORKER
+        self.assertEqual(estados, [(False, True, 5000, "falso"),
+                                   (True, padrao["particoes_em_paralelo"], padrao["orcamento_tokens"], padrao["backend_llm"])])
+
+if __name__ == "__main__":
+    unittest.main()